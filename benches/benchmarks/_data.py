@@ -0,0 +1,80 @@
+"""Datasets for the benchmarks, generated from the bundled test data.
+"""
+
+import functools
+
+from pyhmmer.easel import (
+    Alphabet,
+    DigitalSequence,
+    DigitalSequenceBlock,
+    Randomness,
+    TextSequence,
+)
+from pyinfernal.cm import CMFile
+from pyinfernal.tests.utils import resource_files
+
+#: The Rfam models bundled with the tests, by increasing consensus length.
+MODELS = ["RF03523", "RF00107", "RF00029", "RF00042", "RF00243"]
+
+#: The default seed used to generate the target sequences.
+SEED = 42
+
+
+def data_path(*parts):
+    return resource_files("pyinfernal.tests").joinpath("data", *parts)
+
+
+@functools.lru_cache(maxsize=None)
+def load_cm(name):
+    with CMFile(data_path("cms", f"{name}.cm")) as cm_file:
+        return cm_file.read()
+
+
+def load_cms(names=MODELS):
+    return [load_cm(name) for name in names]
+
+
+def make_targets(total_length, max_length=10000, seed=SEED):
+    """Generate a block of random targets with embedded true positives.
+
+    The background sequences are sampled from the default residue
+    distribution with random lengths of at most ``max_length``. One in
+    four targets is a sequence sampled from one of the bundled models,
+    embedded in a genome-like background sequence, so that every model
+    gets true hits to report and align.
+
+    """
+    alphabet = Alphabet.rna()
+    rng = Randomness(seed)
+    cms = load_cms()
+
+    block = DigitalSequenceBlock(alphabet)
+    length = 0
+    while length < total_length:
+        if len(block) % 4 == 0:
+            cm = cms[(len(block) // 4) % len(cms)]
+            seq = cm.sample(1, rng, embed=max_length)[0]
+            seq.name = f"{seq.name}_{len(block)}"
+        else:
+            seq = DigitalSequence.sample(alphabet, max_length, rng)
+            seq.name = f"random_{len(block)}"
+        block.append(seq)
+        length += len(seq)
+    return block
+
+
+def make_reads(total_length, read_length=150, seed=SEED):
+    """Generate a block of short reads tiled over random targets.
+
+    The reads are consecutive non-overlapping slices of the targets
+    generated by `make_targets`, so that some of them overlap the
+    embedded true positives.
+
+    """
+    alphabet = Alphabet.rna()
+    block = DigitalSequenceBlock(alphabet)
+    for seq in make_targets(total_length, seed=seed).textize():
+        for i in range(0, len(seq) - read_length + 1, read_length):
+            read = TextSequence(name=f"{seq.name}_{i}", sequence=seq.sequence[i:i+read_length])
+            block.append(read.digitize(alphabet))
+    return block
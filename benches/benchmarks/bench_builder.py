@@ -0,0 +1,23 @@
+"""Benchmarks for building CMs from alignments with a `Builder`.
+"""
+
+from pyhmmer.easel import Alphabet, MSAFile
+from pyinfernal.cm import Builder
+
+from ._data import data_path
+
+
+class BuilderBuild:
+    timeout = 600
+
+    def setup(self):
+        self.alphabet = Alphabet.rna()
+        with MSAFile(data_path("msas", "tRNA.sto"), digital=True, alphabet=self.alphabet) as msa_file:
+            self.msa = msa_file.read()
+        self.builder = Builder(self.alphabet)
+
+    def time_build_msa(self):
+        self.builder.build_msa(self.msa)
+
+    def peakmem_build_msa(self):
+        self.builder.build_msa(self.msa)
@@ -0,0 +1,19 @@
+"""Benchmarks for sampling sequences from a CM.
+"""
+
+from pyhmmer.easel import Randomness
+
+from ._data import SEED, load_cm
+
+
+class CMSample:
+    params = ([None, 1000, 10000], ["genomic", "iid"])
+    param_names = ["embed", "background"]
+
+    def setup(self, embed, background):
+        if embed is None and background != "genomic":
+            raise NotImplementedError("background is only used with embed")
+        self.cm = load_cm("RF00029")
+
+    def time_sample(self, embed, background):
+        self.cm.sample(1000, Randomness(SEED), embed=embed, background=background)
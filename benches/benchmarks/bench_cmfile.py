@@ -0,0 +1,25 @@
+"""Benchmarks for loading CMs from ASCII and binary files.
+"""
+
+from pyinfernal.cm import CMFile
+
+from ._data import data_path
+
+
+class CMFileLoad:
+    params = (["5.c", "tRNA.c"], ["cm", "cbm"])
+    param_names = ["database", "format"]
+
+    def setup(self, database, format):
+        self.path = data_path("cms", f"{database}.{format}")
+        # read once to warm up the filesystem cache
+        with open(self.path, "rb") as f:
+            f.read()
+
+    def time_read_all(self, database, format):
+        with CMFile(self.path) as cm_file:
+            cms = list(cm_file)
+
+    def peakmem_read_all(self, database, format):
+        with CMFile(self.path) as cm_file:
+            cms = list(cm_file)
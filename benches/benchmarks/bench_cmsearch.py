@@ -0,0 +1,58 @@
+"""Benchmarks for the parallel scaling of the `cmsearch` dispatchers.
+"""
+
+import time
+
+import psutil
+
+from pyinfernal.infernal import cmsearch
+
+from ._data import MODELS, load_cms, make_reads, make_targets
+
+
+class CmsearchScaling:
+    params = (["threading", "multiprocessing"], ["queries", "targets"], [1, 2, 4, 8])
+    param_names = ["backend", "parallel", "cpus"]
+    timeout = 600
+
+    def setup(self, backend, parallel, cpus):
+        if cpus > (psutil.cpu_count(logical=False) or 1):
+            raise NotImplementedError("not enough CPUs available")
+        self.cms = load_cms(MODELS)
+        self.targets = make_targets(500000)
+
+    def time_cmsearch(self, backend, parallel, cpus):
+        for hits in cmsearch(self.cms, self.targets, cpus=cpus, backend=backend, parallel=parallel):
+            pass
+
+    def peakmem_cmsearch(self, backend, parallel, cpus):
+        for hits in cmsearch(self.cms, self.targets, cpus=cpus, backend=backend, parallel=parallel):
+            pass
+
+
+class CmsearchThreadScaling:
+    # many cheap queries against short targets, where the time spent
+    # holding the GIL in each search limits the scaling of threads
+    params = [1, 2, 4, 8]
+    param_names = ["cpus"]
+    timeout = 600
+
+    def setup(self, cpus):
+        if cpus > (psutil.cpu_count(logical=False) or 1):
+            raise NotImplementedError("not enough CPUs available")
+        self.cms = load_cms(MODELS[:2]) * 16
+        self.targets = make_reads(50000)
+
+    def _run(self, cpus):
+        t1 = time.perf_counter()
+        for hits in cmsearch(self.cms, self.targets, cpus=cpus, backend="threading"):
+            pass
+        return time.perf_counter() - t1
+
+    def time_cmsearch(self, cpus):
+        self._run(cpus)
+
+    def track_speedup(self, cpus):
+        return self._run(1) / self._run(cpus)
+
+    track_speedup.unit = "x"
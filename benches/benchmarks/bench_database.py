@@ -0,0 +1,67 @@
+"""Benchmarks for loading targets from a `SequenceDatabase`.
+"""
+
+import os
+import shutil
+import tempfile
+
+from pyhmmer.easel import SequenceFile
+from pyinfernal.cm import SequenceDatabase
+from pyinfernal.infernal import cmsearch
+
+from ._data import MODELS, load_cms, make_targets
+
+
+class DatabaseLoading:
+    params = [1000000, 10000000]
+    param_names = ["residues"]
+    timeout = 600
+
+    def setup(self, residues):
+        self.folder = tempfile.mkdtemp()
+        self.fasta = os.path.join(self.folder, "targets.fa")
+        self.db = os.path.join(self.folder, "targets.db")
+        targets = make_targets(residues)
+        with open(self.fasta, "wb") as f:
+            for seq in targets.textize():
+                seq.write(f)
+        SequenceDatabase.create(self.db, targets)
+        self.alphabet = targets.alphabet
+
+    def teardown(self, residues):
+        shutil.rmtree(self.folder)
+
+    def time_read_fasta(self, residues):
+        with SequenceFile(self.fasta, digital=True, alphabet=self.alphabet) as seq_file:
+            seq_file.read_block().total_length()
+
+    def time_open_database(self, residues):
+        SequenceDatabase(self.db).total_length()
+
+    def peakmem_read_fasta(self, residues):
+        with SequenceFile(self.fasta, digital=True, alphabet=self.alphabet) as seq_file:
+            seq_file.read_block().total_length()
+
+    def peakmem_open_database(self, residues):
+        SequenceDatabase(self.db).total_length()
+
+
+class DatabaseSearch:
+    params = ["block", "database"]
+    param_names = ["targets"]
+    timeout = 600
+
+    def setup(self, targets):
+        self.folder = tempfile.mkdtemp()
+        self.cms = load_cms(MODELS[:2])
+        self.targets = make_targets(500000)
+        if targets == "database":
+            path = os.path.join(self.folder, "targets.db")
+            self.targets = SequenceDatabase.create(path, self.targets)
+
+    def teardown(self, targets):
+        shutil.rmtree(self.folder)
+
+    def time_cmsearch(self, targets):
+        for hits in cmsearch(self.cms, self.targets, cpus=1):
+            pass
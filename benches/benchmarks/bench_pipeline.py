@@ -0,0 +1,85 @@
+"""Benchmarks for the single-threaded throughput of `Pipeline` searches.
+"""
+
+import time
+
+from pyinfernal.cm import Pipeline
+
+from ._data import MODELS, load_cm, load_cms, make_reads, make_targets
+
+
+class SearchThroughput:
+    params = MODELS
+    param_names = ["model"]
+    timeout = 300
+
+    def setup(self, model):
+        self.cm = load_cm(model)
+        self.targets = make_targets(500000)
+        self.pipeline = Pipeline(self.cm.alphabet, Z=self.targets.total_length())
+
+    def time_search_cm(self, model):
+        self.pipeline.search_cm(self.cm, self.targets)
+        self.pipeline.clear()
+
+    def peakmem_search_cm(self, model):
+        self.pipeline.search_cm(self.cm, self.targets)
+        self.pipeline.clear()
+
+    def track_residues_per_second(self, model):
+        t1 = time.perf_counter()
+        self.pipeline.search_cm(self.cm, self.targets)
+        t2 = time.perf_counter()
+        self.pipeline.clear()
+        return self.targets.total_length() / (t2 - t1)
+
+    track_residues_per_second.unit = "residues/s"
+
+
+class ShortReadThroughput:
+    params = (MODELS, [False, True])
+    param_names = ["model", "short_targets"]
+    timeout = 300
+
+    def setup(self, model, short_targets):
+        self.cm = load_cm(model)
+        self.targets = make_reads(500000)
+        # use the filter thresholds of a search in a large set of reads
+        self.pipeline = Pipeline(
+            self.cm.alphabet,
+            Z=1_000_000_000,
+            short_targets=short_targets,
+        )
+
+    def time_search_cm(self, model, short_targets):
+        self.pipeline.search_cm(self.cm, self.targets)
+        self.pipeline.clear()
+
+    def track_reads_per_second(self, model, short_targets):
+        t1 = time.perf_counter()
+        self.pipeline.search_cm(self.cm, self.targets)
+        t2 = time.perf_counter()
+        self.pipeline.clear()
+        return len(self.targets) / (t2 - t1)
+
+    track_reads_per_second.unit = "reads/s"
+
+
+class MultiQueryThroughput:
+    params = [False, True]
+    param_names = ["batched"]
+    timeout = 600
+
+    def setup(self, batched):
+        self.cms = load_cms()
+        self.targets = make_reads(500000)
+        self.pipeline = Pipeline(self.cms[0].alphabet, Z=1_000_000_000)
+
+    def time_search(self, batched):
+        if batched:
+            self.pipeline.search_cms(self.cms, self.targets)
+        else:
+            for cm in self.cms:
+                self.pipeline.search_cm(cm, self.targets)
+                self.pipeline.clear()
+        self.pipeline.clear()
@@ -0,0 +1,60 @@
+"""Benchmarks for searching targets through a `SeedIndex`.
+"""
+
+import os
+import shutil
+import tempfile
+
+from pyinfernal.cm import Pipeline, SeedIndex
+
+from ._data import MODELS, load_cms, make_targets
+
+
+class SeedIndexSearch:
+    params = [10.0, 12.0, 14.0, 16.0]
+    param_names = ["threshold"]
+    timeout = 600
+
+    def setup(self, threshold):
+        self.folder = tempfile.mkdtemp()
+        self.cms = load_cms(MODELS)
+        self.targets = make_targets(1000000)
+        self.index = SeedIndex.create(os.path.join(self.folder, "targets.idx"), self.targets)
+        self.Z = self.targets.total_length()
+
+    def teardown(self, threshold):
+        shutil.rmtree(self.folder)
+
+    def time_search_cm(self, threshold):
+        for cm in self.cms:
+            Pipeline(cm.alphabet, Z=self.Z).search_cm(cm, self.targets)
+
+    def time_search_indexed(self, threshold):
+        for cm in self.cms:
+            Pipeline(cm.alphabet, Z=self.Z).search_indexed(cm, self.targets, self.index, threshold)
+
+    def track_sensitivity(self, threshold):
+        # the fraction of the included hits of a complete scan also found
+        # by the indexed search
+        found = total = 0
+        for cm in self.cms:
+            expected = Pipeline(cm.alphabet, Z=self.Z).search_cm(cm, self.targets)
+            hits = Pipeline(cm.alphabet, Z=self.Z).search_indexed(cm, self.targets, self.index, threshold)
+            keys = {(hit.name, hit.strand, hit.alignment.target_from) for hit in hits}
+            for hit in expected.included:
+                total += 1
+                found += (hit.name, hit.strand, hit.alignment.target_from) in keys
+        return found / total if total else 1.0
+
+    track_sensitivity.unit = "fraction"
+
+    def track_coverage(self, threshold):
+        # the fraction of the target residues searched by the indexed search
+        residues = sum(
+            end - start
+            for cm in self.cms
+            for _, start, end, _ in self.index.regions(cm, threshold)
+        )
+        return residues / (2 * len(self.cms) * self.Z)
+
+    track_coverage.unit = "fraction"
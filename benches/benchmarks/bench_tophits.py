@@ -0,0 +1,26 @@
+"""Benchmarks for merging the partial hits of several threads.
+"""
+
+from pyinfernal.cm import Pipeline, TopHits
+
+from ._data import load_cm, make_targets
+
+
+class TopHitsMerge:
+    params = [1, 2, 4, 8, 16, 32]
+    param_names = ["threads"]
+
+    def setup(self, threads):
+        # emulate the partial hits obtained by the `targets` parallel
+        # strategy, searching one chunk of the targets per thread
+        cm = load_cm("RF00029")
+        targets = make_targets(500000, max_length=2000)
+        pipeline = Pipeline(cm.alphabet, Z=targets.total_length(), E=1000.0)
+        chunksize = (len(targets) + threads - 1) // threads
+        self.hits = []
+        for i in range(0, len(targets), chunksize):
+            self.hits.append(pipeline.search_cm(cm, targets[i:i+chunksize]))
+            pipeline.clear()
+
+    def time_merge(self, threads):
+        TopHits.merge(*self.hits)
@@ -51,6 +51,7 @@ cdef extern from "infernal.h" nogil:
     #define NOT_IMPOSSIBLE(x)  ((x) > -9.999e35) 
     #define NOT_IMPROBABLE(x)  ((x) > -4.999e35) 
     #define sreLOG2(x)  ((x) > 0 ? log(x) * 1.44269504 : IMPOSSIBLE)
+    double sreLOG2(double x)
     #define sreEXP2(x)  (exp((x) * 0.69314718 )) 
     #define epnEXP10(x) (exp((x) * 2.30258509 ))
     #define NOTZERO(x)  (fabs(x - 0.) > -1e6)
@@ -2,8 +2,10 @@ from libc.stdint cimport uint32_t, uint64_t
 from posix.types cimport off_t
 
 from libeasel.alphabet cimport ESL_ALPHABET
+from libeasel.sq cimport ESL_SQ
 from libhmmer.p7_hmm cimport P7_HMM
 from libinfernal cimport CM_p7_NEVPARAM
+from libinfernal.cm_mx cimport CM_SCAN_MX
 from libinfernal.cm_qdband cimport CM_QDBINFO
 from libinfernal.stats cimport ExpInfo_t
 
@@ -94,6 +96,22 @@ cdef extern from "infernal.h" nogil:
         CM_W_SETBY_CMDLINE
         CM_W_SETBY_SUBCOPY
 
+    cdef struct consensus_s:
+        char *cseq
+        char *cstr
+        int  *ct
+        int  *lpos
+        int  *rpos
+        int   clen
+    ctypedef consensus_s CMConsensus_t
+
+    cdef struct emitmap_s:
+        int *lpos
+        int *rpos
+        int *epos
+        int  clen
+    ctypedef emitmap_s CMEmitMap_t
+
     cdef struct cm_s:
         char    *name
         char    *acc
@@ -201,7 +219,7 @@ cdef extern from "infernal.h" nogil:
         # CM_TR_EMIT_MX      *trnb_emx
         # CM_TR_SHADOW_MX    *trnb_shmx
 
-        # CM_SCAN_MX         *smx
+        CM_SCAN_MX         *smx
         # CM_TR_SCAN_MX      *trsmx
         # CP9_MX             *cp9_mx
         # CP9_MX             *cp9_bmx
@@ -215,8 +233,8 @@ cdef extern from "infernal.h" nogil:
         const  ESL_ALPHABET *abc
         off_t  offset
 
-        # CMEmitMap_t     *emap
-        # CMConsensus_t   *cmcons
+        CMEmitMap_t     *emap
+        CMConsensus_t   *cmcons
         # CM_TR_PENALTIES *trp
     ctypedef cm_s CM_t
 
@@ -279,12 +297,12 @@ cdef extern from "infernal.h" nogil:
     int   cm_SetName(CM_t *cm, char *name)
     int   cm_SetAccession(CM_t *cm, char *acc)
     int   cm_SetDescription(CM_t *cm, char *desc)
-    # int   cm_SetConsensus(CM_t *cm, CMConsensus_t *cons, ESL_SQ *sq);
+    int   cm_SetConsensus(CM_t *cm, CMConsensus_t *cons, ESL_SQ *sq)
     # int   cm_AppendComlog(CM_t *cm, int argc, char **argv, int add_seed, uint32_t seed);
     int   cm_SetCtime(CM_t *cm)
-    # int   DefaultNullModel(const ESL_ALPHABET *abc, float **ret_null);
+    int   DefaultNullModel(const ESL_ALPHABET *abc, float **ret_null)
     # int   CMAllocNullModel(CM_t *cm);
-    # void  CMSetNullModel(CM_t *cm, float *null);
+    void  CMSetNullModel(CM_t *cm, float *null)
     # int   CMReadNullModel(const ESL_ALPHABET *abc, char *nullfile, float **ret_null);
     # int   IntMaxDigits();
     # int   IntDigits(int i);
@@ -0,0 +1,43 @@
+from libc.stdint cimport int64_t
+
+from libeasel.random cimport ESL_RANDOMNESS
+from libeasel.sq cimport ESL_SQ
+from libinfernal.cm cimport CM_t
+from libinfernal.cm_parsetree cimport Parsetree_t
+
+
+cdef extern from "esl_stopwatch.h" nogil:
+
+    ctypedef struct ESL_STOPWATCH:
+        pass
+
+
+cdef extern from "infernal.h" nogil:
+
+    const char TRMODE_UNKNOWN
+    const char TRMODE_J
+    const char TRMODE_L
+    const char TRMODE_R
+    const char TRMODE_T
+
+    ctypedef struct CM_ALNDATA:
+        ESL_SQ*      sq
+        int64_t      idx
+        float        sc
+        float        pp
+        Parsetree_t* tr
+        char*        ppstr
+        int          spos
+        int          epos
+        float        secs_bands
+        float        secs_aln
+        float        secs_tot
+        float        mb_tot
+        double       tau
+        float        thresh1
+        float        thresh2
+
+    CM_ALNDATA* cm_alndata_Create()
+    void        cm_alndata_Destroy(CM_ALNDATA *data, int free_sq)
+    # int         DispatchSqBlockAlignment(CM_t *cm, char *errbuf, ESL_SQ_BLOCK *sq_block, float mxsize, ESL_STOPWATCH *w, ESL_STOPWATCH *w_tot, ESL_RANDOMNESS *r, CM_ALNDATA ***ret_dataA)
+    int         DispatchSqAlignment(CM_t *cm, char *errbuf, ESL_SQ *sq, int64_t idx, float mxsize, char mode, int pass_idx, int cp9b_valid, ESL_STOPWATCH *w, ESL_STOPWATCH *w_tot, ESL_RANDOMNESS *r, CM_ALNDATA **ret_data)
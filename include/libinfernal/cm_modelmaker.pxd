@@ -0,0 +1,19 @@
+from libeasel cimport ESL_DSQ
+from libeasel.alphabet cimport ESL_ALPHABET
+from libeasel.msa cimport ESL_MSA
+from libinfernal.cm cimport CM_t
+from libinfernal.cm_parsetree cimport Parsetree_t
+
+
+cdef extern from "infernal.h" nogil:
+
+    int  HandModelmaker(ESL_MSA *msa, char *errbuf, int use_rf, int use_el, int use_wts, float symfrac, CM_t **ret_cm, Parsetree_t **ret_mtr)
+    int  AssignMatchColumnsForMsa(ESL_MSA *msa, char *errbuf, int use_rf, int use_wts, float symfrac, int **ret_matassign)
+    int  ConsensusModelmaker(const ESL_ALPHABET *abc, char *errbuf, char *ss_cons, int clen, int building_sub_model, CM_t **ret_cm, Parsetree_t **ret_gtr)
+    int  Transmogrify(CM_t *cm, char *errbuf, Parsetree_t *gtr, ESL_DSQ *ax, int *used_el, int alen, Parsetree_t **ret_tr)
+    int  cm_from_guide(CM_t *cm, char *errbuf, Parsetree_t *gtr, int will_never_localize)
+    int  cm_find_and_detach_dual_inserts(CM_t *cm, int do_check, int do_detach)
+    int  cm_check_before_detaching(CM_t *cm, int insert1, int insert2)
+    int  cm_detach_state(CM_t *cm, int insert1, int insert2)
+    int  cm_zero_flanking_insert_counts(CM_t *cm, char *errbuf)
+    int  clean_cs(char *cs, int alen, int be_quiet)
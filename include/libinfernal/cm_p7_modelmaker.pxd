@@ -0,0 +1,13 @@
+from libhmmer.p7_hmm cimport P7_HMM
+from libinfernal.cm cimport CM_t
+
+
+cdef extern from "infernal.h" nogil:
+
+    # int   BuildP7HMM_MatchEmitsOnly(CM_t *cm, CP9_t *cp9, P7_HMM **ret_p7)
+    # int   cm_cp9_to_p7(CM_t *cm, CP9_t *cp9, char *errbuf)
+    int   cm_p7_Calibrate(P7_HMM *hmm, char *errbuf, int ElmL, int ElvL, int ElfL, int EgfL, int ElmN, int ElvN, int ElfN, int EgfN, double ElfT, double EgfT, double *ret_gfmu, double *ret_gflambda)
+    # int   cm_p7_Tau(ESL_RANDOMNESS *r, char *errbuf, P7_OPROFILE *om, P7_PROFILE *gm, P7_BG *bg, int L, int N, double lambda, double tailp, double *ret_tau)
+    int   cm_SetFilterHMM(CM_t *cm, P7_HMM *hmm, double gfmu, double gflambda)
+    float cm_p7_hmm_Sizeof(P7_HMM *hmm)
+    int   cm_p7_hmm_SetConsensus(P7_HMM *hmm)
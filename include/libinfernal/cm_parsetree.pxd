@@ -0,0 +1,38 @@
+from libc.stdio cimport FILE
+
+from libeasel.alphabet cimport ESL_ALPHABET
+from libeasel.msa cimport ESL_MSA
+from libeasel.random cimport ESL_RANDOMNESS
+from libeasel.sq cimport ESL_SQ
+from libeasel cimport ESL_DSQ
+from libinfernal.cm cimport CM_t
+from libinfernal.prior cimport Prior_t
+
+
+cdef extern from "infernal.h" nogil:
+
+    cdef struct parsetree_s:
+        int  *emitl
+        int  *emitr
+        int  *state
+        char *mode
+        int  *nxtl
+        int  *nxtr
+        int  *prv
+        int   n
+        int   nalloc
+        int   memblock
+        bint  is_std
+        int   pass_idx
+        float trpenalty
+    ctypedef parsetree_s Parsetree_t
+
+    # Parsetree_t *CreateParsetree(int size)
+    # int          GrowParsetree(Parsetree_t *tr)
+    void         FreeParsetree(Parsetree_t *tr)
+    # float        SizeofParsetree(Parsetree_t *tr)
+    int          EmitParsetree(CM_t *cm, char *errbuf, ESL_RANDOMNESS *r, char *name, int do_digital, Parsetree_t **ret_tr, ESL_SQ **ret_sq, int *ret_N)
+    void         ParsetreeCountExceptTruncatedMPs(CM_t *cm, Parsetree_t *tr, ESL_DSQ *dsq, float wgt)
+    void         ParsetreeCountOnlyTruncatedMPs(CM_t *cm, Parsetree_t *tr, ESL_DSQ *dsq, float wgt, double **dbl_e, const Prior_t *pri)
+    int          cm_parsetree_Doctor(CM_t *cm, char *errbuf, Parsetree_t *tr, int *opt_ndi, int *opt_nid)
+    int          Parsetrees2Alignment(CM_t *cm, char *errbuf, const ESL_ALPHABET *abc, ESL_SQ **sq, double *wgt, Parsetree_t **tr, char **postcode, int nseq, FILE *insertfp, FILE *elfp, int do_full, int do_matchonly, int allow_trunc, ESL_MSA **ret_msa)
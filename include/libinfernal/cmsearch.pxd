@@ -1,4 +1,9 @@
+from cpython.pythread cimport PyThread_type_lock
+from libc.stdint cimport int32_t, int64_t, uint32_t
+
+from libeasel cimport ESL_DSQ
 from libhmmer.p7_bg cimport P7_BG
+from libhmmer.impl.p7_omx cimport P7_OMX
 from libhmmer.p7_profile cimport P7_PROFILE
 from libhmmer.p7_scoredata cimport P7_SCOREDATA
 from libinfernal.cm cimport CM_t
@@ -12,6 +17,24 @@ elif HMMER_IMPL == "SSE":
 elif HMMER_IMPL == "NEON":
     from libhmmer.impl_neon.p7_oprofile cimport P7_OPROFILE
 
+
+# NOTE(@althonos): the windows list and the long-target SSV filter are not
+#                  exposed in the PyHMMER headers, but are needed to screen
+#                  the targets before running the complete pipeline.
+cdef extern from "hmmer.h" nogil:
+
+    ctypedef struct P7_HMM_WINDOW:
+        int64_t    n
+        int32_t    length
+
+    ctypedef struct P7_HMM_WINDOWLIST:
+        P7_HMM_WINDOW *windows
+        int            count
+        int            size
+
+    int p7_hmmwindow_init(P7_HMM_WINDOWLIST *list)
+    int p7_SSVFilter_longtarget(const ESL_DSQ *dsq, int L, P7_OPROFILE *om, P7_OMX *ox, const P7_SCOREDATA *ssvdata, P7_BG *bg, double P, P7_HMM_WINDOWLIST *windowlist)
+
 ctypedef struct WORKER_INFO:
     CM_PIPELINE      *pli
     CM_TOPHITS       *th
@@ -24,4 +47,20 @@ ctypedef struct WORKER_INFO:
     P7_PROFILE       *Tgm
     P7_SCOREDATA     *msvdata
     float            *p7_evparam
-    float             smxsize
\ No newline at end of file
+    float             smxsize
+
+    # NOTE(@althonos): the fields below are not part of the `WORKER_INFO`
+    #                  of `cmsearch.c`, they are used to pass the limits
+    #                  of the search to the inner loop of `pyinfernal`.
+    int64_t           max_hits
+    int64_t           max_residues
+    bint              truncated
+    bint             *cancelled
+    PyThread_type_lock cancel_lock
+    double            deadline
+    double            next_signal_check
+    bint              check_signals
+    bint              presize
+    bint              short_targets
+    bint              reseed_targets
+    uint32_t          seed
@@ -0,0 +1,14 @@
+from libc.stdio cimport FILE
+
+from libeasel.alphabet cimport ESL_ALPHABET
+from libinfernal.cm cimport CM_t, CMConsensus_t, CMEmitMap_t
+
+
+cdef extern from "infernal.h" nogil:
+
+    CMConsensus_t *CreateCMConsensus(CM_t *cm, const ESL_ALPHABET *abc)
+    void           FreeCMConsensus(CMConsensus_t *con)
+    CMEmitMap_t   *CreateEmitMap(CM_t *cm)
+    float          SizeofEmitMap(CM_t *cm, CMEmitMap_t *emap)
+    void           DumpEmitMap(FILE *fp, CMEmitMap_t *map, CM_t *cm)
+    void           FreeEmitMap(CMEmitMap_t *map)
@@ -0,0 +1,10 @@
+from libinfernal.cm cimport CM_t
+from libinfernal.prior cimport Prior_t
+
+
+cdef extern from "infernal.h" nogil:
+
+    int    cm_EntropyWeight(CM_t *cm, const Prior_t *pri, double etarget, double min_Neff, double max_Neff, int pretend_cm_is_hmm, double *ret_hmm_re, double *ret_Neff)
+    void   cm_Rescale(CM_t *hmm, float scale)
+    # void   cp9_Rescale(CP9_t *hmm, float scale)
+    double cm_MeanMatchInfo(const CM_t *cm)
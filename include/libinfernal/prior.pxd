@@ -0,0 +1,23 @@
+from libc.stdio cimport FILE
+
+from libeasel.mixdchlet cimport ESL_MIXDCHLET
+from libinfernal.cm cimport CM_t
+
+
+cdef extern from "infernal.h" nogil:
+
+    ctypedef struct Prior_t:
+        int             tsetnum
+        ESL_MIXDCHLET **t
+        ESL_MIXDCHLET  *mbp
+        ESL_MIXDCHLET  *mnt
+        ESL_MIXDCHLET  *i
+        int             maxnq
+        int             maxnalpha
+
+    Prior_t *Prior_Create()
+    void     Prior_Destroy(Prior_t *pri)
+    Prior_t *Prior_Read(FILE *fp)
+    void     PriorifyCM(CM_t *cm, const Prior_t *pri)
+    Prior_t *Prior_Default(int mimic_h3)
+    Prior_t *Prior_Default_v0p56_through_v1p02()
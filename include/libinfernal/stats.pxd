@@ -1,3 +1,8 @@
+from libeasel cimport ESL_DSQ
+from libeasel.alphabet cimport ESL_ALPHABET
+from libeasel.random cimport ESL_RANDOMNESS
+
+
 cdef extern from "infernal.h" nogil:
     cdef struct expinfo_s:
         double cur_eff_dbsize
@@ -28,13 +33,13 @@ cdef extern from "infernal.h" nogil:
     # double     Score2E(float x, double mu, double lambda, double eff_dbsize);
     # float      cm_p7_E2Score(double E, double Z, int hitlen, float mu, float lambda);
     # float      cm_p7_P2Score(double P, float mu, float lambda);
-    # int        ExpModeIsLocal(int exp_mode);
-    # int        ExpModeIsInside(int exp_mode);
-    # ExpInfo_t *CreateExpInfo();
-    # void       SetExpInfo(ExpInfo_t *exp, double lambda, double mu_orig, double dbsize, int nrandhits, double tailp);
+    int        ExpModeIsLocal(int exp_mode)
+    int        ExpModeIsInside(int exp_mode)
+    ExpInfo_t *CreateExpInfo()
+    void       SetExpInfo(ExpInfo_t *exp, double lambda_, double mu_orig, double dbsize, int nrandhits, double tailp)
     # ExpInfo_t *DuplicateExpInfo(ExpInfo_t *src);
     # char      *DescribeExpMode(int exp_mode);
     # int        UpdateExpsForDBSize(CM_t *cm, char *errbuf, double dbsize);
-    # int        CreateGenomicHMM(const ESL_ALPHABET *abc, char *errbuf, double **ret_sA, double ***ret_tAA, double ***ret_eAA, int *ret_nstates);
-    # int        SampleGenomicSequenceFromHMM(ESL_RANDOMNESS *r, const ESL_ALPHABET *abc, char *errbuf, double *sA, double **tAA, double **eAA, int nstates, int L, ESL_DSQ **ret_dsq);
+    int        CreateGenomicHMM(const ESL_ALPHABET *abc, char *errbuf, double **ret_sA, double ***ret_tAA, double ***ret_eAA, int *ret_nstates)
+    int        SampleGenomicSequenceFromHMM(ESL_RANDOMNESS *r, const ESL_ALPHABET *abc, char *errbuf, double *sA, double **tAA, double **eAA, int nstates, int L, ESL_DSQ **ret_dsq)
     # int        CopyExpInfo(ExpInfo_t *src, ExpInfo_t *dest);
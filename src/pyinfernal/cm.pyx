@@ -1,4 +1,14 @@
-from cpython.exc cimport PyErr_WarnEx
+from cpython.buffer cimport PyBUF_SIMPLE, PyObject_GetBuffer, PyBuffer_Release
+from cpython.bytes cimport PyBytes_FromStringAndSize
+from cpython.exc cimport PyErr_WarnEx, PyErr_CheckSignals
+from cpython.pythread cimport (
+    PyThread_type_lock,
+    PyThread_allocate_lock,
+    PyThread_free_lock,
+    PyThread_acquire_lock,
+    PyThread_release_lock,
+    WAIT_LOCK,
+)
 from cpython.unicode cimport (
     PyUnicode_FromString,
     PyUnicode_DecodeASCII,
@@ -6,15 +16,25 @@ from cpython.unicode cimport (
 )
 
 from libc cimport errno
-from libc.stdio cimport FILE, fopen, fclose
-from libc.stdint cimport uint32_t, uint64_t, int64_t
-from libc.stdlib cimport malloc, calloc, realloc, free
-from libc.string cimport memset, memcpy, memmove, strdup, strndup, strncpy, strlen
+from libc.math cimport isnan, isinf, log
+from libc.stdio cimport FILE, SEEK_END, SEEK_SET, fopen, fclose, snprintf
+from libc.stdint cimport uint8_t, uint16_t, uint32_t, uint64_t, int64_t
+from libc.stdlib cimport malloc, calloc, realloc, free, qsort
+from libc.string cimport memcmp, memset, memcpy, memmove, strdup, strndup, strncpy, strlen
+from posix.stdio cimport fseeko, ftello
+from posix.time cimport clock_gettime, timespec, CLOCK_MONOTONIC
+from posix.types cimport off_t
 
 cimport libeasel
 cimport libeasel.alphabet
 cimport libeasel.vec
 cimport libeasel.fileparser
+cimport libeasel.ssi
+cimport libeasel.msa
+cimport libeasel.random
+cimport libeasel.bitfield
+cimport libeasel.mixdchlet
+cimport libeasel.msaweight
 cimport libhmmer.impl.p7_oprofile
 cimport libhmmer.impl.p7_omx
 cimport libhmmer.p7_bg
@@ -24,43 +44,85 @@ cimport libhmmer.p7_gmx
 cimport libhmmer.p7_domaindef
 cimport libhmmer.p7_scoredata
 cimport libhmmer.modelconfig
+cimport libhmmer.modelstats
+cimport libhmmer.p7_builder
+cimport libhmmer.p7_prior
 cimport libinfernal.cm
 cimport libinfernal.cm_alidisplay
+cimport libinfernal.cm_alndata
 cimport libinfernal.cm_mx
+cimport libinfernal.cm_dpsearch
 cimport libinfernal.cm_file
 cimport libinfernal.cm_tophits
+cimport libinfernal.cm_parsetree
 cimport libinfernal.cm_pipeline
 cimport libinfernal.cm_qdband
 cimport libinfernal.cm_modelconfig
 cimport libinfernal.cm_p7_modelconfig
-from libeasel cimport eslERRBUFSIZE
+cimport libinfernal.cm_modelmaker
+cimport libinfernal.cm_p7_modelmaker
+cimport libinfernal.display
+cimport libinfernal.eweight
+cimport libinfernal.prior
+cimport libinfernal.stats
+from libeasel cimport eslERRBUFSIZE, ESL_DSQ
 from libeasel.alphabet cimport ESL_ALPHABET
+from libeasel.bitfield cimport ESL_BITFIELD
 from libeasel.fileparser cimport ESL_FILEPARSER
+from libeasel.msa cimport ESL_MSA
+from libeasel.msaweight cimport ESL_MSAWEIGHT_CFG
 from libeasel.sq cimport ESL_SQ
 from libeasel.random cimport ESL_RANDOMNESS
 from libhmmer.impl.p7_oprofile cimport P7_OPROFILE, P7_OM_BLOCK
+from libhmmer.impl.p7_omx cimport P7_OMX
+from libhmmer.p7_bg cimport P7_BG
+from libhmmer.p7_builder cimport P7_BUILDER
+from libhmmer.p7_prior cimport P7_PRIOR
 from libhmmer.logsum cimport p7_FLogsumInit
 from libhmmer.p7_hmm cimport P7_HMM
 from libhmmer.p7_hmmfile cimport P7_HMMFILE
 from libhmmer.p7_scoredata cimport P7_SCOREDATA
 from libhmmer.p7_gmx cimport P7_GMX
+from libhmmer.p7_profile cimport P7_PROFILE
 from libinfernal cimport CM_p7_NEVPARAM
 from libinfernal.cm_file cimport CM_FILE, cm_file_formats_e
-from libinfernal.cm_pipeline cimport CM_PIPELINE, CM_PLI_ACCT, cm_zsetby_e, cm_pipemodes_e, cm_newmodelmodes_e
+from libinfernal.cm_pipeline cimport (
+    CM_PIPELINE,
+    CM_PLI_ACCT,
+    cm_zsetby_e,
+    cm_pipemodes_e,
+    cm_newmodelmodes_e,
+    PLI_PASS_STD_ANY,
+    PLI_PASS_5P_ONLY_FORCE,
+    PLI_PASS_3P_ONLY_FORCE,
+    PLI_PASS_5P_AND_3P_FORCE,
+    PLI_PASS_5P_AND_3P_ANY,
+    PLI_PASS_HMM_ONLY_ANY,
+)
 from libinfernal.cm_tophits cimport CM_TOPHITS, CM_HIT
 from libinfernal.cm cimport CM_t
-from libinfernal.cmsearch cimport WORKER_INFO
+from libinfernal.cmsearch cimport WORKER_INFO, P7_HMM_WINDOWLIST, p7_hmmwindow_init, p7_SSVFilter_longtarget
 from libinfernal.logsum cimport FLogsumInit, init_ilogsum
 from libinfernal.cm_alidisplay cimport CM_ALIDISPLAY
+from libinfernal.cm_alndata cimport CM_ALNDATA
+from libinfernal.cm_parsetree cimport Parsetree_t
+from libinfernal.prior cimport Prior_t
+from libinfernal.stats cimport ExpInfo_t
 
 cimport pyhmmer.easel
 cimport pyhmmer.plan7
 from pyhmmer.platform cimport _FileobjReader, _FileobjWriter
 from pyhmmer.easel cimport (
     Alphabet,
+    DigitalMSA,
+    DigitalSequence,
     DigitalSequenceBlock,
+    MatrixF,
     Randomness,
     SequenceFile,
+    VectorF,
+    VectorI,
+    VectorU8,
 )
 from pyhmmer.plan7 cimport (
     Background,
@@ -75,14 +137,21 @@ include "_strings.pxi"
 
 # --- Python imports ---------------------------------------------------------
 
+import array
 import datetime
 import enum
 import io
+import itertools
+import mmap
 import os
 import operator
+import queue
 import sys
+import tempfile
+import threading
 import warnings
 
+from pyhmmer.easel import SSIWriter
 from pyhmmer.utils import SizedIterator
 from pyhmmer.errors import (
     UnexpectedError,
@@ -101,18 +170,69 @@ cdef dict CM_FILE_FORMATS = {
     "3/a": cm_file_formats_e.CM_FILE_1a,
 }
 
+# the length of the random sequences searched to calibrate a CM
+cdef int _CALIBRATION_CHUNKLEN = 10000
+
 cdef dict CM_FILE_MAGIC = {
-    # v1a_magic:  cm_file_formats_e.CM_FILE_1,
-    # v1a_fmagic: cm_file_formats_e.CM_FILE_1a,
-    0xe3edb0b2: cm_file_formats_e.CM_FILE_1,
-    0xb1e1e6f3: cm_file_formats_e.CM_FILE_1a,
+    # v1a_magic: cm_file_formats_e.CM_FILE_1a,
+    0xe3edb0b2: cm_file_formats_e.CM_FILE_1a,
 }
 
+# the layout of the files storing a `SequenceDatabase`
+cdef bytes    _DATABASE_MAGIC     = b"PYINFDB\x00"
+cdef uint32_t _DATABASE_BYTEORDER = 0x01020304
+cdef uint32_t _DATABASE_VERSION   = 1
+
+cdef struct _DatabaseHeader:
+    char     magic[8]
+    uint32_t byteorder    # written in native order to detect foreign files
+    uint32_t version
+    uint32_t alphabet     # the type of the Easel alphabet
+    uint32_t reserved
+    uint64_t n_sequences
+    uint64_t n_residues
+    uint64_t records      # offset of the `_DatabaseRecord` table
+    uint64_t strings      # offset of the NUL-terminated strings
+
+cdef struct _DatabaseRecord:
+    uint64_t dsq          # offset of the sentinel preceding the residues
+    uint64_t n
+    uint64_t name         # offsets relative to the strings
+    uint64_t acc
+    uint64_t desc
+
+cdef char* _EMPTY_STRING = b""
+
+# the layout of the files storing a `SeedIndex`
+cdef bytes    _SEEDINDEX_MAGIC   = b"PYINFSI\x00"
+cdef uint32_t _SEEDINDEX_VERSION = 1
+cdef int      _SEEDINDEX_PREFIX  = 8     # the length of the k-mer prefixes used as buckets
+
+cdef struct _SeedIndexHeader:
+    char     magic[8]
+    uint32_t byteorder    # written in native order to detect foreign files
+    uint32_t version
+    uint32_t alphabet     # the type of the Easel alphabet
+    uint32_t k
+    uint32_t prefix
+    uint32_t reserved
+    uint64_t n_sequences
+    uint64_t n_residues
+    uint64_t n_seeds
+    uint64_t starts       # offset of the cumulated sequence lengths
+    uint64_t buckets      # offset of the bucket boundaries
+    uint64_t seeds        # offset of the sorted seeds
+
 # --- Fused types ------------------------------------------------------------
 
 ctypedef fused SearchTargets:
     SequenceFile
     DigitalSequenceBlock
+    SequenceDatabase
+
+ctypedef fused SearchBlock:
+    DigitalSequenceBlock
+    SequenceDatabase
 
 # --- Cython classes ---------------------------------------------------------
 
@@ -123,6 +243,19 @@ cdef class CM:
         filter_hmm (`pyhmmer.plan7.HMM` or `None`): The HMM used for
             the initial filtering stages inside the Infernal pipeline.
 
+    Hint:
+        The parameters and the structure of the model are exposed as
+        `~pyhmmer.easel.MatrixF`, `~pyhmmer.easel.VectorF`,
+        `~pyhmmer.easel.VectorI` or `~pyhmmer.easel.VectorU8` views of
+        the model arrays, without copy. They implement the buffer
+        protocol, so they can be wrapped in NumPy arrays with
+        `numpy.asarray` to vectorize computations over the model.
+
+    Caution:
+        The array views are writable, and edits are visible to the
+        model. Editing the arrays describing the structure of the model,
+        such as `CM.state_types`, will likely corrupt it.
+
     """
     cdef CM_t*              _cm
     cdef readonly Alphabet alphabet
@@ -193,7 +326,11 @@ cdef class CM:
         if self._cm is not NULL:
             self._cm.fp7 = NULL # owned by `self.filter_hmm`
             self._cm.mlp7 = NULL # owned by `self.ml_hmm`
-            libinfernal.cm.FreeCM(self._cm)
+            # NOTE(@althonos): Freeing a configured CM also frees its DP
+            #                  matrices, which takes a while, and happens
+            #                  for the query copy after every search.
+            with nogil:
+                libinfernal.cm.FreeCM(self._cm)
 
     def __sizeof__(self):
         assert self._cm != NULL
@@ -202,6 +339,35 @@ cdef class CM:
     def __copy__(self):
         return self.copy()
 
+    def __reduce__(self):
+        return CM.__new__, (CM,), self.__getstate__()
+
+    def __getstate__(self):
+        # NOTE(@althonos): the binary format is the only one that stores
+        #                  the full content of a CM without loss, and is
+        #                  much faster to load than the ASCII format.
+        cdef object buffer = io.BytesIO()
+        self.write(buffer, binary=True)
+        return buffer.getvalue()
+
+    def __setstate__(self, bytes state):
+        cdef CM cm
+
+        with CMFile(io.BytesIO(state)) as cm_file:
+            cm = cm_file.read()
+        if cm is None:
+            raise ValueError("could not load CM from state")
+
+        # steal the pointer and the HMMs owning the filter data
+        if self._cm is not NULL:
+            self._cm.fp7 = NULL
+            self._cm.mlp7 = NULL
+            libinfernal.cm.FreeCM(self._cm)
+        self._cm, cm._cm = cm._cm, NULL
+        self.alphabet = cm.alphabet
+        self.filter_hmm = cm.filter_hmm
+        self.ml_hmm = cm.ml_hmm
+
     # --- Properties ---------------------------------------------------------
 
     @property
@@ -218,6 +384,228 @@ cdef class CM:
         assert self._cm != NULL
         return self._cm.M
 
+    @property
+    def clen(self):
+        """`int`: The consensus length of the model.
+        """
+        assert self._cm != NULL
+        return self._cm.clen
+
+    @property
+    def W(self):
+        """`int`: The maximum expected length of a hit to the model.
+        """
+        assert self._cm != NULL
+        return self._cm.W
+
+    @property
+    def nbp(self):
+        """`int`: The number of base pairs in the model consensus structure.
+        """
+        assert self._cm != NULL
+        return libinfernal.cm.CMCountNodetype(self._cm, libinfernal.MATP_nd)
+
+    @property
+    def transition_probabilities(self):
+        """`~pyhmmer.easel.MatrixF`: The transition probabilities of the model.
+
+        The property exposes a matrix of shape :math:`(M, 6)`, with one
+        row per state. The transition from state *v* in column *x* goes
+        to state ``first_children[v] + x``, and only the first
+        ``children_counts[v]`` columns are used.
+
+        Example:
+            >>> trna.transition_probabilities.shape
+            (227, 6)
+            >>> round(sum(trna.transition_probabilities[1]), 4)
+            1.0
+
+        """
+        assert self._cm != NULL
+        cdef MatrixF mat = MatrixF.__new__(MatrixF)
+        mat._m = mat._shape[0] = self._cm.M
+        mat._n = mat._shape[1] = libinfernal.MAXCONNECT
+        mat._owner = self
+        mat._data = <void**> self._cm.t
+        return mat
+
+    @property
+    def emission_probabilities(self):
+        """`~pyhmmer.easel.MatrixF`: The emission probabilities of the model.
+
+        The property exposes a matrix of shape :math:`(M, K^2)`, with one
+        row per state. Match-pair states use all the columns, with the
+        probability of emitting the pair *(a, b)* in column
+        :math:`a \\times K + b`, while singlet emitting states only use
+        the first :math:`K` columns.
+
+        """
+        assert self._cm != NULL
+        cdef MatrixF mat = MatrixF.__new__(MatrixF)
+        mat._m = mat._shape[0] = self._cm.M
+        mat._n = mat._shape[1] = self.alphabet.K * self.alphabet.K
+        mat._owner = self
+        mat._data = <void**> self._cm.e
+        return mat
+
+    @property
+    def begin_probabilities(self):
+        """`~pyhmmer.easel.VectorF`: The local begin probabilities of each state.
+        """
+        assert self._cm != NULL
+        cdef VectorF vec = VectorF.__new__(VectorF)
+        vec._n = vec._shape[0] = self._cm.M
+        vec._owner = self
+        vec._data = <void*> self._cm.begin
+        return vec
+
+    @property
+    def end_probabilities(self):
+        """`~pyhmmer.easel.VectorF`: The local end probabilities of each state.
+        """
+        assert self._cm != NULL
+        cdef VectorF vec = VectorF.__new__(VectorF)
+        vec._n = vec._shape[0] = self._cm.M
+        vec._owner = self
+        vec._data = <void*> self._cm.end
+        return vec
+
+    @property
+    def null_probabilities(self):
+        """`~pyhmmer.easel.VectorF`: The residue frequencies of the null model.
+
+        Together with the emission and transition probabilities, they
+        give the log-odds scores used by Infernal, e.g.
+        :math:`\\log_2 \\frac{e_v(a, b)}{f_a f_b}` for the emission of the
+        pair *(a, b)* by the match-pair state *v*.
+
+        """
+        assert self._cm != NULL
+        cdef VectorF vec = VectorF.__new__(VectorF)
+        vec._n = vec._shape[0] = self.alphabet.K
+        vec._owner = self
+        vec._data = <void*> self._cm.null
+        return vec
+
+    @property
+    def state_types(self):
+        """`~pyhmmer.easel.VectorU8`: The type of each state of the model.
+
+        The values are the codes of the `StateType` enum.
+
+        Example:
+            >>> StateType(trna.state_types[0])
+            <StateType.S: 6>
+            >>> list(trna.state_types).count(StateType.MP)
+            21
+
+        """
+        assert self._cm != NULL
+        cdef VectorU8 vec = VectorU8.__new__(VectorU8)
+        vec._n = vec._shape[0] = self._cm.M
+        vec._owner = self
+        vec._data = <void*> self._cm.sttype
+        return vec
+
+    @property
+    def state_nodes(self):
+        """`~pyhmmer.easel.VectorI`: The index of the node of each state.
+        """
+        assert self._cm != NULL
+        cdef VectorI vec = VectorI.__new__(VectorI)
+        vec._n = vec._shape[0] = self._cm.M
+        vec._owner = self
+        vec._data = <void*> self._cm.ndidx
+        return vec
+
+    @property
+    def first_children(self):
+        """`~pyhmmer.easel.VectorI`: The index of the first child of each state.
+
+        For bifurcation states, this is the index of the left child,
+        and the index of the right child is stored in `children_counts`.
+
+        """
+        assert self._cm != NULL
+        cdef VectorI vec = VectorI.__new__(VectorI)
+        vec._n = vec._shape[0] = self._cm.M
+        vec._owner = self
+        vec._data = <void*> self._cm.cfirst
+        return vec
+
+    @property
+    def children_counts(self):
+        """`~pyhmmer.easel.VectorI`: The number of children of each state.
+        """
+        assert self._cm != NULL
+        cdef VectorI vec = VectorI.__new__(VectorI)
+        vec._n = vec._shape[0] = self._cm.M
+        vec._owner = self
+        vec._data = <void*> self._cm.cnum
+        return vec
+
+    @property
+    def node_types(self):
+        """`~pyhmmer.easel.VectorU8`: The type of each node of the model.
+
+        The values are the codes of the `NodeType` enum.
+
+        Example:
+            >>> NodeType(trna.node_types[0])
+            <NodeType.ROOT: 6>
+
+        """
+        assert self._cm != NULL
+        cdef VectorU8 vec = VectorU8.__new__(VectorU8)
+        vec._n = vec._shape[0] = self._cm.nodes
+        vec._owner = self
+        vec._data = <void*> self._cm.ndtype
+        return vec
+
+    @property
+    def node_map(self):
+        """`~pyhmmer.easel.VectorI`: The index of the first state of each node.
+        """
+        assert self._cm != NULL
+        cdef VectorI vec = VectorI.__new__(VectorI)
+        vec._n = vec._shape[0] = self._cm.nodes
+        vec._owner = self
+        vec._data = <void*> self._cm.nodemap
+        return vec
+
+    @property
+    def qdb_bands(self):
+        """`tuple` of `~pyhmmer.easel.VectorI`: The tight query-dependent bands.
+
+        The bands are given as a ``(dmin, dmax)`` tuple of vectors with
+        the minimum and maximum length of the subsequences emitted by
+        each state, outside of which the probability mass is below the
+        :math:`\\beta_1` tail probability (:math:`10^{-7}` by default).
+
+        """
+        assert self._cm != NULL
+        assert self._cm.qdbinfo != NULL
+        return (
+            self._qdb_vector(self._cm.qdbinfo.dmin1),
+            self._qdb_vector(self._cm.qdbinfo.dmax1),
+        )
+
+    @property
+    def qdb_loose_bands(self):
+        """`tuple` of `~pyhmmer.easel.VectorI`: The loose query-dependent bands.
+
+        The bands are given as a ``(dmin, dmax)`` tuple of vectors like
+        `CM.qdb_bands`, computed with the smaller :math:`\\beta_2` tail
+        probability (:math:`10^{-15}` by default).
+
+        """
+        assert self._cm != NULL
+        assert self._cm.qdbinfo != NULL
+        return (
+            self._qdb_vector(self._cm.qdbinfo.dmin2),
+            self._qdb_vector(self._cm.qdbinfo.dmax2),
+        )
+
     @property
     def name(self):
         """`str`: The name of the CM.
@@ -357,6 +745,15 @@ cdef class CM:
         with nogil:
             strncpy(self._cm.ctime, s, n + 1)
 
+    # --- Utils --------------------------------------------------------------
+
+    cdef VectorI _qdb_vector(self, int* data):
+        cdef VectorI vec = VectorI.__new__(VectorI)
+        vec._n = vec._shape[0] = self._cm.M
+        vec._owner = self
+        vec._data = <void*> data
+        return vec
+
     # --- Methods ------------------------------------------------------------
 
     cpdef CM copy(self):
@@ -378,6 +775,415 @@ cdef class CM:
         assert copy != NULL
         return CM.from_ptr(copy, alphabet=self.alphabet)
 
+    cpdef void write(self, object fh, bint binary=False) except *:
+        """Write the CM to a file handle.
+
+        Arguments:
+            fh (`io.IOBase`): A Python file handle, opened in binary mode.
+            binary (`bool`): Pass `True` to save the CM in binary format,
+                which is much faster to load than the ASCII format but is
+                not portable across platforms.
+
+        Raises:
+            `ValueError`: When the CM has been configured in local mode,
+                which cannot be serialized by Infernal.
+
+        """
+        assert self._cm != NULL
+
+        cdef int            status
+        cdef _FileobjWriter fw
+
+        if self._cm.flags & (libinfernal.cm.CMH_LOCAL_BEGIN | libinfernal.cm.CMH_LOCAL_END):
+            raise ValueError("cannot write a CM configured in local mode")
+
+        with _FileobjWriter(fh) as fw:
+            if binary:
+                status = libinfernal.cm_file.cm_file_WriteBinary(fw.file, -1, self._cm, NULL)
+            else:
+                status = libinfernal.cm_file.cm_file_WriteASCII(fw.file, -1, self._cm)
+        if status == libeasel.eslFAIL:
+            raise OSError("Failed to write CM")
+        elif status != libeasel.eslOK:
+            _reraise_error()
+            raise UnexpectedError(status, "cm_file_WriteBinary" if binary else "cm_file_WriteASCII")
+
+    def calibrate(
+        self,
+        double L = 1.6,
+        *,
+        int cpus = 0,
+        uint32_t seed = 181,
+        int gtailn = 250,
+        int ltailn = 750,
+        double beta = 1e-15,
+        bint null3 = True,
+    ):
+        """Calibrate the E-value parameters of the CM.
+
+        Random sequences are sampled from a genomic background HMM and
+        searched with the CM in glocal and local mode, using both CYK
+        and Inside. The scores of the highest-scoring hits are then
+        fitted to an exponential tail, and the resulting parameters are
+        stored in the CM, like the ``cmcalibrate`` binary does.
+
+        Arguments:
+            L (`float`): The total length of random sequences to search,
+                in megabases.
+            cpus (`int`): The number of threads to use for searching the
+                random sequences. Pass *0* to use all available CPUs.
+            seed (`int`): The seed to use for generating random sequences.
+                Pass *0* to use an arbitrary seed.
+            gtailn (`int`): The number of top hits per megabase to fit
+                in glocal modes.
+            ltailn (`int`): The number of top hits per megabase to fit
+                in local modes.
+            beta (`float`): The tail loss probability to use for
+                query-dependent banding.
+            null3 (`bool`): Whether to use the NULL3 post hoc null model
+                to correct hit scores.
+
+        Raises:
+            `ValueError`: When the CM has been configured in local mode,
+                or when too few hits were found to fit an exponential
+                tail (in which case ``L`` should be increased).
+
+        Caution:
+            Calibrating a CM is computationally expensive, and can take
+            hours for large models with the default value of ``L``.
+
+        """
+        assert self._cm != NULL
+
+        cdef int                 status
+        cdef int                 i
+        cdef int                 mode
+        cdef int                 N
+        cdef int                 nstates = 0
+        cdef double*             sA      = NULL
+        cdef double**            tAA     = NULL
+        cdef double**            eAA     = NULL
+        cdef ESL_DSQ**           dsqs    = NULL
+        cdef ESL_RANDOMNESS*     rng     = NULL
+        cdef CM_t*               cm      = NULL
+        cdef ExpInfo_t**         expA    = NULL
+        cdef char[eslERRBUFSIZE] errbuf
+        cdef _CalibrationWorker  worker
+        cdef list                workers = []
+        cdef list                threads
+
+        if self._cm.flags & (libinfernal.cm.CMH_LOCAL_BEGIN | libinfernal.cm.CMH_LOCAL_END):
+            raise ValueError("cannot calibrate a CM configured in local mode")
+        if L <= 0:
+            raise InvalidParameter("L", L, hint="strictly positive number")
+        if cpus < 0:
+            raise InvalidParameter("cpus", cpus, hint="positive integer")
+        if gtailn <= 0:
+            raise InvalidParameter("gtailn", gtailn, hint="strictly positive integer")
+        if ltailn <= 0:
+            raise InvalidParameter("ltailn", ltailn, hint="strictly positive integer")
+        if beta <= 0:
+            raise InvalidParameter("beta", beta, hint="strictly positive number")
+
+        # NOTE(@althonos): `cmcalibrate` searches 10kb chunks rather than
+        #                  a single long sequence, to limit the number of
+        #                  hits found before overlaps are removed.
+        N = max(1, <int> (L * 1e6 / _CALIBRATION_CHUNKLEN + 0.5))
+        cpus = min(N, cpus if cpus > 0 else (os.cpu_count() or 1))
+
+        try:
+            # generate the random sequences shared by all search modes
+            dsqs = <ESL_DSQ**> calloc(N, sizeof(ESL_DSQ*))
+            if dsqs == NULL:
+                raise AllocationError("ESL_DSQ*", sizeof(ESL_DSQ*), N)
+            rng = libeasel.random.esl_randomness_Create(seed)
+            if rng == NULL:
+                raise AllocationError("ESL_RANDOMNESS", sizeof(ESL_RANDOMNESS))
+            with nogil:
+                status = libinfernal.stats.CreateGenomicHMM(self._cm.abc, errbuf, &sA, &tAA, &eAA, &nstates)
+                for i in range(N):
+                    if status != libeasel.eslOK:
+                        break
+                    status = libinfernal.stats.SampleGenomicSequenceFromHMM(rng, self._cm.abc, errbuf, sA, tAA, eAA, nstates, _CALIBRATION_CHUNKLEN, &dsqs[i])
+            if status != libeasel.eslOK:
+                raise EaselError(status, errbuf.decode("utf-8", "ignore"))
+
+            # prepare the exponential tails
+            expA = <ExpInfo_t**> calloc(libinfernal.stats.EXP_NMODES, sizeof(ExpInfo_t*))
+            if expA == NULL:
+                raise AllocationError("ExpInfo_t*", sizeof(ExpInfo_t*), libinfernal.stats.EXP_NMODES)
+            for mode in range(libinfernal.stats.EXP_NMODES):
+                expA[mode] = libinfernal.stats.CreateExpInfo()
+                if expA[mode] == NULL:
+                    raise AllocationError("ExpInfo_t", sizeof(ExpInfo_t))
+
+            # prepare one worker per thread, scanning every `cpus`-th sequence
+            for i in range(cpus):
+                worker = _CalibrationWorker.__new__(_CalibrationWorker)
+                worker.dsqs = dsqs
+                worker.N = N
+                worker.L = _CALIBRATION_CHUNKLEN
+                worker.start = i
+                worker.step = cpus
+                workers.append(worker)
+
+            for mode in range(libinfernal.stats.EXP_NMODES):
+                # configure a new copy of the CM when switching to local mode
+                if mode == 0 or libinfernal.stats.ExpModeIsLocal(mode) != libinfernal.stats.ExpModeIsLocal(mode - 1):
+                    if cm != NULL:
+                        libinfernal.cm.FreeCM(cm)
+                        cm = NULL
+                    _calibration_configure(self._cm, &cm, libinfernal.stats.ExpModeIsLocal(mode), beta, null3)
+                    for worker in workers:
+                        worker.configure(cm)
+                # search sequences in parallel
+                for worker in workers:
+                    worker.inside = libinfernal.stats.ExpModeIsInside(mode)
+                threads = []
+                for worker in workers:
+                    threads.append(threading.Thread(target=worker.run))
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                for worker in workers:
+                    if worker.status != libeasel.eslOK:
+                        raise EaselError(worker.status, worker.errbuf.decode("utf-8", "ignore"))
+                # fit the exponential tail on all hits
+                _calibration_fit(
+                    workers,
+                    ltailn if libinfernal.stats.ExpModeIsLocal(mode) else gtailn,
+                    N * _CALIBRATION_CHUNKLEN,
+                    expA[mode]
+                )
+
+            # replace the exponential tails of the CM only on success
+            if self._cm.expA != NULL:
+                for mode in range(libinfernal.stats.EXP_NMODES):
+                    free(self._cm.expA[mode])
+                free(self._cm.expA)
+            self._cm.expA = expA
+            self._cm.flags |= libinfernal.cm.CMH_EXPTAIL_STATS
+            expA = NULL
+
+        finally:
+            workers.clear()
+            if cm != NULL:
+                libinfernal.cm.FreeCM(cm)
+            if rng != NULL:
+                libeasel.random.esl_randomness_Destroy(rng)
+            if dsqs != NULL:
+                for i in range(N):
+                    free(dsqs[i])
+                free(dsqs)
+            if expA != NULL:
+                for mode in range(libinfernal.stats.EXP_NMODES):
+                    free(expA[mode])
+                free(expA)
+            if tAA != NULL:
+                for i in range(nstates):
+                    free(tAA[i])
+                free(tAA)
+            if eAA != NULL:
+                for i in range(nstates):
+                    free(eAA[i])
+                free(eAA)
+            free(sA)
+
+    def sample(
+        self,
+        int n,
+        object randomness = None,
+        *,
+        bint local = False,
+        object embed = None,
+        str background = "genomic",
+    ):
+        """Sample sequences from the CM.
+
+        Sequences are emitted from the CM in C without holding the GIL,
+        like the ``cmemit`` binary does. The emitted sequences are named
+        after the CM, e.g. ``tRNA-sample1``, ``tRNA-sample2``, etc.
+
+        Arguments:
+            n (`int`): The number of sequences to sample.
+            randomness (`~pyhmmer.easel.Randomness`, `int` or `None`): The
+                random number generator to use for sampling, or a seed to
+                initialize a generator. If `None` or ``0`` given, create
+                a new random number generator with a random seed.
+            local (`bool`): Whether to sample from the CM configured in
+                local mode, which produces fragments of the family.
+            embed (`int` or `None`): If given, embed each emitted sequence
+                at a random position of a random background sequence of
+                this length. The coordinates of the embedded sequence are
+                appended to its name, e.g. ``tRNA-sample1/45-117``.
+            background (`str`): The model used to generate background
+                sequences when ``embed`` is given, either ``genomic`` to
+                use the genome-like HMM of ``cmcalibrate``, or ``iid``
+                to sample residues uniformly at random.
+
+        Returns:
+            `~pyhmmer.easel.DigitalSequenceBlock`: The sampled sequences.
+
+        Raises:
+            `ValueError`: When an emitted sequence is longer than the
+                background sequence it should be embedded in.
+
+        Example:
+            >>> seqs = trna.sample(10, 42, embed=500)
+            >>> len(seqs)
+            10
+            >>> seqs[0].name
+            'tRNA-sample1/202-273'
+            >>> len(seqs[0])
+            500
+
+        """
+        assert self._cm != NULL
+
+        cdef int                 status
+        cdef int                 i
+        cdef int                 x
+        cdef int                 start
+        cdef int                 length
+        cdef int                 nstates   = 0
+        cdef int                 L         = 0
+        cdef int                 K         = self._cm.abc.K
+        cdef bint                iid       = background == "iid"
+        cdef double*             sA        = NULL
+        cdef double**            tAA       = NULL
+        cdef double**            eAA       = NULL
+        cdef CM_t*               cm        = NULL
+        cdef ESL_SQ*             esq       = NULL
+        cdef ESL_SQ*             gsq       = NULL
+        cdef ESL_SQ**            sqs       = NULL
+        cdef const char*         cm_name   = b"cm"
+        cdef char[256]           name
+        cdef char[eslERRBUFSIZE] errbuf
+        cdef Randomness          rng
+        cdef DigitalSequence     seq
+        cdef DigitalSequenceBlock block    = DigitalSequenceBlock(self.alphabet)
+
+        if self._cm.flags & (libinfernal.cm.CMH_LOCAL_BEGIN | libinfernal.cm.CMH_LOCAL_END):
+            raise ValueError("cannot sample from a CM configured in local mode")
+        if n < 0:
+            raise InvalidParameter("n", n, hint="positive integer")
+        if background not in ("genomic", "iid"):
+            raise InvalidParameter("background", background, choices=["genomic", "iid"])
+        if embed is not None:
+            L = embed
+            if L <= 0:
+                raise InvalidParameter("embed", embed, hint="strictly positive integer or None")
+        if isinstance(randomness, Randomness):
+            rng = randomness
+        else:
+            rng = Randomness(randomness)
+        if self._cm.name != NULL:
+            cm_name = self._cm.name
+
+        # configure a copy of the CM (see `initialize_cm` in `cmemit.c`)
+        with nogil:
+            status = libinfernal.cm.cm_Clone(self._cm, errbuf, &cm)
+        if status != libeasel.eslOK:
+            raise EaselError(status, errbuf.decode("utf-8", "ignore"))
+
+        try:
+            if local:
+                cm.config_opts |= libinfernal.cm.CM_CONFIG_LOCAL
+                cm.config_opts |= libinfernal.cm.CM_CONFIG_HMMLOCAL
+                cm.config_opts |= libinfernal.cm.CM_CONFIG_HMMEL
+            with nogil:
+                status = libinfernal.cm_modelconfig.cm_Configure(cm, errbuf, -1)
+            if status != libeasel.eslOK:
+                raise EaselError(status, errbuf.decode("utf-8", "ignore"))
+
+            sqs = <ESL_SQ**> calloc(max(1, n), sizeof(ESL_SQ*))
+            if sqs == NULL:
+                raise AllocationError("ESL_SQ*", sizeof(ESL_SQ*), n)
+
+            with nogil:
+                if L > 0 and not iid:
+                    status = libinfernal.stats.CreateGenomicHMM(cm.abc, errbuf, &sA, &tAA, &eAA, &nstates)
+                for i in range(n):
+                    if status != libeasel.eslOK:
+                        break
+                    # emit a sequence from the CM
+                    snprintf(name, sizeof(name), "%s-sample%i", cm_name, i + 1)
+                    status = libinfernal.cm_parsetree.EmitParsetree(cm, errbuf, rng._rng, name, True, NULL, &esq, &length)
+                    if status != libeasel.eslOK:
+                        break
+                    esq.abc = self._cm.abc
+                    if L == 0:
+                        sqs[i] = esq
+                        esq = NULL
+                        continue
+                    # generate a background sequence to embed it in
+                    if esq.n > L:
+                        status = libeasel.eslEINCOMPAT
+                        break
+                    gsq = sqs[i] = libeasel.sq.esl_sq_CreateDigital(self._cm.abc)
+                    if gsq == NULL:
+                        status = libeasel.eslEMEM
+                        break
+                    if iid:
+                        status = libeasel.sq.esl_sq_GrowTo(gsq, L)
+                        if status != libeasel.eslOK:
+                            break
+                        gsq.dsq[0] = gsq.dsq[L + 1] = libeasel.eslDSQ_SENTINEL
+                        for x in range(1, L + 1):
+                            gsq.dsq[x] = <ESL_DSQ> (libeasel.random.esl_random(rng._rng) * K)
+                    else:
+                        free(gsq.dsq)
+                        gsq.dsq = NULL
+                        status = libinfernal.stats.SampleGenomicSequenceFromHMM(rng._rng, cm.abc, errbuf, sA, tAA, eAA, nstates, L, &gsq.dsq)
+                        if status != libeasel.eslOK:
+                            break
+                        gsq.salloc = L + 2
+                    gsq.n = gsq.W = gsq.L = gsq.end = L
+                    gsq.start = 1
+                    gsq.C = 0
+                    # embed the emitted sequence at a random position
+                    start = <int> (libeasel.random.esl_random(rng._rng) * (L - esq.n + 1)) + 1
+                    memcpy(&gsq.dsq[start], &esq.dsq[1], esq.n * sizeof(ESL_DSQ))
+                    snprintf(name, sizeof(name), "%s/%i-%i", esq.name, start, start + <int> esq.n - 1)
+                    status = libeasel.sq.esl_sq_SetName(gsq, name)
+                    libeasel.sq.esl_sq_Destroy(esq)
+                    esq = NULL
+
+            if status == libeasel.eslEINCOMPAT:
+                raise ValueError(f"embedding length too small for emitted sequence of length {esq.n}")
+            elif status == libeasel.eslEMEM:
+                raise AllocationError("ESL_SQ", sizeof(ESL_SQ))
+            elif status != libeasel.eslOK:
+                raise EaselError(status, errbuf.decode("utf-8", "ignore"))
+
+            # wrap the sampled sequences
+            for i in range(n):
+                seq = DigitalSequence.__new__(DigitalSequence, self.alphabet)
+                seq._sq = sqs[i]
+                sqs[i] = NULL
+                block.append(seq)
+
+        finally:
+            libinfernal.cm.FreeCM(cm)
+            libeasel.sq.esl_sq_Destroy(esq)
+            if sqs != NULL:
+                for i in range(n):
+                    libeasel.sq.esl_sq_Destroy(sqs[i])
+                free(sqs)
+            if tAA != NULL:
+                for i in range(nstates):
+                    free(tAA[i])
+                free(tAA)
+            if eAA != NULL:
+                for i in range(nstates):
+                    free(eAA[i])
+                free(eAA)
+            free(sA)
+
+        return block
+
+
 cdef class CMFile:
     """A wrapper around a file storing serialized CMs.
 
@@ -559,6 +1365,74 @@ cdef class CMFile:
         # zero on success
         return 0
 
+    cdef CM _read_at(self, off_t offset):
+        cdef int status
+
+        if self._fp == NULL:
+            raise ValueError("I/O operation on closed file.")
+        with nogil:
+            status = libinfernal.cm_file.cm_file_Position(self._fp, offset)
+        if status != libeasel.eslOK:
+            _reraise_error()
+            raise UnexpectedError(status, "cm_file_Position")
+        return self.read()
+
+    cdef dict _reopen_options(self):
+        # records can only be located in files that can be reopened
+        if self._name is None or self._reader is not None:
+            return None
+        if self._fp.do_gzip or self._fp.do_stdin:
+            return None
+        if self._fp.format != cm_file_formats_e.CM_FILE_1a:
+            return None
+        return dict(db=self._fp.is_pressed, alphabet=self.alphabet)
+
+    cdef off_t _record_start(self):
+        # NOTE(@althonos): A newly opened file has already consumed the
+        #                  format tag of the first record, so it must be
+        #                  restarted from the beginning.
+        return 0 if self._fp.newly_opened else ftello(self._fp.f)
+
+    cdef void _skip_to_end(self) noexcept:
+        # advance to the end of the file as if all the CMs had been read,
+        # after the records were processed without this handle
+        fseeko(self._fp.f, 0, SEEK_END)
+        self._fp.newly_opened = False
+
+    cdef list _record_offsets(self):
+        cdef int      status
+        cdef uint64_t i
+        cdef off_t    offset
+        cdef off_t    start
+        cdef list     offsets = []
+
+        if self._reopen_options() is None:
+            return None
+        start = self._record_start()
+
+        if self._fp.ssi != NULL:
+            for i in range(self._fp.ssi.nprimary):
+                status = libeasel.ssi.esl_ssi_FindNumber(self._fp.ssi, i, NULL, &offset, NULL, NULL, NULL)
+                if status == libeasel.eslEFORMAT:
+                    raise ValueError("Invalid format in SSI index")
+                elif status != libeasel.eslOK:
+                    raise UnexpectedError(status, "esl_ssi_FindNumber")
+                offsets.append(offset)
+            offsets.sort()
+        elif not self._fp.is_binary:
+            # every record of an ASCII file starts with the format tag
+            # on its own line, while filter HMMs start with `HMMER3/f`
+            with open(self._fp.fname, "rb") as fh:
+                with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mem:
+                    offset = 0 if mem[:11] == b"INFERNAL1/a" else _next_record(mem, 0)
+                    while offset != -1:
+                        offsets.append(offset)
+                        offset = _next_record(mem, offset)
+        else:
+            return None
+
+        return [offset for offset in offsets if offset >= start]
+
     # --- Magic methods ------------------------------------------------------
 
     def __cinit__(self):
@@ -655,6 +1529,33 @@ cdef class CMFile:
             raise StopIteration()
         return cm
 
+    def __getitem__(self, str key):
+        return self.fetch(key)
+
+    def __contains__(self, object key):
+        cdef int      status
+        cdef uint16_t fh
+        cdef off_t    offset
+        cdef bytes    _key
+
+        if self._fp == NULL:
+            raise ValueError("I/O operation on closed file.")
+        if self._fp.ssi == NULL:
+            raise ValueError("CM file has no SSI index")
+        if not isinstance(key, str):
+            return False
+
+        _key = key.encode("utf-8")
+        status = libeasel.ssi.esl_ssi_FindName(self._fp.ssi, _key, &fh, &offset, NULL, NULL)
+        if status == libeasel.eslOK:
+            return True
+        elif status == libeasel.eslENOTFOUND:
+            return False
+        elif status == libeasel.eslEFORMAT:
+            raise ValueError("Invalid format in SSI index")
+        else:
+            raise UnexpectedError(status, "esl_ssi_FindName")
+
     # --- Properties ---------------------------------------------------------
 
     @property
@@ -663,6 +1564,17 @@ cdef class CMFile:
         """
         return self._fp == NULL
 
+    @property
+    def indexed(self):
+        """`bool`: Whether the `CMFile` has an SSI index for random access.
+
+        An SSI index is loaded automatically when opening a CM file from
+        a path, if a file with the same name and an additional ``.ssi``
+        extension exists. Use `CMFile.create_index` to create one.
+
+        """
+        return self._fp != NULL and self._fp.ssi != NULL
+
     @property
     def name(self):
         """`str` or `None`: The path to the CM file, if known.
@@ -718,734 +1630,5092 @@ cdef class CMFile:
             _reraise_error()
             raise UnexpectedError(status, "p7_hmmfile_Read")
 
-    cpdef void close(self) except *:
-        """Close the CM file and free resources.
+    cpdef CM fetch(self, str key):
+        """Fetch a CM from the file using its SSI index.
 
-        This method has no effect if the file is already closed. It is called
-        automatically if the `CMFile` was used in a context::
+        This allows retrieving selected CMs from a large database (such
+        as the complete Rfam database) without having to parse all the
+        CMs stored before them. Use `CMFile.create_index` to build the
+        index of a CM file.
 
-            >>> with CMFile("tests/data/cms/5.c.cm") as cm_file:
-            ...     cm = cm_file.read()
-            >>> cm_file.closed
-            True
+        Arguments:
+            key (`str`): The name or the accession of the CM to fetch.
 
-        """
-        if self._reader:
-            self._reader.close()
-            self._reader = None
-            self._fp.f = self._fp.hfp.f = NULL # reader closed the file
-        if self._fp:
-            libinfernal.cm_file.cm_file_Close(self._fp)
-            self._fp = NULL
+        Returns:
+            `~pyinfernal.cm.CM`: The CM with the given name or accession.
 
+        Raises:
+            `KeyError`: When no CM with the given name or accession
+                could be found in the index.
+            `ValueError`: When attempting to fetch a CM from a closed
+                file, from a file without an SSI index, or when the
+                file could not be parsed.
 
-cdef uint32_t DEFAULT_SEED    = 181
-cdef double   DEFAULT_E       = 10.0
-cdef double   DEFAULT_INCE    = 0.01
+        """
+        cdef int         status
+        cdef bytes       _key
+        cdef const char* k
+        cdef CM          cm
 
-cdef class Pipeline:
-    """An Infernal accelerated sequence/covariance model comparison pipeline.
+        if self._fp == NULL:
+            raise ValueError("I/O operation on closed file.")
+        if self._fp.ssi == NULL:
+            raise ValueError("CM file has no SSI index")
 
-    The Infernal pipeline handles the comparison of digital sequences to
-    CMs. Since Infernal 1.1, the pipeline is accelerated using the HMMER
-    platform acceleration to compute initial SSV/MSV/Viterbi filters before
-    actually attempting full alignments.
+        _key = k = key.encode("utf-8")
+        with nogil:
+            status = libinfernal.cm_file.cm_file_PositionByKey(self._fp, k)
 
-    Attributes:
-        alphabet (`~pyhmmer.easel.Alphabet`): The alphabet for which the
-            pipeline is configured.
-        randomness (`~pyhmmer.easel.Randomness`): The random number generator
-            being used by the pipeline.
+        if status == libeasel.eslENOTFOUND:
+            raise KeyError(key)
+        elif status == libeasel.eslEFORMAT:
+            raise ValueError("Invalid format in SSI index")
+        elif status != libeasel.eslOK:
+            _reraise_error()
+            raise UnexpectedError(status, "cm_file_PositionByKey")
 
-    """
+        cm = self.read()
+        if cm is None:
+            raise EOFError(f"SSI index points past the end of the file for key {key!r}")
+        return cm
 
-    CLEN_HINT = 100  # default model size
-    M_HINT    = 100  # default model nodes
-    L_HINT    = 100  # default sequence size
+    def keys(self):
+        """Get the names of the CMs in the SSI index of the file.
 
-    cdef CM_PIPELINE* _pli
-    cdef uint32_t     _seed
-    cdef int64_t      _Z
+        Returns:
+            `list` of `str`: The names of the CMs in the index, sorted
+            in lexicographic order.
 
-    cdef readonly Alphabet         alphabet
-    cdef readonly Randomness       randomness
-    cdef readonly Background       background
+        Raises:
+            `ValueError`: When the file is closed or has no SSI index.
 
-    cdef          OptimizedProfile opt          # temporary optimized profile
-    cdef          Profile          profile      # temporary profile
-    cdef          Profile          profile_l    # temporary profile, 3' truncated
-    cdef          Profile          profile_r    # temporary profile, 5' truncated
-    cdef          Profile          profile_t    # temporary profile, 5' + 3' truncated
+        """
+        cdef int      status
+        cdef uint64_t i
+        cdef char*    pkey   = NULL
+        cdef list     keys   = []
 
-    # --- Magic methods ------------------------------------------------------
+        if self._fp == NULL:
+            raise ValueError("I/O operation on closed file.")
+        if self._fp.ssi == NULL:
+            raise ValueError("CM file has no SSI index")
+
+        for i in range(self._fp.ssi.nprimary):
+            status = libeasel.ssi.esl_ssi_FindNumber(self._fp.ssi, i, NULL, NULL, NULL, NULL, &pkey)
+            if status == libeasel.eslEFORMAT:
+                raise ValueError("Invalid format in SSI index")
+            elif status != libeasel.eslOK:
+                raise UnexpectedError(status, "esl_ssi_FindNumber")
+            try:
+                keys.append(pkey.decode("utf-8"))
+            finally:
+                free(pkey)
+                pkey = NULL
+
+        return keys
+
+    def prefetch(self, int size = 4, int threads = 1):
+        """Iterate over the remaining CMs, parsing them in the background.
+
+        The returned iterator reads CMs ahead of the consumer in background
+        threads, so that parsing the next models overlaps with processing
+        the current one. With several threads, the remaining records are
+        split between threads that each parse their share with a separate
+        file handle, which requires locating the records in the file
+        beforehand: this is supported for uncompressed ASCII files, and
+        for any file with an SSI index. Otherwise, a single thread is used.
 
-    def __cinit__(self):
-        self._pli = NULL
-        self.alphabet = None
-        self.randomness = None
+        Arguments:
+            size (`int`): The maximum number of CMs to read in advance.
+                This bounds the memory used by models that have been parsed
+                but not consumed yet.
+            threads (`int`): The number of threads to parse CMs with.
 
-    def __init__(
-        self,
-        Alphabet alphabet,
-        int64_t Z,
-        Background background = None,
-        *,
-        # bint bias_filter=True,
-        # bint null2=True,
-        uint32_t seed=DEFAULT_SEED,
-        # object Z=None,
-        # double F1=DEFAULT_F1,
-        # double F2=DEFAULT_F2,
-        # double F3=DEFAULT_F3,
-        double E=DEFAULT_E,
-        object T=None,
-        double incE=DEFAULT_INCE,
-        object incT=None,
-    #     str bit_cutoffs=None,
-    ):
-        cdef int clen_hint = self.CLEN_HINT
-        cdef int l_hint    = self.L_HINT
-        cdef int m_hint    = self.M_HINT
+        Yields:
+            `~pyinfernal.cm.CM`: The remaining CMs of the file, in the
+            same order as they are stored in the file.
 
-        with nogil:
-            self._pli = libinfernal.cm_pipeline.cm_pipeline_Create(
-                NULL,                               # ESL_GETOPTS *go
-                <ESL_ALPHABET*> alphabet._abc,      # ESL_ALPHABET *abc
-                clen_hint,                          # int clen_hint
-                l_hint,                             # int L_hint
-                Z,                                  # int Z
-                cm_zsetby_e.CM_ZSETBY_OPTION,       # cm_zsetby_e Z_setby
-                cm_pipemodes_e.CM_SEARCH_SEQS,      # cm_pipemodes_e mode
-            )
-        if self._pli == NULL:
-            raise AllocationError("CM_PIPELINE", sizeof(CM_PIPELINE))
+        Caution:
+            The file is consumed by the iterator, and should not be read
+            from until the iterator has been exhausted or closed.
 
-        # record alphabet
-        self.alphabet = alphabet
+        Example:
+            >>> with CMFile("tests/data/cms/5.c.cm") as cm_file:
+            ...     names = [cm.name for cm in cm_file.prefetch(threads=2)]
+            >>> names
+            ['tRNA', 'Vault', 'snR75', 'Plant_SRP', 'tRNA-Sec']
 
-        # use the backgroud model or create a default one
-        if background is None:
-            self.background = Background(alphabet)
-        elif background.alphabet != self.alphabet:
-            raise AlphabetMismatch(self.alphabet, background.alphabet)
-        else:
-            self.background = background.copy() # FIXME: do we really need a copy?
+        """
+        cdef int  i
+        cdef list offsets = None
+        cdef list sources
+        cdef dict options
 
-        # create a Randomness object exposing the internal pipeline RNG
-        self.randomness = Randomness.__new__(Randomness)
-        self.randomness._owner = self
-        self.randomness._rng = self._pli.r
+        if self._fp == NULL:
+            raise ValueError("I/O operation on closed file.")
+        if size < 1:
+            raise InvalidParameter("size", size, hint="strictly positive integer")
+        if threads < 1:
+            raise InvalidParameter("threads", threads, hint="strictly positive integer")
+
+        if threads > 1:
+            offsets = self._record_offsets()
+        if not offsets:
+            return _prefetch([self], size)
+
+        # distribute the records so that the threads can be polled in turn
+        # to recover the original order of the CMs
+        options = self._reopen_options()
+        threads = min(threads, len(offsets))
+        self._skip_to_end()
+        sources = [
+            _read_offsets(self._name, offsets[i::threads], options)
+            for i in range(threads)
+        ]
+        return _prefetch(sources, size)
+
+    cpdef list headers(self):
+        """Read the headers of the remaining CMs in the file.
+
+        Headers give access to the metadata of the CMs, which can be used
+        to select models before loading them with `CMHeader.load`. For
+        uncompressed ASCII files, the headers are obtained by scanning the
+        file without parsing the model parameters, which takes a fraction
+        of the time and memory needed to load the CMs. Other files are
+        parsed completely, but the CMs are discarded after reading.
 
-        # create empty profiles and optimized profile to reuse globally
-        # between queries rather than reallocating on every new query
-        self.profile = Profile(m_hint, self.alphabet)
-        self.opt = OptimizedProfile(m_hint, self.alphabet)
-        self.profile_r = Profile(m_hint, self.alphabet)
-        self.profile_l = Profile(m_hint, self.alphabet)
-        self.profile_t = Profile(m_hint, self.alphabet)
+        Returns:
+            `list` of `~pyinfernal.cm.CMHeader`: The headers of the
+            remaining CMs in the file, in the order they are stored.
 
-        # configure the pipeline with the additional keyword arguments
-        self.seed = seed
-        self.Z = Z
-        self.E = E
-        self.T = T
-        self.incE = incE
-        self.incT = incT
+        Example:
+            >>> with CMFile("tests/data/cms/5.c.cm") as cm_file:
+            ...     headers = cm_file.headers()
+            >>> [h.name for h in headers if h.clen < 100]
+            ['tRNA', 'snR75', 'tRNA-Sec']
 
-    def __dealloc__(self):
-        # NOTE(@althonos): `cm_pipeline_Destroy` supposedly requires a `CM_t`
-        #                  but does not use it so it *should* be fine to pass
-        #                  a NULL pointer here.
-        libinfernal.cm_pipeline.cm_pipeline_Destroy(self._pli, NULL)
+        """
+        cdef CM   cm
+        cdef dict options
+        cdef list headers = []
 
-    # --- Properties ---------------------------------------------------------
+        if self._fp == NULL:
+            raise ValueError("I/O operation on closed file.")
 
-    @property
-    def Z(self):
-        """`int` or `None`: The number of effective targets searched.
+        options = self._reopen_options()
+        if options is not None and not self._fp.is_binary:
+            headers = _scan_headers(self._fp.fname, self._record_start(), self._name, options)
+            self._skip_to_end()
+        else:
+            for cm in self:
+                headers.append(CMHeader._from_cm(cm, self._name if options else None, options))
 
-        It is used to compute the independent e-value for each hit.
-        If `None`, the parameter number will be set automatically after all
-        the comparisons have been done. Otherwise, it can be set to an
-        arbitrary number.
+        return headers
 
-        """
-        return None if self._Z < 0 else self._Z
+    @staticmethod
+    def create_index(object file):
+        """Create an SSI index for the CM file at the given location.
 
-    @Z.setter
-    def Z(self, int64_t Z):
-        assert self._pli != NULL
-        if Z is None:
-            self._pli.Z       = 0.0
-            self._pli.Z_setby = cm_zsetby_e.CM_ZSETBY_OPTION
-            self._Z           = -1
-        else:
-            self._pli.Z_setby = cm_zsetby_e.CM_ZSETBY_OPTION
-            self._pli.Z = self._Z = Z
+        This method is equivalent to ``cmfetch --index``: it reads all
+        the CMs in the file, and records their names (and accessions as
+        aliases) together with their positions into a new index file
+        with an additional ``.ssi`` extension, which is loaded by any
+        `CMFile` subsequently opened from the same path.
 
-    @property
-    def seed(self):
-        """`int`: The seed given at pipeline initialization.
+        Arguments:
+            file (`str`, `bytes` or `os.PathLike`): The path to the CM
+                file to index.
 
-        Setting this attribute to a different value will cause the random
-        number generator to be reseeded immediately.
+        Returns:
+            `int`: The number of CMs that were indexed.
+
+        Raises:
+            `FileExistsError`: When an SSI index already exists for the
+                given file.
+            `ValueError`: When the file is compressed, and therefore
+                cannot be indexed.
 
         """
-        return self._seed
+        cdef CM      cm
+        cdef CMFile  cm_file
+        cdef int     fh
+        cdef int     n       = 0
+        cdef str     path    = os.fsdecode(file)
+        cdef str     ssi     = f"{path}.ssi"
+
+        if os.path.exists(ssi):
+            raise FileExistsError(errno.EEXIST, f"SSI index {ssi!r} already exists")
+
+        with CMFile(path, db=False) as cm_file:
+            if cm_file._fp.do_gzip or cm_file._fp.do_stdin:
+                raise ValueError("cannot index a compressed CM file")
+            try:
+                with SSIWriter(ssi) as writer:
+                    fh = writer.add_file(path, 0)
+                    for cm in cm_file:
+                        writer.add_key(cm.name, fh, cm._cm.offset)
+                        if cm.accession is not None:
+                            writer.add_alias(cm.accession, cm.name)
+                        n += 1
+            except BaseException:
+                # remove the incomplete index
+                if os.path.exists(ssi):
+                    os.remove(ssi)
+                raise
+
+        return n
 
-    @seed.setter
-    def seed(self, uint32_t seed):
-        self._seed = seed
-        self._pli.do_reseeding = self._pli.ddef.do_reseeding = seed != 0
-        self.randomness.seed(seed)
+    @staticmethod
+    def cached(object file, object cache = None, *, Alphabet alphabet = None):
+        """Open a CM file through a binary cache.
 
-    @property
-    def F1(self):
-        """`float`: The MSV filter threshold.
-        """
-        assert self._pli != NULL
-        return self._pli.F1
+        Parsing CMs in ASCII format is slow, which adds up when the same
+        database is loaded repeatedly. This method converts the file to
+        the binary format on first use, and opens the binary copy on
+        subsequent calls. The cache is rebuilt whenever the source file
+        is more recent than the cache.
 
-    @F1.setter
-    def F1(self, double F1):
-        assert self._pli != NULL
-        self._pli.F1 = F1
+        Arguments:
+            file (`str`, `bytes` or `os.PathLike`): The path to the CM
+                file to open.
+            cache (`str`, `bytes` or `os.PathLike`, optional): The path
+                to the binary cache. Defaults to the path of ``file``
+                with an additional ``.cbm`` extension.
+            alphabet (`~pyhmmer.easel.Alphabet`, optional): The alphabet
+                of the CMs in the file.
 
-    @property
-    def F2(self):
-        """`float`: The Viterbi filter threshold.
-        """
-        assert self._pli != NULL
-        return self._pli.F2
+        Returns:
+            `CMFile`: A CM file open for reading the binary cache, or
+            the source file itself if it is already in binary format.
 
-    @F2.setter
-    def F2(self, double F2):
-        assert self._pli != NULL
-        self._pli.F2 = F2
+        Note:
+            The cache is written to a temporary file first, and then
+            moved to its final location, so that concurrent processes
+            never observe a partially written cache.
 
-    @property
-    def F3(self):
-        """`float`: The uncorrected Forward filter threshold.
         """
-        assert self._pli != NULL
-        return self._pli.F3
+        cdef CM     cm
+        cdef CMFile cm_file
+        cdef str    path    = os.fsdecode(file)
+        cdef str    dest    = f"{path}.cbm" if cache is None else os.fsdecode(cache)
+        cdef str    tmp     = None
 
-    @F3.setter
-    def F3(self, double F3):
-        assert self._pli != NULL
-        self._pli.F3 = F3
+        if os.path.exists(dest) and os.stat(dest).st_mtime >= os.stat(path).st_mtime:
+            return CMFile(dest, alphabet=alphabet)
 
-    @property
-    def F4(self):
-        """`float`: The glocal Forward filter threshold.
-        """
-        assert self._pli != NULL
-        return self._pli.F4
+        cm_file = CMFile(path, db=False, alphabet=alphabet)
+        if cm_file._fp.is_binary:
+            return cm_file
 
-    @F4.setter
-    def F4(self, double F4):
-        assert self._pli != NULL
-        self._pli.F4 = F4
+        try:
+            with cm_file, tempfile.NamedTemporaryFile(
+                "wb",
+                dir=os.path.dirname(os.path.abspath(dest)),
+                prefix=f".{os.path.basename(dest)}.",
+                delete=False,
+            ) as dst:
+                tmp = dst.name
+                for cm in cm_file:
+                    cm.write(dst, binary=True)
+            os.replace(tmp, dest)
+        except BaseException:
+            # remove the incomplete cache
+            if tmp is not None and os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+        return CMFile(dest, alphabet=alphabet)
 
-    @property
-    def F5(self):
-        """`float`: The glocal envelope definition filter threshold.
-        """
-        assert self._pli != NULL
-        return self._pli.F5
+    cpdef void close(self) except *:
+        """Close the CM file and free resources.
 
-    @F5.setter
-    def F5(self, double F5):
-        assert self._pli != NULL
-        self._pli.F5 = F5
+        This method has no effect if the file is already closed. It is called
+        automatically if the `CMFile` was used in a context::
+
+            >>> with CMFile("tests/data/cms/5.c.cm") as cm_file:
+            ...     cm = cm_file.read()
+            >>> cm_file.closed
+            True
 
-    @property
-    def F6(self):
-        """`float`: The CYK filter threshold.
         """
-        assert self._pli != NULL
-        return self._pli.F6
+        if self._reader:
+            self._reader.close()
+            self._reader = None
+            self._fp.f = self._fp.hfp.f = NULL # reader closed the file
+        if self._fp:
+            libinfernal.cm_file.cm_file_Close(self._fp)
+            self._fp = NULL
 
-    @F6.setter
-    def F6(self, double F6):
-        assert self._pli != NULL
-        self._pli.F6 = F6
 
-    @property
-    def E(self):
-        """`float`: The per-target E-value threshold for reporting a hit.
-        """
-        assert self._pli != NULL
-        return self._pli.E
+cdef class CMHeader:
+    """The header of a CM stored in a CM file.
 
-    @E.setter
-    def E(self, double E):
-        assert self._pli != NULL
-        self._pli.E = E
+    Headers are obtained with `CMFile.headers`, and describe a CM without
+    holding its parameters, so that a whole database can be inspected to
+    select the models to use at little cost.
 
-    @property
-    def T(self):
-        """`float` or `None`: The per-target score threshold for reporting a hit.
+    Attributes:
+        name (`str`): The name of the CM.
+        accession (`str` or `None`): The accession of the CM, if any.
+        description (`str` or `None`): The description of the CM, if any.
+        M (`int`): The number of states in the model.
+        N (`int`): The number of nodes in the model.
+        clen (`int`): The consensus length of the model.
+        W (`int`): The maximum expected length of a hit.
+        nbp (`int`): The number of base pairs in the model consensus
+            structure.
+        nseq (`int` or `None`): The number of training sequences used,
+            if any.
+        path (`str` or `None`): The path to the file storing the CM, if
+            the CM can be loaded from there.
+        offset (`int` or `None`): The offset of the CM in the file, if
+            the CM can be loaded from there.
 
-        If set to a non-`None` value, this threshold takes precedence over
-        the per-target E-value threshold (`Pipeline.E`).
+    """
 
-        """
-        assert self._pli != NULL
-        return None if self._pli.by_E else self._pli.T
+    cdef readonly str    name
+    cdef readonly str    accession
+    cdef readonly str    description
+    cdef readonly int    M
+    cdef readonly int    N
+    cdef readonly int    clen
+    cdef readonly int    W
+    cdef readonly int    nbp
+    cdef readonly object nseq
+    cdef readonly str    path
+    cdef readonly object offset
+    cdef          dict   _options
 
-    @T.setter
+    @staticmethod
+    cdef CMHeader _from_cm(CM cm, str path, dict options):
+        cdef CMHeader header = CMHeader.__new__(CMHeader)
+        header.name = cm.name
+        header.accession = cm.accession
+        header.description = cm.description
+        header.M = cm._cm.M
+        header.N = cm._cm.nodes
+        header.clen = cm._cm.clen
+        header.W = cm._cm.W
+        header.nbp = libinfernal.cm.CMCountNodetype(cm._cm, libinfernal.MATP_nd)
+        header.nseq = cm.nseq
+        header.path = path
+        header.offset = None if path is None else cm._cm.offset
+        header._options = options
+        return header
+
+    def __repr__(self):
+        cdef str ty = type(self).__name__
+        return f"<{ty} name={self.name!r} clen={self.clen} offset={self.offset!r}>"
+
+    cpdef CM load(self, CMFile cm_file = None):
+        """Load the complete CM described by this header.
+
+        Arguments:
+            cm_file (`~pyinfernal.cm.CMFile`, optional): An open handle
+                to the file storing the CM, which avoids reopening the
+                file when loading many CMs. Note that the handle will be
+                repositioned after the CM.
+
+        Returns:
+            `~pyinfernal.cm.CM`: The CM described by this header.
+
+        Raises:
+            `ValueError`: When the header was obtained from a file that
+                cannot be reopened, such as a file-like object.
+
+        """
+        cdef CM cm
+        if self.path is None or self.offset is None:
+            raise ValueError("CM header is not associated with a file path")
+        if cm_file is None:
+            with CMFile(self.path, **self._options) as cm_file:
+                cm = cm_file._read_at(self.offset)
+        else:
+            cm = cm_file._read_at(self.offset)
+        if cm is None:
+            raise EOFError(f"Offset points past the end of the file for CM {self.name!r}")
+        return cm
+
+
+cdef class SequenceDatabase:
+    """A database of digital target sequences mapped from a file.
+
+    The database file stores the digitized residues of the sequences with
+    their names, accessions and descriptions, and the total number of
+    residues, so that opening it only maps the file into memory instead of
+    parsing and digitizing the sequences. The sequences are searched
+    directly from the mapping without copy, and since the mapping is backed
+    by the page cache, all the processes opening the same database share
+    its memory.
+
+    Example:
+        Store sequences in a database, and search them without
+        loading them into memory::
+
+            >>> with tempfile.TemporaryDirectory() as folder:
+            ...     path = os.path.join(folder, "pANT_R100.db")
+            ...     db = SequenceDatabase.create(path, sequences)
+            ...     pipeline = Pipeline(trna.alphabet, Z=db.total_length())
+            ...     hits = pipeline.search_cm(trna, db)
+            >>> db.total_length() == sequences.total_length()
+            True
+            >>> len(hits)
+            3
+
+    Note:
+        Database files use the byte order of the machine they were created
+        on, and cannot be opened on machines with a different byte order.
+
+    """
+
+    cdef          ESL_SQ*          _sqs
+    cdef          ESL_SQ**         _refs
+    cdef          size_t           _length
+    cdef          size_t           _start
+    cdef          uint64_t         _residues
+    cdef          SequenceDatabase _owner
+    cdef          object           _mmap
+    cdef          Py_buffer        _buffer
+    cdef readonly Alphabet         alphabet
+    cdef readonly str              path
+
+    # --- Magic methods ------------------------------------------------------
+
+    def __cinit__(self):
+        self._sqs = NULL
+        self._refs = NULL
+        self._length = 0
+        self._start = 0
+        self._residues = 0
+        self._owner = None
+        self._mmap = None
+        self._buffer.buf = NULL
+        self.alphabet = None
+        self.path = None
+
+    def __init__(self, object path):
+        """__init__(self, path)\\n--\\n
+
+        Open a sequence database.
+
+        Arguments:
+            path (`str` or `os.PathLike`): The path to a database file
+                created with `SequenceDatabase.create`.
+
+        Raises:
+            `ValueError`: When the file is not a valid database file.
+
+        """
+        cdef const _DatabaseHeader* header
+        cdef const _DatabaseRecord* records
+        cdef const char*            buf
+        cdef uint64_t               length
+        cdef uint64_t               n
+        cdef uint64_t               i
+        cdef uint64_t               residues = 0
+        cdef bint                   valid    = True
+
+        self.path = os.fsdecode(path)
+        with open(self.path, "rb") as fh:
+            if os.fstat(fh.fileno()).st_size < sizeof(_DatabaseHeader):
+                raise ValueError(f"not a sequence database: {self.path!r}")
+            self._mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        PyObject_GetBuffer(self._mmap, &self._buffer, PyBUF_SIMPLE)
+        buf = <const char*> self._buffer.buf
+        length = self._buffer.len
+
+        # check the header
+        header = <const _DatabaseHeader*> buf
+        if memcmp(header.magic, <const char*> _DATABASE_MAGIC, sizeof(header.magic)) != 0:
+            raise ValueError(f"not a sequence database: {self.path!r}")
+        if header.byteorder != _DATABASE_BYTEORDER:
+            raise ValueError("sequence database was created on a machine with a different byte order")
+        if header.version != _DATABASE_VERSION:
+            raise ValueError(f"unsupported sequence database version: {header.version!r}")
+        self.alphabet = Alphabet.from_type(header.alphabet)
+
+        # check the tables fit in the file
+        n = header.n_sequences
+        if (
+               header.records > length
+            or n > (length - header.records) // sizeof(_DatabaseRecord)
+            or header.strings > length
+            or (n > 0 and buf[length - 1] != b'\0')
+        ):
+            raise ValueError(f"truncated sequence database: {self.path!r}")
+        records = <const _DatabaseRecord*> &buf[header.records]
+
+        # create the sequence views
+        self._sqs = <ESL_SQ*> calloc(max(1, n), sizeof(ESL_SQ))
+        self._refs = <ESL_SQ**> malloc(max(1, n) * sizeof(ESL_SQ*))
+        if self._sqs == NULL or self._refs == NULL:
+            raise AllocationError("ESL_SQ", sizeof(ESL_SQ), n)
+        with nogil:
+            for i in range(n):
+                # check the record points inside the file
+                if (
+                       records[i].n >= length
+                    or records[i].dsq >= length - records[i].n - 1
+                    or buf[records[i].dsq] != <char> libeasel.eslDSQ_SENTINEL
+                    or buf[records[i].dsq + records[i].n + 1] != <char> libeasel.eslDSQ_SENTINEL
+                    or records[i].name >= length - header.strings
+                    or records[i].acc >= length - header.strings
+                    or records[i].desc >= length - header.strings
+                ):
+                    valid = False
+                    break
+                # NOTE(@althonos): The views point into the read-only
+                #                  mapping, so they must never be passed to
+                #                  Easel functions modifying or freeing
+                #                  their contents.
+                self._sqs[i].name = <char*> &buf[header.strings + records[i].name]
+                self._sqs[i].acc = <char*> &buf[header.strings + records[i].acc]
+                self._sqs[i].desc = <char*> &buf[header.strings + records[i].desc]
+                self._sqs[i].tax_id = -1
+                self._sqs[i].dsq = <ESL_DSQ*> &buf[records[i].dsq]
+                self._sqs[i].n = records[i].n
+                self._sqs[i].start = 1
+                self._sqs[i].end = self._sqs[i].W = self._sqs[i].L = records[i].n
+                self._sqs[i].source = _EMPTY_STRING
+                self._sqs[i].idx = i
+                self._sqs[i].roff = self._sqs[i].hoff = self._sqs[i].doff = self._sqs[i].eoff = -1
+                self._sqs[i].abc = self.alphabet._abc
+                self._refs[i] = &self._sqs[i]
+                residues += records[i].n
+        if not valid or residues != header.n_residues:
+            raise ValueError(f"corrupted sequence database: {self.path!r}")
+
+        self._length = n
+        self._residues = residues
+
+    def __dealloc__(self):
+        if self._owner is None:
+            free(self._sqs)
+            free(self._refs)
+            if self._buffer.buf != NULL:
+                PyBuffer_Release(&self._buffer)
+                self._buffer.buf = NULL
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+
+    def __repr__(self):
+        cdef str ty = type(self).__name__
+        if self._owner is None:
+            return f"{ty}({self.path!r})"
+        return f"{ty}({self.path!r})[{self._start}:{self._start + self._length}]"
+
+    def __reduce__(self):
+        # reopen the file rather than copying the sequences, so that the
+        # processes receiving the database share the same mapping
+        if self._owner is None:
+            return SequenceDatabase, (self.path,)
+        return operator.getitem, (self._owner, slice(self._start, self._start + self._length))
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, object index):
+        cdef int              status
+        cdef ssize_t          i
+        cdef ssize_t          start
+        cdef ssize_t          stop
+        cdef ssize_t          step
+        cdef SequenceDatabase view
+        cdef DigitalSequence  seq
+
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._length)
+            if step != 1:
+                raise ValueError(f"cannot slice a {type(self).__name__} with a step")
+            # create a view of the sequences sharing the same mapping
+            view = SequenceDatabase.__new__(SequenceDatabase)
+            view._owner = self if self._owner is None else self._owner
+            view.alphabet = self.alphabet
+            view.path = self.path
+            view._refs = &self._refs[start]
+            view._length = max(0, stop - start)
+            view._start = self._start + start
+            for i in range(view._length):
+                view._residues += view._refs[i].n
+            return view
+
+        i = index
+        if i < 0:
+            i += self._length
+        if i < 0 or i >= <ssize_t> self._length:
+            raise IndexError("list index out of range")
+        # copy the sequence out of the mapping
+        seq = DigitalSequence.__new__(DigitalSequence, self.alphabet)
+        seq._sq = libeasel.sq.esl_sq_CreateDigital(self.alphabet._abc)
+        if seq._sq == NULL:
+            raise AllocationError("ESL_SQ", sizeof(ESL_SQ))
+        status = libeasel.sq.esl_sq_Copy(self._refs[i], seq._sq)
+        if status != libeasel.eslOK:
+            raise UnexpectedError(status, "esl_sq_Copy")
+        return seq
+
+    def __iter__(self):
+        cdef size_t i
+        for i in range(self._length):
+            yield self[i]
+
+    # --- Methods ------------------------------------------------------------
+
+    @classmethod
+    def create(cls, object path, object sequences, Alphabet alphabet = None):
+        """Write sequences to a new database file, and open it.
+
+        Arguments:
+            path (`str` or `os.PathLike`): The path of the database file
+                to create. An existing file will be overwritten.
+            sequences (iterable of `~pyhmmer.easel.DigitalSequence`): The
+                sequences to store, such as a `~pyhmmer.easel.SequenceFile`
+                opened in digital mode, which is read iteratively.
+            alphabet (`~pyhmmer.easel.Alphabet`, optional): The alphabet
+                of the sequences. If `None` given, use the alphabet of
+                ``sequences``, or of the first sequence.
+
+        Returns:
+            `~pyinfernal.cm.SequenceDatabase`: The created database.
+
+        Raises:
+            `~pyhmmer.errors.AlphabetMismatch`: When the sequences are
+                not all in the same alphabet.
+
+        """
+        cdef _DatabaseHeader header
+        cdef DigitalSequence seq
+        cdef const ESL_SQ*   sq
+        cdef uint64_t        offset
+        cdef bytes           sentinel = bytes([libeasel.eslDSQ_SENTINEL])
+        cdef object          records  = array.array("Q")
+        cdef bytearray       strings  = bytearray()
+
+        if array.array("Q").itemsize != sizeof(uint64_t):
+            raise RuntimeError("unsupported platform for sequence databases")
+        if alphabet is None:
+            alphabet = getattr(sequences, "alphabet", None)
+
+        memset(&header, 0, sizeof(_DatabaseHeader))
+        memcpy(header.magic, <const char*> _DATABASE_MAGIC, sizeof(header.magic))
+        header.byteorder = _DATABASE_BYTEORDER
+        header.version = _DATABASE_VERSION
+
+        with open(path, "wb") as fh:
+            # write the residues, separated by sentinels, after the header
+            offset = sizeof(_DatabaseHeader)
+            fh.seek(offset)
+            fh.write(sentinel)
+            for seq in sequences:
+                if alphabet is None:
+                    alphabet = seq.alphabet
+                elif not alphabet._eq(seq.alphabet):
+                    raise AlphabetMismatch(alphabet, seq.alphabet)
+                sq = seq._sq
+                records.append(offset)
+                records.append(sq.n)
+                records.append(len(strings))
+                strings += sq.name
+                strings.append(0)
+                records.append(len(strings))
+                strings += sq.acc
+                strings.append(0)
+                records.append(len(strings))
+                strings += sq.desc
+                strings.append(0)
+                fh.write(PyBytes_FromStringAndSize(<const char*> &sq.dsq[1], sq.n))
+                fh.write(sentinel)
+                offset += sq.n + 1
+                header.n_sequences += 1
+                header.n_residues += sq.n
+            # write the record table, aligned in the file, and the strings
+            offset += 1
+            fh.write(bytes(-offset % sizeof(uint64_t)))
+            header.records = offset + (-offset % sizeof(uint64_t))
+            header.strings = header.records + header.n_sequences * sizeof(_DatabaseRecord)
+            fh.write(records)
+            fh.write(strings)
+            # write the header once the sizes are known
+            if alphabet is None:
+                raise ValueError("could not determine the alphabet of the sequences")
+            header.alphabet = alphabet._abc.type
+            fh.seek(0)
+            fh.write(PyBytes_FromStringAndSize(<const char*> &header, sizeof(_DatabaseHeader)))
+
+        return cls(path)
+
+    cpdef uint64_t total_length(self):
+        """Get the total number of residues in the database.
+
+        The number of residues is stored in the database, so this method
+        does not need to read the sequences.
+
+        """
+        return self._residues
+
+    cpdef list lengths(self):
+        """Get the lengths of the sequences in the database.
+
+        Returns:
+            `list` of `int`: The number of residues of each sequence.
+
+        """
+        cdef size_t i
+        return [self._refs[i].n for i in range(self._length)]
+
+
+cdef int _compare_uint64(const void* a, const void* b) noexcept nogil:
+    cdef uint64_t x = (<const uint64_t*> a)[0]
+    cdef uint64_t y = (<const uint64_t*> b)[0]
+    return (x > y) - (x < y)
+
+
+cdef void _seedindex_fill(
+    ESL_SQ**  refs,
+    size_t    n_sequences,
+    int       k,
+    int       prefix,
+    uint64_t* cursors,
+    uint64_t* seeds,
+) noexcept nogil:
+    # count the seeds of each bucket if `seeds` is NULL, or store them at the
+    # position of their bucket cursor otherwise; seeds are made of the k-mer
+    # code in the high bits, and of the position of the k-mer in the
+    # concatenated sequences in the low bits, so that sorting the seeds
+    # groups them by k-mer
+    cdef size_t   i
+    cdef int64_t  j
+    cdef ESL_DSQ  x
+    cdef int      run
+    cdef uint64_t b
+    cdef uint64_t code
+    cdef uint64_t offset = 0
+    cdef int      shift  = 64 - 2*k
+    cdef int      bshift = 2*(k - prefix)
+    cdef uint64_t mask   = (<uint64_t> 1 << (2*k)) - 1
+
+    for i in range(n_sequences):
+        run = 0
+        code = 0
+        for j in range(1, refs[i].n + 1):
+            x = refs[i].dsq[j]
+            # skip the k-mers containing degenerate residues
+            if x < 4:
+                code = ((code << 2) | x) & mask
+                run += 1
+            else:
+                run = 0
+            if run >= k:
+                b = code >> bshift
+                if seeds != NULL:
+                    seeds[cursors[b]] = (code << shift) | (offset + j - k)
+                cursors[b] += 1
+        offset += refs[i].n
+
+
+cdef struct _SeedArray:
+    uint64_t* values
+    size_t    n
+    size_t    capacity
+
+
+cdef int _seedarray_push(_SeedArray* array, uint64_t value) except -1 nogil:
+    cdef uint64_t* values
+    if array.n == array.capacity:
+        array.capacity = max(1024, 2*array.capacity)
+        values = <uint64_t*> realloc(array.values, array.capacity * sizeof(uint64_t))
+        if values == NULL:
+            with gil:
+                raise AllocationError("uint64_t", sizeof(uint64_t), array.capacity)
+        array.values = values
+    array.values[array.n] = value
+    array.n += 1
+    return 0
+
+
+cdef int _seedwords_enumerate(
+    _SeedArray*   words,
+    const double* scores,
+    const double* bounds,
+    int           k,
+    int           depth,
+    double        score,
+    double        threshold,
+    uint64_t      code,
+) except -1 nogil:
+    # enumerate the words scoring above the threshold, pruning the branches
+    # that cannot reach it even with the best residue at each position
+    cdef uint64_t x
+    if score + bounds[depth] < threshold:
+        return 0
+    if depth == k:
+        return _seedarray_push(words, code)
+    for x in range(4):
+        _seedwords_enumerate(
+            words,
+            scores,
+            bounds,
+            k,
+            depth + 1,
+            score + scores[4*depth + x],
+            threshold,
+            (code << 2) | x,
+        )
+    return 0
+
+
+cdef int _seedwords_collect(
+    _SeedArray*      words,
+    const P7_HMM*    hmm,
+    const float*     null,
+    int              k,
+    double           threshold,
+) except -1 nogil:
+    # collect the words scoring above the threshold against each window
+    # of k consecutive match states of the HMM
+    cdef int     i
+    cdef int     j
+    cdef int     x
+    cdef double* scores = NULL
+    cdef double* bounds = NULL
+    cdef size_t  n
+    cdef size_t  u
+
+    if hmm.M < k:
+        return 0
+
+    scores = <double*> malloc(4 * hmm.M * sizeof(double))
+    bounds = <double*> malloc((k + 1) * sizeof(double))
+    if scores == NULL or bounds == NULL:
+        free(scores)
+        free(bounds)
+        with gil:
+            raise AllocationError("double", sizeof(double), 4 * hmm.M)
+
+    try:
+        # compute the log-odds score of each residue in bits
+        for i in range(hmm.M):
+            for x in range(4):
+                if hmm.mat[i+1][x] > 0.0:
+                    scores[4*i + x] = log(hmm.mat[i+1][x] / null[x]) / log(2.0)
+                else:
+                    scores[4*i + x] = -libeasel.eslINFINITY
+        # enumerate the words of each window
+        for i in range(hmm.M - k + 1):
+            bounds[k] = 0.0
+            for j in range(k - 1, -1, -1):
+                bounds[j] = bounds[j+1] + max(
+                    scores[4*(i+j) + 0],
+                    scores[4*(i+j) + 1],
+                    scores[4*(i+j) + 2],
+                    scores[4*(i+j) + 3],
+                )
+            _seedwords_enumerate(words, &scores[4*i], bounds, k, 0, 0.0, threshold, 0)
+    finally:
+        free(scores)
+        free(bounds)
+
+    # remove the words found in several windows
+    if words.n > 0:
+        qsort(words.values, words.n, sizeof(uint64_t), _compare_uint64)
+        n = 1
+        for u in range(1, words.n):
+            if words.values[u] != words.values[n-1]:
+                words.values[n] = words.values[u]
+                n += 1
+        words.n = n
+    return 0
+
+
+cdef int _seedindex_lookup(
+    _SeedArray*     positions,
+    const uint64_t* buckets,
+    const uint64_t* seeds,
+    int             k,
+    int             prefix,
+    uint64_t        code,
+) except -1 nogil:
+    # record the positions of the seeds of the given k-mer
+    cdef int      shift = 64 - 2*k
+    cdef uint64_t b     = code >> (2*(k - prefix))
+    cdef uint64_t lo    = buckets[b]
+    cdef uint64_t hi    = buckets[b+1]
+    cdef uint64_t mid
+    cdef uint64_t end
+    # find the first seed of the k-mer
+    while lo < hi:
+        mid = lo + (hi - lo) // 2
+        if (seeds[mid] >> shift) < code:
+            lo = mid + 1
+        else:
+            hi = mid
+    # record all the seeds of the k-mer
+    end = buckets[b+1]
+    while lo < end and (seeds[lo] >> shift) == code:
+        _seedarray_push(positions, seeds[lo] & ((<uint64_t> 1 << shift) - 1))
+        lo += 1
+    return 0
+
+
+cdef class SeedIndex:
+    """A persistent index of the k-mers of digital target sequences.
+
+    The index stores the positions of every k-mer of a fixed set of target
+    sequences, so that the candidate windows of a query can be found
+    without scanning the targets. For each CM, the seeds are the k-mers
+    scoring above a threshold against any window of *k* consecutive
+    match states of its filter HMM, which are looked up on both strands.
+    The `Pipeline` is then only run on the windows around the seeds,
+    large enough to contain any hit overlapping a seed.
+
+    Attributes:
+        k (`int`): The length of the indexed k-mers.
+        alphabet (`~pyhmmer.easel.Alphabet`): The alphabet of the
+            indexed sequences.
+        path (`str`): The path to the index file.
+
+    Example:
+        Index sequences, and search only the candidate windows of a CM::
+
+            >>> with CMFile("tests/data/cms/RF00107.cm") as cm_file:
+            ...     cm = cm_file.read()
+            >>> with tempfile.TemporaryDirectory() as folder:
+            ...     path = os.path.join(folder, "pANT_R100.idx")
+            ...     index = SeedIndex.create(path, sequences)
+            ...     pipeline = Pipeline(cm.alphabet, Z=sequences.total_length())
+            ...     hits = pipeline.search_indexed(cm, sequences, index)
+            >>> len(hits.included)
+            2
+
+    Caution:
+        Hits without any seed are not found, so an indexed search is less
+        sensitive than a complete scan of the targets, in particular for
+        short or divergent hits. Lowering the score threshold of the
+        seeds, or creating the index with a lower *k*, recovers more hits
+        at the cost of searching larger windows.
+
+    Note:
+        Index files use the byte order of the machine they were created
+        on, and cannot be opened on machines with a different byte order.
+
+    """
+
+    cdef          object          _mmap
+    cdef          Py_buffer       _buffer
+    cdef const    uint64_t*       _starts
+    cdef const    uint64_t*       _buckets
+    cdef const    uint64_t*       _seeds
+    cdef          uint64_t        _n_sequences
+    cdef          uint64_t        _n_residues
+    cdef          uint64_t        _n_seeds
+    cdef          int             _prefix
+    cdef readonly int             k
+    cdef readonly Alphabet        alphabet
+    cdef readonly str             path
+
+    # --- Magic methods ------------------------------------------------------
+
+    def __cinit__(self):
+        self._mmap = None
+        self._buffer.buf = NULL
+        self._starts = NULL
+        self._buckets = NULL
+        self._seeds = NULL
+        self._n_sequences = 0
+        self._n_residues = 0
+        self._n_seeds = 0
+        self.alphabet = None
+        self.path = None
+
+    def __init__(self, object path):
+        """__init__(self, path)\\n--\\n
+
+        Open a seed index.
+
+        Arguments:
+            path (`str` or `os.PathLike`): The path to an index file
+                created with `SeedIndex.create`.
+
+        Raises:
+            `ValueError`: When the file is not a valid index file.
+
+        """
+        cdef const _SeedIndexHeader* header
+        cdef const char*             buf
+        cdef uint64_t                length
+        cdef uint64_t                n_buckets
+        cdef uint64_t                i
+        cdef bint                    valid     = True
+
+        self.path = os.fsdecode(path)
+        with open(self.path, "rb") as fh:
+            if os.fstat(fh.fileno()).st_size < sizeof(_SeedIndexHeader):
+                raise ValueError(f"not a seed index: {self.path!r}")
+            self._mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        PyObject_GetBuffer(self._mmap, &self._buffer, PyBUF_SIMPLE)
+        buf = <const char*> self._buffer.buf
+        length = self._buffer.len
+
+        # check the header
+        header = <const _SeedIndexHeader*> buf
+        if memcmp(header.magic, <const char*> _SEEDINDEX_MAGIC, sizeof(header.magic)) != 0:
+            raise ValueError(f"not a seed index: {self.path!r}")
+        if header.byteorder != _DATABASE_BYTEORDER:
+            raise ValueError("seed index was created on a machine with a different byte order")
+        if header.version != _SEEDINDEX_VERSION:
+            raise ValueError(f"unsupported seed index version: {header.version!r}")
+        if not 4 <= header.k <= 16 or not 1 <= header.prefix <= header.k:
+            raise ValueError(f"corrupted seed index: {self.path!r}")
+        self.alphabet = Alphabet.from_type(header.alphabet)
+        self.k = header.k
+        self._prefix = header.prefix
+
+        # check the tables fit in the file
+        n_buckets = (<uint64_t> 1) << (2 * self._prefix)
+        if (
+               header.starts > length
+            or header.n_sequences >= (length - header.starts) // sizeof(uint64_t)
+            or header.buckets > length
+            or n_buckets >= (length - header.buckets) // sizeof(uint64_t)
+            or header.seeds > length
+            or header.n_seeds > (length - header.seeds) // sizeof(uint64_t)
+        ):
+            raise ValueError(f"truncated seed index: {self.path!r}")
+        self._starts = <const uint64_t*> &buf[header.starts]
+        self._buckets = <const uint64_t*> &buf[header.buckets]
+        self._seeds = <const uint64_t*> &buf[header.seeds]
+
+        # check the tables are consistent, so that lookups stay in bounds
+        with nogil:
+            for i in range(header.n_sequences):
+                if self._starts[i] > self._starts[i+1]:
+                    valid = False
+            for i in range(n_buckets):
+                if self._buckets[i] > self._buckets[i+1]:
+                    valid = False
+        if (
+               not valid
+            or self._starts[0] != 0
+            or self._starts[header.n_sequences] != header.n_residues
+            or self._buckets[0] != 0
+            or self._buckets[n_buckets] != header.n_seeds
+        ):
+            raise ValueError(f"corrupted seed index: {self.path!r}")
+
+        self._n_sequences = header.n_sequences
+        self._n_residues = header.n_residues
+        self._n_seeds = header.n_seeds
+
+    def __dealloc__(self):
+        if self._buffer.buf != NULL:
+            PyBuffer_Release(&self._buffer)
+            self._buffer.buf = NULL
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __repr__(self):
+        cdef str ty = type(self).__name__
+        return f"{ty}({self.path!r})"
+
+    def __reduce__(self):
+        return SeedIndex, (self.path,)
+
+    def __len__(self):
+        return self._n_sequences
+
+    # --- Methods ------------------------------------------------------------
+
+    @classmethod
+    def create(cls, object path, object sequences, int k = 12):
+        """Index the k-mers of sequences in a new index file, and open it.
+
+        Arguments:
+            path (`str` or `os.PathLike`): The path of the index file
+                to create. An existing file will be overwritten.
+            sequences (`~pyhmmer.easel.DigitalSequenceBlock` or `~pyinfernal.cm.SequenceDatabase`):
+                The target sequences to index.
+            k (`int`): The length of the indexed k-mers, between 4 and 16.
+                Longer k-mers give smaller candidate windows, but require
+                hits to share a longer seed with the query.
+
+        Returns:
+            `~pyinfernal.cm.SeedIndex`: The created index.
+
+        Raises:
+            `ValueError`: When the sequences are not in a nucleotide
+                alphabet, or are too long to be indexed with the given
+                ``k``.
+
+        Hint:
+            The index uses 8 bytes per indexed residue. It only refers
+            to the sequences by their position in ``sequences``, which
+            must be given in the same order to `Pipeline.search_indexed`.
+
+        """
+        cdef _SeedIndexHeader header
+        cdef ESL_SQ**         refs
+        cdef size_t           n
+        cdef size_t           i
+        cdef uint64_t         b
+        cdef Alphabet         alphabet
+        cdef uint64_t         n_buckets
+        cdef uint64_t*        starts    = NULL
+        cdef uint64_t*        buckets   = NULL
+        cdef uint64_t*        cursors   = NULL
+        cdef uint64_t*        seeds     = NULL
+        cdef int              prefix    = min(k, _SEEDINDEX_PREFIX)
+
+        if isinstance(sequences, SequenceDatabase):
+            refs = (<SequenceDatabase> sequences)._refs
+            n = (<SequenceDatabase> sequences)._length
+        elif isinstance(sequences, DigitalSequenceBlock):
+            refs = (<DigitalSequenceBlock> sequences)._refs
+            n = (<DigitalSequenceBlock> sequences)._length
+        else:
+            ty = type(sequences).__name__
+            raise TypeError(f"expected DigitalSequenceBlock or SequenceDatabase, found {ty}")
+        alphabet = sequences.alphabet
+        if not alphabet.is_nucleotide():
+            raise ValueError(f"expected a nucleotide alphabet, found {alphabet!r}")
+        if not 4 <= k <= 16:
+            raise InvalidParameter("k", k, hint="integer between 4 and 16")
+
+        memset(&header, 0, sizeof(_SeedIndexHeader))
+        memcpy(header.magic, <const char*> _SEEDINDEX_MAGIC, sizeof(header.magic))
+        header.byteorder = _DATABASE_BYTEORDER
+        header.version = _SEEDINDEX_VERSION
+        header.alphabet = alphabet._abc.type
+        header.k = k
+        header.prefix = prefix
+        header.n_sequences = n
+        n_buckets = (<uint64_t> 1) << (2 * prefix)
+
+        try:
+            # compute the cumulated lengths of the sequences
+            starts = <uint64_t*> malloc((n + 1) * sizeof(uint64_t))
+            if starts == NULL:
+                raise AllocationError("uint64_t", sizeof(uint64_t), n + 1)
+            starts[0] = 0
+            for i in range(n):
+                starts[i+1] = starts[i] + refs[i].n
+            header.n_residues = starts[n]
+            if header.n_residues >> (64 - 2*k) != 0:
+                raise ValueError(f"too many residues to index with k={k}: {header.n_residues}")
+            # count the seeds of each bucket
+            buckets = <uint64_t*> calloc(n_buckets + 1, sizeof(uint64_t))
+            cursors = <uint64_t*> malloc(n_buckets * sizeof(uint64_t))
+            if buckets == NULL or cursors == NULL:
+                raise AllocationError("uint64_t", sizeof(uint64_t), n_buckets + 1)
+            with nogil:
+                _seedindex_fill(refs, n, k, prefix, &buckets[1], NULL)
+                for b in range(n_buckets):
+                    buckets[b+1] += buckets[b]
+            header.n_seeds = buckets[n_buckets]
+            # store the seeds in their buckets, and sort each bucket
+            seeds = <uint64_t*> malloc(max(1, header.n_seeds) * sizeof(uint64_t))
+            if seeds == NULL:
+                raise AllocationError("uint64_t", sizeof(uint64_t), header.n_seeds)
+            with nogil:
+                memcpy(cursors, buckets, n_buckets * sizeof(uint64_t))
+                _seedindex_fill(refs, n, k, prefix, cursors, seeds)
+                for b in range(n_buckets):
+                    qsort(&seeds[buckets[b]], buckets[b+1] - buckets[b], sizeof(uint64_t), _compare_uint64)
+            # write the header and the tables
+            header.starts = sizeof(_SeedIndexHeader)
+            header.buckets = header.starts + (n + 1) * sizeof(uint64_t)
+            header.seeds = header.buckets + (n_buckets + 1) * sizeof(uint64_t)
+            with open(path, "wb") as fh:
+                fh.write(PyBytes_FromStringAndSize(<const char*> &header, sizeof(_SeedIndexHeader)))
+                _write_uint64(fh, starts, n + 1)
+                _write_uint64(fh, buckets, n_buckets + 1)
+                _write_uint64(fh, seeds, header.n_seeds)
+        finally:
+            free(starts)
+            free(buckets)
+            free(cursors)
+            free(seeds)
+
+        return cls(path)
+
+    cpdef uint64_t total_length(self):
+        """Get the total number of residues in the indexed sequences.
+        """
+        return self._n_residues
+
+    cpdef list lengths(self):
+        """Get the lengths of the indexed sequences.
+
+        Returns:
+            `list` of `int`: The number of residues of each sequence.
+
+        """
+        cdef uint64_t i
+        return [self._starts[i+1] - self._starts[i] for i in range(self._n_sequences)]
+
+    cpdef list regions(self, CM query, double threshold = 14.0):
+        """Get the candidate windows of a CM in the indexed sequences.
+
+        Arguments:
+            query (`~pyinfernal.cm.CM`): The covariance model to find
+                candidate windows for.
+            threshold (`float`): The minimum score of a seed, in bits,
+                against the filter HMM of the CM.
+
+        Returns:
+            `list` of `tuple`: The candidate windows, as ``(sequence,
+            start, end, strand)`` tuples that can be given to
+            `Pipeline.search_regions`, where ``sequence`` is the index
+            of a sequence. Overlapping windows on the same strand are
+            merged.
+
+        Raises:
+            `~pyhmmer.errors.AlphabetMismatch`: When the CM and the
+                index are not in the same alphabet.
+            `ValueError`: When the CM has no filter HMM.
+
+        """
+        cdef _SeedArray     words
+        cdef _SeedArray     positions
+        cdef size_t         u
+        cdef uint64_t       code
+        cdef uint64_t       rc
+        cdef int            j
+        cdef int            strand
+        cdef uint64_t       s
+        cdef int64_t        pos
+        cdef int64_t        length
+        cdef int64_t        start
+        cdef int64_t        end
+        cdef int64_t        region_start
+        cdef int64_t        region_end
+        cdef int64_t        region_seq
+        cdef const P7_HMM*  hmm        = query._cm.fp7
+        cdef int            W          = query._cm.W
+        cdef int            k          = self.k
+        cdef const ESL_DSQ* complement = self.alphabet._abc.complement
+        cdef list           regions    = []
+
+        if not self.alphabet._eq(query.alphabet):
+            raise AlphabetMismatch(self.alphabet, query.alphabet)
+        if hmm == NULL:
+            raise ValueError(f"CM {query.name!r} has no filter HMM")
+
+        memset(&words, 0, sizeof(_SeedArray))
+        memset(&positions, 0, sizeof(_SeedArray))
+        try:
+            with nogil:
+                _seedwords_collect(&words, hmm, query._cm.null, k, threshold)
+            for strand in range(2):
+                # find the positions of the seeds
+                positions.n = 0
+                with nogil:
+                    for u in range(words.n):
+                        code = words.values[u]
+                        if strand == 1:
+                            # look for the reverse complement of the word
+                            rc = 0
+                            for j in range(k):
+                                rc = (rc << 2) | complement[code & 3]
+                                code >>= 2
+                            code = rc
+                        _seedindex_lookup(&positions, self._buckets, self._seeds, k, self._prefix, code)
+                    qsort(positions.values, positions.n, sizeof(uint64_t), _compare_uint64)
+                # merge the windows around the seeds, which contain any
+                # hit of at most W residues overlapping the seed
+                s = 0
+                region_seq = -1
+                region_start = region_end = 0
+                for u in range(positions.n):
+                    while self._starts[s+1] <= positions.values[u]:
+                        s += 1
+                    pos = positions.values[u] - self._starts[s]
+                    length = self._starts[s+1] - self._starts[s]
+                    start = max(0, pos + k - W)
+                    end = min(length, pos + W)
+                    if region_seq == <int64_t> s and start <= region_end:
+                        region_end = max(region_end, end)
+                    else:
+                        if region_seq >= 0:
+                            regions.append((region_seq, region_start, region_end, "+-"[strand]))
+                        region_seq = s
+                        region_start = start
+                        region_end = end
+                if region_seq >= 0:
+                    regions.append((region_seq, region_start, region_end, "+-"[strand]))
+        finally:
+            free(words.values)
+            free(positions.values)
+
+        regions.sort()
+        return regions
+
+
+cdef int _write_uint64(object fh, const uint64_t* data, uint64_t n) except -1:
+    # write an array in chunks, to avoid copying it completely in memory
+    cdef uint64_t i
+    cdef uint64_t chunk = 1 << 20
+    for i in range(0, n, chunk):
+        fh.write(PyBytes_FromStringAndSize(<const char*> &data[i], min(chunk, n - i) * sizeof(uint64_t)))
+    return 0
+
+
+cdef list _scan_headers(const char* fname, off_t start, str path, dict options):
+    cdef CMHeader header
+    cdef bytes    line
+    cdef bytes    tag
+    cdef bytes    value
+    cdef ssize_t  offset
+    cdef ssize_t  body
+    cdef ssize_t  end
+    cdef list     headers = []
+
+    with open(fname, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mem:
+        offset = 0 if mem[:11] == b"INFERNAL1/a" else _next_record(mem, 0)
+        while offset != -1:
+            # the header ends with the line that starts the model section,
+            # and the model section ends with the line closing the record
+            body = mem.find(b"\nCM\n", offset)
+            end = mem.find(b"\n//", body)
+            if body == -1 or end == -1:
+                raise ValueError(f"Invalid format in file: truncated CM record at offset {offset}")
+            if offset >= start:
+                header = CMHeader.__new__(CMHeader)
+                header.nseq = None
+                header.path = path
+                header.offset = offset
+                header._options = options
+                for line in mem[offset:body].splitlines()[1:]:
+                    tag, _, value = line.partition(b" ")
+                    value = value.strip()
+                    if tag == b"NAME":
+                        header.name = value.decode("utf-8")
+                    elif tag == b"ACC":
+                        header.accession = value.decode("utf-8")
+                    elif tag == b"DESC":
+                        header.description = value.decode("utf-8")
+                    elif tag == b"STATES":
+                        header.M = int(value)
+                    elif tag == b"NODES":
+                        header.N = int(value)
+                    elif tag == b"CLEN":
+                        header.clen = int(value)
+                    elif tag == b"W":
+                        header.W = int(value)
+                    elif tag == b"NSEQ":
+                        header.nseq = int(value)
+                header.nbp = mem[body:end].count(b"[ MATP")
+                headers.append(header)
+            offset = _next_record(mem, end)
+
+    return headers
+
+
+cdef ssize_t _next_record(object mem, ssize_t offset):
+    offset = mem.find(b"\nINFERNAL1/a", offset)
+    return offset if offset == -1 else offset + 1
+
+
+def _read_offsets(str path, list offsets, dict options):
+    cdef off_t  offset
+    cdef CMFile cm_file
+    with CMFile(path, **options) as cm_file:
+        for offset in offsets:
+            yield cm_file._read_at(offset)
+
+
+def _prefetch_put(object q, object item, object stop):
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _prefetch_worker(object source, object q, object stop):
+    try:
+        for cm in source:
+            if not _prefetch_put(q, (cm, None), stop):
+                return
+        _prefetch_put(q, (None, None), stop)
+    except BaseException as err:
+        _prefetch_put(q, (None, err), stop)
+
+
+def _prefetch(list sources, int size):
+    queues = [
+        queue.Queue(maxsize=max(1, size // len(sources)))
+        for _ in sources
+    ]
+    stop = threading.Event()
+    workers = [
+        threading.Thread(target=_prefetch_worker, args=(source, q, stop), daemon=True)
+        for source, q in zip(sources, queues)
+    ]
+    for thread in workers:
+        thread.start()
+
+    # NOTE(@althonos): Records were distributed to the sources in turn,
+    #                  so the first source to run out marks the end of the
+    #                  file, and the following ones have no more records.
+    try:
+        i = 0
+        while True:
+            cm, err = queues[i].get()
+            if err is not None:
+                raise err
+            elif cm is None:
+                break
+            yield cm
+            i = (i + 1) % len(queues)
+    finally:
+        stop.set()
+        for thread in workers:
+            thread.join()
+
+
+cdef class _CalibrationWorker:
+    """A worker searching random sequences to calibrate a CM.
+    """
+
+    cdef CM_t*               cm
+    cdef ESL_DSQ**           dsqs
+    cdef int                 N
+    cdef int                 L
+    cdef int                 start
+    cdef int                 step
+    cdef bint                inside
+    cdef float*              scores
+    cdef int64_t             nscores
+    cdef int                 status
+    cdef char[eslERRBUFSIZE] errbuf
+
+    def __cinit__(self):
+        self.cm = NULL
+        self.dsqs = NULL
+        self.scores = NULL
+        self.nscores = 0
+        self.status = libeasel.eslOK
+        self.errbuf[0] = 0
+
+    def __dealloc__(self):
+        if self.cm != NULL:
+            libinfernal.cm.FreeCM(self.cm)
+        free(self.scores)
+
+    cdef void configure(self, CM_t* cm) except *:
+        cdef int   status
+        cdef CM_t* copy   = NULL
+
+        with nogil:
+            status = libinfernal.cm.cm_Clone(cm, self.errbuf, &copy)
+        if status != libeasel.eslOK:
+            raise EaselError(status, self.errbuf.decode("utf-8", "ignore"))
+        if self.cm != NULL:
+            libinfernal.cm.FreeCM(self.cm)
+        self.cm = copy
+
+    def run(self):
+        cdef int         i
+        cdef uint64_t    h
+        cdef float*      scores
+        cdef CM_TOPHITS* th
+        cdef int         status = libeasel.eslOK
+        cdef int         qdbidx = libinfernal.cm_mx.SMX_NOQDB
+        cdef bint        null3  = self.cm.search_opts & libinfernal.cm.CM_SEARCH_NULL3
+
+        if self.cm.search_opts & libinfernal.cm.CM_SEARCH_QDB:
+            qdbidx = libinfernal.cm_mx.SMX_QDB2_LOOSE
+        if self.inside:
+            self.cm.search_opts |= libinfernal.cm.CM_SEARCH_INSIDE
+        else:
+            self.cm.search_opts &= ~libinfernal.cm.CM_SEARCH_INSIDE
+
+        with nogil:
+            self.nscores = 0
+            i = self.start
+            while i < self.N:
+                th = libinfernal.cm_tophits.cm_tophits_Create()
+                if th == NULL:
+                    status = libeasel.eslEMEM
+                    break
+                # NOTE(@althonos): Overlapping hits are already removed by
+                #                  the scanners, so all the scores reported
+                #                  in the hit list can be used as is.
+                if self.inside:
+                    status = libinfernal.cm_dpsearch.FastIInsideScan(
+                        self.cm, self.errbuf, self.cm.smx, qdbidx, self.dsqs[i], 1, self.L,
+                        -libeasel.eslINFINITY, th, null3, 0.0, NULL, NULL, NULL, NULL
+                    )
+                else:
+                    status = libinfernal.cm_dpsearch.FastCYKScan(
+                        self.cm, self.errbuf, self.cm.smx, qdbidx, self.dsqs[i], 1, self.L,
+                        -libeasel.eslINFINITY, th, null3, 0.0, NULL, NULL, NULL, NULL
+                    )
+                if status == libeasel.eslOK and th.N > 0:
+                    scores = <float*> realloc(self.scores, (self.nscores + th.N) * sizeof(float))
+                    if scores == NULL:
+                        status = libeasel.eslEMEM
+                    else:
+                        self.scores = scores
+                        for h in range(th.N):
+                            self.scores[self.nscores + h] = th.unsrt[h].score
+                        self.nscores += th.N
+                libinfernal.cm_tophits.cm_tophits_Destroy(th)
+                if status != libeasel.eslOK:
+                    break
+                i += self.step
+            self.status = status
+
+
+cdef int _calibration_configure(
+    const CM_t* cm,
+    CM_t** ret_cm,
+    bint local,
+    double beta,
+    bint null3,
+) except 1:
+    # configure a copy of the CM for calibration (see `initialize_cm`
+    # in `cmcalibrate.c`)
+    cdef int                 status
+    cdef char[eslERRBUFSIZE] errbuf
+    cdef CM_t*               copy   = NULL
+
+    with nogil:
+        status = libinfernal.cm.cm_Clone(<CM_t*> cm, errbuf, &copy)
+    if status != libeasel.eslOK:
+        raise EaselError(status, errbuf.decode("utf-8", "ignore"))
+
+    copy.search_opts |= libinfernal.cm.CM_SEARCH_QDB | libinfernal.cm.CM_SEARCH_NOALIGN
+    if libinfernal.cm_qdband.CheckCMQDBInfo(copy.qdbinfo, 0.0, False, beta, True) != libeasel.eslOK:
+        copy.config_opts |= libinfernal.cm.CM_CONFIG_QDB
+        copy.qdbinfo.beta1 = beta
+        copy.qdbinfo.beta2 = beta
+    if null3:
+        copy.search_opts |= libinfernal.cm.CM_SEARCH_NULL3
+    if local:
+        copy.config_opts |= libinfernal.cm.CM_CONFIG_LOCAL
+        copy.config_opts |= libinfernal.cm.CM_CONFIG_HMMLOCAL
+        copy.config_opts |= libinfernal.cm.CM_CONFIG_HMMEL
+    copy.config_opts |= libinfernal.cm.CM_CONFIG_SCANMX
+
+    with nogil:
+        status = libinfernal.cm_modelconfig.cm_Configure(copy, errbuf, -1)
+    if status != libeasel.eslOK or copy.smx == NULL:
+        libinfernal.cm.FreeCM(copy)
+        raise EaselError(status, errbuf.decode("utf-8", "ignore"))
+
+    ret_cm[0] = copy
+    return 0
+
+
+cdef int _compare_doubles(const void* a, const void* b) noexcept nogil:
+    cdef double x = (<const double*> a)[0]
+    cdef double y = (<const double*> b)[0]
+    return (x > y) - (x < y)
+
+
+cdef int _calibration_fit(
+    list workers,
+    int tailn,
+    int64_t dbsize,
+    ExpInfo_t* exp,
+) except 1:
+    # fit an exponential tail to the top scores (see `fit_histogram`
+    # in `cmcalibrate.c`, `esl_histogram_GetTailByMass` and
+    # `esl_exp_FitComplete` in Easel)
+    cdef int64_t            i
+    cdef int64_t            n
+    cdef int64_t            nscores = 0
+    cdef double*            scores  = NULL
+    cdef double             tailp
+    cdef double             mu
+    cdef double             mean    = 0.0
+    cdef double             lambda_
+    cdef _CalibrationWorker worker
+
+    for worker in workers:
+        nscores += worker.nscores
+
+    tailp = tailn * (dbsize / 1e6) / nscores if nscores > 0 else 2.0
+    if tailp > 1.0:
+        raise ValueError(f"too few hits to fit an exponential tail ({nscores} hits in {dbsize / 1e6:.3f} Mb), increase L")
+
+    scores = <double*> malloc(nscores * sizeof(double))
+    if scores == NULL:
+        raise AllocationError("double", sizeof(double), nscores)
+
+    try:
+        n = 0
+        for worker in workers:
+            for i in range(worker.nscores):
+                scores[n + i] = worker.scores[i]
+            n += worker.nscores
+        with nogil:
+            qsort(scores, nscores, sizeof(double), _compare_doubles)
+
+        # fit to the highest scores, rounding down the tail mass
+        n = <int64_t> (<double> nscores * tailp)
+        if n <= 1:
+            raise ValueError(f"too few hits in the tail of the histogram ({n} hits), increase L")
+        mu = scores[nscores - n]
+        for i in range(nscores - n, nscores):
+            mean += scores[i] - mu
+        lambda_ = 1.0 / (mean / n)
+        if isnan(lambda_) or isinf(lambda_):
+            raise ValueError(f"failed to fit an exponential tail (lambda={lambda_}), increase L")
+
+        libinfernal.stats.SetExpInfo(exp, lambda_, mu, dbsize, nscores, tailp)
+    finally:
+        free(scores)
+
+    return 0
+
+
+cdef CM_ALIDISPLAY* _alidisplay_clone_for(
+    const CM_ALIDISPLAY* ad,
+    const ESL_SQ* sq,
+    int64_t delta,
+) noexcept nogil:
+    # NOTE(@althonos): `cm_alidisplay_Clone` keeps the serialized layout of
+    #                  the source, so the target metadata cannot be replaced
+    #                  in the copy; instead we create a deserialized copy
+    #                  where every string is owned independently.
+    cdef CM_ALIDISPLAY* ad2 = <CM_ALIDISPLAY*> malloc(sizeof(CM_ALIDISPLAY))
+    if ad2 == NULL:
+        return NULL
+
+    memcpy(ad2, ad, sizeof(CM_ALIDISPLAY))
+    ad2.mem = NULL
+    ad2.memsize = 0
+    ad2.rfline = ad2.ncline = ad2.csline = ad2.model = ad2.mline = ad2.aseq = ad2.ppline = NULL
+    ad2.aseq_el = ad2.rfline_el = ad2.ppline_el = NULL
+    ad2.cmname = ad2.cmacc = ad2.cmdesc = NULL
+    ad2.sqname = ad2.sqacc = ad2.sqdesc = NULL
+
+    if (
+           libeasel.esl_strdup(ad.rfline,    -1, &ad2.rfline)    != libeasel.eslOK
+        or libeasel.esl_strdup(ad.ncline,    -1, &ad2.ncline)    != libeasel.eslOK
+        or libeasel.esl_strdup(ad.csline,    -1, &ad2.csline)    != libeasel.eslOK
+        or libeasel.esl_strdup(ad.model,     -1, &ad2.model)     != libeasel.eslOK
+        or libeasel.esl_strdup(ad.mline,     -1, &ad2.mline)     != libeasel.eslOK
+        or libeasel.esl_strdup(ad.aseq,      -1, &ad2.aseq)      != libeasel.eslOK
+        or libeasel.esl_strdup(ad.ppline,    -1, &ad2.ppline)    != libeasel.eslOK
+        or libeasel.esl_strdup(ad.aseq_el,   -1, &ad2.aseq_el)   != libeasel.eslOK
+        or libeasel.esl_strdup(ad.rfline_el, -1, &ad2.rfline_el) != libeasel.eslOK
+        or libeasel.esl_strdup(ad.ppline_el, -1, &ad2.ppline_el) != libeasel.eslOK
+        or libeasel.esl_strdup(ad.cmname,    -1, &ad2.cmname)    != libeasel.eslOK
+        or libeasel.esl_strdup(ad.cmacc,     -1, &ad2.cmacc)     != libeasel.eslOK
+        or libeasel.esl_strdup(ad.cmdesc,    -1, &ad2.cmdesc)    != libeasel.eslOK
+        or libeasel.esl_strdup(sq.name,      -1, &ad2.sqname)    != libeasel.eslOK
+        or libeasel.esl_strdup(sq.acc,       -1, &ad2.sqacc)     != libeasel.eslOK
+        or libeasel.esl_strdup(sq.desc,      -1, &ad2.sqdesc)    != libeasel.eslOK
+    ):
+        libinfernal.cm_alidisplay.cm_alidisplay_Destroy(ad2)
+        return NULL
+
+    ad2.sqfrom += delta
+    ad2.sqto += delta
+    return ad2
+
+
+cdef object _cstr_or_none(const char* s):
+    return None if s == NULL else PyBytes_FromStringAndSize(s, strlen(s))
+
+
+cdef int _strdup_or_null(char** dst, object s) except 1:
+    cdef const char* data
+    if s is None:
+        dst[0] = NULL
+    else:
+        data = s
+        dst[0] = strdup(data)
+        if dst[0] == NULL:
+            raise AllocationError("char", sizeof(char), len(s) + 1)
+    return 0
+
+
+cdef dict _alidisplay_getstate(const CM_ALIDISPLAY* ad):
+    return {
+        "rfline": _cstr_or_none(ad.rfline),
+        "ncline": _cstr_or_none(ad.ncline),
+        "csline": _cstr_or_none(ad.csline),
+        "model": _cstr_or_none(ad.model),
+        "mline": _cstr_or_none(ad.mline),
+        "aseq": _cstr_or_none(ad.aseq),
+        "ppline": _cstr_or_none(ad.ppline),
+        "N": ad.N,
+        "aseq_el": _cstr_or_none(ad.aseq_el),
+        "rfline_el": _cstr_or_none(ad.rfline_el),
+        "ppline_el": _cstr_or_none(ad.ppline_el),
+        "N_el": ad.N_el,
+        "cmname": _cstr_or_none(ad.cmname),
+        "cmacc": _cstr_or_none(ad.cmacc),
+        "cmdesc": _cstr_or_none(ad.cmdesc),
+        "cfrom_emit": ad.cfrom_emit,
+        "cto_emit": ad.cto_emit,
+        "cfrom_span": ad.cfrom_span,
+        "cto_span": ad.cto_span,
+        "clen": ad.clen,
+        "sqname": _cstr_or_none(ad.sqname),
+        "sqacc": _cstr_or_none(ad.sqacc),
+        "sqdesc": _cstr_or_none(ad.sqdesc),
+        "sqfrom": ad.sqfrom,
+        "sqto": ad.sqto,
+        "sc": ad.sc,
+        "avgpp": ad.avgpp,
+        "gc": ad.gc,
+        "tau": ad.tau,
+        "matrix_Mb": ad.matrix_Mb,
+        "elapsed_secs": ad.elapsed_secs,
+        "hmmonly": ad.hmmonly,
+    }
+
+
+cdef CM_ALIDISPLAY* _alidisplay_from_state(dict state) except NULL:
+    # NOTE(@althonos): like in `_alidisplay_clone_for`, we create a
+    #                  deserialized alidisplay where every string is
+    #                  owned independently, which `cm_alidisplay_Clone`
+    #                  and `cm_alidisplay_Destroy` both support.
+    cdef CM_ALIDISPLAY* ad = <CM_ALIDISPLAY*> calloc(1, sizeof(CM_ALIDISPLAY))
+    if ad == NULL:
+        raise AllocationError("CM_ALIDISPLAY", sizeof(CM_ALIDISPLAY))
+    try:
+        _strdup_or_null(&ad.rfline, state["rfline"])
+        _strdup_or_null(&ad.ncline, state["ncline"])
+        _strdup_or_null(&ad.csline, state["csline"])
+        _strdup_or_null(&ad.model, state["model"])
+        _strdup_or_null(&ad.mline, state["mline"])
+        _strdup_or_null(&ad.aseq, state["aseq"])
+        _strdup_or_null(&ad.ppline, state["ppline"])
+        _strdup_or_null(&ad.aseq_el, state["aseq_el"])
+        _strdup_or_null(&ad.rfline_el, state["rfline_el"])
+        _strdup_or_null(&ad.ppline_el, state["ppline_el"])
+        _strdup_or_null(&ad.cmname, state["cmname"])
+        _strdup_or_null(&ad.cmacc, state["cmacc"])
+        _strdup_or_null(&ad.cmdesc, state["cmdesc"])
+        _strdup_or_null(&ad.sqname, state["sqname"])
+        _strdup_or_null(&ad.sqacc, state["sqacc"])
+        _strdup_or_null(&ad.sqdesc, state["sqdesc"])
+    except:
+        libinfernal.cm_alidisplay.cm_alidisplay_Destroy(ad)
+        raise
+    ad.N = state["N"]
+    ad.N_el = state["N_el"]
+    ad.cfrom_emit = state["cfrom_emit"]
+    ad.cto_emit = state["cto_emit"]
+    ad.cfrom_span = state["cfrom_span"]
+    ad.cto_span = state["cto_span"]
+    ad.clen = state["clen"]
+    ad.sqfrom = state["sqfrom"]
+    ad.sqto = state["sqto"]
+    ad.sc = state["sc"]
+    ad.avgpp = state["avgpp"]
+    ad.gc = state["gc"]
+    ad.tau = state["tau"]
+    ad.matrix_Mb = state["matrix_Mb"]
+    ad.elapsed_secs = state["elapsed_secs"]
+    ad.hmmonly = state["hmmonly"]
+    ad.memsize = 0
+    ad.mem = NULL
+    return ad
+
+
+cdef dict _hit_getstate(const CM_HIT* hit):
+    return {
+        "name": _cstr_or_none(hit.name),
+        "acc": _cstr_or_none(hit.acc),
+        "desc": _cstr_or_none(hit.desc),
+        "cm_idx": hit.cm_idx,
+        "clan_idx": hit.clan_idx,
+        "seq_idx": hit.seq_idx,
+        "pass_idx": hit.pass_idx,
+        "hit_idx": hit.hit_idx,
+        "srcL": hit.srcL,
+        "start": hit.start,
+        "stop": hit.stop,
+        "in_rc": hit.in_rc,
+        "root": hit.root,
+        "mode": hit.mode,
+        "score": hit.score,
+        "bias": hit.bias,
+        "pvalue": hit.pvalue,
+        "evalue": hit.evalue,
+        "has_evalue": hit.has_evalue,
+        "hmmonly": hit.hmmonly,
+        "glocal": hit.glocal,
+        "ad": None if hit.ad == NULL else _alidisplay_getstate(hit.ad),
+        "flags": hit.flags,
+        "any_oidx": hit.any_oidx,
+        "win_oidx": hit.win_oidx,
+        "any_bitE": hit.any_bitE,
+        "win_bitE": hit.win_bitE,
+    }
+
+
+cdef int _hit_setstate(CM_HIT* hit, dict state) except 1:
+    _strdup_or_null(&hit.name, state["name"])
+    _strdup_or_null(&hit.acc, state["acc"])
+    _strdup_or_null(&hit.desc, state["desc"])
+    hit.cm_idx = state["cm_idx"]
+    hit.clan_idx = state["clan_idx"]
+    hit.seq_idx = state["seq_idx"]
+    hit.pass_idx = state["pass_idx"]
+    hit.hit_idx = state["hit_idx"]
+    hit.srcL = state["srcL"]
+    hit.start = state["start"]
+    hit.stop = state["stop"]
+    hit.in_rc = state["in_rc"]
+    hit.root = state["root"]
+    hit.mode = state["mode"]
+    hit.score = state["score"]
+    hit.bias = state["bias"]
+    hit.pvalue = state["pvalue"]
+    hit.evalue = state["evalue"]
+    hit.has_evalue = state["has_evalue"]
+    hit.hmmonly = state["hmmonly"]
+    hit.glocal = state["glocal"]
+    hit.flags = state["flags"]
+    hit.any_oidx = state["any_oidx"]
+    hit.win_oidx = state["win_oidx"]
+    hit.any_bitE = state["any_bitE"]
+    hit.win_bitE = state["win_bitE"]
+    if state["ad"] is not None:
+        hit.ad = _alidisplay_from_state(state["ad"])
+    return 0
+
+
+cdef ESL_SQ* _subsequence(
+    const ESL_SQ* sq,
+    int64_t start,
+    int64_t end,
+) noexcept nogil:
+    # NOTE(@althonos): The subsequence is configured like a window of the
+    #                  source sequence (as created by `esl_sqio_ReadWindow`),
+    #                  so that the pipeline reports hit coordinates in the
+    #                  source sequence, and only allows truncated hits at
+    #                  the actual sequence termini.
+    cdef int64_t n   = end - start
+    cdef ESL_SQ* sub = libeasel.sq.esl_sq_CreateDigital(sq.abc)
+    if sub == NULL:
+        return NULL
+
+    if (
+           libeasel.sq.esl_sq_GrowTo(sub, n)             != libeasel.eslOK
+        or libeasel.sq.esl_sq_SetName(sub, sq.name)      != libeasel.eslOK
+        or libeasel.sq.esl_sq_SetAccession(sub, sq.acc)  != libeasel.eslOK
+        or libeasel.sq.esl_sq_SetDesc(sub, sq.desc)      != libeasel.eslOK
+    ):
+        libeasel.sq.esl_sq_Destroy(sub)
+        return NULL
+
+    sub.dsq[0] = sub.dsq[n+1] = libeasel.eslDSQ_SENTINEL
+    memcpy(&sub.dsq[1], &sq.dsq[start+1], n * sizeof(ESL_DSQ))
+    sub.n = n
+    sub.start = sq.start + start
+    sub.end = sub.start + n - 1
+    sub.C = 0
+    sub.W = n
+    sub.L = sq.L
+    return sub
+
+
+cdef int _hit_sorter_for_pruning(const void* vh1, const void* vh2) noexcept nogil:
+    cdef const CM_HIT* h1 = (<const CM_HIT**> vh1)[0]
+    cdef const CM_HIT* h2 = (<const CM_HIT**> vh2)[0]
+    cdef bint          d1 = h1.flags & libinfernal.cm_tophits.CM_HIT_IS_REMOVED_DUPLICATE
+    cdef bint          d2 = h2.flags & libinfernal.cm_tophits.CM_HIT_IS_REMOVED_DUPLICATE
+    # sort duplicates last, then by P-value and score (the P-value is not
+    # computed when the pipeline terminates after F3, so it may be zero
+    # for all hits)
+    if d1 != d2:
+        return 1 if d1 else -1
+    if h1.pvalue != h2.pvalue:
+        return -1 if h1.pvalue < h2.pvalue else 1
+    if h1.score != h2.score:
+        return -1 if h1.score > h2.score else 1
+    # use the position in the original list as tie-breaker for stability
+    return -1 if h1 < h2 else (1 if h1 > h2 else 0)
+
+
+cdef int _prune_hits(CM_TOPHITS* th, int64_t max_hits) except -1 nogil:
+    # NOTE(@althonos): Infernal has no function to remove hits from a
+    #                  `CM_TOPHITS`, so we sort the hit pointers to find the
+    #                  best hits, and compact the storage to only retain them.
+    #                  Hits flagged as duplicates by the overlap removal are
+    #                  removed as well. Returns 1 if any non-duplicate hit
+    #                  was removed, 0 otherwise.
+    cdef uint64_t i
+    cdef uint64_t j
+    cdef uint64_t n
+    cdef bint     truncated = False
+    cdef char*    keep      = NULL
+
+    if th.N == 0:
+        return 0
+
+    keep = <char*> calloc(th.N, sizeof(char))
+    if keep == NULL:
+        raise AllocationError("char", sizeof(char), th.N)
+
+    # sort hits and select the ones to keep
+    for i in range(th.N):
+        th.hit[i] = &th.unsrt[i]
+    qsort(th.hit, th.N, sizeof(CM_HIT*), _hit_sorter_for_pruning)
+    n = 0
+    for i in range(th.N):
+        if th.hit[i].flags & libinfernal.cm_tophits.CM_HIT_IS_REMOVED_DUPLICATE:
+            break
+        if n == <uint64_t> max_hits:
+            truncated = True
+            break
+        keep[th.hit[i] - th.unsrt] = True
+        n += 1
+
+    # compact the hit storage, releasing memory of discarded hits
+    j = 0
+    for i in range(th.N):
+        if keep[i]:
+            if i != j:
+                memcpy(&th.unsrt[j], &th.unsrt[i], sizeof(CM_HIT))
+            th.unsrt[j].hit_idx = j
+            j += 1
+        else:
+            free(th.unsrt[i].name)
+            free(th.unsrt[i].acc)
+            free(th.unsrt[i].desc)
+            libinfernal.cm_alidisplay.cm_alidisplay_Destroy(th.unsrt[i].ad)
+    free(keep)
+
+    # reset the hit pointers, which are not sorted anymore
+    th.N = j
+    for i in range(th.N):
+        th.hit[i] = &th.unsrt[i]
+    th.is_sorted_by_evalue = False
+    th.is_sorted_for_overlap_removal = False
+    th.is_sorted_for_overlap_markup = False
+    th.is_sorted_by_position = False
+
+    return truncated
+
+
+cdef struct _TargetRef:
+    int64_t length
+    int64_t index
+    ESL_SQ* sq
+
+
+cdef int _compare_targets_by_length(const void* a, const void* b) noexcept nogil:
+    cdef const _TargetRef* x = <const _TargetRef*> a
+    cdef const _TargetRef* y = <const _TargetRef*> b
+    if x.length != y.length:
+        return -1 if x.length < y.length else 1
+    if x.index != y.index:
+        return -1 if x.index < y.index else 1
+    return 0
+
+
+cdef int _sort_targets_by_length(
+    ESL_SQ** targets,
+    int64_t* indices,
+    size_t n,
+) except 1 nogil:
+    # NOTE(@althonos): Sort the targets by increasing length (and by
+    #                  original index for targets of the same length),
+    #                  permuting `indices` accordingly so that hits can
+    #                  be mapped back to their original sequence index.
+    cdef size_t      i
+    cdef _TargetRef* refs = <_TargetRef*> malloc(max(1, n) * sizeof(_TargetRef))
+
+    if refs == NULL:
+        raise AllocationError("_TargetRef", sizeof(_TargetRef), n)
+
+    for i in range(n):
+        refs[i].length = targets[i].n
+        refs[i].index = indices[i]
+        refs[i].sq = targets[i]
+    qsort(refs, n, sizeof(_TargetRef), _compare_targets_by_length)
+    for i in range(n):
+        targets[i] = refs[i].sq
+        indices[i] = refs[i].index
+
+    free(refs)
+    return 0
+
+
+cdef uint32_t _fnv1a_str(uint32_t h, const char* data) noexcept nogil:
+    cdef size_t i = 0
+    while data != NULL and data[i] != 0:
+        h = (h ^ <unsigned char> data[i]) * 16777619u
+        i += 1
+    # terminate with a byte that never appears in a string
+    return (h ^ 0xFF) * 16777619u
+
+
+cdef uint32_t _target_seed(uint32_t seed, const CM_t* cm, const ESL_SQ* sq) noexcept nogil:
+    # derive a seed from the pipeline seed, the query and the target with
+    # a 32-bit FNV-1a hash, so that the randomness used for a target does
+    # not depend on the other targets searched by the same pipeline
+    cdef size_t      i
+    cdef uint32_t    h   = 2166136261u
+    cdef int64_t[4]  ints
+    cdef const char* data
+
+    ints[0] = seed
+    ints[1] = cm.checksum
+    ints[2] = sq.start
+    ints[3] = sq.n
+    data = <const char*> ints
+    for i in range(sizeof(ints)):
+        h = (h ^ <unsigned char> data[i]) * 16777619u
+    h = _fnv1a_str(h, cm.name)
+    h = _fnv1a_str(h, sq.name)
+    # a null seed would make Easel pick an arbitrary seed
+    return h if h != 0 else 1
+
+
+cdef struct _TargetScreen:
+    P7_HMM_WINDOWLIST wlist
+    ESL_DSQ*          dsq
+    int64_t           dsq_size
+    int64_t           length
+    int64_t*          offsets
+    uint8_t*          passed
+    size_t            size
+    size_t            start
+    size_t            end
+
+
+cdef struct _QueryScreen:
+    CM_t*         cm
+    P7_PROFILE*   gm
+    P7_OPROFILE*  om
+    P7_SCOREDATA* msvdata
+    int           maxW
+    bint          hmmonly
+    bint          enabled
+
+
+cdef int _screen_strand(
+    CM_PIPELINE* pli,
+    P7_BG* bg,
+    _QueryScreen* query,
+    _TargetScreen* screen,
+    uint8_t* passed,
+    uint8_t flag,
+) except 1 nogil:
+    # run the SSV filter like the first stage of `pli_p7_filter` on the
+    # concatenated targets, and flag the targets overlapping any window
+    # that survived it
+    cdef int     i
+    cdef int     status
+    cdef size_t  lo
+    cdef size_t  hi
+    cdef size_t  mid
+    cdef int64_t wstart
+    cdef int64_t wend
+    cdef size_t  count      = screen.end - screen.start
+    cdef int     max_length = query.om.max_length
+    cdef double  F1         = pli.F1_hmmonly if query.hmmonly else pli.F1
+
+    # make sure the DP row is large enough for the SSV filter
+    status = libhmmer.impl.p7_omx.p7_omx_GrowTo(pli.oxf, query.om.M, 0, 0)
+    if status != libeasel.eslOK:
+        raise AllocationError("P7_OMX", sizeof(P7_OMX))
+
+    libhmmer.impl.p7_oprofile.p7_oprofile_ReconfigMSVLength(query.om, query.maxW)
+    query.om.max_length = query.maxW
+    screen.wlist.count = 0
+    status = p7_SSVFilter_longtarget(screen.dsq, screen.length - 1, query.om, pli.oxf, query.msvdata, bg, F1, &screen.wlist)
+    query.om.max_length = max_length
+    if status != libeasel.eslOK:
+        raise UnexpectedError(status, "p7_SSVFilter_longtarget")
+
+    for i in range(screen.wlist.count):
+        wstart = screen.wlist.windows[i].n
+        wend = wstart + screen.wlist.windows[i].length - 1
+        # find the target containing the start of the window
+        lo = 0
+        hi = count
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if screen.offsets[mid] <= wstart:
+                lo = mid
+            else:
+                hi = mid
+        # flag all the targets overlapping the window
+        while lo < count and screen.offsets[lo] <= wend:
+            passed[lo] |= flag
+            lo += 1
+
+    return 0
+
+
+cdef int _screen_batch(
+    _TargetScreen* screen,
+    ESL_SQ** sq,
+    size_t start,
+    size_t n_targets,
+) except 1 nogil:
+    # NOTE(@althonos): Short targets are screened in batches, concatenated
+    #                  into a single sequence with a missing data residue
+    #                  between consecutive targets. Missing data residues
+    #                  have the lowest score at every position of the SSV
+    #                  filter and reset its DP row, so the concatenation
+    #                  has exactly the windows of each target screened
+    #                  separately, without paying the setup cost of the
+    #                  filter for every target.
+    cdef size_t  j
+    cdef void*   p
+    cdef int64_t pos
+    cdef size_t  end    = start
+    cdef int64_t length = 0
+    cdef ESL_DSQ spacer = sq[start].abc.Kp - 1
+
+    # select the targets of the next batch
+    while end < n_targets and (end == start or length + sq[end].n + 1 <= SCREEN_BATCH_LENGTH):
+        length += sq[end].n + 1
+        end += 1
+
+    # grow the buffers if needed
+    if screen.dsq_size < length + 1:
+        p = realloc(screen.dsq, sizeof(ESL_DSQ) * (length + 1))
+        if p == NULL:
+            raise AllocationError("ESL_DSQ", sizeof(ESL_DSQ), length + 1)
+        screen.dsq = <ESL_DSQ*> p
+        screen.dsq_size = length + 1
+    if screen.size < end - start + 1:
+        p = realloc(screen.offsets, sizeof(int64_t) * (end - start + 1))
+        if p == NULL:
+            raise AllocationError("int64_t", sizeof(int64_t), end - start + 1)
+        screen.offsets = <int64_t*> p
+        p = realloc(screen.passed, sizeof(uint8_t) * (end - start + 1))
+        if p == NULL:
+            raise AllocationError("uint8_t", sizeof(uint8_t), end - start + 1)
+        screen.passed = <uint8_t*> p
+        screen.size = end - start + 1
+
+    screen.start = start
+    screen.end = end
+    screen.length = length
+
+    # concatenate the top strand of the targets
+    pos = 1
+    screen.dsq[0] = libeasel.eslDSQ_SENTINEL
+    for j in range(start, end):
+        screen.offsets[j - start] = pos
+        memcpy(&screen.dsq[pos], &sq[j].dsq[1], sizeof(ESL_DSQ) * sq[j].n)
+        pos += sq[j].n
+        screen.dsq[pos] = spacer
+        pos += 1
+    screen.offsets[end - start] = pos
+    screen.dsq[length] = libeasel.eslDSQ_SENTINEL
+
+    return 0
+
+
+cdef int _screen_revcomp(
+    _TargetScreen* screen,
+    ESL_SQ** sq,
+) except 1 nogil:
+    # reverse complement each target of the batch in place, so that the
+    # offsets of the targets are the same on both strands
+    cdef int     status
+    cdef size_t  j
+    cdef int64_t pos
+
+    for j in range(screen.start, screen.end):
+        pos = screen.offsets[j - screen.start]
+        status = libeasel.alphabet.esl_abc_revcomp(sq[j].abc, &screen.dsq[pos - 1], sq[j].n)
+        if status != libeasel.eslOK:
+            raise UnexpectedError(status, "esl_abc_revcomp")
+
+    return 0
+
+
+cdef int _screen_targets(
+    WORKER_INFO* info,
+    _TargetScreen* screen,
+    ESL_SQ** sq,
+    size_t start,
+    size_t n_targets,
+) except 1 nogil:
+    # screen the next batch of targets with the filter of the current query
+    cdef _QueryScreen query
+
+    query.om = info.om
+    query.msvdata = info.msvdata
+    query.maxW = info.pli.maxW
+    query.hmmonly = info.pli.do_hmmonly_cur
+    query.enabled = True
+
+    _screen_batch(screen, sq, start, n_targets)
+    memset(screen.passed, 0, sizeof(uint8_t) * (screen.end - screen.start))
+    if info.pli.do_top:
+        _screen_strand(info.pli, info.bg, &query, screen, screen.passed, SCREEN_TOP)
+    if info.pli.do_bot and sq[start].abc.complement != NULL:
+        _screen_revcomp(screen, sq)
+        _screen_strand(info.pli, info.bg, &query, screen, screen.passed, SCREEN_BOTTOM)
+
+    return 0
+
+
+cdef int _screen_queries(
+    CM_PIPELINE* pli,
+    P7_BG* bg,
+    _QueryScreen* queries,
+    size_t n_queries,
+    ESL_SQ** sq,
+    size_t n_targets,
+    uint8_t* passed,
+) except 1 nogil:
+    # NOTE(@althonos): The filters of all queries are run on each batch
+    #                  of targets while it is still in cache, so that the
+    #                  target database is only streamed once from memory
+    #                  no matter the number of queries. The strands that
+    #                  pass the filter of query `q` are flagged in row `q`
+    #                  of the `passed` matrix. Targets too long to be
+    #                  batched are not screened, since most of them pass
+    #                  the filter anyway and would be filtered twice.
+    cdef size_t        q
+    cdef size_t        t
+    cdef int           status
+    cdef _TargetScreen screen
+    cdef bint          do_bot = pli.do_bot and n_targets > 0 and sq[0].abc.complement != NULL
+
+    memset(passed, SCREEN_TOP | SCREEN_BOTTOM, sizeof(uint8_t) * n_queries * n_targets)
+    memset(&screen, 0, sizeof(_TargetScreen))
+
+    status = p7_hmmwindow_init(&screen.wlist)
+    if status != libeasel.eslOK:
+        raise AllocationError("P7_HMM_WINDOWLIST", sizeof(P7_HMM_WINDOWLIST))
+
+    try:
+        t = 0
+        while t < n_targets:
+            # skip empty targets and targets too long to be batched
+            if sq[t].n == 0 or sq[t].n >= SCREEN_BATCH_LENGTH:
+                t += 1
+                continue
+            # screen the next batch with the filter of every query
+            _screen_batch(&screen, sq, t, n_targets)
+            for q in range(n_queries):
+                if queries[q].enabled:
+                    memset(&passed[q * n_targets + t], 0, sizeof(uint8_t) * (screen.end - t))
+                    if pli.do_top:
+                        _screen_strand(pli, bg, &queries[q], &screen, &passed[q * n_targets + t], SCREEN_TOP)
+            if do_bot:
+                _screen_revcomp(&screen, sq)
+                for q in range(n_queries):
+                    if queries[q].enabled:
+                        _screen_strand(pli, bg, &queries[q], &screen, &passed[q * n_targets + t], SCREEN_BOTTOM)
+            t = screen.end
+    finally:
+        free(screen.wlist.windows)
+        free(screen.dsq)
+        free(screen.offsets)
+        free(screen.passed)
+
+    return 0
+
+
+cdef inline void _account_pass(CM_PIPELINE* pli, int p, int64_t n, bint in_rc) noexcept nogil:
+    # passes on the sequence termini only search the `maxW` terminal residues
+    if p != PLI_PASS_STD_ANY and p != PLI_PASS_5P_AND_3P_ANY and p != PLI_PASS_HMM_ONLY_ANY:
+        n = min(n, <int64_t> pli.maxW)
+    if in_rc:
+        pli.acct[p].npli_bot += 1
+        pli.acct[p].nres_bot += n
+    else:
+        pli.acct[p].npli_top += 1
+        pli.acct[p].nres_top += n
+
+
+cdef inline void _account_terminal_passes(
+    CM_PIPELINE* pli,
+    int64_t n,
+    bint have5term,
+    bint have3term,
+    bint in_rc,
+) noexcept nogil:
+    if have5term:
+        _account_pass(pli, PLI_PASS_5P_ONLY_FORCE, n, in_rc)
+    if have3term:
+        _account_pass(pli, PLI_PASS_3P_ONLY_FORCE, n, in_rc)
+    if have5term and have3term and n <= pli.maxW:
+        _account_pass(pli, PLI_PASS_5P_AND_3P_FORCE, n, in_rc)
+
+
+cdef void _account_screened(CM_PIPELINE* pli, const ESL_SQ* sq, bint in_rc) noexcept nogil:
+    # NOTE(@althonos): When no window of a strand survives the SSV filter,
+    #                  `cm_Pipeline` only updates the accounting of the
+    #                  passes it enters, so this replicates the selection
+    #                  of passes done at the beginning of `cm_Pipeline`.
+    cdef int64_t start     = sq.end if in_rc else sq.start
+    cdef int64_t end       = sq.start if in_rc else sq.end
+    cdef bint    have5term
+    cdef bint    have3term
+
+    if start <= end:
+        have5term = start == 1
+        have3term = end == sq.L
+    else:
+        have5term = start == sq.L
+        have3term = end == 1
+
+    if pli.do_hmmonly_cur:
+        _account_pass(pli, PLI_PASS_HMM_ONLY_ANY, sq.n, in_rc)
+    elif pli.do_trunc_ends:
+        _account_pass(pli, PLI_PASS_STD_ANY, sq.n, in_rc)
+        _account_terminal_passes(pli, sq.n, have5term, have3term, in_rc)
+    elif pli.do_trunc_5p_ends:
+        _account_pass(pli, PLI_PASS_STD_ANY, sq.n, in_rc)
+        if have5term:
+            _account_pass(pli, PLI_PASS_5P_ONLY_FORCE, sq.n, in_rc)
+    elif pli.do_trunc_3p_ends:
+        _account_pass(pli, PLI_PASS_STD_ANY, sq.n, in_rc)
+        if have3term:
+            _account_pass(pli, PLI_PASS_3P_ONLY_FORCE, sq.n, in_rc)
+    elif pli.do_trunc_any:
+        _account_pass(pli, PLI_PASS_STD_ANY, sq.n, in_rc)
+        _account_terminal_passes(pli, sq.n, have5term, have3term, in_rc)
+        _account_pass(pli, PLI_PASS_5P_AND_3P_ANY, sq.n, in_rc)
+    elif pli.do_trunc_int:
+        _account_pass(pli, PLI_PASS_STD_ANY, sq.n, in_rc)
+        _account_pass(pli, PLI_PASS_5P_AND_3P_ANY, sq.n, in_rc)
+    elif pli.do_trunc_only:
+        _account_pass(pli, PLI_PASS_5P_AND_3P_ANY, sq.n, in_rc)
+    else:
+        _account_pass(pli, PLI_PASS_STD_ANY, sq.n, in_rc)
+
+
+cdef double _monotonic() noexcept nogil:
+    cdef timespec ts
+    clock_gettime(CLOCK_MONOTONIC, &ts)
+    return ts.tv_sec + ts.tv_nsec * 1e-9
+
+
+cdef int _check_interrupt(WORKER_INFO* info) except 1 nogil:
+    # NOTE(@althonos): This is called between targets (and strands) of the
+    #                  search loop, so that long-running searches can be
+    #                  interrupted without waiting for the whole database
+    #                  to be processed. Signals are only checked from the
+    #                  main thread, at most every `SIGNAL_CHECK_INTERVAL`
+    #                  seconds, to avoid contention on the GIL.
+    cdef double now
+    cdef bint   cancelled
+
+    # the flag may be set by `Pipeline.cancel` from another thread, which
+    # may not hold the GIL (or run without a GIL at all), so access to
+    # the flag is synchronized with a lock
+    PyThread_acquire_lock(info.cancel_lock, WAIT_LOCK)
+    cancelled = info.cancelled[0]
+    PyThread_release_lock(info.cancel_lock)
+    if cancelled:
+        raise KeyboardInterrupt("search was cancelled")
+
+    if info.deadline >= 0 or info.check_signals:
+        now = _monotonic()
+        if info.deadline >= 0 and now >= info.deadline:
+            raise TimeoutError("search exceeded its time limit")
+        if info.check_signals and now >= info.next_signal_check:
+            info.next_signal_check = now + SIGNAL_CHECK_INTERVAL
+            with gil:
+                PyErr_CheckSignals()
+
+    return 0
+
+
+cdef double   SIGNAL_CHECK_INTERVAL = 0.1
+
+cdef int64_t  SCREEN_BATCH_LENGTH = 65536
+cdef size_t   SCREEN_BATCH_QUERIES = 16
+cdef uint8_t  SCREEN_TOP          = 1
+cdef uint8_t  SCREEN_BOTTOM       = 2
+
+cdef uint32_t DEFAULT_SEED    = 181
+cdef double   DEFAULT_E       = 10.0
+cdef double   DEFAULT_INCE    = 0.01
+
+cdef class Pipeline:
+    """An Infernal accelerated sequence/covariance model comparison pipeline.
+
+    The Infernal pipeline handles the comparison of digital sequences to
+    CMs. Since Infernal 1.1, the pipeline is accelerated using the HMMER
+    platform acceleration to compute initial SSV/MSV/Viterbi filters before
+    actually attempting full alignments.
+
+    Attributes:
+        alphabet (`~pyhmmer.easel.Alphabet`): The alphabet for which the
+            pipeline is configured.
+        randomness (`~pyhmmer.easel.Randomness`): The random number generator
+            being used by the pipeline.
+
+    """
+
+    CLEN_HINT = 100  # default model size
+    M_HINT    = 100  # default model nodes
+    L_HINT    = 100  # default sequence size
+
+    cdef CM_PIPELINE* _pli
+    cdef uint32_t     _seed
+    cdef int64_t      _Z
+    cdef bint         _deduplicate
+    cdef bint         _sort_targets
+    cdef bint         _reseed_targets
+    cdef bint         _short_targets
+    cdef int64_t      _max_hits
+    cdef int64_t      _max_residues
+    cdef double       _max_time
+    cdef bint         _cancelled
+    cdef PyThread_type_lock _cancel_lock
+
+    cdef readonly Alphabet         alphabet
+    cdef readonly Randomness       randomness
+    cdef readonly Background       background
+
+    cdef          OptimizedProfile opt          # temporary optimized profile
+    cdef          Profile          profile      # temporary profile
+    cdef          Profile          profile_l    # temporary profile, 3' truncated
+    cdef          Profile          profile_r    # temporary profile, 5' truncated
+    cdef          Profile          profile_t    # temporary profile, 5' + 3' truncated
+
+    # --- Magic methods ------------------------------------------------------
+
+    def __cinit__(self):
+        self._pli = NULL
+        self.alphabet = None
+        self.randomness = None
+        self._cancelled = False
+        self._cancel_lock = PyThread_allocate_lock()
+        if self._cancel_lock == NULL:
+            raise MemoryError("could not allocate lock")
+
+    def __init__(
+        self,
+        Alphabet alphabet,
+        int64_t Z,
+        Background background = None,
+        *,
+        # bint bias_filter=True,
+        # bint null2=True,
+        uint32_t seed=DEFAULT_SEED,
+        # object Z=None,
+        # double F1=DEFAULT_F1,
+        # double F2=DEFAULT_F2,
+        # double F3=DEFAULT_F3,
+        double E=DEFAULT_E,
+        object T=None,
+        double incE=DEFAULT_INCE,
+        object incT=None,
+    #     str bit_cutoffs=None,
+        bint deduplicate=False,
+        bint sort_targets=False,
+        bint reseed_targets=False,
+        bint short_targets=False,
+        object max_hits=None,
+        object max_residues=None,
+        object max_time=None,
+    ):
+        cdef int clen_hint = self.CLEN_HINT
+        cdef int l_hint    = self.L_HINT
+        cdef int m_hint    = self.M_HINT
+
+        with nogil:
+            self._pli = libinfernal.cm_pipeline.cm_pipeline_Create(
+                NULL,                               # ESL_GETOPTS *go
+                <ESL_ALPHABET*> alphabet._abc,      # ESL_ALPHABET *abc
+                clen_hint,                          # int clen_hint
+                l_hint,                             # int L_hint
+                Z,                                  # int Z
+                cm_zsetby_e.CM_ZSETBY_OPTION,       # cm_zsetby_e Z_setby
+                cm_pipemodes_e.CM_SEARCH_SEQS,      # cm_pipemodes_e mode
+            )
+        if self._pli == NULL:
+            raise AllocationError("CM_PIPELINE", sizeof(CM_PIPELINE))
+
+        # record alphabet
+        self.alphabet = alphabet
+
+        # use the backgroud model or create a default one
+        if background is None:
+            self.background = Background(alphabet)
+        elif background.alphabet != self.alphabet:
+            raise AlphabetMismatch(self.alphabet, background.alphabet)
+        else:
+            self.background = background.copy() # FIXME: do we really need a copy?
+
+        # create a Randomness object exposing the internal pipeline RNG
+        self.randomness = Randomness.__new__(Randomness)
+        self.randomness._owner = self
+        self.randomness._rng = self._pli.r
+
+        # create empty profiles and optimized profile to reuse globally
+        # between queries rather than reallocating on every new query
+        self.profile = Profile(m_hint, self.alphabet)
+        self.opt = OptimizedProfile(m_hint, self.alphabet)
+        self.profile_r = Profile(m_hint, self.alphabet)
+        self.profile_l = Profile(m_hint, self.alphabet)
+        self.profile_t = Profile(m_hint, self.alphabet)
+
+        # configure the pipeline with the additional keyword arguments
+        self.seed = seed
+        self.Z = Z
+        self.E = E
+        self.T = T
+        self.incE = incE
+        self.incT = incT
+        self.deduplicate = deduplicate
+        self.sort_targets = sort_targets
+        self.reseed_targets = reseed_targets
+        self.short_targets = short_targets
+        self.max_hits = max_hits
+        self.max_residues = max_residues
+        self.max_time = max_time
+
+    def __dealloc__(self):
+        # NOTE(@althonos): `cm_pipeline_Destroy` supposedly requires a `CM_t`
+        #                  but does not use it so it *should* be fine to pass
+        #                  a NULL pointer here.
+        libinfernal.cm_pipeline.cm_pipeline_Destroy(self._pli, NULL)
+        if self._cancel_lock != NULL:
+            PyThread_free_lock(self._cancel_lock)
+
+    # --- Properties ---------------------------------------------------------
+
+    @property
+    def Z(self):
+        """`int` or `None`: The number of effective targets searched.
+
+        It is used to compute the independent e-value for each hit.
+        If `None`, the parameter number will be set automatically after all
+        the comparisons have been done. Otherwise, it can be set to an
+        arbitrary number.
+
+        """
+        return None if self._Z < 0 else self._Z
+
+    @Z.setter
+    def Z(self, int64_t Z):
+        assert self._pli != NULL
+        if Z is None:
+            self._pli.Z       = 0.0
+            self._pli.Z_setby = cm_zsetby_e.CM_ZSETBY_OPTION
+            self._Z           = -1
+        else:
+            self._pli.Z_setby = cm_zsetby_e.CM_ZSETBY_OPTION
+            self._pli.Z = self._Z = Z
+
+    @property
+    def seed(self):
+        """`int`: The seed given at pipeline initialization.
+
+        Setting this attribute to a different value will cause the random
+        number generator to be reseeded immediately.
+
+        """
+        return self._seed
+
+    @seed.setter
+    def seed(self, uint32_t seed):
+        self._seed = seed
+        self._pli.do_reseeding = self._pli.ddef.do_reseeding = seed != 0
+        self.randomness.seed(seed)
+
+    @property
+    def F1(self):
+        """`float`: The MSV filter threshold.
+        """
+        assert self._pli != NULL
+        return self._pli.F1
+
+    @F1.setter
+    def F1(self, double F1):
+        assert self._pli != NULL
+        self._pli.F1 = F1
+
+    @property
+    def F2(self):
+        """`float`: The Viterbi filter threshold.
+        """
+        assert self._pli != NULL
+        return self._pli.F2
+
+    @F2.setter
+    def F2(self, double F2):
+        assert self._pli != NULL
+        self._pli.F2 = F2
+
+    @property
+    def F3(self):
+        """`float`: The uncorrected Forward filter threshold.
+        """
+        assert self._pli != NULL
+        return self._pli.F3
+
+    @F3.setter
+    def F3(self, double F3):
+        assert self._pli != NULL
+        self._pli.F3 = F3
+
+    @property
+    def F4(self):
+        """`float`: The glocal Forward filter threshold.
+        """
+        assert self._pli != NULL
+        return self._pli.F4
+
+    @F4.setter
+    def F4(self, double F4):
+        assert self._pli != NULL
+        self._pli.F4 = F4
+
+    @property
+    def F5(self):
+        """`float`: The glocal envelope definition filter threshold.
+        """
+        assert self._pli != NULL
+        return self._pli.F5
+
+    @F5.setter
+    def F5(self, double F5):
+        assert self._pli != NULL
+        self._pli.F5 = F5
+
+    @property
+    def F6(self):
+        """`float`: The CYK filter threshold.
+        """
+        assert self._pli != NULL
+        return self._pli.F6
+
+    @F6.setter
+    def F6(self, double F6):
+        assert self._pli != NULL
+        self._pli.F6 = F6
+
+    @property
+    def E(self):
+        """`float`: The per-target E-value threshold for reporting a hit.
+        """
+        assert self._pli != NULL
+        return self._pli.E
+
+    @E.setter
+    def E(self, double E):
+        assert self._pli != NULL
+        self._pli.E = E
+
+    @property
+    def T(self):
+        """`float` or `None`: The per-target score threshold for reporting a hit.
+
+        If set to a non-`None` value, this threshold takes precedence over
+        the per-target E-value threshold (`Pipeline.E`).
+
+        """
+        assert self._pli != NULL
+        return None if self._pli.by_E else self._pli.T
+
+    @T.setter
     def T(self, object T):
         assert self._pli != NULL
-        if T is None:
-            self._pli.T = 0.0
-            self._pli.by_E = True
+        if T is None:
+            self._pli.T = 0.0
+            self._pli.by_E = True
+        else:
+            self._pli.T = T
+            self._pli.by_E = False
+
+    @property
+    def incE(self):
+        """`float`: The per-target E-value threshold for including a hit.
+        """
+        assert self._pli != NULL
+        return self._pli.incE
+
+    @incE.setter
+    def incE(self, double incE):
+        assert self._pli != NULL
+        self._pli.incE = incE
+
+    @property
+    def incT(self):
+        """`float` or `None`: The per-target score threshold for including a hit.
+
+        If set to a non-`None` value, this threshold takes precedence over
+        the per-target E-value inclusion threshold (`Pipeline.incE`).
+
+        """
+        assert self._pli != NULL
+        return None if self._pli.inc_by_E else self._pli.incT
+
+    @incT.setter
+    def incT(self, object incT):
+        assert self._pli != NULL
+        if incT is None:
+            self._pli.incT = 0.0
+            self._pli.inc_by_E = True
+        else:
+            self._pli.incT = incT
+            self._pli.inc_by_E = False
+
+    @property
+    def deduplicate(self):
+        """`bool`: Whether to search identical target sequences only once.
+
+        When enabled, the digital sequences of the target block are hashed
+        before searching, and only one representative of each group of
+        identical sequences is run through the pipeline. The hits are then
+        copied back to every duplicate target, with its own name, accession
+        and description. This can save a lot of time on inputs with a high
+        redundancy, such as amplicon reads.
+
+        Note:
+            The E-values of the hits are computed from `Pipeline.Z`, which
+            is never derived from the residues actually searched, so they
+            are not affected by the deduplication. Note that
+            `~pyinfernal.infernal.cmsearch` sets ``Z`` to the total length
+            of the target block when it is not given, which counts the
+            duplicate targets as well.
+
+        """
+        return self._deduplicate
+
+    @deduplicate.setter
+    def deduplicate(self, bint deduplicate):
+        self._deduplicate = deduplicate
+
+    @property
+    def sort_targets(self):
+        """`bool`: Whether to search target sequences by increasing length.
+
+        When enabled, the target sequences are searched from the shortest
+        to the longest, and the dynamic programming matrices of the
+        pipeline are grown once for each group of targets of similar
+        length, instead of being reallocated every time a longer target
+        is encountered. This improves the memory access pattern on
+        databases mixing sequences of very different lengths, such as
+        reads and contigs.
+
+        Note:
+            Hits are always reported with the index of their target in
+            the original block, so the resulting `TopHits` are the same
+            as when searching the targets in storage order.
+
+        """
+        return self._sort_targets
+
+    @sort_targets.setter
+    def sort_targets(self, bint sort_targets):
+        self._sort_targets = sort_targets
+
+    @property
+    def reseed_targets(self):
+        """`bool`: Whether to derive the random seed from each target.
+
+        When enabled, the random number generator of the pipeline is
+        reseeded before each target sequence, with a seed derived from
+        the pipeline `~Pipeline.seed`, the query CM and the name and
+        coordinates of the target. The stochastic steps of the pipeline
+        then no longer depend on the order in which targets are searched,
+        so that splitting the database into chunks or searching it with
+        a different number of threads yields the same results.
+
+        """
+        return self._reseed_targets
+
+    @reseed_targets.setter
+    def reseed_targets(self, bint reseed_targets):
+        self._reseed_targets = reseed_targets
+
+    @property
+    def short_targets(self):
+        """`bool`: Whether to optimize the search for short target sequences.
+
+        When enabled, each strand of a target is first screened with the
+        SSV filter alone, and the complete pipeline only runs on strands
+        where at least one window survives it. This skips most of the
+        setup cost of the pipeline for every target, which dominates
+        the search time on short sequences such as sequencing reads,
+        where the filters themselves only process a few hundred residues.
+
+        Note:
+            The results are the same as without screening, but the SSV
+            filter runs twice on strands that pass it. This option should
+            only be enabled for targets much shorter than the query
+            window length, which rarely pass the first filter.
+
+        """
+        return self._short_targets
+
+    @short_targets.setter
+    def short_targets(self, bint short_targets):
+        self._short_targets = short_targets
+
+    @property
+    def max_hits(self):
+        """`int` or `None`: The maximum number of hits to retain per query.
+
+        When set, only the best hits (with the lowest E-values) are kept
+        in the `TopHits` returned for each query. The hit list is pruned
+        regularly while searching, so that the memory used to store hits
+        and their alignments stays bounded even for queries producing a
+        very large number of hits. If any hit was discarded, the returned
+        `TopHits` will be marked as `~TopHits.truncated`.
+
+        Note:
+            Hits removed as duplicates by the overlap removal are never
+            retained when this option is set.
+
+        """
+        return None if self._max_hits < 0 else self._max_hits
+
+    @max_hits.setter
+    def max_hits(self, object max_hits):
+        if max_hits is None:
+            self._max_hits = -1
+        elif max_hits < 1:
+            raise InvalidParameter("max_hits", max_hits, hint="strictly positive integer or None")
+        else:
+            self._max_hits = max_hits
+
+    @property
+    def max_residues(self):
+        """`int` or `None`: The maximum number of residues to search per query.
+
+        When set, the search for a query is stopped once at least this
+        number of target residues has been searched, in which case the
+        returned `TopHits` will be marked as `~TopHits.truncated`. Since
+        targets are always searched entirely, the actual number of residues
+        searched may exceed this limit by at most one target.
+
+        """
+        return None if self._max_residues < 0 else self._max_residues
+
+    @max_residues.setter
+    def max_residues(self, object max_residues):
+        if max_residues is None:
+            self._max_residues = -1
+        elif max_residues < 1:
+            raise InvalidParameter("max_residues", max_residues, hint="strictly positive integer or None")
+        else:
+            self._max_residues = max_residues
+
+    @property
+    def max_time(self):
+        """`float` or `None`: The maximum time to spend searching a query.
+
+        When set, a search taking longer than this number of seconds will
+        be interrupted with a `TimeoutError`. The partial results obtained
+        before the interruption are available as the ``hits`` attribute
+        of the exception, as a `TopHits` instance marked as
+        `~TopHits.truncated`.
+
+        Note:
+            The deadline is only checked between targets, so the actual
+            time spent may exceed the limit by the time needed to search
+            a single target sequence.
+
+        """
+        return None if self._max_time < 0 else self._max_time
+
+    @max_time.setter
+    def max_time(self, object max_time):
+        if max_time is None:
+            self._max_time = -1
+        elif max_time <= 0:
+            raise InvalidParameter("max_time", max_time, hint="strictly positive number or None")
+        else:
+            self._max_time = max_time
+
+    # --- Utils --------------------------------------------------------------
+
+    cpdef void cancel(self):
+        """Request the cancellation of the current search.
+
+        This method can be called from another thread to interrupt a
+        search running with this pipeline. The search will stop before
+        processing the next target and raise a `KeyboardInterrupt`, with
+        the partial results available as the ``hits`` attribute of the
+        exception. If no search is running, the next search will be
+        cancelled immediately, unless `Pipeline.clear` is called first.
+
+        """
+        self._set_cancelled(True)
+
+    cdef void _set_cancelled(self, bint cancelled) noexcept nogil:
+        PyThread_acquire_lock(self._cancel_lock, WAIT_LOCK)
+        self._cancelled = cancelled
+        PyThread_release_lock(self._cancel_lock)
+
+    cpdef void clear(self):
+        """Reset the pipeline to its default state.
+        """
+        assert self._pli != NULL
+
+        cdef int      status
+        cdef int      i
+        cdef uint32_t seed
+
+        # reset the cancellation flag
+        self._set_cancelled(False)
+
+        # reinitialize the random number generator, even if
+        # `self._pli.do_reseeding` is False, because a true
+        # deallocation/reallocation of a P7_PIPELINE would reinitialize
+        # it unconditionally.
+        self.randomness.seed(self._seed)
+
+        # reinitialize the domaindef
+        status = libhmmer.p7_domaindef.p7_domaindef_Reuse(self._pli.ddef)
+        if status != libeasel.eslOK:
+            raise UnexpectedError(status, "p7_domaindef_Reuse")
+
+        with nogil:
+            # reinitialize the dynamic programming matrices
+            # (no status check, infallible)
+            libhmmer.impl.p7_omx.p7_omx_Reuse(self._pli.oxf)
+            libhmmer.impl.p7_omx.p7_omx_Reuse(self._pli.oxb)
+            libhmmer.impl.p7_omx.p7_omx_Reuse(self._pli.fwd)
+            libhmmer.impl.p7_omx.p7_omx_Reuse(self._pli.bck)
+            libhmmer.p7_gmx.p7_gmx_Reuse(self._pli.gxf)
+            libhmmer.p7_gmx.p7_gmx_Reuse(self._pli.gxb)
+            libhmmer.p7_gmx.p7_gmx_Reuse(self._pli.gfwd)
+            libhmmer.p7_gmx.p7_gmx_Reuse(self._pli.gbck)
+            # Reset accounting values
+            self._pli.nseqs           = 0
+            self._pli.nmodels         = 0
+            self._pli.nnodes          = 0
+            self._pli.nmodels_hmmonly = 0
+            self._pli.nnodes_hmmonly  = 0
+            self._pli.cmfp            = NULL
+            self._pli.errbuf[0]       = b'\0'
+            # Reset pipeline accounting statistics
+            for i in range(libinfernal.cm_pipeline.NPLI_PASSES):
+                libinfernal.cm_pipeline.cm_pli_ZeroAccounting(&self._pli.acct[i])
+
+    cdef int _configure_cm(
+        self,
+        WORKER_INFO* info,
+    ) noexcept nogil:
+        cdef int   status
+        cdef float reqMb  = 0.0
+        cdef bint check_fcyk_beta
+        cdef bint check_final_beta
+        cdef int  W_from_cmdline
+
+        if (info.pli.cm_config_opts & libinfernal.cm.CM_CONFIG_SCANMX) != 0:
+            reqMb += libinfernal.cm_mx.cm_scan_mx_SizeNeeded(info.cm, True, True)
+        if (info.pli.cm_config_opts & libinfernal.cm.CM_CONFIG_TRSCANMX) != 0:
+            reqMb += libinfernal.cm_mx.cm_tr_scan_mx_SizeNeeded(info.cm, True, True)
+        if reqMb > info.smxsize:
+            return libeasel.eslERANGE
+            # ESL_FAIL(eslERANGE, info->pli->errbuf, "search will require %.2f Mb > %.2f Mb limit.\nIncrease limit with --smxsize, or don't use --max,--nohmm,--qdb,--fqdb.", reqMb, info->smxsize);
+
+        # cm_pipeline_Create() sets configure/align options in pli->cm_config_opts, pli->cm_align_opts
+        # NOTE: is this really necessary? we want to avoid modifying CM which is the query
+        #       if we can help it
+        info.cm.config_opts = info.pli.cm_config_opts
+        info.cm.align_opts  = info.pli.cm_align_opts
+
+        # check if we need to recalculate QDBs prior to building the scan matrix in cm_Configure()
+        check_fcyk_beta  = (info.pli.fcyk_cm_search_opts & libinfernal.cm.CM_SEARCH_QDB) != 0
+        check_final_beta = (info.pli.final_cm_search_opts & libinfernal.cm.CM_SEARCH_QDB) != 0
+        if libinfernal.cm_qdband.CheckCMQDBInfo(info.cm.qdbinfo, info.pli.fcyk_beta, check_fcyk_beta, info.pli.final_beta, check_final_beta) != libeasel.eslOK:
+            info.cm.config_opts  |= libinfernal.cm.CM_CONFIG_QDB
+            info.cm.qdbinfo.beta1 = info.pli.fcyk_beta
+            info.cm.qdbinfo.beta2 = info.pli.final_beta
+
+        W_from_cmdline = -1 if not info.pli.do_wcx else <int> (info.cm.clen * info.pli.wcx)
+        return libinfernal.cm_modelconfig.cm_Configure(info.cm, info.pli.errbuf, W_from_cmdline)
+
+    cdef int _grow_profiles(
+        self,
+        CM query,
+    ) except 1:
+        cdef int M = query.M
+        if self.profile._gm.allocM < M:
+            self.profile = Profile(M, self.alphabet)
+            self.opt = OptimizedProfile(M, self.alphabet)
+            self.profile_r = Profile(M, self.alphabet)
+            self.profile_l = Profile(M, self.alphabet)
+            self.profile_t = Profile(M, self.alphabet)
+        else:
+            self.profile.clear()
+            self.profile_r.clear()
+            self.profile_l.clear()
+            self.profile_t.clear()
+
+    cdef int _setup_hmm_filter(
+        self,
+        WORKER_INFO* info,
+        CM query,
+    ) except 1:
+        cdef int status
+        cdef bint do_trunc_ends = True #(esl_opt_GetBoolean(go, "--notrunc") || esl_opt_GetBoolean(go, "--inttrunc")) ? FALSE : TRUE;
+
+        # set up the HMM filter-related structures
+        self._grow_profiles(query)
+        info.gm = self.profile._gm
+        info.om = self.opt._om
+        info.bg = self.background._bg
+
+        # NOTE(@althonos): The profiles are configured with the C functions
+        #                  rather than `Profile.configure` and
+        #                  `OptimizedProfile.convert`, so that the whole
+        #                  setup can run without the GIL.
+        with nogil:
+            status = libhmmer.modelconfig.p7_ProfileConfig(info.cm.fp7, info.bg, info.gm, 100, libhmmer.p7_LOCAL)
+            if status != libeasel.eslOK:
+                raise UnexpectedError(status, "p7_ProfileConfig")
+            status = libhmmer.impl.p7_oprofile.p7_oprofile_Convert(info.gm, info.om) # <om> is now p7_LOCAL, multihit
+            if status == libeasel.eslEMEM:
+                raise AllocationError("P7_OPROFILE", sizeof(P7_OPROFILE))
+            elif status != libeasel.eslOK:
+                raise UnexpectedError(status, "p7_oprofile_Convert")
+
+            # clone gm into Tgm before putting it into glocal mode
+            if do_trunc_ends:
+                status = libhmmer.p7_profile.p7_profile_Copy(info.gm, self.profile_t._gm)
+                if status != libeasel.eslOK:
+                    raise UnexpectedError(status, "p7_profile_Copy")
+
+            # after om has been created, convert gm to glocal, to define envelopes in cm_pipeline()
+            status = libhmmer.modelconfig.p7_ProfileConfig(info.cm.fp7, info.bg, info.gm, 100, libhmmer.p7_GLOCAL)
+            if status != libeasel.eslOK:
+                raise UnexpectedError(status, "p7_ProfileConfig")
+
+            if do_trunc_ends:
+                # create Rgm, Lgm, and Tgm specially-configured profiles for defining envelopes around
+                # hits that may be truncated 5' (Rgm), 3' (Lgm) or both (Tgm).
+                status = libhmmer.p7_profile.p7_profile_Copy(info.gm, self.profile_r._gm)
+                if status != libeasel.eslOK:
+                    raise UnexpectedError(status, "p7_profile_Copy")
+                status = libhmmer.p7_profile.p7_profile_Copy(info.gm, self.profile_l._gm)
+                if status != libeasel.eslOK:
+                    raise UnexpectedError(status, "p7_profile_Copy")
+                # setup pointers
+                info.Tgm = self.profile_t._gm
+                info.Rgm = self.profile_r._gm
+                info.Lgm = self.profile_l._gm
+                # info->Tgm was created when gm was still in local mode above
+                # we cloned Tgm from the while profile was still locally configured, above
+                status = libinfernal.cm_p7_modelconfig.p7_ProfileConfig5PrimeTrunc(info.Rgm, 100)
+                if status != libeasel.eslOK:
+                    raise UnexpectedError(status, "p7_ProfileConfig5PrimeTrunc")
+                status = libinfernal.cm_p7_modelconfig.p7_ProfileConfig3PrimeTrunc(info.cm.fp7, info.Lgm, 100)
+                if status != libeasel.eslOK:
+                    raise UnexpectedError(status, "p7_ProfileConfig3PrimeTrunc")
+                status = libinfernal.cm_p7_modelconfig.p7_ProfileConfig5PrimeAnd3PrimeTrunc(info.Tgm, 100)
+                if status != libeasel.eslOK:
+                    raise UnexpectedError(status, "p7_ProfileConfig5PrimeAnd3PrimeTrunc")
+            else:
+                info.Rgm = NULL
+                info.Lgm = NULL
+                info.Tgm = NULL
+
+            # copy E-value parameters
+            libeasel.vec.esl_vec_FCopy(info.cm.fp7_evparam, libinfernal.CM_p7_NEVPARAM, info.p7_evparam)
+
+            # compute msvdata
+            info.msvdata = libhmmer.p7_scoredata.p7_hmm_ScoreDataCreate(info.om, NULL)
+            if info.msvdata == NULL:
+                raise AllocationError("P7_SCOREDATA", sizeof(P7_SCOREDATA))
+
+        return 0
+
+    cdef void free_info(
+        self,
+        WORKER_INFO *info,
+    ) noexcept nogil:
+        # TODO: free or use Python garbage collection with dedicated objects
+        # CM_PIPELINE      *pli         # <-- owned by self
+        # CM_TOPHITS       *th          # <-- owned by the returned Tophits
+        # CM_t             *cm          # <-- owned by the input CM
+        # P7_BG            *bg          # <-- owned by self.background
+        # P7_OPROFILE      *om          # <-- owned by self.opt
+        # P7_PROFILE       *gm          # <-- owned by self.profile
+        # P7_PROFILE       *Rgm         # <-- owned by self.profile_r
+        # P7_PROFILE       *Lgm         # <-- owned by self.profile_l
+        # P7_PROFILE       *Tgm         # <-- owned by self.profile_t
+        # P7_SCOREDATA     *msvdata     # <-- not owned
+        # float            *p7_evparam  # <-- stack allocated (!)
+        # float             smxsize
+        if info.msvdata:
+            libhmmer.p7_scoredata.p7_hmm_ScoreDataDestroy(info.msvdata)
+        return
+
+    cdef size_t _deduplicate_targets(
+        self,
+        ESL_SQ** sequences,
+        size_t n_sequences,
+        ESL_SQ** unique,
+        int64_t* indices,
+        int64_t* duplicates,
+    ) except? 0:
+        # group the target sequences by their digital residues, recording
+        # the first sequence of each group in `unique` (with its index in
+        # `indices`) and chaining the following ones through `duplicates`
+        cdef size_t   i
+        cdef object   u
+        cdef bytes    key
+        cdef ESL_SQ*  sq
+        cdef dict     groups = {}
+        cdef list     tails  = []
+        cdef size_t   n      = 0
+
+        for i in range(n_sequences):
+            sq = sequences[i]
+            key = PyBytes_FromStringAndSize(<char*> &sq.dsq[1], sq.n)
+            duplicates[i] = -1
+            u = groups.get(key)
+            if u is None:
+                groups[key] = n
+                unique[n] = sq
+                indices[n] = i
+                tails.append(i)
+                n += 1
+            else:
+                duplicates[tails[u]] = i
+                tails[u] = i
+
+        return n
+
+    @staticmethod
+    cdef int _expand_duplicates(
+        CM_TOPHITS* th,
+        ESL_SQ** sq,
+        const int64_t* indices,
+        const int64_t* duplicates,
+    ) except 1 nogil:
+        # copy the hits found on each representative sequence to all the
+        # other sequences of its group, updating the target metadata
+        cdef int      status
+        cdef uint64_t i
+        cdef int64_t  j
+        cdef int64_t  r
+        cdef int64_t  delta
+        cdef int64_t  hit_idx
+        cdef CM_HIT*  hit
+        cdef uint64_t n       = th.N
+
+        for i in range(n):
+            # map the hit back to the index of the sequence in the block
+            r = th.unsrt[i].seq_idx = indices[th.unsrt[i].seq_idx]
+            j = duplicates[r]
+            while j != -1:
+                status = libinfernal.cm_tophits.cm_tophits_CreateNextHit(th, &hit)
+                if status != libeasel.eslOK:
+                    raise AllocationError("CM_HIT", sizeof(CM_HIT))
+                # copy the hit (the hit list may have been reallocated)
+                hit_idx = hit.hit_idx
+                memcpy(hit, &th.unsrt[i], sizeof(CM_HIT))
+                hit.hit_idx = hit_idx
+                hit.seq_idx = j
+                hit.name = hit.acc = hit.desc = NULL
+                hit.ad = NULL
+                # update coordinates in case the sequences are subsequences
+                # with different offsets in their source
+                if hit.in_rc:
+                    delta = sq[j].end - sq[r].end
+                else:
+                    delta = sq[j].start - sq[r].start
+                hit.start += delta
+                hit.stop += delta
+                # record target metadata
+                if libeasel.esl_strdup(sq[j].name, -1, &hit.name) != libeasel.eslOK:
+                    raise AllocationError("char", sizeof(char), strlen(sq[j].name))
+                if sq[j].acc[0] != b'\0' and libeasel.esl_strdup(sq[j].acc, -1, &hit.acc) != libeasel.eslOK:
+                    raise AllocationError("char", sizeof(char), strlen(sq[j].acc))
+                if sq[j].desc[0] != b'\0' and libeasel.esl_strdup(sq[j].desc, -1, &hit.desc) != libeasel.eslOK:
+                    raise AllocationError("char", sizeof(char), strlen(sq[j].desc))
+                # copy the alignment with the new target metadata
+                if th.unsrt[i].ad != NULL:
+                    hit.ad = _alidisplay_clone_for(th.unsrt[i].ad, sq[j], delta)
+                    if hit.ad == NULL:
+                        raise AllocationError("CM_ALIDISPLAY", sizeof(CM_ALIDISPLAY))
+                j = duplicates[j]
+
+        return 0
+
+    # --- Methods ------------------------------------------------------------
+
+    @staticmethod
+    cdef int _search_loop(
+        WORKER_INFO* info,
+        ESL_SQ** sq,
+        size_t n_targets,
+        int nbps,
+        const char* strands,
+        const uint8_t* screened,
+        const int64_t* indices,
+    ) except 1 nogil:
+        # adapted from `serial_loop` in `cmsearch.c`, inner loop code
+
+        cdef size_t   t
+        cdef size_t   u
+        cdef int      status
+        cdef uint64_t prv_pli_ntophits = 0
+        cdef int64_t  residues         = 0
+        cdef int64_t  allocated        = 0
+        cdef ESL_SQ*  copy             = NULL
+        cdef bint     do_screen        = False
+        cdef bint     do_strand
+        cdef uint8_t  passed
+        cdef _TargetScreen screen
+
+        memset(&screen, 0, sizeof(_TargetScreen))
+
+        # prepare pipeline for new model
+        status = libinfernal.cm_pipeline.cm_pli_NewModel(
+            info.pli,
+            cm_newmodelmodes_e.CM_NEWMODEL_CM,
+            info.cm,
+            info.cm.clen,
+            info.cm.W,
+            nbps,
+            info.om,
+            info.bg,
+            info.p7_evparam,
+            info.om.max_length,
+            0, #cm_idx - 1, # FIXME?  # int64_t cur_cm_idx
+            -1,                       # int     cur_clan_idx
+            NULL,
+        )
+        if status != libeasel.eslOK:
+            raise UnexpectedError(status, "cm_pli_NewModel")
+
+        # screen targets with the SSV filter only when it is the first stage
+        # of the pipeline, as configured for the current model
+        if info.short_targets and not info.pli.do_max and screened == NULL:
+            do_screen = info.pli.do_hmmonly_cur or (info.pli.do_msv and info.pli.do_edef)
+        if do_screen:
+            status = p7_hmmwindow_init(&screen.wlist)
+            if status != libeasel.eslOK:
+                raise AllocationError("P7_HMM_WINDOWLIST", sizeof(P7_HMM_WINDOWLIST))
+
+        try:
+            # run the inner loop on all sequences
+            for t in range(n_targets):
+                # stop if the search was cancelled or timed out
+                _check_interrupt(info)
+
+                # stop early if the residue budget was exhausted
+                if info.max_residues >= 0 and residues >= info.max_residues:
+                    info.truncated = True
+                    break
+                residues += sq[t].n
+
+                # when targets are sorted by length, grow the matrices once
+                # to the longest target of the next bucket of targets (with
+                # lengths up to twice the current one) so that they are not
+                # reallocated for every new target
+                if info.presize and sq[t].n > allocated:
+                    u = t
+                    while u + 1 < n_targets and sq[u + 1].n <= 2 * sq[t].n:
+                        u += 1
+                    allocated = sq[u].n
+                    status = libhmmer.impl.p7_omx.p7_omx_GrowTo(info.pli.oxf, info.om.M, 0, allocated)
+                    if status != libeasel.eslOK:
+                        raise AllocationError("P7_OMX", sizeof(P7_OMX))
+                    if info.pli.do_bot and sq[t].abc.complement != NULL:
+                        if copy == NULL:
+                            copy = libeasel.sq.esl_sq_CreateDigital(info.pli.abc)
+                            if copy == NULL:
+                                raise AllocationError("ESL_SQ", sizeof(ESL_SQ))
+                        status = libeasel.sq.esl_sq_GrowTo(copy, allocated)
+                        if status != libeasel.eslOK:
+                            raise AllocationError("ESL_DSQ", sizeof(ESL_DSQ), allocated)
+
+                # derive the randomness from the query and the target only
+                if info.reseed_targets:
+                    libeasel.random.esl_randomness_Init(info.pli.r, _target_seed(info.seed, info.cm, sq[t]))
+
+                # configure the pipeline for a new sequence
+                status = libinfernal.cm_pipeline.cm_pli_NewSeq(info.pli, sq[t], t)
+                if status != libeasel.eslOK:
+                    raise UnexpectedError(status, "cm_pli_NewSeq")
+
+                # screen the next batch of targets with the SSV filter, and
+                # only run the complete pipeline on the strands that pass it
+                passed = SCREEN_TOP | SCREEN_BOTTOM
+                if do_screen and sq[t].n > 0:
+                    if t >= screen.end:
+                        _screen_targets(info, &screen, sq, t, n_targets)
+                    passed = screen.passed[t - screen.start]
+                elif screened != NULL and sq[t].n > 0:
+                    passed = screened[t if indices == NULL else indices[t]]
+
+                # run top strand
+                do_strand = info.pli.do_top and (strands == NULL or strands[t] != b'-')
+                if do_strand and not (passed & SCREEN_TOP):
+                    _account_screened(info.pli, sq[t], False)
+                    do_strand = False
+                if do_strand:
+                    prv_pli_ntophits = info.th.N
+                    status = libinfernal.cm_pipeline.cm_Pipeline(
+                        info.pli,
+                        info.cm.offset,
+                        info.om,
+                        info.bg,
+                        info.p7_evparam,
+                        info.msvdata,
+                        sq[t],
+                        info.th,
+                        False, # not reverse-complement
+                        NULL,
+                        &info.gm,
+                        &info.Rgm,
+                        &info.Lgm,
+                        &info.Tgm,
+                        &info.cm
+                    )
+                    if status != libeasel.eslOK:
+                        raise EaselError(status, info.pli.errbuf.decode('utf-8', 'ignore'))
+                    libinfernal.cm_pipeline.cm_pipeline_Reuse(info.pli)  # prepare for next search
+                    # if sq[t].C > 0:
+                    #     libinfernal.cm_pipeline.cm_pli_AdjustNresForOverlaps(info.pli, sq[t].C, False)
+                    libinfernal.cm_tophits.cm_tophits_UpdateHitPositions(info.th, prv_pli_ntophits, sq[t].start, False)
+
+                # reverse complement
+                do_strand = info.pli.do_bot and sq[t].abc.complement != NULL and (strands == NULL or strands[t] != b'+')
+                if do_strand and not (passed & SCREEN_BOTTOM):
+                    _account_screened(info.pli, sq[t], True)
+                    do_strand = False
+                if do_strand:
+                    # stop if the search was cancelled or timed out
+                    _check_interrupt(info)
+                    # allocate space for a copy
+                    if copy == NULL:
+                        copy = libeasel.sq.esl_sq_CreateDigital(info.pli.abc)
+                        if copy == NULL:
+                            raise AllocationError("ESL_SQ", sizeof(ESL_SQ))
+                    # copy sequence
+                    # FIXME: maybe we could avoid that if we used locks in the
+                    #        right place, but for now needed as the same
+                    #        DigitalSequenceBlock may be shared between threads
+                    #        and cause race conditions
+                    status = libeasel.sq.esl_sq_Copy(sq[t], copy)
+                    if status != libeasel.eslOK:
+                        raise UnexpectedError(status, "esl_sq_Copy")
+                    # reverse complement the copy we own locally
+                    status = libeasel.sq.esl_sq_ReverseComplement(copy)
+                    if status != libeasel.eslOK:
+                        raise UnexpectedError(status, "esl_sq_ReverseComplement")
+
+                    prv_pli_ntophits = info.th.N
+                    status = libinfernal.cm_pipeline.cm_Pipeline(
+                        info.pli,
+                        info.cm.offset,
+                        info.om,
+                        info.bg,
+                        info.p7_evparam,
+                        info.msvdata,
+                        copy,
+                        info.th,
+                        True, # reverse-complement
+                        NULL,
+                        &info.gm,
+                        &info.Rgm,
+                        &info.Lgm,
+                        &info.Tgm,
+                        &info.cm
+                    )
+                    if status != libeasel.eslOK:
+                        raise EaselError(status, info.pli.errbuf.decode('utf-8', 'ignore'))
+                    libinfernal.cm_pipeline.cm_pipeline_Reuse(info.pli)  # prepare for next search
+                    # if copy.C > 0:
+                    #     libinfernal.cm_pipeline.cm_pli_AdjustNresForOverlaps(info.pli, copy.C, True)
+                    libinfernal.cm_tophits.cm_tophits_UpdateHitPositions(info.th, prv_pli_ntophits, copy.start, True)
+
+                # prune the hit list to keep memory bounded
+                if info.max_hits >= 0 and info.th.N >= 2 * <uint64_t> info.max_hits:
+                    libinfernal.cm_tophits.cm_tophits_SortForOverlapRemoval(info.th)
+                    status = libinfernal.cm_tophits.cm_tophits_RemoveOrMarkOverlaps(info.th, False, info.pli.errbuf)
+                    if status != libeasel.eslOK:
+                        raise UnexpectedError(status, "cm_tophits_RemoveOrMarkOverlaps")
+                    if _prune_hits(info.th, info.max_hits):
+                        info.truncated = True
+
+        finally:
+            libeasel.sq.esl_sq_Destroy(copy)
+            free(screen.wlist.windows)
+            free(screen.dsq)
+            free(screen.offsets)
+            free(screen.passed)
+
+        # Return 0 to indicate success
+        return 0
+
+    cdef int _setup_search(
+        self,
+        WORKER_INFO* tinfo,
+        CM query,
+        TopHits top_hits,
+        float* p7_evparam,
+        bint configure = True,
+    ) except -1:
+        # adapted from `serial_master` in `cmsearch.c`, outer loop code
+        cdef int status
+        cdef int nbps
+
+        # check that all alphabets are consistent
+        if not self.alphabet._eq(query.alphabet):
+            raise AlphabetMismatch(self.alphabet, query.alphabet)
+
+        # ensure the CM defines a filter HMM
+        if query.filter_hmm is None:
+            raise ValueError(f"no filter HMM was found for CM {query.name!r}")
+
+        # use struct to keep track of current worker state
+        tinfo.p7_evparam = p7_evparam
+        tinfo.smxsize = 128.0
+        tinfo.cm = query._cm
+        tinfo.pli = self._pli  # Maybe copy?
+        tinfo.th = top_hits._th
+        tinfo.bg = self.background._bg
+        tinfo.Rgm = tinfo.Lgm = tinfo.Tgm = NULL
+        tinfo.msvdata = NULL
+        tinfo.max_hits = self._max_hits
+        tinfo.max_residues = self._max_residues
+        tinfo.truncated = False
+        tinfo.cancelled = &self._cancelled
+        tinfo.cancel_lock = self._cancel_lock
+        tinfo.deadline = -1 if self._max_time < 0 else _monotonic() + self._max_time
+        tinfo.next_signal_check = 0.0
+        tinfo.check_signals = threading.current_thread() is threading.main_thread()
+        tinfo.presize = False
+        tinfo.reseed_targets = self._reseed_targets
+        tinfo.short_targets = self._short_targets
+        tinfo.seed = self._seed
+
+        # check if we have E-value stats for the CM, we require them
+        # *unless* we are going to run the pipeline in HMM-only mode.
+        # We run the pipeline in HMM-only mode if --nohmmonly is
+        # not used and -g is not used and:
+        # (a) --hmmonly used OR
+        # (b) model has 0 basepairs
+        nbps = libinfernal.cm.CMCountNodetype(tinfo.cm, libinfernal.MATP_nd)
+        if (
+               self._pli.do_hmmonly_never
+            or self._pli.do_glocal_cm_always
+            or (not self._pli.do_hmmonly_always and nbps > 0)
+        ):
+            if not (tinfo.cm.flags & libinfernal.cm.CMH_EXPTAIL_STATS):
+                raise ValueError(f"no E-value parameters were found for CM {query.name!r}, it may need to be calibrated")
+
+        # configure the CM (this builds QDBs if nec) and setup HMM filters
+        # (we need to do this before clone_info()). We need a pipeline to
+        # do this only b/c we need pli->cm_config_opts.
+        #
+        if configure:
+            with nogil:
+                status = self._configure_cm(tinfo)
+            if status != libeasel.eslOK:
+                raise EaselError(status, tinfo.pli.errbuf.decode('utf-8', 'ignore'))
+        status = self._setup_hmm_filter(tinfo, query)
+        if status != libeasel.eslOK:
+            raise EaselError(status, tinfo.pli.errbuf.decode('utf-8', 'ignore'))
+
+        # make sure the pipeline is set to search mode
+        self._pli.mode = cm_pipemodes_e.CM_SEARCH_SEQS
+        return nbps
+
+    cdef int _finish_search(
+        self,
+        WORKER_INFO* tinfo,
+        TopHits top_hits,
+    ) except 1:
+        cdef int    status
+        cdef double eZ
+
+        with nogil:
+            # we need to re-compute e-values before merging (when list will be sorted)
+            if tinfo.pli.do_hmmonly_cur:
+                eZ = tinfo.pli.Z / <float> tinfo.om.max_length
+            else:
+                eZ = tinfo.cm.expA[tinfo.pli.final_cm_exp_mode].cur_eff_dbsize
+            libinfernal.cm_tophits.cm_tophits_ComputeEvalues(tinfo.th, eZ, 0)
+
+            # Sort by sequence index/position and remove duplicates
+            libinfernal.cm_tophits.cm_tophits_SortForOverlapRemoval(tinfo.th)
+            status = libinfernal.cm_tophits.cm_tophits_RemoveOrMarkOverlaps(tinfo.th, False, tinfo.pli.errbuf)
+            if status != libeasel.eslOK:
+                raise UnexpectedError(status, "cm_tophits_RemoveOrMarkOverlaps")
+
+            # Only retain the best hits if requested
+            if tinfo.max_hits >= 0 and _prune_hits(tinfo.th, tinfo.max_hits):
+                tinfo.truncated = True
+
+            # Resort: by score (usually) or by position (if in special 'terminate after F3' mode) */
+            if tinfo.pli.do_trm_F3:
+                status = libinfernal.cm_tophits.cm_tophits_SortByPosition(tinfo.th)
+                if status != libeasel.eslOK:
+                    raise UnexpectedError(status, "cm_tophits_SortByPosition")
+            else:
+                status = libinfernal.cm_tophits.cm_tophits_SortByEvalue(tinfo.th)
+                if status != libeasel.eslOK:
+                    raise UnexpectedError(status, "cm_tophits_SortByEvalue")
+
+            # Enforce threshold (and copy pipeline configuration) before returning
+            top_hits._threshold(self)
+
+        top_hits._empty = False
+        top_hits._truncated = tinfo.truncated
+        top_hits._max_hits = tinfo.max_hits
+        return 0
+
+    cdef int _interrupt_search(
+        self,
+        WORKER_INFO* tinfo,
+        TopHits top_hits,
+        BaseException err,
+    ) except 1:
+        # reset the cancellation flag so that the pipeline can be reused
+        self._set_cancelled(False)
+        # finish processing the hits found so far, and record them in the
+        # exception so that the caller can access the partial results
+        tinfo.truncated = True
+        self._finish_search(tinfo, top_hits)
+        err.hits = top_hits
+        return 0
+
+    cdef TopHits _search_block(
+        self,
+        CM query,
+        CM copy,
+        ESL_SQ** sequences,
+        size_t n_sequences,
+        int64_t target_offset,
+        const uint8_t* screened,
+        bint configure,
+    ):
+        # search a private copy of the query (configured already unless
+        # `configure` is set) against a block of targets, only running the
+        # complete pipeline on the strands flagged in `screened` if given,
+        # and report the hits for the original query
+        cdef float[CM_p7_NEVPARAM] p7_evparam
+        cdef WORKER_INFO           tinfo
+        cdef int                   nbps
+        cdef size_t                i
+        cdef size_t                n_targets  = n_sequences
+        cdef ESL_SQ**              targets    = sequences
+        cdef int64_t*              indices    = NULL
+        cdef int64_t*              duplicates = NULL
+        cdef TopHits               top_hits   = TopHits(query)
+
+        # configure the CM and the pipeline for the query
+        nbps = self._setup_search(&tinfo, copy, top_hits, p7_evparam, configure)
+
+        # use a private array of targets (with their original indices)
+        # if the targets need to be deduplicated or reordered
+        if self._deduplicate or self._sort_targets:
+            targets = <ESL_SQ**> malloc(sizeof(ESL_SQ*) * max(1, n_sequences))
+            indices = <int64_t*> malloc(sizeof(int64_t) * max(1, n_sequences))
+            if self._deduplicate:
+                duplicates = <int64_t*> malloc(sizeof(int64_t) * max(1, n_sequences))
+            if targets == NULL or indices == NULL or (self._deduplicate and duplicates == NULL):
+                free(targets)
+                free(indices)
+                free(duplicates)
+                raise AllocationError("ESL_SQ*", sizeof(ESL_SQ*), n_sequences)
+
+        try:
+            # group identical sequences to search each of them only once
+            if duplicates != NULL:
+                n_targets = self._deduplicate_targets(sequences, n_sequences, targets, indices, duplicates)
+            elif indices != NULL:
+                for i in range(n_targets):
+                    targets[i] = sequences[i]
+                    indices[i] = i
+            # search targets by increasing length
+            if self._sort_targets:
+                _sort_targets_by_length(targets, indices, n_targets)
+                tinfo.presize = True
+            try:
+                try:
+                    with nogil:
+                        # run the cmsearch loop on all database sequences while
+                        # recycling memory between targets
+                        Pipeline._search_loop(&tinfo, targets, n_targets, nbps, NULL, screened, indices)
+                finally:
+                    # report hits with the index of the targets in the block,
+                    # copying them to the duplicate targets, also when the
+                    # search was interrupted so that partial hits are valid
+                    if duplicates != NULL:
+                        with nogil:
+                            Pipeline._expand_duplicates(tinfo.th, sequences, indices, duplicates)
+                    elif indices != NULL:
+                        for i in range(tinfo.th.N):
+                            tinfo.th.unsrt[i].seq_idx = indices[tinfo.th.unsrt[i].seq_idx]
+                    # offset the indices when the block is a chunk of a larger
+                    # database, so that ties are broken like in a single search
+                    if target_offset != 0:
+                        for i in range(tinfo.th.N):
+                            tinfo.th.unsrt[i].seq_idx += target_offset
+            except (KeyboardInterrupt, TimeoutError) as err:
+                self._interrupt_search(&tinfo, top_hits, err)
+                raise
+        finally:
+            if indices != NULL:
+                free(targets)
+                free(indices)
+                free(duplicates)
+
+        self._finish_search(&tinfo, top_hits)
+        return top_hits
+
+    cpdef TopHits search_cm(
+        self,
+        CM query,
+        SearchTargets sequences,
+        int64_t target_offset=0,
+    ):
+        cdef float[CM_p7_NEVPARAM] p7_evparam
+        cdef WORKER_INFO           tinfo
+        cdef CM                    copy
+        cdef TopHits               top_hits   = TopHits(query)
+
+        # FIXME: as the pipeline also handles the configuration of the CM,
+        #        we need to first make a copy here otherwise the query is
+        #        left in configured state, which it unusable for subsequent
+        #        pipeline calls. Would be better to figure out how to simply
+        #        "deinitialize" the pipeline when done, and to use a lock/copy
+        #        in the `pyinfernal.infernal` Python code instead to manage
+        #        ownership
+        copy = query.copy()
+
+        # check that all alphabets are consistent
+        if not self.alphabet._eq(sequences.alphabet):
+            raise AlphabetMismatch(self.alphabet, sequences.alphabet)
+
+        if SearchTargets is SequenceFile:
+            # raise NotImplementedError("Pipeline.search_cm")
+            self._setup_search(&tinfo, copy, top_hits, p7_evparam)
+            self._finish_search(&tinfo, top_hits)
+            return top_hits
+        else:
+            return self._search_block(
+                query,
+                copy,
+                sequences._refs,
+                sequences._length,
+                target_offset,
+                NULL,
+                True,
+            )
+
+    cpdef list search_cms(
+        self,
+        object queries,
+        SearchBlock sequences,
+    ):
+        """Search several CMs against the same target sequences.
+
+        The SSV filter of every query is first run on each batch of
+        short targets while the batch is still in cache, so that the
+        target sequences are only streamed once from memory for all
+        the queries. The complete pipeline is then run for each query
+        only on the target strands that passed its filter.
+
+        Arguments:
+            queries (iterable of `~pyinfernal.cm.CM`): The covariance
+                models to search with.
+            sequences (`~pyhmmer.easel.DigitalSequenceBlock` or `~pyinfernal.cm.SequenceDatabase`):
+                The target sequences to search.
+
+        Returns:
+            `list` of `~pyinfernal.cm.TopHits`: The hits found for each
+            query, in the same order as the queries.
+
+        Note:
+            The results are the same as calling `Pipeline.search_cm`
+            for each query, clearing the pipeline between queries.
+            The queries are screened in batches of 16, so that the
+            memory used for their filters and for the screening results
+            only grows with the number of targets, whatever the number
+            of queries.
+
+        Hint:
+            Only targets shorter than 65,536 residues are screened, and
+            only when the SSV filter is the first stage of the pipeline
+            for a query (i.e. unless the pipeline is configured with
+            ``max=True`` or without the MSV or envelope definition
+            stages, for models with base pairs).
+
+        """
+        cdef list batch
+        cdef list results = []
+
+        # check that all alphabets are consistent
+        if not self.alphabet._eq(sequences.alphabet):
+            raise AlphabetMismatch(self.alphabet, sequences.alphabet)
+
+        # screen the queries in batches of bounded size, since the screening
+        # results take one byte per query and per target
+        queries = iter(queries)
+        batch = list(itertools.islice(queries, SCREEN_BATCH_QUERIES))
+        while batch:
+            if results:
+                self.clear()
+            results.extend(self._search_cms_batch(batch, sequences))
+            batch = list(itertools.islice(queries, SCREEN_BATCH_QUERIES))
+
+        return results
+
+    cdef list _search_cms_batch(
+        self,
+        list queries,
+        SearchBlock sequences,
+    ):
+        cdef int           status
+        cdef size_t        i
+        cdef int           nbps
+        cdef CM            query
+        cdef CM            copy
+        cdef WORKER_INFO   tinfo
+        cdef list          originals = []
+        cdef list          copies    = []
+        cdef list          profiles  = []
+        cdef list          opts      = []
+        cdef list          results   = []
+        cdef size_t        n_queries = 0
+        cdef _QueryScreen* screens   = NULL
+        cdef uint8_t*      screened  = NULL
+
+        # copy every query (see `Pipeline.search_cm`), and allocate the
+        # profiles for their filters
+        for query in queries:
+            if not self.alphabet._eq(query.alphabet):
+                raise AlphabetMismatch(self.alphabet, query.alphabet)
+            if query.filter_hmm is None:
+                raise ValueError(f"no filter HMM was found for CM {query.name!r}")
+            copy = query.copy()
+            originals.append(query)
+            copies.append(copy)
+            profiles.append(Profile(copy.M, self.alphabet))
+            opts.append(OptimizedProfile(copy.M, self.alphabet))
+        n_queries = len(copies)
+
+        screens = <_QueryScreen*> calloc(max(1, n_queries), sizeof(_QueryScreen))
+        screened = <uint8_t*> malloc(max(1, n_queries * sequences._length) * sizeof(uint8_t))
+        if screens == NULL or screened == NULL:
+            free(screens)
+            free(screened)
+            raise AllocationError("uint8_t", sizeof(uint8_t), n_queries * sequences._length)
+        for i in range(n_queries):
+            screens[i].cm = (<CM> copies[i])._cm
+            screens[i].gm = (<Profile> profiles[i])._gm
+            screens[i].om = (<OptimizedProfile> opts[i])._om
+
+        try:
+            # configure every query, and build its filter configured like
+            # the one built by `Pipeline._setup_hmm_filter`
+            tinfo.pli = self._pli
+            tinfo.smxsize = 128.0
+            with nogil:
+                for i in range(n_queries):
+                    tinfo.cm = screens[i].cm
+                    status = self._configure_cm(&tinfo)
+                    if status != libeasel.eslOK:
+                        raise EaselError(status, self._pli.errbuf.decode('utf-8', 'ignore'))
+                    status = libhmmer.modelconfig.p7_ProfileConfig(screens[i].cm.fp7, self.background._bg, screens[i].gm, 100, libhmmer.p7_LOCAL)
+                    if status != libeasel.eslOK:
+                        raise UnexpectedError(status, "p7_ProfileConfig")
+                    status = libhmmer.impl.p7_oprofile.p7_oprofile_Convert(screens[i].gm, screens[i].om)
+                    if status == libeasel.eslEMEM:
+                        raise AllocationError("P7_OPROFILE", sizeof(P7_OPROFILE))
+                    elif status != libeasel.eslOK:
+                        raise UnexpectedError(status, "p7_oprofile_Convert")
+                    screens[i].msvdata = libhmmer.p7_scoredata.p7_hmm_ScoreDataCreate(screens[i].om, NULL)
+                    if screens[i].msvdata == NULL:
+                        raise AllocationError("P7_SCOREDATA", sizeof(P7_SCOREDATA))
+                    # NOTE(@althonos): These replicate the model-dependent
+                    #                  settings made by `cm_pli_NewModel`, which
+                    #                  cannot be called here without updating
+                    #                  the pipeline accounting.
+                    nbps = libinfernal.cm.CMCountNodetype(screens[i].cm, libinfernal.MATP_nd)
+                    if self._pli.do_hmmonly_never or self._pli.do_glocal_cm_cur:
+                        screens[i].hmmonly = False
+                    else:
+                        screens[i].hmmonly = self._pli.do_hmmonly_always or nbps == 0
+                    screens[i].maxW = <int> max(self._pli.wmult * screens[i].cm.W, self._pli.cmult * screens[i].cm.clen)
+                    screens[i].enabled = not self._pli.do_max and (
+                        screens[i].hmmonly or (self._pli.do_msv and self._pli.do_edef)
+                    )
+
+            # screen all the targets with all the queries at once
+            with nogil:
+                _screen_queries(
+                    self._pli,
+                    self.background._bg,
+                    screens,
+                    n_queries,
+                    sequences._refs,
+                    sequences._length,
+                    screened,
+                )
+
+            # run the complete pipeline on the strands that passed
+            for i, (query, copy) in enumerate(zip(originals, copies)):
+                if i > 0:
+                    self.clear()
+                results.append(self._search_block(
+                    query,
+                    copy,
+                    sequences._refs,
+                    sequences._length,
+                    0,
+                    &screened[i * sequences._length],
+                    False,
+                ))
+        finally:
+            for i in range(n_queries):
+                libhmmer.p7_scoredata.p7_hmm_ScoreDataDestroy(screens[i].msvdata)
+            free(screens)
+            free(screened)
+
+        return results
+
+    cpdef TopHits search_regions(
+        self,
+        CM query,
+        SearchBlock sequences,
+        object regions,
+    ):
+        """Search a CM against selected regions of the target sequences.
+
+        Use this method when candidate regions are already known (for
+        instance, windows around HMM hits, or annotated gene neighbourhoods)
+        to avoid scanning the complete target sequences. Hit coordinates
+        are reported relative to the source sequences, as if the complete
+        sequences had been searched.
+
+        Arguments:
+            query (`~pyinfernal.cm.CM`): The covariance model to search
+                with.
+            sequences (`~pyhmmer.easel.DigitalSequenceBlock` or `~pyinfernal.cm.SequenceDatabase`):
+                The source sequences the regions refer to.
+            regions (iterable of `tuple`): The regions to search, given
+                as ``(sequence, start, end)`` or ``(sequence, start, end,
+                strand)`` tuples, where ``sequence`` is the name or the
+                index of a sequence in ``sequences``, ``start`` and ``end``
+                are 0-based, end-exclusive coordinates (as in the BED
+                format) given as integers or decimal strings, and ``strand`` is either ``"+"``, ``"-"``, or
+                ``"."``/`None` to search both strands. Rows with six
+                columns or more are read as BED6 rows, with the strand
+                in the sixth column.
+
+        Returns:
+            `~pyinfernal.cm.TopHits`: The hits found in the given regions.
+
+        Raises:
+            `KeyError`: When a region refers to an unknown sequence name.
+            `IndexError`: When a region refers to an invalid sequence index.
+            `ValueError`: When a region has invalid coordinates or strand,
+                including coordinates that cannot be parsed as integers.
+
+        Note:
+            The E-values are computed with the `Pipeline.Z` the pipeline
+            was configured with, so hits found in a region get the same
+            E-value as when searching the complete sequences with the
+            same ``Z``.
+
+        Hint:
+            Overlapping regions can be given: redundant hits found in
+            the overlapping parts are removed like overlapping hits
+            from different passes of the pipeline.
+
+        """
+        cdef float[CM_p7_NEVPARAM] p7_evparam
+        cdef WORKER_INFO           tinfo
+        cdef int                   nbps
+        cdef size_t                i
+        cdef ssize_t               n
+        cdef int64_t               start
+        cdef int64_t               end
+        cdef object                key
+        cdef object                region_start
+        cdef object                region_end
+        cdef object                strand
+        cdef tuple                 region
+        cdef ESL_SQ*               sq
+        cdef ESL_SQ*               subseq
+        cdef dict                  names
+        cdef list                  rows       = list(regions)
+        cdef size_t                n_regions  = len(rows)
+        cdef ESL_SQ**              subseqs    = NULL
+        cdef int64_t*              sources    = NULL
+        cdef char*                 strands    = NULL
+        cdef TopHits               top_hits   = TopHits(query)
+
+        # see `Pipeline.search_cm`
+        query = query.copy()
+
+        # check that all alphabets are consistent
+        if not self.alphabet._eq(sequences.alphabet):
+            raise AlphabetMismatch(self.alphabet, sequences.alphabet)
+
+        # configure the CM and the pipeline for the query
+        nbps = self._setup_search(&tinfo, query, top_hits, p7_evparam)
+
+        # allocate arrays for the subsequences
+        subseqs = <ESL_SQ**> calloc(max(1, n_regions), sizeof(ESL_SQ*))
+        sources = <int64_t*> malloc(max(1, n_regions) * sizeof(int64_t))
+        strands = <char*> malloc(max(1, n_regions) * sizeof(char))
+        if subseqs == NULL or sources == NULL or strands == NULL:
+            free(subseqs)
+            free(sources)
+            free(strands)
+            raise AllocationError("ESL_SQ*", sizeof(ESL_SQ*), n_regions)
+
+        try:
+            # extract the subsequences of each region
+            names = None
+            for i, row in enumerate(rows):
+                region = tuple(row)
+                if len(region) == 3:
+                    key, region_start, region_end = region
+                    strand = None
+                elif len(region) == 4:
+                    key, region_start, region_end, strand = region
+                elif len(region) >= 6:
+                    key, region_start, region_end = region[:3]
+                    strand = region[5]
+                else:
+                    raise ValueError(f"invalid region: {region!r}")
+                # rows read from a CSV or BED file hold the coordinates
+                # as strings, which need to be parsed explicitly
+                try:
+                    if isinstance(region_start, (str, bytes)):
+                        region_start = int(region_start)
+                    if isinstance(region_end, (str, bytes)):
+                        region_end = int(region_end)
+                    start = operator.index(region_start)
+                    end = operator.index(region_end)
+                except (TypeError, ValueError, OverflowError) as err:
+                    raise ValueError(f"invalid coordinates in region {i}: {region!r}") from err
+                # find the index of the source sequence
+                if isinstance(key, str):
+                    if names is None:
+                        names = {
+                            sequences._refs[j].name.decode():j
+                            for j in range(sequences._length)
+                        }
+                    sources[i] = names[key]
+                else:
+                    n = key
+                    if n < 0:
+                        n += sequences._length
+                    if n < 0 or n >= <ssize_t> sequences._length:
+                        raise IndexError(f"sequence index out of range: {key!r}")
+                    sources[i] = n
+                # check coordinates and strand
+                sq = sequences._refs[sources[i]]
+                if start < 0 or end > sq.n or start >= end:
+                    raise ValueError(f"invalid coordinates for sequence of length {sq.n}: {start!r}, {end!r}")
+                if strand is None or strand == ".":
+                    strands[i] = b'.'
+                elif strand == "+" or strand == "-":
+                    strands[i] = ord(strand)
+                else:
+                    raise ValueError(f"invalid strand: {strand!r}")
+                # copy the region into a new subsequence
+                subseqs[i] = subseq = _subsequence(sq, start, end)
+                if subseq == NULL:
+                    raise AllocationError("ESL_SQ", sizeof(ESL_SQ))
+            # run the search loop on the subsequences
+            try:
+                try:
+                    with nogil:
+                        Pipeline._search_loop(&tinfo, subseqs, n_regions, nbps, strands, NULL, NULL)
+                finally:
+                    # report hits with the index of the source sequences
+                    for i in range(tinfo.th.N):
+                        tinfo.th.unsrt[i].seq_idx = sources[tinfo.th.unsrt[i].seq_idx]
+            except (KeyboardInterrupt, TimeoutError) as err:
+                self._interrupt_search(&tinfo, top_hits, err)
+                raise
+        finally:
+            for i in range(n_regions):
+                libeasel.sq.esl_sq_Destroy(subseqs[i])
+            free(subseqs)
+            free(sources)
+            free(strands)
+
+        self._finish_search(&tinfo, top_hits)
+        return top_hits
+
+    cpdef TopHits search_indexed(
+        self,
+        CM query,
+        SearchBlock sequences,
+        SeedIndex index,
+        double threshold = 14.0,
+    ):
+        """Search a CM against the candidate windows of an indexed target.
+
+        The candidate windows of the query are obtained with
+        `SeedIndex.regions`, and searched with `Pipeline.search_regions`,
+        so that only the parts of the target sequences sharing a seed
+        with the query are searched.
+
+        Arguments:
+            query (`~pyinfernal.cm.CM`): The covariance model to search
+                with.
+            sequences (`~pyhmmer.easel.DigitalSequenceBlock` or `~pyinfernal.cm.SequenceDatabase`):
+                The target sequences, in the order they were given to
+                `SeedIndex.create`.
+            index (`~pyinfernal.cm.SeedIndex`): The seed index of the
+                target sequences.
+            threshold (`float`): The minimum score of a seed, in bits,
+                against the filter HMM of the CM.
+
+        Returns:
+            `~pyinfernal.cm.TopHits`: The hits found in the candidate
+            windows, with coordinates relative to the target sequences.
+
+        Raises:
+            `ValueError`: When the index was not created for the given
+                target sequences.
+
+        Caution:
+            Hits without a seed are not found, see `SeedIndex` for the
+            loss of sensitivity compared to `Pipeline.search_cm`. Like
+            with `Pipeline.search_regions`, the E-values are computed
+            with `Pipeline.Z`, which should be set to the size of the
+            complete targets.
+
+        """
+        cdef size_t i
+
+        if index._n_sequences != sequences._length:
+            raise ValueError(
+                f"seed index was created for {index._n_sequences} sequences, "
+                f"found {sequences._length}"
+            )
+        for i in range(sequences._length):
+            if <uint64_t> sequences._refs[i].n != index._starts[i+1] - index._starts[i]:
+                raise ValueError(f"seed index does not match the length of sequence {i}")
+
+        return self.search_regions(query, sequences, index.regions(query, threshold))
+
+
+cdef class Aligner:
+    """A covariance model aligner, configured to align sequences to a CM.
+
+    The aligner reimplements the per-sequence loop of ``cmalign``: by
+    default, each sequence is aligned with the optimal accuracy algorithm,
+    using HMM-banded DP matrices whose bands are tightened until the
+    matrices fit in ``mxsize`` megabytes.
+
+    Attributes:
+        cm (`~pyinfernal.cm.CM`): The CM sequences are aligned to.
+        alphabet (`~pyhmmer.easel.Alphabet`): The alphabet of the CM.
+
+    Caution:
+        An `Aligner` stores DP matrices that are reused between sequences,
+        and must not be used from several threads at once. Create one
+        `Aligner` per thread instead.
+
+    """
+
+    cdef CM_t*             _cm
+    cdef float             _mxsize
+    cdef bint              _truncated
+
+    cdef readonly CM       cm
+    cdef readonly Alphabet alphabet
+
+    def __cinit__(self):
+        self._cm = NULL
+        self.cm = None
+        self.alphabet = None
+
+    def __init__(
+        self,
+        CM cm not None,
+        *,
+        bint local = True,
+        bint truncated = True,
+        str algorithm = "optacc",
+        bint posteriors = True,
+        bint hbanded = True,
+        double tau = 1e-7,
+        double maxtau = 0.05,
+        double mxsize = 1024.0,
+    ):
+        """__init__(self, cm, *, local=True, truncated=True, algorithm="optacc", posteriors=True, hbanded=True, tau=1e-7, maxtau=0.05, mxsize=1024.0)\n--\n
+
+        Create a new aligner for the given CM.
+
+        Arguments:
+            cm (`~pyinfernal.cm.CM`): The CM to align sequences to.
+
+        Keyword Arguments:
+            local (`bool`): Whether to configure the CM for local alignment
+                rather than global alignment.
+            truncated (`bool`): Whether to use the truncated alignment
+                algorithms, for sequences that may be fragments. Sequences
+                that cannot be aligned in truncated mode are aligned again
+                in standard mode.
+            algorithm (`str`): The alignment algorithm to use, either
+                ``optacc`` for the optimal accuracy algorithm, or ``cyk``
+                for the CYK algorithm.
+            posteriors (`bool`): Whether to compute posterior probabilities
+                for each aligned residue.
+            hbanded (`bool`): Whether to accelerate alignment with bands
+                derived from the CM plan 9 HMM. Disabling the bands is
+                much slower and requires much more memory.
+            tau (`float`): The tail loss probability for the HMM bands.
+            maxtau (`float`): The maximum tail loss probability that can
+                be used when tightening HMM bands to fit the DP matrices
+                in ``mxsize``.
+            mxsize (`float`): The maximum size of the DP matrices, in
+                megabytes.
+
+        Raises:
+            `ValueError`: When the CM has been configured in local mode,
+                or when an invalid option is given.
+
+        """
+        cdef int                 status
+        cdef char[eslERRBUFSIZE] errbuf
+        cdef CM_t*               copy   = NULL
+
+        if cm._cm.flags & (libinfernal.cm.CMH_LOCAL_BEGIN | libinfernal.cm.CMH_LOCAL_END):
+            raise ValueError("cannot create an aligner for a CM configured in local mode")
+        if algorithm not in ("optacc", "cyk"):
+            raise InvalidParameter("algorithm", algorithm, choices=["optacc", "cyk"])
+        if not 1e-18 < tau < 1.0:
+            raise InvalidParameter("tau", tau, hint="real number between 1e-18 and 1")
+        if not 0.0 < maxtau < 0.5:
+            raise InvalidParameter("maxtau", maxtau, hint="real number between 0 and 0.5")
+        if mxsize <= 0.0:
+            raise InvalidParameter("mxsize", mxsize, hint="strictly positive number")
+
+        with nogil:
+            status = libinfernal.cm.cm_Clone(cm._cm, errbuf, &copy)
+        if status == libeasel.eslEMEM:
+            raise AllocationError("CM_t", sizeof(CM_t))
+        elif status != libeasel.eslOK:
+            raise EaselError(status, errbuf.decode("utf-8", "ignore"))
+
+        # configure the CM like `initialize_cm` in `cmalign.c`
+        if algorithm == "cyk":
+            copy.align_opts |= libinfernal.cm.CM_ALIGN_CYK
         else:
-            self._pli.T = T
-            self._pli.by_E = False
+            copy.align_opts |= libinfernal.cm.CM_ALIGN_OPTACC
+        if hbanded:
+            copy.align_opts |= libinfernal.cm.CM_ALIGN_HBANDED | libinfernal.cm.CM_ALIGN_XTAU
+        else:
+            copy.align_opts |= libinfernal.cm.CM_ALIGN_NONBANDED
+            copy.config_opts |= libinfernal.cm.CM_CONFIG_NONBANDEDMX
+        if posteriors:
+            copy.align_opts |= libinfernal.cm.CM_ALIGN_POST
+        if truncated:
+            copy.align_opts |= libinfernal.cm.CM_ALIGN_TRUNC
+            copy.config_opts |= libinfernal.cm.CM_CONFIG_TRUNC
+        if local:
+            copy.config_opts |= libinfernal.cm.CM_CONFIG_LOCAL
+            copy.config_opts |= libinfernal.cm.CM_CONFIG_HMMLOCAL
+            copy.config_opts |= libinfernal.cm.CM_CONFIG_HMMEL
+        copy.tau = tau
+        copy.maxtau = maxtau
+
+        with nogil:
+            status = libinfernal.cm_modelconfig.cm_Configure(copy, errbuf, -1)
+        if status != libeasel.eslOK:
+            libinfernal.cm.FreeCM(copy)
+            raise EaselError(status, errbuf.decode("utf-8", "ignore"))
+
+        self._cm = copy
+        self._mxsize = mxsize
+        self._truncated = truncated and hbanded
+        self.cm = cm
+        self.alphabet = cm.alphabet
+
+    def __dealloc__(self):
+        if self._cm != NULL:
+            libinfernal.cm.FreeCM(self._cm)
+
+    # --- Properties ---------------------------------------------------------
 
     @property
-    def incE(self):
-        """`float`: The per-target E-value threshold for including a hit.
+    def mxsize(self):
+        """`float`: The maximum size of the DP matrices, in megabytes.
         """
-        assert self._pli != NULL
-        return self._pli.incE
+        return self._mxsize
 
-    @incE.setter
-    def incE(self, double incE):
-        assert self._pli != NULL
-        self._pli.incE = incE
+    # --- Methods ------------------------------------------------------------
 
-    @property
-    def incT(self):
-        """`float` or `None`: The per-target score threshold for including a hit.
+    cpdef DigitalMSA align(self, DigitalSequenceBlock sequences):
+        """Align a block of sequences to the CM.
 
-        If set to a non-`None` value, this threshold takes precedence over
-        the per-target E-value inclusion threshold (`Pipeline.incE`).
+        Arguments:
+            sequences (`~pyhmmer.easel.DigitalSequenceBlock`): The
+                sequences to align.
+
+        Returns:
+            `~pyhmmer.easel.DigitalMSA`: The multiple sequence alignment
+            of the sequences to the CM, in the same order as the input,
+            with the consensus structure and posterior probabilities
+            annotated.
+
+        Raises:
+            `~pyhmmer.errors.AlphabetMismatch`: When the sequences are not
+                in the same alphabet as the CM.
+            `~pyhmmer.errors.EaselError`: When a sequence cannot be
+                aligned, for instance because the DP matrices needed to
+                align it exceed ``mxsize``.
+
+        Example:
+            >>> seq = easel.TextSequence(
+            ...     name="tRNA-1",
+            ...     sequence="GCCGAUAUAGCUCAGUUGGUAGAGCAGCGCAUUCGUAAUGCGAAGGUCGUAGGUUCGAUUCCUAUUAUCGGCA",
+            ... )
+            >>> block = easel.TextSequenceBlock([seq]).digitize(trna.alphabet)
+            >>> aligner = Aligner(trna)
+            >>> msa = aligner.align(block)
+            >>> msa.names
+            ('tRNA-1',)
 
         """
-        assert self._pli != NULL
-        return None if self._pli.inc_by_E else self._pli.incT
+        assert self._cm != NULL
 
-    @incT.setter
-    def incT(self, object incT):
-        assert self._pli != NULL
-        if incT is None:
-            self._pli.incT = 0.0
-            self._pli.inc_by_E = True
+        cdef int                 status
+        cdef size_t              i
+        cdef int                 pass_idx
+        cdef char[eslERRBUFSIZE] errbuf
+        cdef ESL_MSA*            msa      = NULL
+        cdef CM_ALNDATA**        data     = NULL
+        cdef ESL_SQ**            sqs      = NULL
+        cdef Parsetree_t**       trs      = NULL
+        cdef char**              ppstrs   = NULL
+        cdef DigitalMSA          py_msa
+        cdef ssize_t             failed   = -1
+        cdef size_t              n        = len(sequences)
+
+        if sequences.alphabet != self.alphabet:
+            raise AlphabetMismatch(self.alphabet, sequences.alphabet)
+        if n == 0:
+            return DigitalMSA(self.alphabet)
+
+        if self._cm.align_opts & libinfernal.cm.CM_ALIGN_TRUNC:
+            pass_idx = libinfernal.cm_pipeline.PLI_PASS_5P_AND_3P_FORCE
         else:
-            self._pli.incT = incT
-            self._pli.inc_by_E = False
+            pass_idx = libinfernal.cm_pipeline.PLI_PASS_STD_ANY
 
-    # --- Utils --------------------------------------------------------------
+        try:
+            data = <CM_ALNDATA**> calloc(n, sizeof(CM_ALNDATA*))
+            sqs = <ESL_SQ**> calloc(n, sizeof(ESL_SQ*))
+            trs = <Parsetree_t**> calloc(n, sizeof(Parsetree_t*))
+            ppstrs = <char**> calloc(n, sizeof(char*))
+            if data == NULL or sqs == NULL or trs == NULL or ppstrs == NULL:
+                raise AllocationError("CM_ALNDATA*", sizeof(CM_ALNDATA*), n)
 
-    cpdef void clear(self):
-        """Reset the pipeline to its default state.
-        """
-        assert self._pli != NULL
+            with nogil:
+                for i in range(n):
+                    status = libinfernal.cm_alndata.DispatchSqAlignment(
+                        self._cm, errbuf, sequences._refs[i], i, self._mxsize,
+                        libinfernal.cm_alndata.TRMODE_UNKNOWN, pass_idx, False,
+                        NULL, NULL, NULL, &data[i]
+                    )
+                    # NOTE(@althonos): Like `cmalign`, retry sequences that
+                    #                  could not be aligned in truncated mode
+                    #                  with the standard algorithms.
+                    if status == libeasel.eslEAMBIGUOUS and self._truncated:
+                        self._cm.align_opts &= ~libinfernal.cm.CM_ALIGN_TRUNC
+                        status = libinfernal.cm_alndata.DispatchSqAlignment(
+                            self._cm, errbuf, sequences._refs[i], i, self._mxsize,
+                            libinfernal.cm_alndata.TRMODE_UNKNOWN, libinfernal.cm_pipeline.PLI_PASS_STD_ANY, False,
+                            NULL, NULL, NULL, &data[i]
+                        )
+                        self._cm.align_opts |= libinfernal.cm.CM_ALIGN_TRUNC
+                    if status != libeasel.eslOK:
+                        failed = i
+                        break
+                    sqs[i] = data[i].sq
+                    trs[i] = data[i].tr
+                    ppstrs[i] = data[i].ppstr
+                if status == libeasel.eslOK:
+                    status = libinfernal.cm_parsetree.Parsetrees2Alignment(
+                        self._cm, errbuf, self._cm.abc, sqs, NULL, trs, ppstrs, n,
+                        NULL, NULL, True, False, False, &msa
+                    )
+                if status == libeasel.eslOK:
+                    status = libeasel.msa.esl_msa_Digitize(self._cm.abc, msa, errbuf)
 
-        cdef int      status
-        cdef int      i
-        cdef uint32_t seed
+            if status == libeasel.eslEMEM:
+                raise AllocationError("ESL_MSA", sizeof(ESL_MSA))
+            elif status != libeasel.eslOK:
+                if failed >= 0:
+                    raise EaselError(status, f"failed to align {sequences[failed].name!r}: {errbuf.decode('utf-8', 'ignore')}")
+                raise EaselError(status, errbuf.decode("utf-8", "ignore"))
 
-        # reinitialize the random number generator, even if
-        # `self._pli.do_reseeding` is False, because a true
-        # deallocation/reallocation of a P7_PIPELINE would reinitialize
-        # it unconditionally.
-        self.randomness.seed(self._seed)
+            py_msa = DigitalMSA.__new__(DigitalMSA, self.alphabet)
+            py_msa._msa = msa
+            msa = NULL
+            return py_msa
 
-        # reinitialize the domaindef
-        status = libhmmer.p7_domaindef.p7_domaindef_Reuse(self._pli.ddef)
+        finally:
+            if msa != NULL:
+                libeasel.msa.esl_msa_Destroy(msa)
+            if data != NULL:
+                for i in range(n):
+                    libinfernal.cm_alndata.cm_alndata_Destroy(data[i], False)
+                free(data)
+            free(sqs)
+            free(trs)
+            free(ppstrs)
+
+
+cdef P7_PRIOR* _builder_p7_prior() noexcept nogil:
+    # create the default prior of filter HMMs (see `cm_p7_prior_CreateNucleic`
+    # in `cmbuild.c`), with the HMMER nucleic transition priors and a
+    # 4-component mixture Dirichlet for match emissions
+    cdef int       q
+    cdef P7_PRIOR* pri = <P7_PRIOR*> calloc(1, sizeof(P7_PRIOR))
+    cdef double[4] defmq = [0.079226, 0.259549, 0.241578, 0.419647]
+    cdef double[4][4] defm = [
+        [1.294511, 0.400028, 6.579555, 0.509916],
+        [0.090031, 0.028634, 0.086396, 0.041186],
+        [0.158085, 0.448297, 0.114815, 0.394151],
+        [1.740028, 1.487773, 1.565443, 1.947555],
+    ]
+
+    if pri == NULL:
+        return NULL
+
+    pri.tm = libeasel.mixdchlet.esl_mixdchlet_Create(1, 3)
+    pri.ti = libeasel.mixdchlet.esl_mixdchlet_Create(1, 2)
+    pri.td = libeasel.mixdchlet.esl_mixdchlet_Create(1, 2)
+    pri.em = libeasel.mixdchlet.esl_mixdchlet_Create(4, 4)
+    pri.ei = libeasel.mixdchlet.esl_mixdchlet_Create(1, 4)
+    if pri.tm == NULL or pri.ti == NULL or pri.td == NULL or pri.em == NULL or pri.ei == NULL:
+        libhmmer.p7_prior.p7_prior_Destroy(pri)
+        return NULL
+
+    pri.tm.q[0] = 1.0
+    pri.tm.alpha[0][0] = 2.0 # TMM
+    pri.tm.alpha[0][1] = 0.1 # TMI
+    pri.tm.alpha[0][2] = 0.1 # TMD
+    pri.ti.q[0] = 1.0
+    pri.ti.alpha[0][0] = 0.06 # TIM
+    pri.ti.alpha[0][1] = 0.2  # TII
+    pri.td.q[0] = 1.0
+    pri.td.alpha[0][0] = 0.1 # TDM
+    pri.td.alpha[0][1] = 0.2 # TDD
+    for q in range(4):
+        pri.em.q[q] = defmq[q]
+        libeasel.vec.esl_vec_DCopy(defm[q], 4, pri.em.alpha[q])
+    pri.ei.q[0] = 1.0
+    libeasel.vec.esl_vec_DSet(pri.ei.alpha[0], 4, 1.0)
+
+    return pri
+
+
+cdef int _builder_weight(ESL_MSA* msa) except 1:
+    # compute position-based weights ignoring the reference annotation
+    # (see `set_relative_weights` in `cmbuild.c`)
+    cdef int                status
+    cdef ESL_MSAWEIGHT_CFG* cfg    = libeasel.msaweight.esl_msaweight_cfg_Create()
+
+    if cfg == NULL:
+        raise AllocationError("ESL_MSAWEIGHT_CFG", sizeof(ESL_MSAWEIGHT_CFG))
+    cfg.ignore_rf = True
+    with nogil:
+        status = libeasel.msaweight.esl_msaweight_PB_adv(cfg, msa, NULL)
+    libeasel.msaweight.esl_msaweight_cfg_Destroy(cfg)
+
+    if status == libeasel.eslEMEM:
+        raise AllocationError("double", sizeof(double), msa.nseq)
+    elif status != libeasel.eslOK:
+        raise UnexpectedError(status, "esl_msaweight_PB_adv")
+    return 0
+
+
+cdef int _builder_mark_fragments(ESL_MSA* msa, float fragthresh) except 1:
+    # replace the terminal gaps of fragments with missing data (see
+    # `mark_fragments` in `cmbuild.c`)
+    cdef int                status
+    cdef int                i
+    cdef int64_t            pos
+    cdef ESL_ALPHABET*      abc        = <ESL_ALPHABET*> msa.abc
+    cdef ESL_BITFIELD*      fragassign = NULL
+
+    with nogil:
+        status = libeasel.msa.esl_msa_MarkFragments(msa, fragthresh, &fragassign)
+        if status == libeasel.eslOK:
+            for i in range(msa.nseq):
+                if not libeasel.bitfield.esl_bitfield_IsSet(fragassign, i):
+                    continue
+                for pos in range(1, msa.alen + 1):
+                    if libeasel.alphabet.esl_abc_XIsResidue(abc, msa.ax[i][pos]):
+                        break
+                    msa.ax[i][pos] = libeasel.alphabet.esl_abc_XGetMissing(abc)
+                for pos in range(msa.alen, 0, -1):
+                    if libeasel.alphabet.esl_abc_XIsResidue(abc, msa.ax[i][pos]):
+                        break
+                    msa.ax[i][pos] = libeasel.alphabet.esl_abc_XGetMissing(abc)
+        libeasel.bitfield.esl_bitfield_Destroy(fragassign)
+
+    if status == libeasel.eslEMEM:
+        raise AllocationError("ESL_BITFIELD", sizeof(ESL_BITFIELD))
+    elif status != libeasel.eslOK:
+        raise UnexpectedError(status, "esl_msa_MarkFragments")
+    return 0
+
+
+cdef int _builder_build_model(
+    ESL_MSA* msa,
+    float symfrac,
+    float* null,
+    const Prior_t* pri,
+    const Prior_t* pri_zerobp,
+    CM_t** ret_cm,
+) except 1:
+    # build a CM from an alignment and collect the weighted observed
+    # counts (see `build_model` in `cmbuild.c`)
+    cdef int                 status
+    cdef int                 i
+    cdef int                 v
+    cdef int                 a
+    cdef int                 nstates  = 0
+    cdef bint                pretend
+    cdef const Prior_t*      pri2use
+    cdef char[eslERRBUFSIZE] errbuf
+    cdef int                 K        = msa.abc.K
+    cdef CM_t*               cm       = NULL
+    cdef CM_t*               balanced = NULL
+    cdef Parsetree_t*        mtr      = NULL
+    cdef Parsetree_t**       trs      = NULL
+    cdef int*                used_el  = NULL
+    cdef double**            dbl_e    = NULL
+
+    with nogil:
+        status = libinfernal.cm_modelmaker.HandModelmaker(msa, errbuf, False, False, True, symfrac, &cm, &mtr)
+    if status != libeasel.eslOK:
+        raise EaselError(status, errbuf.decode("utf-8", "ignore"))
+
+    try:
+        libinfernal.cm.CMSetNullModel(cm, null)
+        with nogil:
+            status = libinfernal.cm.CMRebalance(cm, errbuf, &balanced)
         if status != libeasel.eslOK:
-            raise UnexpectedError(status, "p7_domaindef_Reuse")
+            raise EaselError(status, errbuf.decode("utf-8", "ignore"))
+        libinfernal.cm.FreeCM(cm)
+        cm, balanced = balanced, NULL
+        nstates = cm.M
+
+        trs = <Parsetree_t**> calloc(msa.nseq, sizeof(Parsetree_t*))
+        used_el = <int*> calloc(msa.alen + 1, sizeof(int))
+        dbl_e = <double**> calloc(cm.M, sizeof(double*))
+        if trs == NULL or used_el == NULL or dbl_e == NULL:
+            raise AllocationError("Parsetree_t*", sizeof(Parsetree_t*), msa.nseq)
+
+        # use the H3-like prior for models without base pairs
+        pretend = libinfernal.cm.CMCountNodetype(cm, libinfernal.MATP_nd) == 0
+        pri2use = pri_zerobp if pretend else pri
 
         with nogil:
-            # reinitialize the dynamic programming matrices
-            # (no status check, infallible)
-            libhmmer.impl.p7_omx.p7_omx_Reuse(self._pli.oxf)
-            libhmmer.impl.p7_omx.p7_omx_Reuse(self._pli.oxb)
-            libhmmer.impl.p7_omx.p7_omx_Reuse(self._pli.fwd)
-            libhmmer.impl.p7_omx.p7_omx_Reuse(self._pli.bck)
-            libhmmer.p7_gmx.p7_gmx_Reuse(self._pli.gxf)
-            libhmmer.p7_gmx.p7_gmx_Reuse(self._pli.gxb)
-            libhmmer.p7_gmx.p7_gmx_Reuse(self._pli.gfwd)
-            libhmmer.p7_gmx.p7_gmx_Reuse(self._pli.gbck)
-            # Reset accounting values
-            self._pli.nseqs           = 0
-            self._pli.nmodels         = 0
-            self._pli.nnodes          = 0
-            self._pli.nmodels_hmmonly = 0
-            self._pli.nnodes_hmmonly  = 0
-            self._pli.cmfp            = NULL
-            self._pli.errbuf[0]       = b'\0'
-            # Reset pipeline accounting statistics
-            for i in range(libinfernal.cm_pipeline.NPLI_PASSES):
-                libinfernal.cm_pipeline.cm_pli_ZeroAccounting(&self._pli.acct[i])
+            for i in range(msa.nseq):
+                status = libinfernal.cm_modelmaker.Transmogrify(cm, errbuf, mtr, msa.ax[i], used_el, msa.alen, &trs[i])
+                if status == libeasel.eslOK and pretend:
+                    status = libinfernal.cm_parsetree.cm_parsetree_Doctor(cm, errbuf, trs[i], NULL, NULL)
+                if status != libeasel.eslOK:
+                    break
+                libinfernal.cm_parsetree.ParsetreeCountExceptTruncatedMPs(cm, trs[i], msa.ax[i], msa.wgt[i])
+        if status != libeasel.eslOK:
+            raise EaselError(status, errbuf.decode("utf-8", "ignore"))
 
-    cdef int _configure_cm(
-        self,
-        WORKER_INFO* info,
-    ) noexcept nogil:
-        cdef int   status
-        cdef float reqMb  = 0.0
-        cdef bint check_fcyk_beta
-        cdef bint check_final_beta
-        cdef int  W_from_cmdline
+        # NOTE(@althonos): Like `cmbuild`, keep a stable copy of the base
+        #                  pair counts so that the counts of truncated MP
+        #                  emissions do not depend on the sequence order.
+        for v in range(cm.M):
+            if cm.sttype[v] == libinfernal.MP_st:
+                dbl_e[v] = <double*> malloc(K * K * sizeof(double))
+                if dbl_e[v] == NULL:
+                    raise AllocationError("double", sizeof(double), K * K)
+                for a in range(K * K):
+                    dbl_e[v][a] = cm.e[v][a]
+        with nogil:
+            for i in range(msa.nseq):
+                libinfernal.cm_parsetree.ParsetreeCountOnlyTruncatedMPs(cm, trs[i], msa.ax[i], msa.wgt[i], dbl_e, pri2use)
+        cm.nseq = msa.nseq
+        cm.eff_nseq = msa.nseq
 
-        if (info.pli.cm_config_opts & libinfernal.cm.CM_CONFIG_SCANMX) != 0:
-            reqMb += libinfernal.cm_mx.cm_scan_mx_SizeNeeded(info.cm, True, True)
-        if (info.pli.cm_config_opts & libinfernal.cm.CM_CONFIG_TRSCANMX) != 0:
-            reqMb += libinfernal.cm_mx.cm_tr_scan_mx_SizeNeeded(info.cm, True, True)
-        if reqMb > info.smxsize:
-            return libeasel.eslERANGE
-            # ESL_FAIL(eslERANGE, info->pli->errbuf, "search will require %.2f Mb > %.2f Mb limit.\nIncrease limit with --smxsize, or don't use --max,--nohmm,--qdb,--fqdb.", reqMb, info->smxsize);
+        status = libinfernal.cm_modelmaker.cm_zero_flanking_insert_counts(cm, errbuf)
+        if status != libeasel.eslOK:
+            raise EaselError(status, errbuf.decode("utf-8", "ignore"))
+        libinfernal.cm_modelmaker.cm_find_and_detach_dual_inserts(cm, True, False)
+
+        if cm.emap == NULL:
+            cm.emap = libinfernal.display.CreateEmitMap(cm)
+        cm.el_selfsc = libinfernal.sreLOG2(libinfernal.DEFAULT_EL_SELFPROB)
+        cm.beta_W = libinfernal.DEFAULT_BETA_W
+        cm.qdbinfo.beta1 = libinfernal.DEFAULT_BETA_QDB1
+        cm.qdbinfo.beta2 = libinfernal.DEFAULT_BETA_QDB2
+        cm.null2_omega = libinfernal.DEFAULT_NULL2_OMEGA
+        cm.null3_omega = libinfernal.DEFAULT_NULL3_OMEGA
+
+        ret_cm[0], cm = cm, NULL
+    finally:
+        if dbl_e != NULL:
+            for v in range(nstates):
+                free(dbl_e[v])
+            free(dbl_e)
+        if cm != NULL:
+            libinfernal.cm.FreeCM(cm)
+        if balanced != NULL:
+            libinfernal.cm.FreeCM(balanced)
+        if mtr != NULL:
+            libinfernal.cm_parsetree.FreeParsetree(mtr)
+        if trs != NULL:
+            for i in range(msa.nseq):
+                if trs[i] != NULL:
+                    libinfernal.cm_parsetree.FreeParsetree(trs[i])
+            free(trs)
+        free(used_el)
+
+    return 0
+
+
+cdef int _builder_parameterize(CM_t* cm, const Prior_t* pri) except 1:
+    # convert the counts of a CM to probabilities (see `parameterize`
+    # and `flatten_insert_emissions` in `cmbuild.c`)
+    cdef int v
+    cdef int K = cm.abc.K
+
+    with nogil:
+        libinfernal.prior.PriorifyCM(cm, pri)
+        libinfernal.cm_modelmaker.cm_find_and_detach_dual_inserts(cm, False, True)
+        # set all insert emission probabilities to the null probabilities
+        libeasel.vec.esl_vec_FNorm(cm.null, K)
+        for v in range(cm.M):
+            if cm.sttype[v] == libinfernal.IL_st or cm.sttype[v] == libinfernal.IR_st:
+                libeasel.vec.esl_vec_FSet(cm.e[v], K * K, 0.0)
+                libeasel.vec.esl_vec_FCopy(cm.null, K, cm.e[v])
+        libinfernal.cm.CMRenormalize(cm)
+
+    return 0
+
+
+cdef int _builder_configure(CM_t* cm) except 1:
+    # configure a CM to compute its QDBs and W (see `configure_model`
+    # in `cmbuild.c`)
+    cdef int                 status
+    cdef char[eslERRBUFSIZE] errbuf
+
+    cm.config_opts |= libinfernal.cm.CM_CONFIG_QDB
+    with nogil:
+        status = libinfernal.cm_modelconfig.cm_Configure(cm, errbuf, -1)
+    if status != libeasel.eslOK:
+        raise EaselError(status, errbuf.decode("utf-8", "ignore"))
+    return 0
+
+
+cdef class Builder:
+    """A factory for covariance models built from multiple sequence alignments.
+
+    The builder reimplements the default pipeline of ``cmbuild``: the
+    alignment is weighted with the position-based method, a CM is
+    built from its consensus structure, parameterized with entropy
+    weighting and the default Infernal priors, and given a calibrated
+    filter HMM.
 
-        # cm_pipeline_Create() sets configure/align options in pli->cm_config_opts, pli->cm_align_opts
-        # NOTE: is this really necessary? we want to avoid modifying CM which is the query
-        #       if we can help it
-        info.cm.config_opts = info.pli.cm_config_opts
-        info.cm.align_opts  = info.pli.cm_align_opts
+    Attributes:
+        alphabet (`~pyhmmer.easel.Alphabet`): The alphabet of the CMs
+            to build.
+        symfrac (`float`): The minimum fraction of non-gap residues
+            for a column to be a consensus column.
+        fragthresh (`float`): The threshold below which a sequence
+            spanning less than this fraction of the alignment length
+            is considered a fragment.
+        esigma (`float`): The *sigma* parameter used to compute the
+            target relative entropy of the CM.
+        eminseq (`float`): The minimum effective sequence number.
+
+    Caution:
+        A `Builder` stores a random number generator used to build the
+        filter HMMs, and must not be used from several threads at once.
+        Use `Builder.copy` to get one `Builder` per thread instead.
+
+    Note:
+        CMs built from an alignment have no E-value parameters, which
+        must be computed with `CM.calibrate` before searching for hits
+        with the CM stages of a `~pyinfernal.cm.Pipeline`.
 
-        # check if we need to recalculate QDBs prior to building the scan matrix in cm_Configure()
-        check_fcyk_beta  = (info.pli.fcyk_cm_search_opts & libinfernal.cm.CM_SEARCH_QDB) != 0
-        check_final_beta = (info.pli.final_cm_search_opts & libinfernal.cm.CM_SEARCH_QDB) != 0
-        if libinfernal.cm_qdband.CheckCMQDBInfo(info.cm.qdbinfo, info.pli.fcyk_beta, check_fcyk_beta, info.pli.final_beta, check_final_beta) != libeasel.eslOK:
-            info.cm.config_opts  |= libinfernal.cm.CM_CONFIG_QDB
-            info.cm.qdbinfo.beta1 = info.pli.fcyk_beta
-            info.cm.qdbinfo.beta2 = info.pli.final_beta
+    """
 
-        W_from_cmdline = -1 if not info.pli.do_wcx else <int> (info.cm.clen * info.pli.wcx)
-        return libinfernal.cm_modelconfig.cm_Configure(info.cm, info.pli.errbuf, W_from_cmdline)
+    cdef Prior_t*           _pri
+    cdef Prior_t*           _pri_zerobp
+    cdef float*             _null
+    cdef P7_BUILDER*        _bld
+    cdef P7_BG*             _bg
+    cdef double             _ere
+    cdef double             _emaxseq
+    cdef double             _p7ere
+
+    cdef readonly Alphabet  alphabet
+    cdef readonly float     symfrac
+    cdef readonly float     fragthresh
+    cdef readonly double    esigma
+    cdef readonly double    eminseq
 
-    cdef int _grow_profiles(
-        self,
-        CM query,
-    ) except 1:
-        cdef int M = query.M
-        if self.profile._gm.allocM < M:
-            self.profile = Profile(M, self.alphabet)
-            self.opt = OptimizedProfile(M, self.alphabet)
-            self.profile_r = Profile(M, self.alphabet)
-            self.profile_l = Profile(M, self.alphabet)
-            self.profile_t = Profile(M, self.alphabet)
-        else:
-            self.profile.clear()
-            self.profile_r.clear()
-            self.profile_l.clear()
-            self.profile_t.clear()
+    def __cinit__(self):
+        self._pri = NULL
+        self._pri_zerobp = NULL
+        self._null = NULL
+        self._bld = NULL
+        self._bg = NULL
+        self.alphabet = None
 
-    cdef int _setup_hmm_filter(
+    def __init__(
         self,
-        WORKER_INFO* info,
-        CM query,
-    ) except 1:
-        cdef int status
-        cdef bint do_trunc_ends = True #(esl_opt_GetBoolean(go, "--notrunc") || esl_opt_GetBoolean(go, "--inttrunc")) ? FALSE : TRUE;
+        Alphabet alphabet not None,
+        *,
+        float symfrac = 0.5,
+        float fragthresh = 0.5,
+        object ere = None,
+        double esigma = 45.0,
+        double eminseq = 0.1,
+        object emaxseq = None,
+        object p7ere = None,
+    ):
+        """__init__(self, alphabet, *, symfrac=0.5, fragthresh=0.5, ere=None, esigma=45.0, eminseq=0.1, emaxseq=None, p7ere=None)\n--\n
 
-        # set up the HMM filter-related structures
-        self._grow_profiles(query)
-        info.gm = self.profile._gm
-        info.om = self.opt._om
-        info.bg = self.background._bg
-        self.profile.configure(query.filter_hmm, self.background, 100, multihit=True, local=True)
-        self.opt.convert(self.profile) # <om> is now p7_LOCAL, multihit
+        Create a new builder for the given alphabet.
 
-        # clone gm into Tgm before putting it into glocal mode
-        if do_trunc_ends:
-            status = libhmmer.p7_profile.p7_profile_Copy(self.profile._gm, self.profile_t._gm)
-            if status != libeasel.eslOK:
-                raise UnexpectedError(status, "p7_profile_Copy")
+        Arguments:
+            alphabet (`~pyhmmer.easel.Alphabet`): The alphabet of the
+                alignments to build CMs from.
+
+        Keyword Arguments:
+            symfrac (`float`): The minimum fraction of non-gap residues
+                for a column to be a consensus column.
+            fragthresh (`float`): The alignment length fraction below
+                which a sequence is considered a fragment.
+            ere (`float`, optional): The minimum target relative entropy
+                per position of the CM. If `None` given, use the default
+                target of ``cmbuild``, which requires an RNA alphabet.
+            esigma (`float`): The *sigma* parameter used to compute the
+                target relative entropy of the CM.
+            eminseq (`float`): The minimum effective sequence number.
+            emaxseq (`float`, optional): The maximum effective sequence
+                number. If `None` given, use the number of sequences in
+                the alignment.
+            p7ere (`float`, optional): The minimum target relative
+                entropy per position of the filter HMM. If `None` given,
+                use the default target of ``cmbuild``.
 
-        # after om has been created, convert gm to glocal, to define envelopes in cm_pipeline()
-        self.profile.configure(query.filter_hmm, self.background, 100, multihit=True, local=False)
+        Raises:
+            `ValueError`: When the alphabet is not a nucleotide alphabet,
+                or when an invalid option is given.
 
-        if do_trunc_ends:
-            # create Rgm, Lgm, and Tgm specially-configured profiles for defining envelopes around
-            # hits that may be truncated 5' (Rgm), 3' (Lgm) or both (Tgm).
-            status = libhmmer.p7_profile.p7_profile_Copy(self.profile._gm, self.profile_r._gm)
-            if status != libeasel.eslOK:
-                raise UnexpectedError(status, "p7_profile_Copy")
-            status = libhmmer.p7_profile.p7_profile_Copy(self.profile._gm, self.profile_l._gm)
-            if status != libeasel.eslOK:
-                raise UnexpectedError(status, "p7_profile_Copy")
-            # setup pointers
-            info.Tgm = self.profile_t._gm
-            info.Rgm = self.profile_r._gm
-            info.Lgm = self.profile_l._gm
-            # info->Tgm was created when gm was still in local mode above
-            # we cloned Tgm from the while profile was still locally configured, above
-            status = libinfernal.cm_p7_modelconfig.p7_ProfileConfig5PrimeTrunc(info.Rgm, 100)
-            if status != libeasel.eslOK:
-                raise UnexpectedError(status, "p7_ProfileConfig5PrimeTrunc")
-            status = libinfernal.cm_p7_modelconfig.p7_ProfileConfig3PrimeTrunc(info.cm.fp7, info.Lgm, 100)
-            if status != libeasel.eslOK:
-                raise UnexpectedError(status, "p7_ProfileConfig3PrimeTrunc")
-            status = libinfernal.cm_p7_modelconfig.p7_ProfileConfig5PrimeAnd3PrimeTrunc(info.Tgm, 100)
-            if status != libeasel.eslOK:
-                raise UnexpectedError(status, "p7_ProfileConfig5PrimeAnd3PrimeTrunc")
-        else:
-            info.Rgm = NULL
-            info.Lgm = NULL
-            info.Tgm = NULL
+        """
+        if not alphabet.is_nucleotide():
+            raise ValueError(f"expected a nucleotide alphabet, found {alphabet!r}")
+        if not 0.0 <= symfrac <= 1.0:
+            raise InvalidParameter("symfrac", symfrac, hint="real number between 0 and 1")
+        if not 0.0 <= fragthresh <= 1.0:
+            raise InvalidParameter("fragthresh", fragthresh, hint="real number between 0 and 1")
+        if ere is None and not alphabet.is_rna():
+            raise ValueError("a target relative entropy (`ere`) is required for non-RNA alphabets")
+        if ere is not None and ere <= 0.0:
+            raise InvalidParameter("ere", ere, hint="strictly positive number or None")
+        if esigma <= 0.0:
+            raise InvalidParameter("esigma", esigma, hint="strictly positive number")
+        if eminseq < 0.0:
+            raise InvalidParameter("eminseq", eminseq, hint="positive number")
+        if emaxseq is not None and emaxseq < 0.0:
+            raise InvalidParameter("emaxseq", emaxseq, hint="positive number or None")
+        if p7ere is not None and p7ere <= 0.0:
+            raise InvalidParameter("p7ere", p7ere, hint="strictly positive number or None")
+
+        self.alphabet = alphabet
+        self.symfrac = symfrac
+        self.fragthresh = fragthresh
+        self.esigma = esigma
+        self.eminseq = eminseq
+        self._ere = 0.0 if ere is None else ere
+        self._emaxseq = -1.0 if emaxseq is None else emaxseq
+        self._p7ere = 0.0 if p7ere is None else p7ere
+
+        # free the previous state if `__init__` is called more than once
+        self._free()
+
+        # use the default priors and null model of `cmbuild`
+        self._pri = libinfernal.prior.Prior_Default(False)
+        self._pri_zerobp = libinfernal.prior.Prior_Default(True)
+        if self._pri == NULL or self._pri_zerobp == NULL:
+            raise AllocationError("Prior_t", sizeof(Prior_t))
+        if libinfernal.cm.DefaultNullModel(alphabet._abc, &self._null) != libeasel.eslOK:
+            raise AllocationError("float", sizeof(float), alphabet.K)
+
+        # configure the builder of filter HMMs like `init_cfg` in `cmbuild.c`
+        self._bg = libhmmer.p7_bg.p7_bg_Create(alphabet._abc)
+        if self._bg == NULL:
+            raise AllocationError("P7_BG", sizeof(P7_BG))
+        self._bld = libhmmer.p7_builder.p7_builder_Create(NULL, alphabet._abc)
+        if self._bld == NULL:
+            raise AllocationError("P7_BUILDER", sizeof(P7_BUILDER))
+        self._bld.arch_strategy = libhmmer.p7_builder.p7_ARCH_HAND
+        self._bld.w_len = -1
+        self._bld.w_beta = libhmmer.p7_builder.p7_DEFAULT_WINDOW_BETA
+        self._bld.re_target = libinfernal.DEFAULT_ETARGET_HMMFILTER if p7ere is None else p7ere
+        libhmmer.p7_prior.p7_prior_Destroy(self._bld.prior)
+        self._bld.prior = _builder_p7_prior()
+        if self._bld.prior == NULL:
+            raise AllocationError("P7_PRIOR", sizeof(P7_PRIOR))
+
+    def __dealloc__(self):
+        self._free()
 
-        # copy E-value parameters
-        libeasel.vec.esl_vec_FCopy(info.cm.fp7_evparam, libinfernal.CM_p7_NEVPARAM, info.p7_evparam)
+    def __copy__(self):
+        return self.copy()
+
+    def __reduce__(self):
+        return type(self), (self.alphabet,), self.__getstate__()
+
+    def __getstate__(self):
+        return {
+            "symfrac": self.symfrac,
+            "fragthresh": self.fragthresh,
+            "ere": self.ere,
+            "esigma": self.esigma,
+            "eminseq": self.eminseq,
+            "emaxseq": self.emaxseq,
+            "p7ere": self.p7ere,
+        }
+
+    def __setstate__(self, dict state):
+        self.__init__(self.alphabet, **state)
+
+    cdef void _free(self) noexcept:
+        if self._pri != NULL:
+            libinfernal.prior.Prior_Destroy(self._pri)
+            self._pri = NULL
+        if self._pri_zerobp != NULL:
+            libinfernal.prior.Prior_Destroy(self._pri_zerobp)
+            self._pri_zerobp = NULL
+        if self._bld != NULL:
+            libhmmer.p7_builder.p7_builder_Destroy(self._bld)
+            self._bld = NULL
+        if self._bg != NULL:
+            libhmmer.p7_bg.p7_bg_Destroy(self._bg)
+            self._bg = NULL
+        free(self._null)
+        self._null = NULL
+
+    # --- Properties ---------------------------------------------------------
+
+    @property
+    def ere(self):
+        """`float` or `None`: The minimum target relative entropy of the CM.
+        """
+        return None if self._ere == 0.0 else self._ere
 
-        # compute msvdata
-        info.msvdata = libhmmer.p7_scoredata.p7_hmm_ScoreDataCreate(info.om, NULL)
-        if info.msvdata == NULL:
-            raise AllocationError("P7_SCOREDATA", sizeof(P7_SCOREDATA))
+    @property
+    def emaxseq(self):
+        """`float` or `None`: The maximum effective sequence number.
+        """
+        return None if self._emaxseq < 0.0 else self._emaxseq
 
-        return 0
+    @property
+    def p7ere(self):
+        """`float` or `None`: The minimum target relative entropy of the filter HMM.
+        """
+        return None if self._p7ere == 0.0 else self._p7ere
 
-    cdef void free_info(
-        self,
-        WORKER_INFO *info,
-    ) noexcept nogil:
-        # TODO: free or use Python garbage collection with dedicated objects
-        # CM_PIPELINE      *pli         # <-- owned by self
-        # CM_TOPHITS       *th          # <-- owned by the returned Tophits
-        # CM_t             *cm          # <-- owned by the input CM
-        # P7_BG            *bg          # <-- owned by self.background
-        # P7_OPROFILE      *om          # <-- owned by self.opt
-        # P7_PROFILE       *gm          # <-- owned by self.profile
-        # P7_PROFILE       *Rgm         # <-- owned by self.profile_r
-        # P7_PROFILE       *Lgm         # <-- owned by self.profile_l
-        # P7_PROFILE       *Tgm         # <-- owned by self.profile_t
-        # P7_SCOREDATA     *msvdata     # <-- not owned
-        # float            *p7_evparam  # <-- stack allocated (!)
-        # float             smxsize
-        if info.msvdata:
-            libhmmer.p7_scoredata.p7_hmm_ScoreDataDestroy(info.msvdata)
-        return
+    # --- Utils --------------------------------------------------------------
 
-    # --- Methods ------------------------------------------------------------
+    cdef int _set_effective_seqnumber(self, CM_t* cm, const Prior_t* pri) except 1:
+        # rescale the counts to the effective sequence number found by
+        # entropy weighting (see `set_effective_seqnumber` in `cmbuild.c`)
+        cdef int    status
+        cdef double hmm_re
+        cdef double neff
+        cdef double etarget
+        cdef double re_target
+        cdef double clen      = cm.clen
+        cdef int    nbps      = libinfernal.cm.CMCountNodetype(cm, libinfernal.MATP_nd)
+        cdef double emaxseq   = cm.nseq if self._emaxseq < 0.0 else self._emaxseq
+
+        if self._ere > 0.0:
+            re_target = self._ere
+        elif nbps > 0:
+            re_target = libinfernal.DEFAULT_ETARGET
+        else:
+            re_target = libinfernal.DEFAULT_ETARGET_HMMFILTER
+        etarget = (self.esigma - libeasel.eslCONST_LOG2R * log(2.0 / (clen * (clen + 1)))) / clen
+        etarget = max(etarget, re_target)
 
-    @staticmethod
-    cdef int _search_loop(
-        WORKER_INFO* info,
-        ESL_SQ** sq,
-        size_t n_targets,
-        int nbps,
-    ) except 1 nogil:
-        # adapted from `serial_loop` in `cmsearch.c`, inner loop code
+        with nogil:
+            status = libinfernal.eweight.cm_EntropyWeight(cm, pri, etarget, self.eminseq, emaxseq, False, &hmm_re, &neff)
+        if status == libeasel.eslEMEM:
+            raise AllocationError("CM_t", sizeof(CM_t))
+        elif status != libeasel.eslOK:
+            raise UnexpectedError(status, "cm_EntropyWeight")
 
-        cdef size_t   t
-        cdef int      status
-        cdef uint64_t prv_pli_ntophits = 0
-        cdef ESL_SQ*  copy             = NULL
+        libinfernal.eweight.cm_Rescale(cm, neff / <float> cm.nseq)
+        cm.eff_nseq = neff
+        return 0
 
-        # prepare pipeline for new model
-        status = libinfernal.cm_pipeline.cm_pli_NewModel(
-            info.pli,
-            cm_newmodelmodes_e.CM_NEWMODEL_CM,
-            info.cm,
-            info.cm.clen,
-            info.cm.W,
-            nbps,
-            info.om,
-            info.bg,
-            info.p7_evparam,
-            info.om.max_length,
-            0, #cm_idx - 1, # FIXME?  # int64_t cur_cm_idx
-            -1,                       # int     cur_clan_idx
-            NULL,
-        )
-        if status != libeasel.eslOK:
-            raise UnexpectedError(status, "cm_pli_NewModel")
+    cdef int _build_filter(self, ESL_MSA* msa, CM_t* cm, bint use_mlp7) except 1:
+        # build and calibrate the filter HMM of a CM (see
+        # `build_and_calibrate_p7_filter` in `cmbuild.c`)
+        cdef int                 status
+        cdef int                 k
+        cdef int64_t             apos
+        cdef int                 cpos
+        cdef double              fhmm_re
+        cdef double              mlp7_re
+        cdef double              neff
+        cdef double              gfmu
+        cdef double              gflambda
+        cdef char[eslERRBUFSIZE] errbuf
+        cdef int                 K        = cm.abc.K
+        cdef double              emaxseq  = cm.nseq if self._emaxseq < 0.0 else self._emaxseq
+        cdef ESL_MSA*            amsa     = NULL
+        cdef P7_HMM*             fhmm     = NULL
+        cdef CM_t*               acm      = NULL
 
         try:
-            # run the inner loop on all sequences
-            for t in range(n_targets):
-                # configure the pipeline for a new sequence
-                status = libinfernal.cm_pipeline.cm_pli_NewSeq(info.pli, sq[t], t)
-                if status != libeasel.eslOK:
-                    raise UnexpectedError(status, "cm_pli_NewSeq")
-
-                # run top strand
-                if info.pli.do_top:
-                    prv_pli_ntophits = info.th.N
-                    status = libinfernal.cm_pipeline.cm_Pipeline(
-                        info.pli,
-                        info.cm.offset,
-                        info.om,
-                        info.bg,
-                        info.p7_evparam,
-                        info.msvdata,
-                        sq[t],
-                        info.th,
-                        False, # not reverse-complement
-                        NULL,
-                        &info.gm,
-                        &info.Rgm,
-                        &info.Lgm,
-                        &info.Tgm,
-                        &info.cm
-                    )
-                    if status != libeasel.eslOK:
-                        raise EaselError(status, info.pli.errbuf.decode('utf-8', 'ignore'))
-                    libinfernal.cm_pipeline.cm_pipeline_Reuse(info.pli)  # prepare for next search
-                    # if sq[t].C > 0:
-                    #     libinfernal.cm_pipeline.cm_pli_AdjustNresForOverlaps(info.pli, sq[t].C, False)
-                    libinfernal.cm_tophits.cm_tophits_UpdateHitPositions(info.th, prv_pli_ntophits, sq[t].start, False)
-
-                # reverse complement
-                if info.pli.do_bot and sq[t].abc.complement != NULL:
-                    # allocate space for a copy
-                    if copy == NULL:
-                        copy = libeasel.sq.esl_sq_CreateDigital(info.pli.abc)
-                        if copy == NULL:
-                            raise AllocationError("ESL_SQ", sizeof(ESL_SQ))
-                    # copy sequence
-                    # FIXME: maybe we could avoid that if we used locks in the
-                    #        right place, but for now needed as the same
-                    #        DigitalSequenceBlock may be shared between threads
-                    #        and cause race conditions
-                    status = libeasel.sq.esl_sq_Copy(sq[t], copy)
-                    if status != libeasel.eslOK:
-                        raise UnexpectedError(status, "esl_sq_Copy")
-                    # reverse complement the copy we own locally
-                    status = libeasel.sq.esl_sq_ReverseComplement(copy)
-                    if status != libeasel.eslOK:
-                        raise UnexpectedError(status, "esl_sq_ReverseComplement")
+            if use_mlp7:
+                # use the ML HMM of the CM, copied so that the CM does not
+                # store the same HMM twice
+                fhmm = libhmmer.p7_hmm.p7_hmm_Clone(cm.mlp7)
+                if fhmm == NULL:
+                    raise AllocationError("P7_HMM", sizeof(P7_HMM))
+            else:
+                # annotate a copy of the alignment with the consensus columns
+                # of the CM, so that the HMM has the same match columns
+                amsa = libeasel.msa.esl_msa_Clone(msa)
+                if amsa == NULL:
+                    raise AllocationError("ESL_MSA", sizeof(ESL_MSA))
+                amsa.cutset[libeasel.msa.eslMSA_GA1] = amsa.cutset[libeasel.msa.eslMSA_GA2] = False
+                amsa.cutset[libeasel.msa.eslMSA_TC1] = amsa.cutset[libeasel.msa.eslMSA_TC2] = False
+                amsa.cutset[libeasel.msa.eslMSA_NC1] = amsa.cutset[libeasel.msa.eslMSA_NC2] = False
+                free(amsa.rf)
+                amsa.rf = <char*> malloc((amsa.alen + 1) * sizeof(char))
+                if amsa.rf == NULL:
+                    raise AllocationError("char", sizeof(char), amsa.alen + 1)
+                for apos in range(amsa.alen):
+                    amsa.rf[apos] = b'.'
+                amsa.rf[amsa.alen] = 0
+                for cpos in range(1, cm.clen + 1):
+                    amsa.rf[cm.map[cpos] - 1] = b'x'
 
-                    prv_pli_ntophits = info.th.N
-                    status = libinfernal.cm_pipeline.cm_Pipeline(
-                        info.pli,
-                        info.cm.offset,
-                        info.om,
-                        info.bg,
-                        info.p7_evparam,
-                        info.msvdata,
-                        copy,
-                        info.th,
-                        True, # reverse-complement
-                        NULL,
-                        &info.gm,
-                        &info.Rgm,
-                        &info.Lgm,
-                        &info.Tgm,
-                        &info.cm
-                    )
-                    if status != libeasel.eslOK:
-                        raise EaselError(status, info.pli.errbuf.decode('utf-8', 'ignore'))
-                    libinfernal.cm_pipeline.cm_pipeline_Reuse(info.pli)  # prepare for next search
-                    # if copy.C > 0:
-                    #     libinfernal.cm_pipeline.cm_pli_AdjustNresForOverlaps(info.pli, copy.C, True)
-                    libinfernal.cm_tophits.cm_tophits_UpdateHitPositions(info.th, prv_pli_ntophits, copy.start, True)
+                with nogil:
+                    status = libhmmer.p7_builder.p7_Builder(self._bld, amsa, self._bg, &fhmm, NULL, NULL, NULL, NULL)
+                if status == libeasel.eslEMEM:
+                    raise AllocationError("P7_HMM", sizeof(P7_HMM))
+                elif status != libeasel.eslOK:
+                    raise EaselError(status, self._bld.errbuf.decode("utf-8", "ignore"))
+
+                # replace the RF annotation with the one of the CM, and the
+                # consensus structure with the full WUSS structure of the CM
+                free(fhmm.rf)
+                fhmm.rf = NULL
+                fhmm.flags &= ~libhmmer.p7_hmm.p7H_RF
+                if cm.flags & libinfernal.cm.CMH_RF and cm.rf != NULL:
+                    fhmm.rf = strdup(cm.rf)
+                    if fhmm.rf == NULL:
+                        raise AllocationError("char", sizeof(char), cm.clen + 2)
+                    fhmm.flags |= libhmmer.p7_hmm.p7H_RF
+                if not (fhmm.flags & libhmmer.p7_hmm.p7H_CS):
+                    raise RuntimeError("filter HMM unexpectedly has no consensus structure annotation")
+                fhmm.cs[0] = b' '
+                memcpy(&fhmm.cs[1], cm.cmcons.cstr, cm.clen * sizeof(char))
+                fhmm.cs[cm.clen + 1] = 0
+
+                # overwrite the emissions of the HMM with the ones of the ML
+                # HMM of a CM with the same mean match relative entropy
+                _builder_build_model(msa, self.symfrac, self._null, self._pri, self._pri_zerobp, &acm)
+                fhmm_re = libhmmer.modelstats.p7_MeanMatchRelativeEntropy(fhmm, self._bg)
+                with nogil:
+                    status = libinfernal.eweight.cm_EntropyWeight(acm, self._pri, fhmm_re, self.eminseq, emaxseq, True, &mlp7_re, &neff)
+                if status == libeasel.eslEMEM:
+                    raise AllocationError("CM_t", sizeof(CM_t))
+                elif status != libeasel.eslOK:
+                    raise UnexpectedError(status, "cm_EntropyWeight")
+                acm.eff_nseq = neff
+                libinfernal.eweight.cm_Rescale(acm, acm.eff_nseq / <float> msa.nseq)
+                _builder_parameterize(acm, self._pri)
+                _builder_configure(acm)
+
+                for k in range(1, fhmm.M + 1):
+                    libeasel.vec.esl_vec_FCopy(acm.mlp7.mat[k], K, fhmm.mat[k])
+                    libeasel.vec.esl_vec_FNorm(fhmm.mat[k], K)
+                libeasel.vec.esl_vec_FSet(fhmm.mat[0], K, 0.0)
+                fhmm.mat[0][0] = 1.0
+                for k in range(fhmm.M + 1):
+                    libeasel.vec.esl_vec_FCopy(acm.mlp7.ins[k], K, fhmm.ins[k])
+                    libeasel.vec.esl_vec_FNorm(fhmm.ins[k], K)
+                status = libhmmer.p7_hmm.p7_hmm_SetComposition(fhmm)
+                if status != libeasel.eslOK:
+                    raise UnexpectedError(status, "p7_hmm_SetComposition")
+                fhmm.eff_nseq = acm.eff_nseq
 
+            # calibrate the filter HMM with the default `cmbuild` parameters
+            with nogil:
+                status = libinfernal.cm_p7_modelmaker.cm_p7_Calibrate(
+                    fhmm, errbuf,
+                    200, 200, 100, max(100, 2 * cm.clen),
+                    200, 200, 200, 200,
+                    0.055, 0.065,
+                    &gfmu, &gflambda
+                )
+            if status != libeasel.eslOK:
+                raise EaselError(status, errbuf.decode("utf-8", "ignore"))
+            status = libinfernal.cm_p7_modelmaker.cm_p7_hmm_SetConsensus(fhmm)
+            if status != libeasel.eslOK:
+                raise UnexpectedError(status, "cm_p7_hmm_SetConsensus")
+            libinfernal.cm_p7_modelmaker.cm_SetFilterHMM(cm, fhmm, gfmu, gflambda)
+            fhmm = NULL
         finally:
-            libeasel.sq.esl_sq_Destroy(copy)
+            if amsa != NULL:
+                libeasel.msa.esl_msa_Destroy(amsa)
+            if acm != NULL:
+                libinfernal.cm.FreeCM(acm)
+            if fhmm != NULL:
+                libhmmer.p7_hmm.p7_hmm_Destroy(fhmm)
 
-        # Return 0 to indicate success
         return 0
 
-    cpdef TopHits search_cm(
-        self,
-        CM query,
-        SearchTargets sequences,
-    ):
-        # adapted from `serial_master` in `cmsearch.c`, outer loop code
-        cdef float[CM_p7_NEVPARAM] p7_evparam
-        cdef WORKER_INFO           tinfo
-        cdef int                   status
-        cdef double                eZ
-        cdef TopHits               top_hits = TopHits(query)
+    # --- Methods ------------------------------------------------------------
 
-        # FIXME: as the pipeline also handles the configuration of the CM,
-        #        we need to first make a copy here otherwise the query is
-        #        left in configured state, which it unusable for subsequent
-        #        pipeline calls. Would be better to figure out how to simply
-        #        "deinitialize" the pipeline when done, and to use a lock/copy
-        #        in the `pyinfernal.infernal` Python code instead to manage
-        #        ownership
-        query = query.copy()
+    cpdef Builder copy(self):
+        """Create a copy of this builder with the same options.
+        """
+        return Builder(
+            self.alphabet,
+            symfrac=self.symfrac,
+            fragthresh=self.fragthresh,
+            ere=self.ere,
+            esigma=self.esigma,
+            eminseq=self.eminseq,
+            emaxseq=self.emaxseq,
+            p7ere=self.p7ere,
+        )
 
-        # check that all alphabets are consistent
-        if not self.alphabet._eq(query.alphabet):
-            raise AlphabetMismatch(self.alphabet, query.alphabet)
-        if not self.alphabet._eq(sequences.alphabet):
-            raise AlphabetMismatch(self.alphabet, sequences.alphabet)
+    cpdef CM build_msa(self, DigitalMSA msa):
+        """Build a new CM from a multiple sequence alignment.
 
-        # ensure the CM defines a filter HMM
-        if query.filter_hmm is None:
-            raise ValueError(f"no filter HMM was found for CM {query.name!r}")
+        Arguments:
+            msa (`~pyhmmer.easel.DigitalMSA`): The alignment to build
+                the CM from, with a name and a consensus secondary
+                structure annotation. The alignment is not modified.
 
-        # use struct to keep track of current worker state
-        tinfo.p7_evparam = p7_evparam
-        tinfo.smxsize = 128.0
-        tinfo.cm = query._cm
-        tinfo.pli = self._pli  # Maybe copy?
-        tinfo.th = top_hits._th
-        tinfo.bg = self.background._bg
-        tinfo.Rgm = tinfo.Lgm = tinfo.Tgm = NULL
-        tinfo.msvdata = NULL
+        Returns:
+            `~pyinfernal.cm.CM`: The CM built from the alignment, with
+            its name, accession, description and bit score cutoffs taken
+            from the alignment, and a calibrated filter HMM.
 
-        # check if we have E-value stats for the CM, we require them
-        # *unless* we are going to run the pipeline in HMM-only mode.
-        # We run the pipeline in HMM-only mode if --nohmmonly is
-        # not used and -g is not used and:
-        # (a) --hmmonly used OR
-        # (b) model has 0 basepairs
-        nbps = libinfernal.cm.CMCountNodetype(tinfo.cm, libinfernal.MATP_nd)
-        # TODO: below
-        # if((   esl_opt_GetBoolean(go, "--nohmmonly"))  ||
-        # (   esl_opt_GetBoolean(go, "-g"))           ||
-        # ((! esl_opt_GetBoolean(go, "--hmmonly"))    && (nbps > 0))) {
-        # /* we're NOT running HMM-only pipeline variant, we need CM E-value stats */
-        # if(! (tinfo->cm->flags & CMH_EXPTAIL_STATS)) cm_Fail("no E-value parameters were read for CM: %s.\nYou may need to run cmcalibrate.", tinfo->cm->name);
-        # }
+        Raises:
+            `~pyhmmer.errors.AlphabetMismatch`: When the alignment is not
+                in the same alphabet as the builder.
+            `ValueError`: When the alignment has no name, or no valid
+                consensus structure annotation.
 
-        # configure the CM (this builds QDBs if nec) and setup HMM filters
-        # (we need to do this before clone_info()). We need a pipeline to
-        # do this only b/c we need pli->cm_config_opts.
-        #
-        status = self._configure_cm(&tinfo)
-        if status != libeasel.eslOK:
-            raise EaselError(status, tinfo.pli.errbuf.decode('utf-8', 'ignore'))
-        status = self._setup_hmm_filter(&tinfo, query)
-        if status != libeasel.eslOK:
-            raise EaselError(status, tinfo.pli.errbuf.decode('utf-8', 'ignore'))
+        Example:
+            >>> alphabet = easel.Alphabet.rna()
+            >>> with easel.MSAFile("tests/data/msas/tRNA.sto", digital=True, alphabet=alphabet) as msa_file:
+            ...     msa = msa_file.read()
+            >>> cm = Builder(alphabet).build_msa(msa)
+            >>> cm.name
+            'tRNA'
+            >>> cm.clen
+            71
 
-        with nogil:
-            # make sure the pipeline is set to search mode
-            self._pli.mode = cm_pipemodes_e.CM_SEARCH_SEQS
-            # run the cmsearch loop on all database sequences while
-            # recycling memory between targets
-            if SearchTargets is DigitalSequenceBlock:
-                Pipeline._search_loop(&tinfo, sequences._refs, sequences._length, nbps)
-            # elif SearchTargets is SequenceFile:
-            #     raise NotImplementedError("Pipeline.search_cm")
-            # else:
-            #     raise NotImplementedError("Pipeline.search_cm")
-
-        # we need to re-compute e-values before merging (when list will be sorted)
-        if tinfo.pli.do_hmmonly_cur:
-            eZ = tinfo.pli.Z / <float> tinfo.om.max_length
-        else:
-            eZ = tinfo.cm.expA[tinfo.pli.final_cm_exp_mode].cur_eff_dbsize
-        libinfernal.cm_tophits.cm_tophits_ComputeEvalues(tinfo.th, eZ, 0)
+        """
+        assert self._bld != NULL
 
-        # Sort by sequence index/position and remove duplicates
-        libinfernal.cm_tophits.cm_tophits_SortForOverlapRemoval(tinfo.th)
-        status = libinfernal.cm_tophits.cm_tophits_RemoveOrMarkOverlaps(tinfo.th, False, tinfo.pli.errbuf)
-        if status != libeasel.eslOK:
-            raise UnexpectedError(status, "cm_tophits_RemoveOrMarkOverlaps")
+        cdef int      status
+        cdef uint32_t checksum
+        cdef bint     pretend
+        cdef Prior_t* pri2use
+        cdef ESL_MSA* copy     = NULL
+        cdef CM_t*    cm       = NULL
+        cdef CM       built
+        cdef CM       result
+
+        if msa.alphabet != self.alphabet:
+            raise AlphabetMismatch(self.alphabet, msa.alphabet)
+        if msa._msa.name == NULL:
+            raise ValueError("cannot build a CM from an alignment without a name")
+        if msa._msa.ss_cons == NULL:
+            raise ValueError("cannot build a CM from an alignment without a consensus structure")
+
+        copy = libeasel.msa.esl_msa_Clone(msa._msa)
+        if copy == NULL:
+            raise AllocationError("ESL_MSA", sizeof(ESL_MSA))
 
-        # Resort: by score (usually) or by position (if in special 'terminate after F3' mode) */
-        if tinfo.pli.do_trm_F3:
-            status = libinfernal.cm_tophits.cm_tophits_SortByPosition(tinfo.th)
+        try:
+            # check and weight the alignment, and mark fragments like
+            # `process_build_workunit` in `cmbuild.c`
+            if not libinfernal.cm_modelmaker.clean_cs(copy.ss_cons, copy.alen, True):
+                raise ValueError("failed to parse consensus structure annotation")
+            status = libeasel.msa.esl_msa_Checksum(copy, &checksum)
             if status != libeasel.eslOK:
-                raise UnexpectedError(status, "cm_tophits_SortByPosition")
-        else:
-            libinfernal.cm_tophits.cm_tophits_SortByEvalue(tinfo.th)
+                raise UnexpectedError(status, "esl_msa_Checksum")
+            _builder_weight(copy)
+            _builder_mark_fragments(copy, self.fragthresh)
+
+            # build the CM and collect counts
+            _builder_build_model(copy, self.symfrac, self._null, self._pri, self._pri_zerobp, &cm)
+            cm.checksum = checksum
+            cm.flags |= libinfernal.cm.CMH_CHKSUM
+            pretend = libinfernal.cm.CMCountNodetype(cm, libinfernal.MATP_nd) == 0
+            pri2use = self._pri_zerobp if pretend else self._pri
+
+            # annotate with the alignment metadata and cutoffs
+            if libinfernal.cm.cm_SetName(cm, copy.name) != libeasel.eslOK:
+                raise AllocationError("char", sizeof(char), strlen(copy.name))
+            if libinfernal.cm.cm_SetAccession(cm, copy.acc) != libeasel.eslOK:
+                raise AllocationError("char", sizeof(char))
+            if libinfernal.cm.cm_SetDescription(cm, copy.desc) != libeasel.eslOK:
+                raise AllocationError("char", sizeof(char))
+            if libinfernal.cm.cm_SetCtime(cm) != libeasel.eslOK:
+                raise AllocationError("char", sizeof(char))
+            if copy.cutset[libeasel.msa.eslMSA_TC1]:
+                cm.tc = copy.cutoff[libeasel.msa.eslMSA_TC1]
+                cm.flags |= libinfernal.cm.CMH_TC
+            if copy.cutset[libeasel.msa.eslMSA_GA1]:
+                cm.ga = copy.cutoff[libeasel.msa.eslMSA_GA1]
+                cm.flags |= libinfernal.cm.CMH_GA
+            if copy.cutset[libeasel.msa.eslMSA_NC1]:
+                cm.nc = copy.cutoff[libeasel.msa.eslMSA_NC1]
+                cm.flags |= libinfernal.cm.CMH_NC
+
+            # parameterize and configure the CM, then build its filter
+            self._set_effective_seqnumber(cm, pri2use)
+            _builder_parameterize(cm, pri2use)
+            _builder_configure(cm)
+            status = libinfernal.cm.cm_SetConsensus(cm, cm.cmcons, NULL)
             if status != libeasel.eslOK:
-                raise UnexpectedError(status, "cm_tophits_SortByEvalue")
+                raise UnexpectedError(status, "cm_SetConsensus")
+            self._build_filter(copy, cm, pretend)
+        except BaseException:
+            if cm != NULL:
+                libinfernal.cm.FreeCM(cm)
+            raise
+        finally:
+            libeasel.msa.esl_msa_Destroy(copy)
 
-        # Enforce threshold (and copy pipeline configuration) before returning
-        top_hits._threshold(self)
-        top_hits._empty = False
-        return top_hits
+        # NOTE(@althonos): A configured CM cannot be configured again, so
+        #                  the CM is reloaded from its binary serialization
+        #                  to get the same unconfigured CM as `CMFile.read`
+        #                  would after `cmbuild`.
+        built = CM.from_ptr(cm, self.alphabet)
+        result = CM.__new__(CM)
+        result.__setstate__(built.__getstate__())
+        return result
 
 
 cdef class Alignment:
@@ -1742,11 +7012,15 @@ cdef class TopHits:
     cdef CM_PIPELINE _pli
     cdef object      _query
     cdef bint        _empty
+    cdef bint        _truncated
+    cdef int64_t     _max_hits
 
     def __cinit__(self):
         self._th = NULL
         self._query = None
         self._empty = True
+        self._truncated = False
+        self._max_hits = -1
         memset(&self._pli, 0, sizeof(CM_PIPELINE))
 
     def __init__(self, object query not None):
@@ -1772,6 +7046,124 @@ cdef class TopHits:
         assert self._th != NULL
         return self._th.N
 
+    def __reduce__(self):
+        return TopHits, (self._query,), self.__getstate__()
+
+    def __getstate__(self):
+        assert self._th != NULL
+
+        cdef size_t i
+        cdef list   unsrt = []
+        cdef list   hits  = []
+
+        for i in range(self._th.N):
+            unsrt.append(_hit_getstate(&self._th.unsrt[i]))
+
+        # the sorted array is only valid if the hits were sorted
+        if (
+               self._th.is_sorted_by_evalue
+            or self._th.is_sorted_for_overlap_removal
+            or self._th.is_sorted_for_overlap_markup
+            or self._th.is_sorted_by_position
+        ):
+            for i in range(self._th.N):
+                hits.append(self._th.hit[i] - self._th.unsrt)
+        else:
+            hits.extend(range(self._th.N))
+
+        return {
+            "_empty": self._empty,
+            "_truncated": self._truncated,
+            "_max_hits": self._max_hits,
+            "unsrt": unsrt,
+            "hit": hits,
+            "nreported": self._th.nreported,
+            "nincluded": self._th.nincluded,
+            "is_sorted_by_evalue": self._th.is_sorted_by_evalue,
+            "is_sorted_for_overlap_removal": self._th.is_sorted_for_overlap_removal,
+            "is_sorted_for_overlap_markup": self._th.is_sorted_for_overlap_markup,
+            "is_sorted_by_position": self._th.is_sorted_by_position,
+            "pipeline": {
+                "mode": self._pli.mode,
+                "by_E": self._pli.by_E,
+                "E": self._pli.E,
+                "T": self._pli.T,
+                "use_bit_cutoffs": self._pli.use_bit_cutoffs,
+                "inc_by_E": self._pli.inc_by_E,
+                "incE": self._pli.incE,
+                "incT": self._pli.incT,
+                "Z": self._pli.Z,
+                "Z_setby": self._pli.Z_setby,
+                "nseqs": self._pli.nseqs,
+                "nmodels": self._pli.nmodels,
+                "nnodes": self._pli.nnodes,
+                "nmodels_hmmonly": self._pli.nmodels_hmmonly,
+                "nnodes_hmmonly": self._pli.nnodes_hmmonly,
+                "acct": [
+                    self._pli.acct[i]
+                    for i in range(libinfernal.cm_pipeline.NPLI_PASSES)
+                ],
+            },
+        }
+
+    def __setstate__(self, dict state):
+        cdef size_t  i
+        cdef int     status
+        cdef CM_HIT* hit
+        cdef dict    pipeline = state["pipeline"]
+
+        # deallocate current data and allocate new top hits
+        libinfernal.cm_tophits.cm_tophits_Destroy(self._th)
+        self._th = libinfernal.cm_tophits.cm_tophits_Create()
+        if self._th == NULL:
+            raise AllocationError("CM_TOPHITS", sizeof(CM_TOPHITS))
+
+        # deserialize hits
+        for hit_state in state["unsrt"]:
+            status = libinfernal.cm_tophits.cm_tophits_CreateNextHit(self._th, &hit)
+            if status == libeasel.eslEMEM:
+                raise AllocationError("CM_HIT", sizeof(CM_HIT))
+            elif status != libeasel.eslOK:
+                raise UnexpectedError(status, "cm_tophits_CreateNextHit")
+            _hit_setstate(hit, hit_state)
+
+        # setup sorted array
+        if len(state["hit"]) != <Py_ssize_t> self._th.N:
+            raise ValueError(f"inconsistent number of hits in state: {len(state['hit'])} != {self._th.N}")
+        for i, offset in enumerate(state["hit"]):
+            self._th.hit[i] = &self._th.unsrt[<size_t> offset]
+
+        # recover sorting flags and accounting
+        self._th.nreported = state["nreported"]
+        self._th.nincluded = state["nincluded"]
+        self._th.is_sorted_by_evalue = state["is_sorted_by_evalue"]
+        self._th.is_sorted_for_overlap_removal = state["is_sorted_for_overlap_removal"]
+        self._th.is_sorted_for_overlap_markup = state["is_sorted_for_overlap_markup"]
+        self._th.is_sorted_by_position = state["is_sorted_by_position"]
+        self._empty = state["_empty"]
+        self._truncated = state["_truncated"]
+        self._max_hits = state["_max_hits"]
+
+        # copy pipeline configuration
+        memset(&self._pli, 0, sizeof(CM_PIPELINE))
+        self._pli.mode = pipeline["mode"]
+        self._pli.by_E = pipeline["by_E"]
+        self._pli.E = pipeline["E"]
+        self._pli.T = pipeline["T"]
+        self._pli.use_bit_cutoffs = pipeline["use_bit_cutoffs"]
+        self._pli.inc_by_E = pipeline["inc_by_E"]
+        self._pli.incE = pipeline["incE"]
+        self._pli.incT = pipeline["incT"]
+        self._pli.Z = pipeline["Z"]
+        self._pli.Z_setby = pipeline["Z_setby"]
+        self._pli.nseqs = pipeline["nseqs"]
+        self._pli.nmodels = pipeline["nmodels"]
+        self._pli.nnodes = pipeline["nnodes"]
+        self._pli.nmodels_hmmonly = pipeline["nmodels_hmmonly"]
+        self._pli.nnodes_hmmonly = pipeline["nnodes_hmmonly"]
+        for i, acct in enumerate(pipeline["acct"]):
+            self._pli.acct[i] = acct
+
     def __getitem__(self, index):
         assert self._th != NULL
         if not (
@@ -1831,6 +7223,18 @@ cdef class TopHits:
         """
         return None if self._pli.inc_by_E else self._pli.incT
 
+    @property
+    def truncated(self):
+        """`bool`: Whether the search stopped early or discarded hits.
+
+        This is `True` when the `Pipeline` that produced these hits was
+        configured with a `~Pipeline.max_hits` or `~Pipeline.max_residues`
+        limit, and that limit was reached, so that some hits may be
+        missing from the list.
+
+        """
+        return self._truncated
+
     @property
     def included(self):
         """iterator of `Hit`: An iterator over the hits marked as *included*.
@@ -1921,6 +7325,8 @@ cdef class TopHits:
         # record query metatada
         copy._query = self._query
         copy._empty = self._empty
+        copy._truncated = self._truncated
+        copy._max_hits = self._max_hits
 
         with nogil:
             # copy pipeline configuration
@@ -2032,7 +7438,9 @@ cdef class TopHits:
         computed by the `Pipeline` from the number of targets, the returned
         object will update them by summing ``self.Z`` and ``other.Z``. If
         they were set manually, the manual value will be kept, provided
-        both values are equal.
+        both values are equal. If any of the hits were obtained with a
+        `Pipeline.max_hits` limit, only the best hits within the smallest
+        limit are retained in the merged list.
 
         Returns:
             `~pyinfernal.cm.TopHits`: A new collection of hits containing
@@ -2053,11 +7461,12 @@ cdef class TopHits:
         """
         assert self._th != NULL
 
-        cdef TopHits other
-        cdef TopHits other_copy
-        cdef TopHits merged     = self.copy()
-        cdef int     status     = libeasel.eslOK
-        cdef bint    mismatch   = False
+        cdef uint64_t j
+        cdef TopHits  other
+        cdef TopHits  other_copy
+        cdef TopHits  merged     = self.copy()
+        cdef int      status     = libeasel.eslOK
+        cdef bint     mismatch   = False
 
         for i, other in enumerate(others):
             assert other._th != NULL
@@ -2074,6 +7483,17 @@ cdef class TopHits:
                 mismatch = merged._query.name != other._query.name
                 mismatch |= merged._query.M != other._query.M
                 mismatch |= merged._query.accession != other._query.accession
+            elif isinstance(merged._query, CM) and isinstance(other._query, CM):
+                # NOTE(@althonos): CMs do not implement equality, so compare
+                #                  the metadata, e.g. for hits of the same CM
+                #                  loaded in different processes.
+                mismatch = merged._query is not other._query
+                mismatch &= (
+                       merged._query.name != other._query.name
+                    or merged._query.accession != other._query.accession
+                    or merged._query.clen != other._query.clen
+                    or merged._query.M != other._query.M
+                )
             else:
                 mismatch = merged._query != other._query
             if mismatch:
@@ -2085,6 +7505,8 @@ cdef class TopHits:
                 memcpy(&merged._pli, &other_copy._pli, sizeof(CM_PIPELINE))
                 merged._th, other_copy._th = other_copy._th, merged._th
                 merged._empty = other_copy._empty
+                merged._truncated = other_copy._truncated
+                merged._max_hits = other_copy._max_hits
                 continue
 
             # check that the parameters are the same
@@ -2100,29 +7522,41 @@ cdef class TopHits:
                 status = libinfernal.cm_pipeline.cm_pipeline_Merge(&merged._pli, &other_copy._pli)
                 if status != libeasel.eslOK:
                     raise UnexpectedError(status, "cm_pipeline_Merge")
+                # merge the hit limits
+                merged._truncated |= other_copy._truncated
+                if merged._max_hits < 0 or (other_copy._max_hits >= 0 and other_copy._max_hits < merged._max_hits):
+                    merged._max_hits = other_copy._max_hits
 
-        # Reset nincluded/nreports before thresholding, unless thresholding
-        # happens through bit cutoffs in which case the values are always
-        # correct
-        if not self._pli.use_bit_cutoffs:
-            for i in range(merged._th.N):
-                merged._th.hit[i].flags &= (~libinfernal.cm_tophits.CM_HIT_IS_REPORTED)
-                merged._th.hit[i].flags &= (~libinfernal.cm_tophits.CM_HIT_IS_INCLUDED)
-
-        # threshold the merged hits with new values
-        status = libinfernal.cm_tophits.cm_tophits_Threshold(merged._th, &merged._pli)
-        if status != libeasel.eslOK:
-            raise UnexpectedError(status, "cm_tophits_Threshold")
+        with nogil:
+            # Only retain the best hits if the merged hits were obtained with
+            # a limit on the number of hits
+            if merged._max_hits >= 0 and _prune_hits(merged._th, merged._max_hits):
+                merged._truncated = True
+
+            # Reset nincluded/nreports before thresholding, unless thresholding
+            # happens through bit cutoffs in which case the values are always
+            # correct
+            if not self._pli.use_bit_cutoffs:
+                for j in range(merged._th.N):
+                    merged._th.hit[j].flags &= (~libinfernal.cm_tophits.CM_HIT_IS_REPORTED)
+                    merged._th.hit[j].flags &= (~libinfernal.cm_tophits.CM_HIT_IS_INCLUDED)
+
+            # threshold the merged hits with new values
+            status = libinfernal.cm_tophits.cm_tophits_Threshold(merged._th, &merged._pli)
+            if status != libeasel.eslOK:
+                raise UnexpectedError(status, "cm_tophits_Threshold")
 
-        # sort by E-value
-        status = libinfernal.cm_tophits.cm_tophits_SortByEvalue(merged._th)
-        if status != libeasel.eslOK:
-            raise UnexpectedError(status, "cm_tophits_SortByEvalue")
+            # sort by E-value
+            status = libinfernal.cm_tophits.cm_tophits_SortByEvalue(merged._th)
+            if status != libeasel.eslOK:
+                raise UnexpectedError(status, "cm_tophits_SortByEvalue")
 
         # return the merged hits
         return merged
 
 class NodeType(enum.IntEnum):
+    """The types of nodes in a covariance model.
+    """
     #DUMMY = libinfernal.DUMMY_nd
     BIF  = libinfernal.BIF_nd
     MATP = libinfernal.MATP_nd
@@ -2133,7 +7567,9 @@ class NodeType(enum.IntEnum):
     ROOT = libinfernal.ROOT_nd
     END  = libinfernal.END_nd
 
-class StateType:
+class StateType(enum.IntEnum):
+    """The types of states in a covariance model.
+    """
     D  = libinfernal.D_st
     MP = libinfernal.MP_st
     ML = libinfernal.ML_st
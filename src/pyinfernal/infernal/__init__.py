@@ -9,8 +9,19 @@ Note:
 
 """
 
+from ._cmalign import cmalign
 from ._cmsearch import cmsearch
+from ._metrics import SearchMetrics, WorkerMetrics
+from ._shard import Shard, ShardManifest, run_shard, run_shards, merge_shards
 
 __all__ = [
+    "cmalign",
     "cmsearch",
+    "SearchMetrics",
+    "WorkerMetrics",
+    "Shard",
+    "ShardManifest",
+    "run_shard",
+    "run_shards",
+    "merge_shards",
 ]
\ No newline at end of file
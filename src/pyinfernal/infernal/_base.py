@@ -28,3 +28,10 @@ if typing.TYPE_CHECKING:
         T: typing.Optional[float]
         incE: float
         incT: typing.Optional[float]
+        deduplicate: bool
+        sort_targets: bool
+        reseed_targets: bool
+        short_targets: bool
+        max_hits: typing.Optional[int]
+        max_residues: typing.Optional[int]
+        max_time: typing.Optional[float]
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import collections
+import concurrent.futures
+import itertools
+import os
+import queue
+import typing
+from typing import Optional, Callable, Iterable, Iterator
+
+import psutil
+
+from pyhmmer.easel import DigitalSequence, DigitalMSA, DigitalSequenceBlock, SequenceFile
+from ..cm import CM, Aligner
+
+
+# --- Chunking -----------------------------------------------------------------
+
+def _chunks(
+    sequences: Iterable[DigitalSequence],
+    cm: CM,
+    chunksize: int,
+) -> Iterator[DigitalSequenceBlock]:
+    """Split the target sequences into blocks of at most ``chunksize``.
+    """
+    if isinstance(sequences, DigitalSequenceBlock):
+        # NB: slicing a `DigitalSequenceBlock` does not copy sequence data
+        for i in range(0, len(sequences), chunksize):
+            yield sequences[i:i+chunksize]
+    elif isinstance(sequences, SequenceFile):
+        if not sequences.digital:
+            raise ValueError("expected digital mode `SequenceFile` for targets")
+        # only read one block at a time so that memory stays bounded
+        # regardless of the size of the sequence file
+        while True:
+            block = sequences.read_block(sequences=chunksize)
+            if not block:
+                break
+            yield block
+    else:
+        it = iter(sequences)
+        while True:
+            block = DigitalSequenceBlock(cm.alphabet, itertools.islice(it, chunksize))
+            if not block:
+                break
+            yield block
+
+
+# --- cmalign ------------------------------------------------------------------
+
+def cmalign(
+    cm: CM,
+    sequences: Iterable[DigitalSequence],
+    *,
+    cpus: int = 0,
+    chunksize: int = 100,
+    callback: Optional[Callable[[DigitalMSA, int], None]] = None,
+    **options,
+) -> Iterator[DigitalMSA]:
+    """Align sequences to a CM, in parallel.
+
+    Sequences are aligned in chunks of ``chunksize`` sequences, with each
+    chunk being aligned independently by an `~pyinfernal.cm.Aligner` in
+    a background thread. Chunks are yielded as soon as they are ready,
+    in the same order as the input sequences, so that large sequence
+    databases can be aligned with a bounded memory footprint.
+
+    Arguments:
+        cm (`~pyinfernal.cm.CM`): The CM to align the sequences to.
+        sequences (iterable of `~pyhmmer.easel.DigitalSequence`): The
+            sequences to align. If a `~pyhmmer.easel.SequenceFile` is
+            given, sequences will be read iteratively from disk rather
+            than prefetched.
+        cpus (`int`): The number of threads to run in parallel. Pass ``1``
+            to run everything in the main thread, ``0`` to automatically
+            select a suitable number (using `psutil.cpu_count`), or any
+            positive number otherwise.
+        chunksize (`int`): The number of sequences to align in each
+            chunk. Larger chunks give fewer but larger alignments.
+        callback (callable): A callback that is called everytime a chunk
+            is aligned with two arguments: the alignment, and the total
+            number of chunks aligned so far. This can be used to display
+            progress in UI.
+
+    Yields:
+        `~pyhmmer.easel.DigitalMSA`: The alignment of each chunk of
+        sequences to the CM, in the same order the sequences were
+        passed in the input. All the alignments share the same consensus
+        columns, but may differ in their insert columns.
+
+    Raises:
+        `~pyhmmer.errors.AlphabetMismatch`: When the CM and the sequences
+            do not share the same alphabet.
+        `~pyhmmer.errors.EaselError`: When a sequence cannot be aligned
+            within the ``mxsize`` memory limit.
+
+    Note:
+        Any additional arguments passed to the `cmalign` function will be
+        passed transparently to the `~pyinfernal.cm.Aligner` to be created.
+        For instance, to align sequences with the CYK algorithm and a
+        stricter memory limit, use::
+
+            >>> msas = cmalign(trna, sequences[:0], algorithm="cyk", mxsize=128.0)
+            >>> list(msas)
+            []
+
+    """
+    cpus = cpus if cpus > 0 else psutil.cpu_count(logical=False) or os.cpu_count() or 1
+    if chunksize <= 0:
+        raise ValueError(f"`chunksize` must be strictly positive, got {chunksize!r}")
+
+    # create the aligners eagerly so that invalid options are reported
+    # before any sequence is read
+    aligners: "queue.Queue[Aligner]" = queue.Queue()
+    for _ in range(cpus):
+        aligners.put(Aligner(cm, **options))
+
+    chunks = _chunks(sequences, cm, chunksize)
+    if cpus == 1:
+        aligner = aligners.get()
+        for i, chunk in enumerate(chunks, start=1):
+            msa = aligner.align(chunk)
+            if callback is not None:
+                callback(msa, i)
+            yield msa
+        return
+
+    def _align(chunk: DigitalSequenceBlock) -> DigitalMSA:
+        aligner = aligners.get()
+        try:
+            return aligner.align(chunk)
+        finally:
+            aligners.put(aligner)
+
+    # only keep a few chunks in flight per thread to bound memory usage
+    # while making sure that threads never wait for the main thread
+    pending: typing.Deque["concurrent.futures.Future[DigitalMSA]"] = collections.deque()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=cpus) as executor:
+        try:
+            count = 0
+            for chunk in chunks:
+                pending.append(executor.submit(_align, chunk))
+                if len(pending) >= 2 * cpus:
+                    msa = pending.popleft().result()
+                    count += 1
+                    if callback is not None:
+                        callback(msa, count)
+                    yield msa
+            while pending:
+                msa = pending.popleft().result()
+                count += 1
+                if callback is not None:
+                    callback(msa, count)
+                yield msa
+        finally:
+            for future in pending:
+                future.cancel()
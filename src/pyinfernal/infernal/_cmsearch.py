@@ -2,23 +2,27 @@ from __future__ import annotations
 
 import collections
 import contextlib
+import copy
 import operator
 import ctypes
 import queue
 import multiprocessing
+import multiprocessing.connection
 import typing
 import os
 import threading
-from typing import Optional, Union, Callable, Iterable
+import time
+from typing import Optional, Union, Callable, Iterable, Dict, List, Tuple
 
 import psutil
 
 from pyhmmer.easel import Alphabet, DigitalSequence, DigitalMSA, DigitalSequenceBlock, SequenceFile
 from pyhmmer.utils import singledispatchmethod, peekable
-from pyhmmer.hmmer._base import _BaseDispatcher, _BaseWorker, _BaseChore
-from ..cm import CM, TopHits, Pipeline
+from pyhmmer.hmmer._base import _BaseDispatcher, _BaseWorker, _BaseChore, _ThreadChore, _ProcessChore
+from ..cm import Builder, CM, CMFile, TopHits, Pipeline, SequenceDatabase
+from ._metrics import SearchMetrics
 
-_SEARCHQueryType = typing.Union[CM]
+_SEARCHQueryType = typing.Union[CM, DigitalMSA]
 _P = typing.TypeVar("_P", bound=CM)
 
 if typing.TYPE_CHECKING:
@@ -33,6 +37,21 @@ _Q = typing.TypeVar("_Q")
 _T = typing.TypeVar("_T")
 # the result type for the pipeline
 _R = typing.TypeVar("_R")
+# the target types that can be split in chunks
+_BlockTargets = typing.Union[DigitalSequenceBlock, SequenceDatabase]
+
+# --- Utils --------------------------------------------------------------------
+
+def _build_cm(builder: Builder, msa: DigitalMSA, cpus: int = 1) -> CM:
+    """Build a CM from an alignment, ready to be searched.
+    """
+    cm = builder.build_msa(msa)
+    # the pipeline only runs without E-value parameters for models
+    # without base pairs, which are searched with the filter HMM alone
+    if cm.nbp > 0:
+        cm.calibrate(cpus=cpus)
+    return cm
+
 
 # --- Worker -------------------------------------------------------------------
 
@@ -44,6 +63,39 @@ class _SEARCHWorker(
     ],
 ):
     pipeline_class: typing.ClassVar[typing.Type[Pipeline]] = Pipeline
+    watch_interval: typing.ClassVar[float] = 0.1
+
+    # the metrics collector (threading backend only) and worker index
+    metrics: Optional[SearchMetrics] = None
+    index: int = 0
+    # the index of the first target in the complete database, when the
+    # worker only searches a chunk of the targets
+    target_offset: int = 0
+    # the number of residues in the targets of the worker, computed once
+    # by the dispatcher to be recorded in the metrics
+    target_residues: int = 0
+    # the number of CPUs to calibrate the CMs built from alignments with
+    build_cpus: int = 1
+
+    def run(self) -> None:
+        # cancel the running search as soon as the kill switch is set, so
+        # that the worker does not have to finish searching all targets
+        # before stopping (e.g. after a `KeyboardInterrupt` in the main
+        # thread, or an error in another worker)
+        done = threading.Event()
+        watcher = threading.Thread(target=self._watch_kill_switch, args=(done,), daemon=True)
+        watcher.start()
+        try:
+            super().run()
+        finally:
+            done.set()
+            watcher.join()
+
+    def _watch_kill_switch(self, done: threading.Event) -> None:
+        while not done.wait(self.watch_interval):
+            if self.pipeline is not None and self.is_killed():
+                self.pipeline.cancel()
+                break
 
     @singledispatchmethod
     def query(self, query) -> "TopHits[Any]":  # type: ignore
@@ -54,7 +106,15 @@ class _SEARCHWorker(
     @query.register(CM)
     def _(self, query: _P) -> "TopHits[_P]":  # type: ignore
         assert self.pipeline is not None
-        return self.pipeline.search_cm(query, self.targets)
+        return self.pipeline.search_cm(query, self.targets, target_offset=self.target_offset)
+
+    @query.register(DigitalMSA)
+    def _(self, query: DigitalMSA) -> "TopHits[CM]":  # type: ignore
+        assert self.pipeline is not None
+        if self.builder is None:
+            self.builder = Builder(query.alphabet)
+        cm = _build_cm(self.builder, query, cpus=self.build_cpus)
+        return self.pipeline.search_cm(cm, self.targets, target_offset=self.target_offset)
 
     def process(self, query: _Q) -> _R:
         """Process a single query and return the resulting hits."""
@@ -65,7 +125,13 @@ class _SEARCHWorker(
                 # Z=self.targets.total_length(), 
                 **self.pipeline_options
             )
-        hits = self.query(query)
+        if self.metrics is not None:
+            self.metrics._query_started(self.index, query)
+        try:
+            hits = self.query(query)
+        finally:
+            if self.metrics is not None:
+                self.metrics._query_finished(self.index, query, self.target_residues)
         self.callback(query, self.query_count.value)  # type: ignore
         self.pipeline.clear()
         return hits
@@ -76,7 +142,40 @@ class _SEARCHThread(_SEARCHWorker, threading.Thread):
 
 
 class _SEARCHProcess(_SEARCHWorker, multiprocessing.Process):
-    pass
+
+    def process(self, query: _Q) -> _R:
+        try:
+            return super().process(query)
+        except (KeyboardInterrupt, TimeoutError) as err:
+            # partial hits cannot be sent back to the main process,
+            # so they must be removed from the exception
+            vars(err).pop("hits", None)
+            raise
+
+
+# --- Chores -------------------------------------------------------------------
+
+class _IndexedThreadChore(_ThreadChore[_Q, _R]):
+    """A thread chore that reports its index to a queue once done.
+
+    Used by the unordered dispatcher to wait for *any* pending chore to
+    be done, since there is no way to wait on several `threading.Event`
+    at once.
+
+    """
+
+    def __init__(self, query: _Q, index: int, completed: "queue.Queue[int]") -> None:
+        super().__init__(query)
+        self.index = index
+        self.completed = completed
+
+    def complete(self, result: _R) -> None:
+        super().complete(result)
+        self.completed.put(self.index)
+
+    def fail(self, exception: BaseException) -> None:
+        super().fail(exception)
+        self.completed.put(self.index)
 
 
 # --- Dispatcher ---------------------------------------------------------------
@@ -88,6 +187,27 @@ class _SEARCHDispatcher(
         "TopHits[_SEARCHQueryType]",
     ]
 ):
+    def __init__(
+        self,
+        *args,
+        metrics: Optional[SearchMetrics] = None,
+        ordered: bool = True,
+        **kwargs,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        # alignment queries are built by the workers, so let each of them
+        # calibrate with the spare CPUs when there are fewer workers than
+        # requested CPUs because there are only a few queries
+        self.build_cpus = max(1, kwargs.get("cpus", self.cpus) // self.cpus)
+        self.metrics = metrics
+        self.ordered = ordered
+        self._worker_count = 0
+        # count the target residues only once for all the workers
+        if metrics is not None and isinstance(self.targets, (DigitalSequenceBlock, SequenceDatabase)):
+            self.target_residues = self.targets.total_length()
+        else:
+            self.target_residues = 0
+
     def _new_worker(
         self,
         query_queue: "queue.Queue[Optional[_BaseChore[_SEARCHQueryType, TopHits[_SEARCHQueryType]]]]",
@@ -105,28 +225,141 @@ class _SEARCHDispatcher(
         else:
             targets = self.targets  # type: ignore
         if self.backend == "threading":
-            return _SEARCHThread(
+            worker = _SEARCHThread(
                 targets=targets,
                 query_queue=query_queue,
                 query_count=query_count,
                 kill_switch=kill_switch,
                 callback=self.callback,
                 options=self.options,
-                builder=self.builder,
+                builder=copy.copy(self.builder),
             )
+            worker.metrics = self.metrics
+            worker.target_residues = self.target_residues
+            worker.build_cpus = self.build_cpus
+            worker.index = self._worker_count
+            self._worker_count += 1
+            return worker
         elif self.backend == "multiprocessing":
-            return _SEARCHProcess(
+            worker = _SEARCHProcess(
                 targets=targets,
                 query_queue=query_queue,
                 query_count=query_count,
                 kill_switch=kill_switch,
                 callback=self.callback,
                 options=self.options,
-                builder=self.builder,
+                builder=copy.copy(self.builder),
             )
+            worker.build_cpus = self.build_cpus
+            return worker
         else:
             raise ValueError(f"Invalid backend for `hmmsearch`: {self.backend!r}")
 
+    def _new_indexed_chore(
+        self,
+        query: _SEARCHQueryType,
+        index: int,
+        completed: "queue.Queue[int]",
+    ) -> "_BaseChore[_SEARCHQueryType, TopHits[_SEARCHQueryType]]":
+        if self.backend == "threading":
+            return _IndexedThreadChore(query, index, completed)
+        elif self.backend == "multiprocessing":
+            return _ProcessChore(query)
+        else:
+            raise ValueError(f"Invalid parallel backend: {self.backend!r}")
+
+    def _done_chores(
+        self,
+        pending: "Dict[int, _BaseChore[_SEARCHQueryType, TopHits[_SEARCHQueryType]]]",
+        completed: "queue.Queue[int]",
+        timeout: Optional[float],
+    ) -> List[int]:
+        # return the indices of the pending chores that are done, waiting
+        # at most `timeout` seconds for the first one (forever if `None`)
+        if self.backend == "multiprocessing":
+            conns = {chore.connr: index for index, chore in pending.items()}  # type: ignore
+            ready = multiprocessing.connection.wait(list(conns), timeout)
+            return sorted(conns[conn] for conn in ready)  # type: ignore
+        indices = []
+        try:
+            indices.append(completed.get(timeout=timeout))
+            while True:
+                indices.append(completed.get_nowait())
+        except queue.Empty:
+            pass
+        return indices
+
+    def _multi_threaded_unordered(self) -> typing.Iterator[Tuple[int, "TopHits[_SEARCHQueryType]"]]:
+        with contextlib.ExitStack() as ctx:
+            # the chores that are not done yet or not yielded yet, by index
+            pending: Dict[int, _BaseChore[_SEARCHQueryType, TopHits[_SEARCHQueryType]]] = {}
+            completed: "queue.Queue[int]" = queue.Queue()
+            if self.backend == "multiprocessing":
+                manager = ctx.enter_context(multiprocessing.Manager())
+                query_queue = ctx.enter_context(contextlib.closing(multiprocessing.Queue(maxsize=2*self.cpus)))
+                query_count = manager.Value(ctypes.c_ulong, 0)
+                kill_switch = manager.Event()
+            elif self.backend == "threading":
+                query_queue = queue.Queue(maxsize=2*self.cpus)
+                query_count = multiprocessing.Value(ctypes.c_ulong)  # type: ignore
+                kill_switch = threading.Event()
+
+            # create and launch one pipeline thread per CPU
+            workers = []
+            for _ in range(self.cpus):
+                worker = self._new_worker(query_queue, query_count, kill_switch)
+                worker.start()
+                workers.append(worker)
+
+            # catch exceptions to kill threads in the background before exiting
+            try:
+                # feed queries to the workers, and yield every result as
+                # soon as it is available, whatever its query index
+                for index, query in enumerate(self.queries):
+                    query_count.value += 1
+                    chore = self._new_indexed_chore(query, index, completed)
+                    while not kill_switch.is_set():
+                        with contextlib.suppress(queue.Full):
+                            query_queue.put(chore, timeout=self.timeout)  # <-- blocks if too many chores in queue
+                            pending[index] = chore
+                            break
+                    for i in self._done_chores(pending, completed, 0):
+                        yield i, pending.pop(i).get()
+                # now that we exhausted all queries, poison pill the
+                # threads so they stop on their own gracefully
+                for _ in workers:
+                    query_queue.put(None)
+                # yield all remaining results, in completion order
+                while pending:
+                    for i in self._done_chores(pending, completed, None):
+                        yield i, pending.pop(i).get()
+                # wait for final workers
+                for worker in workers:
+                    worker.join()  # type: ignore
+                if self.backend == "multiprocessing":
+                    worker.query_queue.close()
+                    worker.query_queue.join_thread()
+            except BaseException as e:
+                # make sure threads are killed to avoid being stuck,
+                # e.g. after a KeyboardInterrupt, then re-raise
+                try:
+                    kill_switch.set()
+                except queue.Full:
+                    pass
+                for worker in workers:
+                    worker.join()  # type: ignore
+                    if self.backend == "multiprocessing":
+                        worker.query_queue.close()
+                raise e
+
+    def run(self) -> typing.Iterator:  # type: ignore
+        if self.ordered:
+            return super().run()
+        elif self.cpus == 1:
+            return enumerate(self._single_threaded())
+        else:
+            return self._multi_threaded_unordered()
+
 
 class _ReverseSEARCHDispatcher(
     _BaseDispatcher[
@@ -141,12 +374,14 @@ class _ReverseSEARCHDispatcher(
     def __init__(
         self,
         queries: Iterable["_SEARCHQueryType"],
-        targets: DigitalSequenceBlock,
+        targets: _BlockTargets,
         cpus: int = 0,
         callback: Optional[Callable[["_SEARCHQueryType", int], None]] = None,
         builder: Optional["Builder"] = None,
         timeout: int = 1,
         backend: "BACKEND" = "threading",
+        metrics: Optional[SearchMetrics] = None,
+        ordered: bool = True,
         **options,  # type: Unpack[PipelineOptions]
     ) -> None:
         super().__init__(
@@ -159,31 +394,47 @@ class _ReverseSEARCHDispatcher(
             backend,
             **options
         )
+        self.metrics = metrics
+        self.ordered = ordered
         # only use as many CPUs as there are targets (if only a few), but
         # that may be a waste for less than N sequences per CPUs?
         self.cpus = max(1, min(cpus, len(targets)))
+        # queries are searched one at a time, so alignments can be built
+        # and calibrated with all the requested CPUs
+        self.build_cpus = max(1, cpus)
         # attempt to balance the chunks so that every thread gets about the
         # same number of *residues* (not the same number of *sequences*!)
+        self.target_offsets: typing.List[int] = []
+        self.target_residues: typing.List[int] = []
+        self.total_residues = 0
         self.target_chunks = self._make_chunks(targets)
 
-    def _make_chunks(self, targets: DigitalSequenceBlock) -> typing.List[DigitalSequenceBlock]:
+    def _make_chunks(self, targets: _BlockTargets) -> typing.List[_BlockTargets]:
         # compute chunksize from total sequence lengths
         # TODO: implement this as a Cython function with quick access to the
         #       sequence data?
-        total_length = sum(len(seq) for seq in targets)
+        if isinstance(targets, SequenceDatabase):
+            lengths = targets.lengths()
+        else:
+            lengths = [len(seq) for seq in targets]
+        total_length = sum(lengths)
         chunksize = (total_length + self.cpus - 1) // self.cpus
         # balance sequence residues across chunks
         current_size = 0
         chunk_indices = [0]
-        for i, seq in enumerate(targets):
-            current_size += len(seq)
+        for i, length in enumerate(lengths):
+            current_size += length
             if current_size > chunksize:
                 chunk_indices.append(i)
                 current_size = 0
         while len(chunk_indices) <= self.cpus:
             chunk_indices.append(len(targets))
+        self.target_offsets = chunk_indices[:-1]
+        self.target_residues = [sum(lengths[i:j]) for i,j in zip(chunk_indices, chunk_indices[1:])]
+        self.total_residues = total_length
         # NB: this does not copy data, as `DigitalSequenceBlock` are implemented
-        #     as views of `DigitalSequence` objects, so slicing is cheap.
+        #     as views of `DigitalSequence` objects, and `SequenceDatabase`
+        #     slices share the same memory mapping, so slicing is cheap.
         return [targets[i:j] for i,j in zip(chunk_indices, chunk_indices[1:])]
 
     def _new_worker(
@@ -191,30 +442,44 @@ class _ReverseSEARCHDispatcher(
         query_queue: "queue.Queue[Optional[_BaseChore[_SEARCHQueryType, TopHits[_SEARCHQueryType]]]]",
         query_count: "multiprocessing.Value[int]",  # type: ignore
         kill_switch: threading.Event,
-        targets: Optional[DigitalSequenceBlock] = None,
+        targets: Optional[_BlockTargets] = None,
+        index: int = 0,
+        target_offset: int = 0,
+        target_residues: Optional[int] = None,
     ) -> _SEARCHWorker:
         if targets is None:
             targets = self.targets
+        if target_residues is None:
+            target_residues = self.total_residues
         if self.backend == "threading":
-            return _SEARCHThread(
+            worker = _SEARCHThread(
                 targets=targets,
                 query_queue=query_queue,
                 query_count=query_count,
                 kill_switch=kill_switch,
                 callback=None,
                 options=self.options,
+                # only used by the main thread worker, since alignments
+                # are otherwise built once for all workers by `_multi_threaded`
                 builder=self.builder,
             )
+            worker.metrics = self.metrics
+            worker.build_cpus = self.build_cpus
+            worker.index = index
+            worker.target_offset = target_offset
+            worker.target_residues = target_residues
+            return worker
         elif self.backend == "multiprocessing":
-            return _SEARCHProcess(
+            worker = _SEARCHProcess(
                 targets=targets,
                 query_queue=query_queue,
                 query_count=query_count,
                 kill_switch=kill_switch,
                 callback=None,
                 options=self.options,
-                builder=self.builder,
             )
+            worker.target_offset = target_offset
+            return worker
         else:
             raise ValueError(f"Invalid backend for `hmmsearch`: {self.backend!r}")
 
@@ -248,7 +513,7 @@ class _ReverseSEARCHDispatcher(
                 elif self.backend == "threading":
                     query_queue = queue.Queue()
                 # create worker
-                worker = self._new_worker(query_queue, query_count, kill_switch, targets=self.target_chunks[i])
+                worker = self._new_worker(query_queue, query_count, kill_switch, targets=self.target_chunks[i], index=i, target_offset=self.target_offsets[i], target_residues=self.target_residues[i])
                 worker.start()
                 workers.append(worker)
                 queues.append(query_queue)
@@ -262,6 +527,13 @@ class _ReverseSEARCHDispatcher(
                     if hits is not None:
                         yield hits
                     query_count.value += 1
+                    # build alignments once, calibrating with all the CPUs,
+                    # so that all workers search (and merge hits of) the
+                    # same CM
+                    if isinstance(query, DigitalMSA):
+                        if self.builder is None:
+                            self.builder = Builder(query.alphabet)
+                        query = _build_cm(self.builder, query, cpus=self.build_cpus)
                     # create one chore per worker
                     chores = []
                     for worker, worker_queue in zip(workers, queues):
@@ -273,7 +545,10 @@ class _ReverseSEARCHDispatcher(
                     for chore in chores:
                         partial_hits.append(chore.get())
                     # merge hits
+                    t1 = time.monotonic()
                     hits = TopHits.merge(*partial_hits)
+                    if self.metrics is not None:
+                        self.metrics._hits_merged(query, time.monotonic() - t1)
                     # call callback here after the hits have been merged
                     if self.callback is not None:
                         self.callback(chore.query, query_count.value)
@@ -301,19 +576,29 @@ class _ReverseSEARCHDispatcher(
                         worker.query_queue.join_thread()
                 raise e
 
+    def run(self) -> typing.Iterator:  # type: ignore
+        # queries are searched one at a time, so they always complete in
+        # input order, and only need to be tagged with their index
+        if self.ordered:
+            return super().run()
+        return enumerate(super().run())
+
 
 # --- hmmsearch --------------------------------------------------------------
 
 def cmsearch(
-    queries: typing.Union[CM, Iterable[CM]],
+    queries: typing.Union[_SEARCHQueryType, Iterable[_SEARCHQueryType]],
     sequences: Iterable[DigitalSequence],
     *,
     cpus: int = 0,
     callback: Optional[Callable[[_P, int], None]] = None,
+    builder: Optional[Builder] = None,
     backend: "BACKEND" = "threading",
     parallel: Optional["PARALLEL"] = None,
+    metrics: Optional[SearchMetrics] = None,
+    ordered: bool = True,
     **options,  # type: Unpack[PipelineOptions]
-) -> typing.Iterator["TopHits[CM]"]:
+) -> typing.Iterator[typing.Union["TopHits[CM]", Tuple[int, "TopHits[CM]"]]]:
     """Search CM profiles against a sequence database.
 
     In Infernal many-to-many comparisons, a *search* is the operation of
@@ -329,17 +614,23 @@ def cmsearch(
     the cost of extra  startup time and much higher memory consumption. You 
     may want to check how much memory is available (for instance with
     `psutil.virtual_memory`) before trying to load a whole sequence database,
-    but it is really recommended to do so whenever possible.
+    but it is really recommended to do so whenever possible. A database
+    stored in a `~pyinfernal.cm.SequenceDatabase` is searched directly from
+    its memory mapping, without startup time or extra memory.
 
     Arguments:
-        queries (iterable of `~pyinfernal.cm.CM`): The
-            query CMs or profiles to search for in the database. Note that
-            passing a single object is supported, but the function
-            will always return an iterator.
+        queries (iterable of `~pyinfernal.cm.CM` or `~pyhmmer.easel.DigitalMSA`):
+            The query CMs or alignments to search for in the database. Note
+            that passing a single object is supported, but the function
+            will always return an iterator. If a `~pyinfernal.cm.CMFile`
+            is given, CMs will be parsed ahead in background threads.
+            Alignments are converted to CMs by the workers, in parallel,
+            before being searched.
         sequences (iterable of `~pyhmmer.easel.DigitalSequence`): A
             database of sequences to query. If you plan on using the
             same sequences several times, consider storing them into
-            a `~pyhmmer.easel.DigitalSequenceBlock` directly. If a
+            a `~pyhmmer.easel.DigitalSequenceBlock` directly, or in a
+            `~pyinfernal.cm.SequenceDatabase` file. If a
             `~pyhmmer.easel.SequenceFile` is given, profiles will be loaded
             iteratively from disk rather than prefetched.
         cpus (`int`): The number of threads to run in parallel. Pass ``1``
@@ -349,6 +640,9 @@ def cmsearch(
         callback (callable): A callback that is called everytime a query is
             processed with two arguments: the query, and the total number
             of queries. This can be used to display progress in UI.
+        builder (`~pyinfernal.cm.Builder`, optional): A builder to configure
+            how the alignment queries are converted to CMs. Passing `None`
+            will create a default instance.
         backend (`str`): The parallel backend to use for workers to be
             executed. Supports ``threading`` to use thread-based parallelism,
             or ``multiprocessing`` to use process-based parallelism.
@@ -359,12 +653,24 @@ def cmsearch(
             a single or a small number of queries. Note that parallelization
             on ``targets`` does not work with `~pyhmmer.easel.SequenceFile`
             targets.
+        metrics (`~pyinfernal.infernal.SearchMetrics`, optional): A
+            metrics collector to record the progress and throughput of
+            the search into, which can be polled from another thread
+            while the search is running.
+        ordered (`bool`): Whether to yield the results in the same order
+            the queries were passed in the input. Pass `False` to yield
+            the results of each query as soon as they are available,
+            together with the index of the query in the input, so that
+            a slow query does not hold back the results of the following
+            ones.
 
     Yields:
         `~pyinfernal.cm.TopHits`: An object reporting *top hits* for each
         query, in the same order the queries were passed in the input.
         The number of included hits depends on the ``incE`` threshold
         passed as an option to the internal `~pyinfernal.cm.Pipeline`.
+        If ``ordered`` is `False`, a tuple with the index of the query
+        and its *top hits* is yielded instead, in completion order.
 
     Raises:
         `~pyhmmer.errors.AlphabetMismatch`: When any of the query CMs
@@ -385,12 +691,35 @@ def cmsearch(
         ``mypy`` should be able to detection which keywords can be passed 
         to `cmsearch` using a `TypedDict` annotation.
 
+    Note:
+        The workers search one query at a time with
+        `Pipeline.search_cm <pyinfernal.cm.Pipeline.search_cm>`, so they
+        do not screen several queries in a single pass over the targets.
+        Only direct callers of `Pipeline.search_cms
+        <pyinfernal.cm.Pipeline.search_cms>` get the single-pass screening.
+
+    Caution:
+        CMs built from alignments with base pairs must be calibrated with
+        `CM.calibrate <pyinfernal.cm.CM.calibrate>` before they can be
+        searched, which is much slower than building them. With the
+        ``queries`` parallel strategy, the workers calibrate several
+        alignments at once, each with a single CPU unless there are
+        fewer queries than ``cpus``. With the ``targets`` strategy, each
+        alignment is calibrated with all the ``cpus`` before its search.
+        Consider building and calibrating CMs once if the alignments
+        are reused.
+
     """
     cpus = cpus if cpus > 0 else psutil.cpu_count(logical=False) or os.cpu_count() or 1
     alphabet = options.get("alphabet")
 
     if not isinstance(queries, collections.abc.Iterable):
         queries = (queries,)
+    elif isinstance(queries, CMFile) and not queries.closed:
+        # parse the queries in the background so that workers do not wait
+        # for the main thread to read the next CM, using a few more threads
+        # when many workers consume the queries
+        queries = queries.prefetch(size=2 * cpus, threads=max(1, cpus // 16))
 
     if isinstance(sequences, SequenceFile):
         raise NotImplementedError("cmsearch currently does not support `SequenceFile` targets")
@@ -400,8 +729,8 @@ def cmsearch(
             raise ValueError("expected digital mode `SequenceFile` for targets")
         assert sequences.alphabet is not None
         alphabet = alphabet or sequences.alphabet
-        targets: typing.Union["SequenceFile[DigitalSequence]", DigitalSequenceBlock] = sequences
-    elif isinstance(sequences, DigitalSequenceBlock):
+        targets: typing.Union["SequenceFile[DigitalSequence]", _BlockTargets] = sequences
+    elif isinstance(sequences, (DigitalSequenceBlock, SequenceDatabase)):
         alphabet = alphabet or sequences.alphabet
         targets = sequences
         if "Z" not in options:
@@ -421,11 +750,11 @@ def cmsearch(
     _queries_hint = operator.length_hint(queries)
     _few_queries = _queries_hint != 0 and _queries_hint < cpus
     if parallel is None:
-        if _few_queries and isinstance(targets, DigitalSequenceBlock):
+        if _few_queries and isinstance(targets, (DigitalSequenceBlock, SequenceDatabase)):
             parallel = "targets"
         else:
             parallel = "queries"
-    if parallel == "targets" and not isinstance(targets, DigitalSequenceBlock):
+    if parallel == "targets" and not isinstance(targets, (DigitalSequenceBlock, SequenceDatabase)):
         raise RuntimeError("cannot use ``targets`` parallel mode with a sequence file")
 
     # start the dispatcher
@@ -438,6 +767,51 @@ def cmsearch(
         cpus=cpus,
         backend=backend,
         callback=callback,  # type: ignore
+        builder=builder,
+        metrics=metrics,
+        ordered=ordered,
         **options,
     )
-    return dispatcher.run()  # type: ignore
+    if metrics is None:
+        return dispatcher.run()  # type: ignore
+
+    # weight the cost of each query by its consensus length if all the
+    # queries are known in advance, otherwise let the metrics extrapolate
+    residues = targets.total_length() if isinstance(targets, (DigitalSequenceBlock, SequenceDatabase)) else 0
+    if isinstance(queries, collections.abc.Sequence):
+        queries_total: Optional[int] = len(queries)
+        if all(isinstance(query, CM) for query in queries):
+            cost: Optional[float] = sum(query.clen for query in queries) * residues
+        else:
+            cost = None
+    else:
+        queries_total = _queries_hint or None
+        cost = None
+    workers = dispatcher.cpus if dispatcher.backend == "threading" else 0
+    return _monitor(dispatcher.run(), metrics, workers, queries_total, cost, residues, ordered)
+
+
+def _monitor(
+    results: typing.Iterator[typing.Any],
+    metrics: SearchMetrics,
+    workers: int,
+    queries_total: Optional[int],
+    cost: Optional[float],
+    residues: int,
+    ordered: bool = True,
+) -> typing.Iterator[typing.Any]:
+    """Record the progress of a search into a metrics collector.
+    """
+    metrics._search_started(workers, queries_total, cost)
+    try:
+        while True:
+            t1 = time.monotonic()
+            try:
+                result = next(results)
+            except StopIteration:
+                break
+            hits = result if ordered else result[1]
+            metrics._hits_ready(hits.query, residues, time.monotonic() - t1)
+            yield result
+    finally:
+        metrics._search_finished()
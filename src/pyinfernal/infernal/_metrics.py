@@ -0,0 +1,344 @@
+from __future__ import annotations
+
+import threading
+import time
+import typing
+from typing import Any, Callable, Dict, List, Optional
+
+if typing.TYPE_CHECKING:
+    from ..cm import CM
+
+
+# --- Worker metrics -----------------------------------------------------------
+
+class WorkerMetrics:
+    """A snapshot of the activity of a single dispatcher worker.
+
+    Attributes:
+        index (`int`): The index of the worker in the dispatcher.
+        queries (`int`): The number of queries processed by the worker.
+        residues (`int`): The number of target residues searched by the
+            worker, summed over all the queries it processed.
+        busy_time (`float`): The time spent by the worker processing
+            queries, in seconds.
+        idle_time (`float`): The time spent by the worker waiting for
+            queries, in seconds.
+        current_query (`str` or `None`): The name of the query currently
+            processed by the worker, or `None` if the worker is idle.
+
+    """
+
+    __slots__ = ("index", "queries", "residues", "busy_time", "idle_time", "current_query")
+
+    def __init__(
+        self,
+        index: int,
+        queries: int = 0,
+        residues: int = 0,
+        busy_time: float = 0.0,
+        idle_time: float = 0.0,
+        current_query: Optional[str] = None,
+    ) -> None:
+        self.index = index
+        self.queries = queries
+        self.residues = residues
+        self.busy_time = busy_time
+        self.idle_time = idle_time
+        self.current_query = current_query
+
+    def __repr__(self) -> str:
+        ty = type(self).__name__
+        return (
+            f"{ty}(index={self.index!r}, queries={self.queries!r}, "
+            f"residues={self.residues!r}, busy_time={self.busy_time!r}, "
+            f"idle_time={self.idle_time!r}, current_query={self.current_query!r})"
+        )
+
+    @property
+    def utilization(self) -> float:
+        """`float`: The fraction of time the worker spent processing queries.
+        """
+        total = self.busy_time + self.idle_time
+        return self.busy_time / total if total > 0 else 0.0
+
+
+class _WorkerState:
+    # mutable state of a worker, only accessed with the metrics lock held
+    __slots__ = ("queries", "residues", "busy_time", "started", "current_query", "current_start")
+
+    def __init__(self, started: float) -> None:
+        self.queries = 0
+        self.residues = 0
+        self.busy_time = 0.0
+        self.started = started
+        self.current_query: Optional[str] = None
+        self.current_start = 0.0
+
+
+# --- Search metrics -----------------------------------------------------------
+
+class SearchMetrics:
+    """Live progress and throughput metrics of a `cmsearch` run.
+
+    Pass an instance to `cmsearch` with the ``metrics`` argument, and
+    then either poll it from another thread (e.g. to refresh a progress
+    bar or export the values to a monitoring system), or pass a
+    ``listener`` to receive events as the search progresses.
+
+    The estimated time remaining is weighted by the cost of each query,
+    approximated as the consensus length of the CM times the number of
+    target residues, since queries of different sizes can take very
+    different times to process.
+
+    Example:
+        >>> metrics = SearchMetrics()
+        >>> all_hits = list(pyinfernal.cmsearch(trna, sequences, metrics=metrics))
+        >>> metrics.queries_done
+        1
+        >>> metrics.residues == sequences.total_length()
+        True
+
+    Note:
+        Per-worker metrics are only collected with the ``threading``
+        backend, since workers of the ``multiprocessing`` backend do not
+        share memory with the main process.
+
+    """
+
+    def __init__(
+        self,
+        listener: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+    ) -> None:
+        """Create a new metrics collector.
+
+        Arguments:
+            listener (callable, optional): A callable called with an event
+                name and a `dict` of event data everytime the state of the
+                search changes. Events are ``search_started``,
+                ``query_started`` and ``query_finished`` (when a worker
+                starts and finishes processing a query), ``hits_merged``
+                (when the partial hits of several workers are merged),
+                ``hits_ready`` (when the hits of a query are returned)
+                and ``search_finished``. The listener may be called from
+                worker threads, and should return quickly.
+
+        """
+        self.listener = listener
+        self._lock = threading.Lock()
+        self._workers: List[_WorkerState] = []
+        self._start: Optional[float] = None
+        self._end: Optional[float] = None
+        self._queries_total: Optional[int] = None
+        self._queries_done = 0
+        self._residues = 0
+        self._cost_total: Optional[float] = None
+        self._cost_estimated = False
+        self._cost_done = 0.0
+        self._merge_time = 0.0
+        self._wait_time = 0.0
+
+    def __repr__(self) -> str:
+        ty = type(self).__name__
+        return (
+            f"<{ty} queries_done={self.queries_done!r} "
+            f"queries_total={self.queries_total!r} "
+            f"residues={self.residues!r} eta={self.eta!r}>"
+        )
+
+    # --- Properties -----------------------------------------------------------
+
+    @property
+    def elapsed(self) -> float:
+        """`float`: The wall-clock time elapsed since the search started.
+        """
+        with self._lock:
+            return self._elapsed()
+
+    @property
+    def queries_total(self) -> Optional[int]:
+        """`int` or `None`: The total number of queries, if known.
+        """
+        return self._queries_total
+
+    @property
+    def queries_done(self) -> int:
+        """`int`: The number of queries processed so far.
+        """
+        return self._queries_done
+
+    @property
+    def residues(self) -> int:
+        """`int`: The number of target residues searched so far.
+        """
+        return self._residues
+
+    @property
+    def residues_per_second(self) -> float:
+        """`float`: The average number of target residues searched per second.
+        """
+        with self._lock:
+            elapsed = self._elapsed()
+            return self._residues / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def merge_time(self) -> float:
+        """`float`: The time spent merging partial hits, in seconds.
+        """
+        return self._merge_time
+
+    @property
+    def wait_time(self) -> float:
+        """`float`: The time spent by the caller waiting for results, in seconds.
+        """
+        return self._wait_time
+
+    @property
+    def workers(self) -> List[WorkerMetrics]:
+        """`list` of `WorkerMetrics`: A snapshot of the activity of each worker.
+        """
+        with self._lock:
+            return self._worker_metrics(time.monotonic())
+
+    @property
+    def eta(self) -> Optional[float]:
+        """`float` or `None`: The estimated time remaining, in seconds.
+
+        The estimate is `None` until the first query has been processed,
+        or if the total number of queries is unknown.
+
+        """
+        with self._lock:
+            return self._eta()
+
+    # --- Methods --------------------------------------------------------------
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Get a consistent snapshot of all metrics as a `dict`.
+
+        The returned dictionary only contains built-in types, so it can
+        be serialized directly, e.g. with `json.dumps`.
+
+        """
+        with self._lock:
+            now = time.monotonic()
+            elapsed = self._elapsed(now)
+            return {
+                "elapsed": elapsed,
+                "queries_total": self._queries_total,
+                "queries_done": self._queries_done,
+                "residues": self._residues,
+                "residues_per_second": self._residues / elapsed if elapsed > 0 else 0.0,
+                "merge_time": self._merge_time,
+                "wait_time": self._wait_time,
+                "eta": self._eta(now),
+                "workers": [
+                    {
+                        "index": worker.index,
+                        "queries": worker.queries,
+                        "residues": worker.residues,
+                        "busy_time": worker.busy_time,
+                        "idle_time": worker.idle_time,
+                        "current_query": worker.current_query,
+                    }
+                    for worker in self._worker_metrics(now)
+                ],
+            }
+
+    # --- Private methods ------------------------------------------------------
+
+    def _elapsed(self, now: Optional[float] = None) -> float:
+        if self._start is None:
+            return 0.0
+        if self._end is not None:
+            return self._end - self._start
+        return (now or time.monotonic()) - self._start
+
+    def _eta(self, now: Optional[float] = None) -> Optional[float]:
+        if self._end is not None:
+            return 0.0
+        if self._cost_total is None or self._cost_done == 0:
+            return None
+        elapsed = self._elapsed(now)
+        remaining = max(0.0, self._cost_total - self._cost_done)
+        return remaining * elapsed / self._cost_done
+
+    def _worker_metrics(self, now: float) -> List[WorkerMetrics]:
+        metrics = []
+        for i, worker in enumerate(self._workers):
+            busy_time = worker.busy_time
+            if worker.current_query is not None:
+                busy_time += now - worker.current_start
+            end = now if self._end is None else self._end
+            metrics.append(WorkerMetrics(
+                index=i,
+                queries=worker.queries,
+                residues=worker.residues,
+                busy_time=busy_time,
+                idle_time=max(0.0, end - worker.started - busy_time),
+                current_query=worker.current_query,
+            ))
+        return metrics
+
+    def _emit(self, event: str, **data: Any) -> None:
+        if self.listener is not None:
+            self.listener(event, data)
+
+    def _search_started(
+        self,
+        workers: int,
+        queries: Optional[int],
+        cost: Optional[float],
+    ) -> None:
+        with self._lock:
+            self._start = now = time.monotonic()
+            self._end = None
+            self._workers = [_WorkerState(now) for _ in range(workers)]
+            self._queries_total = queries
+            self._queries_done = 0
+            self._residues = 0
+            self._cost_total = cost
+            self._cost_estimated = cost is None
+            self._cost_done = 0.0
+            self._merge_time = 0.0
+            self._wait_time = 0.0
+        self._emit("search_started", workers=workers, queries=queries)
+
+    def _query_started(self, worker: int, query: "CM") -> None:
+        with self._lock:
+            state = self._workers[worker]
+            state.current_query = query.name
+            state.current_start = time.monotonic()
+        self._emit("query_started", worker=worker, query=query.name)
+
+    def _query_finished(self, worker: int, query: "CM", residues: int) -> None:
+        with self._lock:
+            state = self._workers[worker]
+            elapsed = time.monotonic() - state.current_start
+            state.busy_time += elapsed
+            state.queries += 1
+            state.residues += residues
+            state.current_query = None
+        self._emit("query_finished", worker=worker, query=query.name, residues=residues, time=elapsed)
+
+    def _hits_ready(self, query: "CM", residues: int, waited: float) -> None:
+        with self._lock:
+            self._queries_done += 1
+            self._residues += residues
+            self._cost_done += query.clen * residues
+            self._wait_time += waited
+            # without a known total cost, extrapolate the cost of the
+            # remaining queries from the average cost of the finished ones
+            if self._cost_estimated and self._queries_total is not None:
+                self._cost_total = self._cost_done * self._queries_total / self._queries_done
+            count = self._queries_done
+        self._emit("hits_ready", query=query.name, count=count, time=waited)
+
+    def _hits_merged(self, query: "CM", elapsed: float) -> None:
+        with self._lock:
+            self._merge_time += elapsed
+        self._emit("hits_merged", query=query.name, time=elapsed)
+
+    def _search_finished(self) -> None:
+        with self._lock:
+            self._end = time.monotonic()
+        self._emit("search_finished", queries=self._queries_done, residues=self._residues)
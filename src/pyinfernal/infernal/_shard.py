@@ -0,0 +1,486 @@
+from __future__ import annotations
+
+import concurrent.futures
+import hashlib
+import json
+import os
+import pickle
+import typing
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import psutil
+
+from pyhmmer.easel import SequenceFile
+from ..cm import CM, CMFile, TopHits
+from ._cmsearch import cmsearch
+
+if typing.TYPE_CHECKING:
+    from ._base import Unpack, PipelineOptions
+
+_PathLike = Union[str, "os.PathLike[str]"]
+
+# the version of the manifest and shard result formats
+_FORMAT_VERSION = 1
+
+
+# --- Partitioning -------------------------------------------------------------
+
+def _partition(weights: List[int], n: int) -> List[Tuple[int, int]]:
+    """Split ``weights`` in at most ``n`` contiguous ranges of similar weight.
+    """
+    n = max(1, min(n, len(weights)))
+    total = sum(weights)
+    ranges = []
+    start = 0
+    current = 0
+    for i, weight in enumerate(weights):
+        current += weight
+        # cut when reaching the expected cumulative weight of the range,
+        # making sure to leave at least one item for each remaining range
+        remaining = n - len(ranges) - 1
+        if remaining > 0 and (current * n >= total * (len(ranges) + 1) or len(weights) - i - 1 == remaining):
+            ranges.append((start, i + 1))
+            start = i + 1
+    if start < len(weights) or not ranges:
+        ranges.append((start, len(weights)))
+    return ranges
+
+
+# --- Manifest -----------------------------------------------------------------
+
+class Shard:
+    """A shard of a search, pairing a range of queries with a range of targets.
+
+    Attributes:
+        index (`int`): The index of the shard in its manifest.
+        queries (`tuple` of `int`): The start and stop indices of the
+            CMs to search, in the order of the query file.
+        targets (`tuple` of `int`): The start and stop indices of the
+            sequences to search, in the order of the target file.
+
+    """
+
+    __slots__ = ("index", "queries", "targets")
+
+    def __init__(
+        self,
+        index: int,
+        queries: Tuple[int, int],
+        targets: Tuple[int, int],
+    ) -> None:
+        self.index = index
+        self.queries = tuple(queries)
+        self.targets = tuple(targets)
+
+    def __repr__(self) -> str:
+        ty = type(self).__name__
+        return f"{ty}(index={self.index!r}, queries={self.queries!r}, targets={self.targets!r})"
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Shard):
+            return NotImplemented
+        return (self.index, self.queries, self.targets) == (other.index, other.queries, other.targets)
+
+
+class ShardManifest:
+    """A manifest splitting a search of CMs against sequences into shards.
+
+    Every shard searches a range of the query CMs against a range of the
+    target sequences, and can be run independently of the others, in a
+    different process or on a different node, with `run_shard`. The
+    effective database size ``Z`` is fixed globally in the manifest, so
+    that the E-values reported in each shard are the ones of the complete
+    search, and the results of all shards can be merged with
+    `merge_shards`.
+
+    Example:
+        >>> cm_path = "tests/data/cms/RF00029.cm"
+        >>> seqs_path = "tests/data/seqs/pANT_R100.fa"
+        >>> manifest = ShardManifest.create(cm_path, seqs_path, E=1.0)
+        >>> manifest.Z
+        138981
+        >>> len(manifest.shards)
+        1
+
+    """
+
+    def __init__(
+        self,
+        queries: _PathLike,
+        targets: _PathLike,
+        shards: Iterable[Shard],
+        Z: int,
+        *,
+        format: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Create a new manifest.
+
+        Arguments:
+            queries (`str` or `os.PathLike`): The path to the CM file
+                storing the queries.
+            targets (`str` or `os.PathLike`): The path to the sequence
+                file storing the targets.
+            shards (iterable of `Shard`): The shards of the search.
+            Z (`int`): The effective database size, in residues.
+
+        Keyword Arguments:
+            format (`str`, optional): The format of the target sequence
+                file, or `None` to detect it automatically.
+            options (`dict`, optional): Additional options to pass to the
+                `~pyinfernal.cm.Pipeline` of every shard.
+
+        """
+        self.queries = os.fspath(queries)
+        self.targets = os.fspath(targets)
+        self.shards = list(shards)
+        self.Z = Z
+        self.format = format
+        self.options = dict(options or {})
+        if "Z" in self.options:
+            raise ValueError("`Z` must be given as a manifest argument, not an option")
+
+    def __repr__(self) -> str:
+        ty = type(self).__name__
+        return f"<{ty} queries={self.queries!r} targets={self.targets!r} shards={len(self.shards)} Z={self.Z!r}>"
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ShardManifest):
+            return NotImplemented
+        return self._state() == other._state()
+
+    @classmethod
+    def create(
+        cls,
+        queries: _PathLike,
+        targets: _PathLike,
+        *,
+        query_shards: int = 1,
+        target_shards: int = 1,
+        Z: Optional[int] = None,
+        format: Optional[str] = None,
+        **options,  # type: Unpack[PipelineOptions]
+    ) -> "ShardManifest":
+        """Create a manifest for searching a CM file against a sequence file.
+
+        The queries and the targets are split into contiguous ranges with
+        about the same cost, using the consensus length of the CMs and
+        the length of the target sequences, and every range of queries
+        is paired with every range of targets to create the shards.
+
+        Arguments:
+            queries (`str` or `os.PathLike`): The path to the CM file
+                storing the queries.
+            targets (`str` or `os.PathLike`): The path to the sequence
+                file storing the targets.
+
+        Keyword Arguments:
+            query_shards (`int`): The number of ranges to split the
+                queries into.
+            target_shards (`int`): The number of ranges to split the
+                targets into.
+            Z (`int`, optional): The effective database size, in residues.
+                If `None` given, use the total length of the targets, like
+                `~pyinfernal.infernal.cmsearch` does.
+            format (`str`, optional): The format of the target sequence
+                file, or `None` to detect it automatically.
+
+        Note:
+            Any additional arguments passed to `ShardManifest.create` will
+            be recorded in the manifest and passed transparently to the
+            `~pyinfernal.cm.Pipeline` of every shard. They must be
+            serializable to JSON.
+
+        """
+        if query_shards <= 0:
+            raise ValueError(f"`query_shards` must be strictly positive, got {query_shards!r}")
+        if target_shards <= 0:
+            raise ValueError(f"`target_shards` must be strictly positive, got {target_shards!r}")
+
+        # get the consensus lengths of the queries from their headers
+        queries = os.path.abspath(os.fspath(queries))
+        with CMFile(queries) as cm_file:
+            headers = cm_file.headers()
+        if not headers:
+            raise ValueError(f"no CM found in {queries!r}")
+        query_ranges = _partition([header.clen for header in headers], query_shards)
+
+        # get the target lengths (in digital mode so that the lengths are
+        # the same as the ones the shards will be searching)
+        targets = os.path.abspath(os.fspath(targets))
+        alphabet = headers[0].load().alphabet
+        lengths = []
+        with SequenceFile(targets, format, digital=True, alphabet=alphabet) as seq_file:
+            for seq in seq_file:
+                lengths.append(len(seq))
+        if not lengths:
+            raise ValueError(f"no sequence found in {targets!r}")
+        target_ranges = _partition(lengths, target_shards)
+
+        shards = [
+            Shard(i, query_range, target_range)
+            for i, (query_range, target_range) in enumerate(
+                (q, t) for q in query_ranges for t in target_ranges
+            )
+        ]
+        return cls(
+            queries,
+            targets,
+            shards,
+            sum(lengths) if Z is None else Z,
+            format=format,
+            options=options,
+        )
+
+    @classmethod
+    def load(cls, fh: typing.TextIO) -> "ShardManifest":
+        """Load a manifest from a file handle opened in text mode.
+        """
+        state = json.load(fh)
+        if state.get("version") != _FORMAT_VERSION:
+            raise ValueError(f"unsupported manifest version: {state.get('version')!r}")
+        return cls(
+            state["queries"],
+            state["targets"],
+            [Shard(**shard) for shard in state["shards"]],
+            state["Z"],
+            format=state["format"],
+            options=state["options"],
+        )
+
+    def dump(self, fh: typing.TextIO) -> None:
+        """Write the manifest to a file handle opened in text mode.
+        """
+        json.dump(self._state(), fh, indent=2)
+
+    def _state(self) -> Dict[str, Any]:
+        return {
+            "version": _FORMAT_VERSION,
+            "queries": self.queries,
+            "targets": self.targets,
+            "format": self.format,
+            "Z": self.Z,
+            "options": self.options,
+            "shards": [
+                {"index": shard.index, "queries": list(shard.queries), "targets": list(shard.targets)}
+                for shard in self.shards
+            ],
+        }
+
+    @property
+    def checksum(self) -> str:
+        """`str`: A checksum of the manifest, recorded in the shard results.
+        """
+        data = json.dumps(self._state(), sort_keys=True).encode()
+        return hashlib.sha256(data).hexdigest()
+
+
+# --- Shard results ------------------------------------------------------------
+
+class _ResultPickler(pickle.Pickler):
+    # NOTE(@althonos): the query CMs are not serialized with the hits but
+    #                  only referenced by index, since they can be loaded
+    #                  back from the query file when merging, and would
+    #                  otherwise be duplicated in every target shard.
+
+    def __init__(self, file: typing.BinaryIO, queries: Dict[int, int]) -> None:
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.queries = queries
+
+    def persistent_id(self, obj: object) -> Optional[Tuple[str, int]]:
+        if isinstance(obj, CM):
+            return ("CM", self.queries[id(obj)])
+        return None
+
+
+class _ResultUnpickler(pickle.Unpickler):
+
+    def __init__(self, file: typing.BinaryIO, query: Optional[CM] = None, index: int = -1) -> None:
+        super().__init__(file)
+        self.query = query
+        self.query_index = index
+
+    def persistent_load(self, pid: Tuple[str, int]) -> CM:
+        if pid != ("CM", self.query_index) or self.query is None:
+            raise pickle.UnpicklingError(f"unexpected query reference: {pid!r}")
+        return self.query
+
+
+def run_shard(
+    manifest: ShardManifest,
+    index: int,
+    output: _PathLike,
+    *,
+    cpus: int = 0,
+) -> None:
+    """Run a shard of a manifest and write the results to a file.
+
+    The results are written to a temporary file first, and only moved to
+    ``output`` once all queries have been processed, so that the results
+    of an interrupted shard are never mistaken for complete ones.
+
+    Arguments:
+        manifest (`~pyinfernal.infernal.ShardManifest`): The manifest of
+            the search.
+        index (`int`): The index of the shard to run.
+        output (`str` or `os.PathLike`): The path to the file where to
+            write the results of the shard.
+
+    Keyword Arguments:
+        cpus (`int`): The number of threads to search the shard with,
+            passed to `~pyinfernal.infernal.cmsearch`.
+
+    """
+    shard = manifest.shards[index]
+    q_start, q_stop = shard.queries
+    t_start, t_stop = shard.targets
+
+    # load the queries of the shard from their offset in the file
+    with CMFile(manifest.queries) as cm_file:
+        headers = cm_file.headers()[q_start:q_stop]
+        cms = [header.load(cm_file) for header in headers]
+    if len(cms) != q_stop - q_start:
+        raise ValueError(f"query file does not contain queries {q_start} to {q_stop}")
+
+    # load the targets of the shard
+    alphabet = cms[0].alphabet
+    with SequenceFile(manifest.targets, manifest.format, digital=True, alphabet=alphabet) as seq_file:
+        for _ in range(t_start):
+            if seq_file.read(skip_sequence=True) is None:
+                break
+        targets = seq_file.read_block(sequences=t_stop - t_start)
+    if len(targets) != t_stop - t_start:
+        raise ValueError(f"target file does not contain sequences {t_start} to {t_stop}")
+
+    output = os.fspath(output)
+    tmp = f"{output}.tmp"
+    queries = {id(cm): i for i, cm in enumerate(cms, start=q_start)}
+    try:
+        # NOTE: every record is written with a new pickler so that it can
+        #       be loaded independently of the previous ones
+        with open(tmp, "wb") as dst:
+            header = {"version": _FORMAT_VERSION, "manifest": manifest.checksum, "shard": index}
+            _ResultPickler(dst, queries).dump(header)
+            for hits in cmsearch(cms, targets, cpus=cpus, Z=manifest.Z, **manifest.options):
+                _ResultPickler(dst, queries).dump(hits)
+        os.replace(tmp, output)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _run_shard(args: Tuple[ShardManifest, int, str, int]) -> str:
+    manifest, index, output, cpus = args
+    run_shard(manifest, index, output, cpus=cpus)
+    return output
+
+
+def run_shards(
+    manifest: ShardManifest,
+    directory: _PathLike,
+    *,
+    processes: int = 0,
+    cpus: int = 1,
+) -> List[str]:
+    """Run all the shards of a manifest in a local process pool.
+
+    Arguments:
+        manifest (`~pyinfernal.infernal.ShardManifest`): The manifest of
+            the search.
+        directory (`str` or `os.PathLike`): The directory where to write
+            the results of each shard.
+
+    Keyword Arguments:
+        processes (`int`): The number of processes to run in parallel.
+            Pass ``0`` to use one process per physical CPU.
+        cpus (`int`): The number of threads each process searches its
+            shard with.
+
+    Returns:
+        `list` of `str`: The paths to the results of every shard, in the
+        order of the shards in the manifest.
+
+    """
+    processes = processes if processes > 0 else psutil.cpu_count(logical=False) or os.cpu_count() or 1
+    directory = os.fspath(directory)
+    jobs = [
+        (manifest, shard.index, os.path.join(directory, f"shard-{shard.index:05}.hits"), cpus)
+        for shard in manifest.shards
+    ]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=min(processes, len(jobs))) as pool:
+        return list(pool.map(_run_shard, jobs))
+
+
+# --- Merging ------------------------------------------------------------------
+
+def merge_shards(
+    manifest: ShardManifest,
+    results: Iterable[_PathLike],
+) -> Iterator["TopHits[CM]"]:
+    """Merge the results of all the shards of a manifest.
+
+    The results of the shards covering the same queries are read in
+    lockstep and merged one query at a time, so that only the hits of a
+    single query are held in memory at once.
+
+    Arguments:
+        manifest (`~pyinfernal.infernal.ShardManifest`): The manifest of
+            the search.
+        results (iterable of `str` or `os.PathLike`): The paths to the
+            results of every shard of the manifest, in any order.
+
+    Yields:
+        `~pyinfernal.cm.TopHits`: The merged hits for each query, in the
+        order of the query file, with E-values computed for the complete
+        target database.
+
+    Raises:
+        `ValueError`: When the results were obtained with a different
+            manifest, or when the results of a shard are missing or
+            incomplete.
+
+    """
+    checksum = manifest.checksum
+
+    # check the headers of all results and map them to their shard
+    paths: Dict[int, str] = {}
+    for result in results:
+        path = os.fspath(result)
+        with open(path, "rb") as src:
+            header = pickle.load(src)
+        if not isinstance(header, dict) or header.get("version") != _FORMAT_VERSION:
+            raise ValueError(f"not a shard result file: {path!r}")
+        if header["manifest"] != checksum:
+            raise ValueError(f"results in {path!r} were obtained with a different manifest")
+        if header["shard"] in paths:
+            raise ValueError(f"duplicate results for shard {header['shard']}: {path!r}")
+        paths[header["shard"]] = path
+    missing = [shard.index for shard in manifest.shards if shard.index not in paths]
+    if missing:
+        raise ValueError(f"missing results for shards: {missing!r}")
+
+    # group shards by query range, in the order of the query file
+    groups: Dict[Tuple[int, int], List[Shard]] = {}
+    for shard in manifest.shards:
+        groups.setdefault(shard.queries, []).append(shard)
+
+    with CMFile(manifest.queries) as cm_file:
+        headers = cm_file.headers()
+        for (q_start, q_stop), shards in sorted(groups.items()):
+            files = [open(paths[shard.index], "rb") for shard in shards]
+            try:
+                for f in files:
+                    _ResultUnpickler(f).load()  # skip header
+                for i in range(q_start, q_stop):
+                    query = headers[i].load(cm_file)
+                    partial_hits = []
+                    for shard, f in zip(shards, files):
+                        try:
+                            partial_hits.append(_ResultUnpickler(f, query, i).load())
+                        except EOFError:
+                            raise ValueError(f"incomplete results for shard {shard.index}") from None
+                    yield partial_hits[0].merge(*partial_hits[1:])
+            finally:
+                for f in files:
+                    f.close()
@@ -1,7 +1,19 @@
 from . import (
-    test_cmfile
+    test_aligner,
+    test_builder,
+    test_cm,
+    test_cmfile,
+    test_pipeline,
+    test_seedindex,
+    test_sequencedatabase,
 )
 
 def load_tests(loader, suite, pattern):
+    suite.addTests(loader.loadTestsFromModule(test_aligner))
+    suite.addTests(loader.loadTestsFromModule(test_builder))
+    suite.addTests(loader.loadTestsFromModule(test_cm))
     suite.addTests(loader.loadTestsFromModule(test_cmfile))
+    suite.addTests(loader.loadTestsFromModule(test_pipeline))
+    suite.addTests(loader.loadTestsFromModule(test_seedindex))
+    suite.addTests(loader.loadTestsFromModule(test_sequencedatabase))
     return suite
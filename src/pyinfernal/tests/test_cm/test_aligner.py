@@ -0,0 +1,66 @@
+import unittest
+
+from pyhmmer.easel import Alphabet, DigitalSequenceBlock, SequenceFile, TextSequence
+from pyhmmer.errors import AlphabetMismatch, EaselError
+from pyinfernal.cm import CMFile, Aligner
+
+from .. import __name__ as __package__
+from .utils import resource_files
+
+
+@unittest.skipUnless(resource_files, "importlib.resources.files not available")
+class TestAligner(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        data = resource_files(__package__).joinpath("data")
+        with CMFile(data.joinpath("cms", "tRNA.c.cm")) as cm_file:
+            cls.cm = next(cm for cm in cm_file if cm.name == "tRNA")
+        with SequenceFile(data.joinpath("seqs", "emitted-tRNA.fa"), digital=True, alphabet=cls.cm.alphabet) as seqs_file:
+            cls.sequences = seqs_file.read_block()
+        with SequenceFile(data.joinpath("seqs", "pANT_R100.fa"), digital=True, alphabet=cls.cm.alphabet) as seqs_file:
+            cls.plasmid = seqs_file.read_block()
+
+    def test_align(self):
+        aligner = Aligner(self.cm)
+        msa = aligner.align(self.sequences)
+        self.assertEqual(len(msa.sequences), len(self.sequences))
+        self.assertEqual(msa.names, tuple(seq.name for seq in self.sequences))
+        text = msa.textize()
+        # all consensus columns of the CM are in the alignment
+        self.assertEqual(len(text.reference.replace(".", "")), self.cm.clen)
+        self.assertEqual(len(text.secondary_structure), len(msa))
+        # aligned sequences are the input sequences with gaps
+        for seq, row in zip(self.sequences.textize(), text.alignment):
+            self.assertEqual(row.replace("-", "").replace(".", ""), seq.sequence)
+
+    def test_align_empty(self):
+        aligner = Aligner(self.cm)
+        msa = aligner.align(DigitalSequenceBlock(self.cm.alphabet))
+        self.assertEqual(len(msa.sequences), 0)
+
+    def test_align_cyk(self):
+        aligner = Aligner(self.cm, algorithm="cyk", posteriors=False)
+        msa = aligner.align(self.sequences)
+        self.assertEqual(len(msa.sequences), len(self.sequences))
+
+    def test_align_global(self):
+        aligner = Aligner(self.cm, local=False, truncated=False)
+        msa = aligner.align(self.sequences)
+        self.assertEqual(len(msa.sequences), len(self.sequences))
+
+    def test_align_mxsize(self):
+        aligner = Aligner(self.cm, mxsize=1.0)
+        self.assertEqual(aligner.mxsize, 1.0)
+        self.assertRaises(EaselError, aligner.align, self.plasmid)
+
+    def test_align_alphabet_mismatch(self):
+        aligner = Aligner(self.cm)
+        seq = TextSequence(name=b"seq1", sequence="MEEMKLL").digitize(Alphabet.amino())
+        block = DigitalSequenceBlock(Alphabet.amino(), [seq])
+        self.assertRaises(AlphabetMismatch, aligner.align, block)
+
+    def test_invalid_parameters(self):
+        self.assertRaises(ValueError, Aligner, self.cm, algorithm="nonsense")
+        self.assertRaises(ValueError, Aligner, self.cm, tau=0.0)
+        self.assertRaises(ValueError, Aligner, self.cm, mxsize=-1.0)
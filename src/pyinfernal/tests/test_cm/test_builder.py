@@ -0,0 +1,112 @@
+import copy
+import pickle
+import unittest
+
+from pyhmmer.easel import Alphabet, MSAFile, SequenceFile, TextMSA, TextSequence
+from pyhmmer.errors import AlphabetMismatch, InvalidParameter
+from pyinfernal.cm import CM, Builder, Pipeline
+
+from .. import __name__ as __package__
+from .utils import resource_files
+
+
+@unittest.skipUnless(resource_files, "importlib.resources.files not available")
+class TestBuilder(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.data = resource_files(__package__).joinpath("data")
+        cls.alphabet = Alphabet.rna()
+
+    def read_msa(self, alphabet=None):
+        alphabet = alphabet or self.alphabet
+        path = self.data.joinpath("msas", "tRNA.sto")
+        with MSAFile(path, digital=True, alphabet=alphabet) as msa_file:
+            return msa_file.read()
+
+    def test_build_msa(self):
+        msa = self.read_msa()
+        cm = Builder(self.alphabet).build_msa(msa)
+        self.assertIsInstance(cm, CM)
+        self.assertEqual(cm.name, "tRNA")
+        self.assertEqual(cm.accession, "RF00005")
+        self.assertEqual(cm.description, "tRNA")
+        self.assertEqual(cm.alphabet, self.alphabet)
+        self.assertEqual(cm.clen, 71)
+        self.assertEqual(cm.M, 227)
+        self.assertEqual(cm.N, 60)
+        self.assertEqual(cm.W, 221)
+        self.assertEqual(cm.nbp, 21)
+        self.assertEqual(cm.nseq, 967)
+        self.assertAlmostEqual(cm.nseq_effective, 104.729, places=2)
+        self.assertIsNot(cm.filter_hmm, None)
+        self.assertEqual(cm.filter_hmm.M, cm.clen)
+
+    def test_build_msa_deterministic(self):
+        msa = self.read_msa()
+        cm1 = Builder(self.alphabet).build_msa(msa)
+        cm2 = Builder(self.alphabet).build_msa(msa)
+        self.assertEqual(cm1.__getstate__(), cm2.__getstate__())
+
+    def test_build_msa_pickle(self):
+        msa = self.read_msa()
+        cm = Builder(self.alphabet).build_msa(msa)
+        cm2 = pickle.loads(pickle.dumps(cm))
+        self.assertEqual(cm.__getstate__(), cm2.__getstate__())
+
+    def test_build_msa_no_basepairs(self):
+        msa = self.read_msa()
+        msa.secondary_structure = "." * len(msa.secondary_structure)
+        cm = Builder(self.alphabet).build_msa(msa)
+        self.assertEqual(cm.nbp, 0)
+        self.assertEqual(cm.clen, 71)
+        # models without base pairs can be searched without calibration
+        with SequenceFile(self.data.joinpath("seqs", "emitted-tRNA.fa"), digital=True, alphabet=self.alphabet) as seqs_file:
+            seqs = seqs_file.read_block()
+        hits = Pipeline(self.alphabet, Z=1000000).search_cm(cm, seqs)
+        self.assertGreater(len(hits.reported), 0)
+
+    def test_build_msa_alphabet_mismatch(self):
+        msa = self.read_msa(Alphabet.dna())
+        self.assertRaises(AlphabetMismatch, Builder(self.alphabet).build_msa, msa)
+
+    def test_build_msa_no_name(self):
+        msa = self.read_msa()
+        msa.name = None
+        self.assertRaises(ValueError, Builder(self.alphabet).build_msa, msa)
+
+    def test_build_msa_no_structure(self):
+        msa = TextMSA(
+            name=b"test",
+            sequences=[
+                TextSequence(name=b"seq1", sequence="ACGUACGU"),
+                TextSequence(name=b"seq2", sequence="ACGUAC-U"),
+            ],
+        ).digitize(self.alphabet)
+        self.assertRaises(ValueError, Builder(self.alphabet).build_msa, msa)
+
+    def test_init_error(self):
+        self.assertRaises(ValueError, Builder, Alphabet.amino())
+        self.assertRaises(ValueError, Builder, Alphabet.dna())
+        self.assertRaises(InvalidParameter, Builder, self.alphabet, symfrac=2.0)
+        self.assertRaises(InvalidParameter, Builder, self.alphabet, fragthresh=-1.0)
+        self.assertRaises(InvalidParameter, Builder, self.alphabet, ere=-1.0)
+        self.assertRaises(InvalidParameter, Builder, self.alphabet, esigma=0.0)
+        self.assertRaises(InvalidParameter, Builder, self.alphabet, emaxseq=-1.0)
+
+    def test_dna_builder(self):
+        builder = Builder(Alphabet.dna(), ere=0.59)
+        cm = builder.build_msa(self.read_msa(Alphabet.dna()))
+        self.assertEqual(cm.alphabet, Alphabet.dna())
+        self.assertEqual(cm.clen, 71)
+
+    def test_copy(self):
+        builder = Builder(self.alphabet, symfrac=0.3, eminseq=1.0, p7ere=0.4)
+        for other in (builder.copy(), copy.copy(builder), pickle.loads(pickle.dumps(builder))):
+            self.assertIsNot(other, builder)
+            self.assertEqual(other.alphabet, builder.alphabet)
+            self.assertAlmostEqual(other.symfrac, 0.3)
+            self.assertEqual(other.eminseq, 1.0)
+            self.assertAlmostEqual(other.p7ere, 0.4)
+            self.assertIs(other.ere, None)
+            self.assertIs(other.emaxseq, None)
@@ -0,0 +1,163 @@
+import io
+import pickle
+import re
+import unittest
+
+from pyhmmer.easel import Randomness
+from pyinfernal.cm import CMFile, NodeType, Pipeline, StateType
+
+from .. import __name__ as __package__
+from .utils import resource_files
+
+
+def _exptail_lines(cm):
+    buffer = io.BytesIO()
+    cm.write(buffer)
+    return [
+        line.split()
+        for line in buffer.getvalue().decode().splitlines()
+        if line.startswith("ECM")
+    ]
+
+
+@unittest.skipUnless(resource_files, "importlib.resources.files not available")
+class TestCM(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        data = resource_files(__package__).joinpath("data")
+        with CMFile(data.joinpath("cms", "RF03523.cm")) as cm_file:
+            cls.cm = cm_file.read()
+
+    def test_pickle(self):
+        cm = pickle.loads(pickle.dumps(self.cm))
+        self.assertEqual(cm.name, self.cm.name)
+        self.assertEqual(cm.accession, self.cm.accession)
+        self.assertEqual(cm.clen, self.cm.clen)
+        self.assertEqual(cm.alphabet, self.cm.alphabet)
+        self.assertIsNot(cm.filter_hmm, None)
+        self.assertEqual(cm.filter_hmm.M, self.cm.filter_hmm.M)
+        b1, b2 = io.BytesIO(), io.BytesIO()
+        self.cm.write(b1)
+        cm.write(b2)
+        self.assertEqual(b1.getvalue(), b2.getvalue())
+
+    def test_calibrate(self):
+        cm1 = self.cm.copy()
+        cm1.calibrate(0.02, cpus=1)
+        lines = _exptail_lines(cm1)
+        self.assertEqual(len(lines), 4)
+        self.assertEqual([line[0] for line in lines], ["ECMLC", "ECMGC", "ECMLI", "ECMGI"])
+        for line in lines:
+            self.assertEqual(int(line[4]), 20000)
+            self.assertGreater(float(line[1]), 0.0)
+        # results should not depend on the number of threads
+        cm2 = self.cm.copy()
+        cm2.calibrate(0.02, cpus=2)
+        self.assertEqual(_exptail_lines(cm2), lines)
+        # the original CM should be left untouched
+        self.assertNotEqual(_exptail_lines(self.cm), lines)
+
+    def test_calibrate_invalid_parameters(self):
+        cm = self.cm.copy()
+        self.assertRaises(ValueError, cm.calibrate, 0.0)
+        self.assertRaises(ValueError, cm.calibrate, cpus=-1)
+        self.assertRaises(ValueError, cm.calibrate, gtailn=0)
+
+    def test_sample(self):
+        seqs = self.cm.sample(20, 42)
+        self.assertEqual(len(seqs), 20)
+        self.assertEqual(seqs[0].name, f"{self.cm.name}-sample1")
+        self.assertEqual(seqs[-1].name, f"{self.cm.name}-sample20")
+        self.assertEqual(seqs.alphabet, self.cm.alphabet)
+        # sampling is reproducible from the seed
+        other = self.cm.sample(20, Randomness(42))
+        self.assertEqual(
+            [seq.textize().sequence for seq in seqs],
+            [seq.textize().sequence for seq in other],
+        )
+        self.assertEqual(len(self.cm.sample(0)), 0)
+
+    def test_sample_embed(self):
+        for background in ("genomic", "iid"):
+            seqs = self.cm.sample(20, 42, embed=1000, background=background)
+            self.assertEqual(seqs.total_length(), 20 * 1000)
+            # the embedded sequences should be found at their coordinates
+            # (hits may extend slightly into the background sequence)
+            pipeline = Pipeline(self.cm.alphabet, Z=1000000)
+            hits = pipeline.search_cm(self.cm, seqs)
+            self.assertGreater(len(hits.included), 10)
+            for hit in hits.included:
+                start, end = map(int, re.search(r"/(\d+)-(\d+)$", hit.name).groups())
+                hit_start, hit_end = sorted((hit.alignment.target_from, hit.alignment.target_to))
+                self.assertLessEqual(start, hit_end)
+                self.assertLessEqual(hit_start, end)
+
+    def test_sample_invalid_parameters(self):
+        self.assertRaises(ValueError, self.cm.sample, -1)
+        self.assertRaises(ValueError, self.cm.sample, 1, embed=0)
+        self.assertRaises(ValueError, self.cm.sample, 1, embed=100, background="nonsense")
+        self.assertRaises(ValueError, self.cm.sample, 10, 42, embed=5)
+
+    def test_transition_probabilities(self):
+        t = self.cm.transition_probabilities
+        self.assertEqual(t.shape, (self.cm.M, 6))
+        view = memoryview(t)
+        self.assertEqual(view.format, "f")
+        self.assertEqual(view.shape, (self.cm.M, 6))
+        counts = self.cm.children_counts
+        for v, state_type in enumerate(self.cm.state_types):
+            if state_type not in (StateType.B, StateType.E):
+                self.assertAlmostEqual(sum(t[v][:counts[v]]), 1.0, places=4)
+
+    def test_emission_probabilities(self):
+        K = self.cm.alphabet.K
+        e = self.cm.emission_probabilities
+        self.assertEqual(e.shape, (self.cm.M, K * K))
+        for v, state_type in enumerate(self.cm.state_types):
+            if state_type == StateType.MP:
+                self.assertAlmostEqual(sum(e[v]), 1.0, places=4)
+            elif state_type in (StateType.ML, StateType.MR, StateType.IL, StateType.IR):
+                self.assertAlmostEqual(sum(e[v][:K]), 1.0, places=4)
+
+    def test_null_probabilities(self):
+        null = self.cm.null_probabilities
+        self.assertEqual(len(null), self.cm.alphabet.K)
+        self.assertAlmostEqual(sum(null), 1.0, places=4)
+
+    def test_structure(self):
+        cm = self.cm
+        self.assertEqual(len(cm.state_types), cm.M)
+        self.assertEqual(len(cm.node_types), cm.N)
+        self.assertEqual(StateType(cm.state_types[0]), StateType.S)
+        self.assertEqual(NodeType(cm.node_types[0]), NodeType.ROOT)
+        self.assertEqual(list(cm.node_types).count(NodeType.MATP), cm.nbp)
+        # the node map gives the first state of each node
+        for n, v in enumerate(cm.node_map):
+            self.assertEqual(cm.state_nodes[v], n)
+            if v > 0:
+                self.assertEqual(cm.state_nodes[v-1], n - 1)
+        # the views share memory with the model
+        cm = self.cm.copy()
+        cm.begin_probabilities[1] = 0.5
+        self.assertEqual(cm.begin_probabilities[1], 0.5)
+        self.assertEqual(len(cm.end_probabilities), cm.M)
+
+    def test_view_lifetime(self):
+        cm = self.cm.copy()
+        t = cm.transition_probabilities
+        expected = list(t[0])
+        del cm
+        self.assertEqual(list(t[0]), expected)
+
+    def test_qdb_bands(self):
+        for dmin, dmax in (self.cm.qdb_bands, self.cm.qdb_loose_bands):
+            self.assertEqual(len(dmin), self.cm.M)
+            self.assertEqual(len(dmax), self.cm.M)
+            self.assertTrue(all(lo <= hi for lo, hi in zip(dmin, dmax)))
+        # the root state can emit a complete hit
+        self.assertLessEqual(self.cm.qdb_bands[1][0], self.cm.W)
+        # loose bands contain the tight bands
+        (dmin1, dmax1), (dmin2, dmax2) = self.cm.qdb_bands, self.cm.qdb_loose_bands
+        self.assertTrue(all(a <= b for a, b in zip(dmin2, dmin1)))
+        self.assertTrue(all(a >= b for a, b in zip(dmax2, dmax1)))
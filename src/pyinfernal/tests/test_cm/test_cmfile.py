@@ -43,6 +43,59 @@ class _TestCMFile:
         with self.open_cm(path) as f:
             self.check_cmfile(f)
 
+    def test_prefetch(self):
+        path = self.cms_folder.joinpath("{}.cm".format(self.ID))
+        if not path.exists():
+            self.skipTest("data files not available")
+        for threads in (1, 3):
+            with self.open_cm(path) as f:
+                self.check_cmfile(f.prefetch(size=2, threads=threads))
+                self.assertIs(f.read(), None)
+            with self.open_cm(path) as f:
+                first = f.read()
+                names = [cm.name for cm in f.prefetch(threads=threads)]
+                self.assertEqual([first.name, *names], self.NAMES)
+        with self.open_cm(path) as f:
+            self.assertRaises(ValueError, f.prefetch, size=0)
+            self.assertRaises(ValueError, f.prefetch, threads=0)
+
+    def test_headers(self):
+        path = self.cms_folder.joinpath("{}.cm".format(self.ID))
+        if not path.exists():
+            self.skipTest("data files not available")
+        with self.open_cm(path) as f:
+            cms = list(f)
+        with self.open_cm(path) as f:
+            headers = f.headers()
+            self.assertIs(f.read(), None)
+        self.assertEqual([header.name for header in headers], self.NAMES)
+        for header, cm in zip(headers, cms):
+            self.assertEqual(header.accession, cm.accession)
+            self.assertEqual(header.description, cm.description)
+            self.assertEqual(header.M, cm.M)
+            self.assertEqual(header.N, cm.N)
+            self.assertEqual(header.clen, cm.clen)
+            self.assertEqual(header.W, cm.W)
+            self.assertEqual(header.nseq, cm.nseq)
+
+    def test_write_roundtrip(self):
+        path = self.cms_folder.joinpath("{}.cm".format(self.ID))
+        if not path.exists():
+            self.skipTest("data files not available")
+        with self.open_cm(path) as f:
+            cms = list(f)
+        for binary in (False, True):
+            buffer = io.BytesIO()
+            for cm in cms:
+                cm.write(buffer, binary=binary)
+            buffer.seek(0)
+            with CMFile(buffer) as f:
+                for cm, copy in itertools.zip_longest(cms, f):
+                    self.assertEqual(copy.name, cm.name)
+                    self.assertEqual(copy.accession, cm.accession)
+                    self.assertEqual(copy.M, cm.M)
+                    self.assertEqual(copy.filter_hmm is None, cm.filter_hmm is None)
+
 
 class _TestCMFileFileobj:
 
@@ -58,6 +111,23 @@ class _TestCMFileFileobj:
         with self.open_cm(path) as f:
             self.assertIs(f.name, None)
 
+    def test_fetch_no_index(self):
+        path = self.cms_folder.joinpath("{}.cm".format(self.ID))
+        if not path.exists():
+            self.skipTest("data files not available")
+        with self.open_cm(path) as f:
+            self.assertFalse(f.indexed)
+            self.assertRaises(ValueError, f.fetch, self.NAMES[0])
+
+    def test_headers_load(self):
+        path = self.cms_folder.joinpath("{}.cm".format(self.ID))
+        if not path.exists():
+            self.skipTest("data files not available")
+        with self.open_cm(path) as f:
+            headers = f.headers()
+        self.assertIs(headers[0].offset, None)
+        self.assertRaises(ValueError, headers[0].load)
+
 
 class _TestCMFilePath:
 
@@ -70,6 +140,93 @@ class _TestCMFilePath:
             self.skipTest("data files not available")
         with self.open_cm(path) as f:
             self.assertEqual(f.name, str(path))
+
+    def test_fetch(self):
+        path = self.cms_folder.joinpath("{}.cm".format(self.ID))
+        if not path.exists():
+            self.skipTest("data files not available")
+        with tempfile.TemporaryDirectory() as folder:
+            copy = os.path.join(folder, os.path.basename(path))
+            shutil.copy(path, copy)
+            self.assertEqual(CMFile.create_index(copy), len(self.NAMES))
+            self.assertRaises(FileExistsError, CMFile.create_index, copy)
+            with self.open_cm(copy) as f:
+                accessions = {cm.name:cm.accession for cm in f}
+            with self.open_cm(copy) as f:
+                self.assertTrue(f.indexed)
+                self.assertEqual(f.keys(), sorted(self.NAMES))
+                for name in reversed(self.NAMES):
+                    self.assertIn(name, f)
+                    self.assertEqual(f.fetch(name).name, name)
+                    self.assertEqual(f[accessions[name]].name, name)
+                self.assertNotIn("missing", f)
+                self.assertRaises(KeyError, f.fetch, "missing")
+
+    def test_fetch_no_index(self):
+        path = self.cms_folder.joinpath("{}.cm".format(self.ID))
+        if not path.exists():
+            self.skipTest("data files not available")
+        with self.open_cm(path) as f:
+            self.assertFalse(f.indexed)
+            self.assertRaises(ValueError, f.fetch, self.NAMES[0])
+
+    def test_cached(self):
+        path = self.cms_folder.joinpath("{}.cm".format(self.ID))
+        if not path.exists():
+            self.skipTest("data files not available")
+        with tempfile.TemporaryDirectory() as folder:
+            copy = os.path.join(folder, os.path.basename(path))
+            shutil.copy(path, copy)
+            cache = copy + ".cbm"
+            with CMFile.cached(copy) as f:
+                self.assertEqual(f.name, cache)
+                self.check_cmfile(f)
+            self.assertTrue(os.path.exists(cache))
+            mtime = os.stat(cache).st_mtime_ns
+            with CMFile.cached(copy) as f:
+                self.check_cmfile(f)
+            self.assertEqual(os.stat(cache).st_mtime_ns, mtime)
+            with CMFile.cached(cache) as f:
+                self.assertEqual(f.name, cache)
+                self.check_cmfile(f)
+            self.assertEqual(
+                sorted(os.listdir(folder)),
+                sorted([os.path.basename(copy), os.path.basename(cache)]),
+            )
+
+    def test_headers_load(self):
+        path = self.cms_folder.joinpath("{}.cm".format(self.ID))
+        if not path.exists():
+            self.skipTest("data files not available")
+        with tempfile.TemporaryDirectory() as folder:
+            copy = os.path.join(folder, os.path.basename(path))
+            shutil.copy(path, copy)
+            with CMFile.cached(copy) as f:
+                binary_headers = f.headers()
+            with self.open_cm(copy) as f:
+                first = f.read()
+                headers = f.headers()
+            self.assertEqual([first.name] + [h.name for h in headers], self.NAMES)
+            for header, binary_header in zip(headers, binary_headers[1:]):
+                self.assertEqual(header.nbp, binary_header.nbp)
+                self.assertEqual(header.clen, binary_header.clen)
+            for header in reversed(headers):
+                self.assertEqual(header.load().name, header.name)
+            with self.open_cm(copy + ".cbm") as f:
+                for header in binary_headers:
+                    self.assertEqual(header.load(f).name, header.name)
+
+    def test_prefetch_index(self):
+        path = self.cms_folder.joinpath("{}.cm".format(self.ID))
+        if not path.exists():
+            self.skipTest("data files not available")
+        with tempfile.TemporaryDirectory() as folder:
+            copy = os.path.join(folder, os.path.basename(path))
+            shutil.copy(path, copy)
+            CMFile.cached(copy).close()
+            CMFile.create_index(copy + ".cbm")
+            with CMFile(copy + ".cbm") as f:
+                self.check_cmfile(f.prefetch(threads=4))
     
 
 class _TestRF00029(_TestCMFile):
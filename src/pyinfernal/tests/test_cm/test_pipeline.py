@@ -0,0 +1,462 @@
+import io
+import pickle
+import subprocess
+import sys
+import sysconfig
+import threading
+import time
+import unittest
+
+from pyhmmer.easel import DigitalSequenceBlock, SequenceFile, TextSequence
+from pyinfernal.cm import CMFile, Pipeline
+
+from .. import __name__ as __package__
+from .utils import resource_files
+
+
+@unittest.skipUnless(resource_files, "importlib.resources.files not available")
+class TestPipeline(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        data = resource_files(__package__).joinpath("data")
+        with CMFile(data.joinpath("cms", "RF00029.cm")) as cm_file:
+            cls.cm = cm_file.read()
+        with SequenceFile(data.joinpath("seqs", "pANT_R100.fa"), digital=True, alphabet=cls.cm.alphabet) as seqs_file:
+            cls.sequences = seqs_file.read_block()
+
+    def _repeated_block(self, n=3):
+        # build a block where every sequence appears several times
+        block = DigitalSequenceBlock(self.cm.alphabet)
+        for i in range(n):
+            for seq in self.sequences:
+                copy = seq.copy()
+                copy.name = f"{seq.name}_{i}"
+                block.append(copy)
+        return block
+
+    def test_deduplicate(self):
+        block = self._repeated_block()
+
+        pli = Pipeline(self.cm.alphabet, Z=100000)
+        expected = pli.search_cm(self.cm, block)
+        pli = Pipeline(self.cm.alphabet, Z=100000, deduplicate=True)
+        self.assertTrue(pli.deduplicate)
+        hits = pli.search_cm(self.cm, block)
+
+        self.assertGreater(len(expected), 0)
+        self.assertEqual(len(hits), len(expected))
+        self.assertEqual(len(hits.reported), len(expected.reported))
+        self.assertEqual(len(hits.included), len(expected.included))
+        self.assertEqual(hits.Z, expected.Z)
+        self.assertEqual(
+            sorted((h.name, h.score, h.evalue, h.alignment.target_from) for h in hits),
+            sorted((h.name, h.score, h.evalue, h.alignment.target_from) for h in expected),
+        )
+        for hit in hits:
+            self.assertEqual(hit.alignment.target_name, hit.name)
+
+    def _mixed_block(self):
+        # split the sequences into chunks of very different lengths
+        block = DigitalSequenceBlock(self.cm.alphabet)
+        lengths = [20000, 150, 2000, 300]
+        for seq in self.sequences.textize():
+            start = 0
+            while start < len(seq):
+                end = start + lengths[len(block) % len(lengths)]
+                chunk = TextSequence(name=f"{seq.name}_{start}", sequence=seq.sequence[start:end])
+                block.append(chunk.digitize(self.cm.alphabet))
+                start = end
+        return block
+
+    def test_sort_targets(self):
+        block = self._mixed_block()
+        block.extend(self._mixed_block())
+
+        pli = Pipeline(self.cm.alphabet, Z=100000)
+        expected = pli.search_cm(self.cm, block)
+        self.assertGreater(len(expected), 0)
+
+        for deduplicate in (False, True):
+            pli = Pipeline(self.cm.alphabet, Z=100000, sort_targets=True, deduplicate=deduplicate)
+            self.assertTrue(pli.sort_targets)
+            hits = pli.search_cm(self.cm, block)
+            self.assertEqual(
+                [(h.name, h.score, h.evalue, h.alignment.target_from) for h in hits],
+                [(h.name, h.score, h.evalue, h.alignment.target_from) for h in expected],
+            )
+
+    def test_reseed_targets(self):
+        block = self._mixed_block()
+        reverse = DigitalSequenceBlock(self.cm.alphabet, reversed(block))
+
+        pli = Pipeline(self.cm.alphabet, Z=100000, seed=42, reseed_targets=True)
+        self.assertTrue(pli.reseed_targets)
+        expected = pli.search_cm(self.cm, block)
+        self.assertGreater(len(expected), 0)
+        hits = pli.search_cm(self.cm, reverse)
+        self.assertEqual(
+            sorted((h.name, h.score, h.evalue, h.alignment.target_from) for h in hits),
+            sorted((h.name, h.score, h.evalue, h.alignment.target_from) for h in expected),
+        )
+
+    def _reads(self, length=150):
+        # tile the sequences with overlapping short reads
+        block = DigitalSequenceBlock(self.cm.alphabet)
+        for seq in self.sequences.textize():
+            for start in range(0, len(seq) - length, length // 2):
+                read = TextSequence(name=f"{seq.name}_{start}", sequence=seq.sequence[start:start+length])
+                block.append(read.digitize(self.cm.alphabet))
+        return block
+
+    def test_short_targets(self):
+        block = self._reads()
+
+        pli = Pipeline(self.cm.alphabet, Z=1000000000)
+        expected = pli.search_cm(self.cm, block)
+        self.assertGreater(len(expected), 0)
+
+        pli = Pipeline(self.cm.alphabet, Z=1000000000, short_targets=True)
+        self.assertTrue(pli.short_targets)
+        hits = pli.search_cm(self.cm, block)
+        self.assertEqual(
+            [(h.name, h.score, h.evalue, h.alignment.target_from) for h in hits],
+            [(h.name, h.score, h.evalue, h.alignment.target_from) for h in expected],
+        )
+        # the pipeline statistics must account for the screened targets
+        state = hits.__getstate__()
+        expected_state = expected.__getstate__()
+        self.assertEqual(state["pipeline"], expected_state["pipeline"])
+
+    def test_search_cms(self):
+        data = resource_files(__package__).joinpath("data")
+        cms = [self.cm]
+        for rfam_id in ["RF03523", "RF00107"]:
+            with CMFile(data.joinpath("cms", f"{rfam_id}.cm")) as cm_file:
+                cms.append(cm_file.read())
+
+        block = self._reads()
+        block.extend(self.sequences)
+        pli = Pipeline(self.cm.alphabet, Z=1000000000)
+        expected = []
+        for cm in cms:
+            expected.append(pli.search_cm(cm, block))
+            pli.clear()
+
+        pli = Pipeline(self.cm.alphabet, Z=1000000000)
+        all_hits = pli.search_cms(cms, block)
+        self.assertEqual(len(all_hits), len(cms))
+        for cm, hits, exp in zip(cms, all_hits, expected):
+            self.assertIs(hits.query, cm)
+            self.assertEqual(
+                [(h.name, h.score, h.evalue, h.alignment.target_from) for h in hits],
+                [(h.name, h.score, h.evalue, h.alignment.target_from) for h in exp],
+            )
+            # the pipeline statistics must account for the screened targets
+            self.assertEqual(hits.__getstate__()["pipeline"], exp.__getstate__()["pipeline"])
+
+    def test_search_cms_batches(self):
+        # more queries than screened in a single batch
+        block = self._reads()
+        cms = [self.cm] * 20
+        pli = Pipeline(self.cm.alphabet, Z=1000000000)
+        expected = pli.search_cm(self.cm, block)
+        pli.clear()
+        all_hits = pli.search_cms(iter(cms), block)
+        self.assertEqual(len(all_hits), len(cms))
+        for hits in all_hits:
+            self.assertEqual(
+                [(h.name, h.score, h.evalue, h.alignment.target_from) for h in hits],
+                [(h.name, h.score, h.evalue, h.alignment.target_from) for h in expected],
+            )
+            self.assertEqual(hits.__getstate__()["pipeline"], expected.__getstate__()["pipeline"])
+
+    def test_search_cms_empty(self):
+        pli = Pipeline(self.cm.alphabet, Z=100000)
+        self.assertEqual(pli.search_cms([], self.sequences), [])
+
+    def _hit_regions(self, hits, flank=50):
+        lengths = {seq.name: len(seq) for seq in self.sequences}
+        regions = []
+        for hit in hits:
+            start, end = sorted((hit.alignment.target_from, hit.alignment.target_to))
+            regions.append((
+                hit.name,
+                max(0, start - 1 - flank),
+                min(end + flank, lengths[hit.name]),
+                hit.strand
+            ))
+        return regions
+
+    def test_search_regions(self):
+        pli = Pipeline(self.cm.alphabet, Z=100000)
+        expected = pli.search_cm(self.cm, self.sequences)
+        self.assertGreater(len(expected), 0)
+
+        regions = self._hit_regions(expected)
+        pli = Pipeline(self.cm.alphabet, Z=100000)
+        hits = pli.search_regions(self.cm, self.sequences, regions)
+
+        self.assertEqual(len(hits), len(expected))
+        self.assertEqual(len(hits.included), len(expected.included))
+        for hit, exp in zip(hits, expected):
+            self.assertEqual(hit.name, exp.name)
+            self.assertEqual(hit.strand, exp.strand)
+            self.assertEqual(hit.score, exp.score)
+            self.assertEqual(hit.evalue, exp.evalue)
+            self.assertEqual(hit.alignment.target_from, exp.alignment.target_from)
+            self.assertEqual(hit.alignment.target_to, exp.alignment.target_to)
+            self.assertEqual(hit.alignment.target_name, exp.alignment.target_name)
+
+    def test_search_regions_overlapping(self):
+        pli = Pipeline(self.cm.alphabet, Z=100000)
+        expected = pli.search_cm(self.cm, self.sequences)
+        # give every region twice, with different flanks and no strand
+        regions = [
+            (name, start, end, ".")
+            for flank in (50, 100)
+            for name, start, end, _ in self._hit_regions(expected, flank)
+        ]
+        pli = Pipeline(self.cm.alphabet, Z=100000)
+        hits = pli.search_regions(self.cm, self.sequences, regions)
+        self.assertEqual(len(hits.reported), len(expected.reported))
+
+    def test_search_regions_strand(self):
+        pli = Pipeline(self.cm.alphabet, Z=100000)
+        expected = pli.search_cm(self.cm, self.sequences)
+        regions = [
+            (name, start, end, "-" if strand == "+" else "+")
+            for name, start, end, strand in self._hit_regions(expected)
+        ]
+        pli = Pipeline(self.cm.alphabet, Z=100000)
+        hits = pli.search_regions(self.cm, self.sequences, regions)
+        self.assertEqual(len(hits.reported), 0)
+
+    def test_search_regions_error(self):
+        pli = Pipeline(self.cm.alphabet, Z=100000)
+        name = self.sequences[0].name
+        length = len(self.sequences[0])
+        with self.assertRaises(KeyError):
+            pli.search_regions(self.cm, self.sequences, [("missing", 0, 100)])
+        with self.assertRaises(IndexError):
+            pli.search_regions(self.cm, self.sequences, [(len(self.sequences), 0, 100)])
+        with self.assertRaises(ValueError):
+            pli.search_regions(self.cm, self.sequences, [(name, 100, 50)])
+        with self.assertRaises(ValueError):
+            pli.search_regions(self.cm, self.sequences, [(name, 0, length + 1)])
+        with self.assertRaises(ValueError):
+            pli.search_regions(self.cm, self.sequences, [(name, 0, 100, "x")])
+
+    def test_search_regions_string_coordinates(self):
+        pli = Pipeline(self.cm.alphabet, Z=100000)
+        expected = pli.search_cm(self.cm, self.sequences)
+        regions = [
+            (name, str(start), str(end), strand)
+            for name, start, end, strand in self._hit_regions(expected)
+        ]
+        pli = Pipeline(self.cm.alphabet, Z=100000)
+        hits = pli.search_regions(self.cm, self.sequences, regions)
+        self.assertEqual(len(hits.reported), len(expected.reported))
+        name = self.sequences[0].name
+        rows = [(name, "0", "100"), (name, "0", "1e3")]
+        with self.assertRaisesRegex(ValueError, "region 1"):
+            pli.search_regions(self.cm, self.sequences, rows)
+        with self.assertRaises(ValueError):
+            pli.search_regions(self.cm, self.sequences, [(name, 0.0, 100)])
+
+    def test_max_hits(self):
+        block = self._repeated_block()
+        pli = Pipeline(self.cm.alphabet, Z=100000)
+        expected = pli.search_cm(self.cm, block)
+        self.assertFalse(expected.truncated)
+        self.assertGreater(len(expected), 2)
+
+        pli = Pipeline(self.cm.alphabet, Z=100000, max_hits=2)
+        self.assertEqual(pli.max_hits, 2)
+        hits = pli.search_cm(self.cm, block)
+        self.assertTrue(hits.truncated)
+        self.assertEqual(len(hits), 2)
+        self.assertEqual(
+            [(h.name, h.evalue) for h in hits],
+            [(h.name, h.evalue) for h in list(expected)[:2]],
+        )
+
+        pli = Pipeline(self.cm.alphabet, Z=100000, max_hits=len(expected))
+        hits = pli.search_cm(self.cm, block)
+        self.assertFalse(hits.truncated)
+        self.assertEqual(len(hits), len(expected))
+
+    def test_max_hits_merge(self):
+        block = self._repeated_block()
+        pli = Pipeline(self.cm.alphabet, Z=100000, max_hits=2)
+        hits1 = pli.search_cm(self.cm, block)
+        hits2 = pli.search_cm(self.cm, block)
+        merged = hits1.merge(hits2)
+        self.assertTrue(merged.truncated)
+        self.assertEqual(len(merged), 2)
+
+    def test_tophits_pickle(self):
+        pli = Pipeline(self.cm.alphabet, Z=100000, E=100.0)
+        hits = pli.search_cm(self.cm, self.sequences)
+        self.assertGreater(len(hits), 0)
+        copy = pickle.loads(pickle.dumps(hits))
+        self.assertEqual(copy.query.name, hits.query.name)
+        self.assertEqual(copy.Z, hits.Z)
+        self.assertEqual(copy.E, hits.E)
+        self.assertEqual(len(copy), len(hits))
+        self.assertEqual(len(copy.included), len(hits.included))
+        for h1, h2 in zip(hits, copy):
+            self.assertEqual(h1.name, h2.name)
+            self.assertEqual(h1.score, h2.score)
+            self.assertEqual(h1.evalue, h2.evalue)
+            self.assertEqual(h1.strand, h2.strand)
+            self.assertEqual(h1.alignment.target_from, h2.alignment.target_from)
+            self.assertEqual(h1.alignment.target_to, h2.alignment.target_to)
+            self.assertEqual(h1.alignment.target_sequence, h2.alignment.target_sequence)
+        b1, b2 = io.BytesIO(), io.BytesIO()
+        hits.write(b1)
+        copy.write(b2)
+        self.assertEqual(b1.getvalue(), b2.getvalue())
+        # hits of the same CM loaded separately can be merged
+        merged = hits.merge(copy)
+        self.assertEqual(len(merged), 2 * len(hits))
+
+    def test_max_residues(self):
+        block = self._repeated_block()
+        pli = Pipeline(self.cm.alphabet, Z=100000)
+        expected = pli.search_cm(self.cm, block)
+
+        pli = Pipeline(self.cm.alphabet, Z=100000, max_residues=len(block[0]))
+        self.assertEqual(pli.max_residues, len(block[0]))
+        hits = pli.search_cm(self.cm, block)
+        self.assertTrue(hits.truncated)
+        self.assertEqual(len(hits), len(expected) // len(block))
+        self.assertTrue(all(hit.name == block[0].name for hit in hits))
+
+        pli = Pipeline(self.cm.alphabet, Z=100000, max_residues=sum(map(len, block)))
+        hits = pli.search_cm(self.cm, block)
+        self.assertFalse(hits.truncated)
+        self.assertEqual(len(hits), len(expected))
+
+    def test_limits_error(self):
+        with self.assertRaises(ValueError):
+            Pipeline(self.cm.alphabet, Z=100000, max_hits=0)
+        with self.assertRaises(ValueError):
+            Pipeline(self.cm.alphabet, Z=100000, max_residues=-1)
+
+    def test_cancel(self):
+        block = self._repeated_block()
+        pli = Pipeline(self.cm.alphabet, Z=100000)
+        pli.cancel()
+        with self.assertRaises(KeyboardInterrupt) as ctx:
+            pli.search_cm(self.cm, block)
+        self.assertTrue(ctx.exception.hits.truncated)
+        self.assertEqual(len(ctx.exception.hits), 0)
+        # the pipeline can be reused after a cancellation
+        hits = pli.search_cm(self.cm, block)
+        self.assertFalse(hits.truncated)
+        self.assertGreater(len(hits), 0)
+
+    def test_cancel_thread(self):
+        block = self._repeated_block(20)
+        pli = Pipeline(self.cm.alphabet, Z=100000)
+        timer = threading.Timer(0.1, pli.cancel)
+        timer.start()
+        try:
+            with self.assertRaises(KeyboardInterrupt) as ctx:
+                pli.search_cm(self.cm, block)
+        finally:
+            timer.join()
+        self.assertTrue(ctx.exception.hits.truncated)
+        self.assertLess(len(ctx.exception.hits), 20 * len(self.sequences) * 3)
+
+    def test_cancel_deduplicate(self):
+        # the partial hits of an interrupted deduplicated search must be
+        # reported for the original targets, including the duplicates
+        head = self._repeated_block()
+        expected = Pipeline(self.cm.alphabet, Z=100000).search_cm(self.cm, head)
+        self.assertGreater(len(expected), 0)
+
+        # append enough unique targets (point mutants of the duplicated
+        # targets, which are as slow to search) for the search to be
+        # cancelled after all the duplicated targets were searched
+        block = head.copy()
+        for seq in self.sequences.textize():
+            for i in range(100):
+                residue = "A" if seq.sequence[i] != "A" else "C"
+                sequence = seq.sequence[:i] + residue + seq.sequence[i+1:]
+                mutant = TextSequence(name=f"{seq.name}_mutant{i}", sequence=sequence)
+                block.append(mutant.digitize(self.cm.alphabet))
+        pli = Pipeline(self.cm.alphabet, Z=100000, deduplicate=True)
+        t1 = time.monotonic()
+        pli.search_cm(self.cm, head)
+        timer = threading.Timer(2 * (time.monotonic() - t1) + 0.1, pli.cancel)
+        timer.start()
+        try:
+            with self.assertRaises(KeyboardInterrupt) as ctx:
+                pli.search_cm(self.cm, block)
+        finally:
+            timer.join()
+
+        hits = ctx.exception.hits
+        self.assertTrue(hits.truncated)
+        names = {seq.name for seq in head}
+        self.assertEqual(
+            sorted((h.name, h.score, h.alignment.target_from) for h in hits if h.name in names),
+            sorted((h.name, h.score, h.alignment.target_from) for h in expected),
+        )
+
+    def test_max_time(self):
+        block = self._repeated_block()
+        pli = Pipeline(self.cm.alphabet, Z=100000, max_time=1e-6)
+        self.assertEqual(pli.max_time, 1e-6)
+        with self.assertRaises(TimeoutError) as ctx:
+            pli.search_cm(self.cm, block)
+        self.assertTrue(ctx.exception.hits.truncated)
+        with self.assertRaises(ValueError):
+            Pipeline(self.cm.alphabet, Z=100000, max_time=0)
+
+    def test_search_threads(self):
+        block = self._mixed_block()
+        pli = Pipeline(self.cm.alphabet, Z=100000)
+        expected = pli.search_cm(self.cm, block)
+        self.assertGreater(len(expected), 0)
+
+        # search the same query and targets from several threads at once,
+        # each with its own pipeline
+        barrier = threading.Barrier(4)
+        results = [None] * 4
+        def search(i):
+            pli = Pipeline(self.cm.alphabet, Z=100000)
+            barrier.wait()
+            hits = pli.search_cm(self.cm, block)
+            results[i] = hits.merge(hits)
+        threads = [threading.Thread(target=search, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for hits in results:
+            self.assertIsNotNone(hits)
+            self.assertEqual(
+                [(h.name, h.score, h.evalue, h.alignment.target_from) for h in hits],
+                [(h.name, h.score, h.evalue, h.alignment.target_from) for h in expected.merge(expected)],
+            )
+
+    @unittest.skipUnless(sysconfig.get_config_var("Py_GIL_DISABLED"), "requires free-threaded Python")
+    def test_gil_disabled(self):
+        # importing the extension must not re-enable the GIL, unless it
+        # was already re-enabled by `pyhmmer` (as of pyhmmer 0.12, its
+        # extension modules still declare that they require the GIL)
+        if not sys._is_gil_enabled():
+            return
+        proc = subprocess.run(
+            [sys.executable, "-c", "import sys, pyhmmer.easel, pyhmmer.plan7; print(sys._is_gil_enabled())"],
+            capture_output=True,
+            check=True,
+            text=True,
+        )
+        if proc.stdout.strip() == "True":
+            self.skipTest("pyhmmer re-enables the GIL")
+        self.fail("importing pyinfernal re-enabled the GIL")
@@ -0,0 +1,137 @@
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from pyhmmer.easel import Alphabet, DigitalSequenceBlock, SequenceFile, TextSequence
+from pyhmmer.errors import AlphabetMismatch, InvalidParameter
+from pyinfernal.cm import CMFile, Pipeline, SeedIndex, SequenceDatabase
+
+from .. import __name__ as __package__
+from .utils import resource_files
+
+
+@unittest.skipUnless(resource_files, "importlib.resources.files not available")
+class TestSeedIndex(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        data = resource_files(__package__).joinpath("data")
+        cls.cms = []
+        for rfam_id in ["RF00029", "RF00042", "RF00107", "RF00243", "RF03523"]:
+            with CMFile(data.joinpath("cms", f"{rfam_id}.cm")) as cm_file:
+                cls.cms.append(cm_file.read())
+        cls.alphabet = cls.cms[0].alphabet
+        with SequenceFile(data.joinpath("seqs", "pANT_R100.fa"), digital=True, alphabet=cls.alphabet) as seqs_file:
+            cls.sequences = seqs_file.read_block()
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "targets.idx")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_create(self):
+        index = SeedIndex.create(self.path, self.sequences, k=10)
+        self.assertEqual(index.path, self.path)
+        self.assertEqual(index.k, 10)
+        self.assertEqual(index.alphabet, self.alphabet)
+        self.assertEqual(len(index), len(self.sequences))
+        self.assertEqual(index.total_length(), self.sequences.total_length())
+        self.assertEqual(index.lengths(), [len(seq) for seq in self.sequences])
+
+    def test_create_database(self):
+        db = SequenceDatabase.create(os.path.join(self.folder, "targets.db"), self.sequences)
+        index = SeedIndex.create(self.path, db)
+        self.assertEqual(index.lengths(), db.lengths())
+
+    def test_create_empty(self):
+        index = SeedIndex.create(self.path, DigitalSequenceBlock(self.alphabet))
+        self.assertEqual(len(index), 0)
+        self.assertEqual(index.total_length(), 0)
+        self.assertEqual(index.regions(self.cms[0]), [])
+
+    def test_create_error(self):
+        self.assertRaises(InvalidParameter, SeedIndex.create, self.path, self.sequences, k=2)
+        self.assertRaises(InvalidParameter, SeedIndex.create, self.path, self.sequences, k=20)
+        self.assertRaises(ValueError, SeedIndex.create, self.path, DigitalSequenceBlock(Alphabet.amino()))
+        self.assertRaises(TypeError, SeedIndex.create, self.path, list(self.sequences))
+
+    def test_pickle(self):
+        index = SeedIndex.create(self.path, self.sequences)
+        copy = pickle.loads(pickle.dumps(index))
+        self.assertEqual(copy.k, index.k)
+        self.assertEqual(copy.regions(self.cms[0]), index.regions(self.cms[0]))
+
+    def test_invalid_file(self):
+        with open(self.path, "wb") as f:
+            f.write(b">seq1\nACGU\n" * 10)
+        self.assertRaises(ValueError, SeedIndex, self.path)
+
+    def test_truncated_file(self):
+        SeedIndex.create(self.path, self.sequences)
+        with open(self.path, "rb") as f:
+            data = f.read()
+        with open(self.path, "wb") as f:
+            f.write(data[:len(data) // 2])
+        self.assertRaises(ValueError, SeedIndex, self.path)
+
+    def test_regions(self):
+        index = SeedIndex.create(self.path, self.sequences)
+        cm = self.cms[0]
+        regions = index.regions(cm)
+        self.assertGreater(len(regions), 0)
+        self.assertEqual(regions, sorted(regions))
+        for seq, start, end, strand in regions:
+            self.assertEqual(seq, 0)
+            self.assertGreaterEqual(start, 0)
+            self.assertLessEqual(end, len(self.sequences[0]))
+            self.assertLess(start, end)
+            self.assertIn(strand, ("+", "-"))
+        # raising the threshold gives fewer candidate windows
+        coverage = lambda regions: sum(end - start for _, start, end, _ in regions)
+        self.assertLess(coverage(index.regions(cm, threshold=18.0)), coverage(regions))
+        self.assertLess(coverage(regions), coverage(index.regions(cm, threshold=10.0)))
+
+    def test_regions_alphabet_mismatch(self):
+        block = DigitalSequenceBlock(Alphabet.dna(), [TextSequence(name=b"seq", sequence="ACGT" * 10).digitize(Alphabet.dna())])
+        index = SeedIndex.create(self.path, block)
+        self.assertRaises(AlphabetMismatch, index.regions, self.cms[0])
+
+    def test_search_indexed(self):
+        # the indexed search should find all the included hits of a complete
+        # scan, with the same scores, while searching fewer residues
+        index = SeedIndex.create(self.path, self.sequences)
+        Z = self.sequences.total_length()
+        for cm in self.cms:
+            expected = Pipeline(self.alphabet, Z=Z).search_cm(cm, self.sequences)
+            hits = Pipeline(self.alphabet, Z=Z).search_indexed(cm, self.sequences, index)
+            self.assertGreater(len(expected.included), 0)
+            self.assertLessEqual(len(hits), len(expected))
+            found = {(hit.name, hit.strand, hit.alignment.target_from): hit.score for hit in hits}
+            for hit in expected.included:
+                key = (hit.name, hit.strand, hit.alignment.target_from)
+                self.assertIn(key, found)
+                self.assertAlmostEqual(found[key], hit.score, places=3)
+
+    def test_search_indexed_database(self):
+        db = SequenceDatabase.create(os.path.join(self.folder, "targets.db"), self.sequences)
+        index = SeedIndex.create(self.path, db)
+        cm = self.cms[0]
+        expected = Pipeline(self.alphabet, Z=db.total_length()).search_indexed(cm, self.sequences, index)
+        hits = Pipeline(self.alphabet, Z=db.total_length()).search_indexed(cm, db, index)
+        self.assertEqual(
+            [(h.name, h.score, h.alignment.target_from) for h in hits],
+            [(h.name, h.score, h.alignment.target_from) for h in expected],
+        )
+
+    def test_search_indexed_mismatch(self):
+        index = SeedIndex.create(self.path, self.sequences)
+        block = DigitalSequenceBlock(self.alphabet, [self.sequences[0], self.sequences[0]])
+        pli = Pipeline(self.alphabet, Z=1000000)
+        self.assertRaises(ValueError, pli.search_indexed, self.cms[0], block, index)
+        seq = TextSequence(name=b"seq", sequence="ACGU" * 10).digitize(self.alphabet)
+        block = DigitalSequenceBlock(self.alphabet, [seq])
+        self.assertRaises(ValueError, pli.search_indexed, self.cms[0], block, index)
@@ -0,0 +1,148 @@
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from pyhmmer.easel import Alphabet, DigitalSequenceBlock, SequenceFile, TextSequence
+from pyhmmer.errors import AlphabetMismatch
+from pyinfernal.cm import CMFile, Pipeline, SequenceDatabase
+
+from .. import __name__ as __package__
+from .utils import resource_files
+
+
+@unittest.skipUnless(resource_files, "importlib.resources.files not available")
+class TestSequenceDatabase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        data = resource_files(__package__).joinpath("data")
+        with CMFile(data.joinpath("cms", "RF00029.cm")) as cm_file:
+            cls.cm = cm_file.read()
+        cls.fasta = data.joinpath("seqs", "pANT_R100.fa")
+        with SequenceFile(cls.fasta, digital=True, alphabet=cls.cm.alphabet) as seqs_file:
+            cls.sequences = seqs_file.read_block()
+        # split the sequence into targets with different metadata
+        text = cls.sequences[0].textize().sequence
+        block = DigitalSequenceBlock(cls.cm.alphabet)
+        for i, (start, end) in enumerate([(0, 30000), (30000, 30150), (30150, 60000), (60000, len(text))]):
+            seq = TextSequence(
+                name=f"chunk{i}",
+                accession=f"ACC{i}" if i % 2 else None,
+                description=f"chunk {i} of pANT_R100" if i < 2 else None,
+                sequence=text[start:end],
+            )
+            block.append(seq.digitize(cls.cm.alphabet))
+        cls.block = block
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "targets.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def assertSequencesEqual(self, db, block):
+        self.assertEqual(len(db), len(block))
+        for seq, expected in zip(db, block):
+            self.assertEqual(seq.name, expected.name)
+            self.assertEqual(seq.accession, expected.accession)
+            self.assertEqual(seq.description, expected.description)
+            self.assertEqual(seq.alphabet, expected.alphabet)
+            self.assertEqual(seq, expected)
+
+    def test_create(self):
+        db = SequenceDatabase.create(self.path, self.block)
+        self.assertEqual(db.path, self.path)
+        self.assertEqual(db.alphabet, self.cm.alphabet)
+        self.assertEqual(db.total_length(), self.block.total_length())
+        self.assertEqual(db.lengths(), [len(seq) for seq in self.block])
+        self.assertSequencesEqual(db, self.block)
+
+    def test_create_from_file(self):
+        with SequenceFile(self.fasta, digital=True, alphabet=self.cm.alphabet) as seqs_file:
+            db = SequenceDatabase.create(self.path, seqs_file)
+        self.assertSequencesEqual(db, self.sequences)
+        self.assertSequencesEqual(SequenceDatabase(self.path), self.sequences)
+
+    def test_create_empty(self):
+        db = SequenceDatabase.create(self.path, DigitalSequenceBlock(self.cm.alphabet))
+        self.assertEqual(len(db), 0)
+        self.assertEqual(db.total_length(), 0)
+        self.assertEqual(list(db), [])
+
+    def test_create_alphabet_mismatch(self):
+        with self.assertRaises(AlphabetMismatch):
+            SequenceDatabase.create(self.path, self.block, alphabet=Alphabet.amino())
+
+    def test_getitem(self):
+        db = SequenceDatabase.create(self.path, self.block)
+        self.assertEqual(db[0], self.block[0])
+        self.assertEqual(db[-1], self.block[-1])
+        self.assertEqual(db[1].accession, "ACC1")
+        self.assertRaises(IndexError, db.__getitem__, len(self.block))
+        self.assertRaises(IndexError, db.__getitem__, -len(self.block) - 1)
+
+    def test_slice(self):
+        db = SequenceDatabase.create(self.path, self.block)
+        view = db[1:3]
+        self.assertEqual(view.total_length(), self.block[1:3].total_length())
+        self.assertSequencesEqual(view, self.block[1:3])
+        self.assertSequencesEqual(view[1:], self.block[2:3])
+        self.assertEqual(len(db[3:1]), 0)
+        self.assertRaises(ValueError, db.__getitem__, slice(None, None, 2))
+
+    def test_pickle(self):
+        db = SequenceDatabase.create(self.path, self.block)
+        self.assertSequencesEqual(pickle.loads(pickle.dumps(db)), self.block)
+        self.assertSequencesEqual(pickle.loads(pickle.dumps(db[2:])), self.block[2:])
+
+    def test_invalid_file(self):
+        with open(self.path, "wb") as f:
+            f.write(b">seq1\nACGU\n" * 10)
+        self.assertRaises(ValueError, SequenceDatabase, self.path)
+
+    def test_truncated_file(self):
+        SequenceDatabase.create(self.path, self.block)
+        with open(self.path, "rb") as f:
+            data = f.read()
+        with open(self.path, "wb") as f:
+            f.write(data[:len(data) // 2])
+        self.assertRaises(ValueError, SequenceDatabase, self.path)
+
+    def test_search_cm(self):
+        db = SequenceDatabase.create(self.path, self.block)
+        pli = Pipeline(self.cm.alphabet, Z=db.total_length())
+        expected = pli.search_cm(self.cm, self.block)
+        pli.clear()
+        hits = pli.search_cm(self.cm, db)
+        self.assertGreater(len(expected), 0)
+        self.assertEqual(
+            [(h.name, h.accession, h.description, h.score, h.evalue, h.alignment.target_from) for h in hits],
+            [(h.name, h.accession, h.description, h.score, h.evalue, h.alignment.target_from) for h in expected],
+        )
+
+    def test_search_cm_options(self):
+        db = SequenceDatabase.create(self.path, list(self.block) * 2)
+        block = DigitalSequenceBlock(self.cm.alphabet, list(self.block) * 2)
+        for options in [dict(deduplicate=True), dict(sort_targets=True), dict(short_targets=True)]:
+            pli = Pipeline(self.cm.alphabet, Z=100000, **options)
+            expected = pli.search_cm(self.cm, block)
+            pli.clear()
+            hits = pli.search_cm(self.cm, db)
+            self.assertEqual(
+                [(h.name, h.score, h.evalue, h.alignment.target_from) for h in hits],
+                [(h.name, h.score, h.evalue, h.alignment.target_from) for h in expected],
+            )
+
+    def test_search_cms(self):
+        db = SequenceDatabase.create(self.path, self.block)
+        pli = Pipeline(self.cm.alphabet, Z=100000)
+        expected = pli.search_cms([self.cm], self.block)
+        pli.clear()
+        hits = pli.search_cms([self.cm], db)
+        self.assertEqual(
+            [(h.name, h.score, h.evalue) for h in hits[0]],
+            [(h.name, h.score, h.evalue) for h in expected[0]],
+        )
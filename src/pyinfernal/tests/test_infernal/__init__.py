@@ -1,7 +1,11 @@
 from . import (
-    test_cmsearch
+    test_cmalign,
+    test_cmsearch,
+    test_shard,
 )
 
 def load_tests(loader, suite, pattern):
+    suite.addTests(loader.loadTestsFromModule(test_cmalign))
     suite.addTests(loader.loadTestsFromModule(test_cmsearch))
+    suite.addTests(loader.loadTestsFromModule(test_shard))
     return suite
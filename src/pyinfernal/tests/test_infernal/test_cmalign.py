@@ -0,0 +1,64 @@
+import unittest
+
+from pyhmmer.easel import DigitalSequenceBlock, SequenceFile
+from pyinfernal.cm import CMFile, Aligner
+from pyinfernal.infernal import cmalign
+
+from ..utils import resource_files
+
+
+@unittest.skipUnless(resource_files, "importlib.resources.files not available")
+class TestCmalign(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.data = resource_files("pyinfernal.tests").joinpath("data")
+        with CMFile(cls.data.joinpath("cms", "tRNA.c.cm")) as cm_file:
+            cls.cm = next(cm for cm in cm_file if cm.name == "tRNA")
+        with cls.seqs_file(cls) as seqs_file:
+            cls.sequences = seqs_file.read_block()
+        cls.expected = Aligner(cls.cm).align(cls.sequences)
+
+    def seqs_file(self):
+        path = self.data.joinpath("seqs", "emitted-tRNA.fa")
+        return SequenceFile(path, digital=True, alphabet=self.cm.alphabet)
+
+    def assert_chunks_match(self, msas, chunksize):
+        names = tuple(seq.name for seq in self.sequences)
+        rows = list(self.expected.textize().alignment)
+        self.assertEqual(len(msas), (len(names) + chunksize - 1) // chunksize)
+        for i, msa in enumerate(msas):
+            self.assertEqual(msa.names, names[i*chunksize:(i+1)*chunksize])
+        # alignments of single sequences have no shared insert columns
+        if chunksize >= len(names):
+            self.assertEqual(list(msas[0].textize().alignment), rows)
+
+    def test_block(self):
+        for cpus in (1, 2):
+            msas = list(cmalign(self.cm, self.sequences, cpus=cpus, chunksize=2))
+            self.assert_chunks_match(msas, 2)
+
+    def test_block_single_chunk(self):
+        msas = list(cmalign(self.cm, self.sequences, cpus=2))
+        self.assert_chunks_match(msas, 100)
+
+    def test_sequence_file(self):
+        with self.seqs_file() as seqs_file:
+            msas = list(cmalign(self.cm, seqs_file, cpus=2, chunksize=1))
+        self.assert_chunks_match(msas, 1)
+
+    def test_iterable(self):
+        msas = list(cmalign(self.cm, iter(self.sequences), cpus=1, chunksize=2))
+        self.assert_chunks_match(msas, 2)
+
+    def test_callback(self):
+        calls = []
+        msas = list(cmalign(self.cm, self.sequences, cpus=2, chunksize=1, callback=lambda msa, n: calls.append((msa, n))))
+        self.assertEqual([n for _, n in calls], [1, 2, 3])
+        self.assertEqual([msa.names for msa, _ in calls], [msa.names for msa in msas])
+
+    def test_options(self):
+        msas = list(cmalign(self.cm, self.sequences, cpus=1, algorithm="cyk", posteriors=False))
+        self.assertEqual(len(msas[0].sequences), len(self.sequences))
+        self.assertRaises(ValueError, next, cmalign(self.cm, self.sequences, algorithm="nonsense"))
+        self.assertRaises(ValueError, next, cmalign(self.cm, self.sequences, chunksize=0))
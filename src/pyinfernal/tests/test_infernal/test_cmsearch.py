@@ -13,7 +13,7 @@ import multiprocessing.resource_sharer
 import pyhmmer
 import pyinfernal
 from pyhmmer.easel import Alphabet, DigitalMSA, MSAFile, SequenceFile, TextSequence
-from pyinfernal.cm import CM, CMFile, TopHits, Hit, Alignment, Pipeline
+from pyinfernal.cm import CM, CMFile, TopHits, Hit, Alignment, Pipeline, SequenceDatabase
 
 from ..utils import resource_files
 
@@ -113,6 +113,20 @@ class _TestSearch(metaclass=abc.ABCMeta):
             hits_it = itertools.chain.from_iterable(all_hits)
             self.assert_hits_match_table(hits_it, tbl)
 
+    @unittest.skipUnless(resource_files, "importlib.resources not available")
+    def test_pANT_5c_cmfile(self):
+        with self.cm_file("5.c") as cm_file:
+            alphabet = cm_file.read().alphabet
+        with self.seqs_file("pANT_R100", digital=True, alphabet=alphabet) as seqs_file:
+            seqs = seqs_file.read_block()
+        with self.cm_file("5.c") as cm_file:
+            all_hits = self.get_hits_multi(cm_file, seqs, Z=1e5)
+        self.assertEqual(
+            [hits.query.name for hits in all_hits],
+            ["tRNA", "Vault", "snR75", "Plant_SRP", "tRNA-Sec"],
+        )
+        self.assertEqual(sum(len(hits.reported) for hits in all_hits), 6)
+
     @unittest.skipUnless(resource_files, "importlib.resources not available")
     def test_pANT_RF00029(self):
         self._test_pANT_RF("RF00029", 3, 3)
@@ -225,6 +239,103 @@ class TestCmsearch(_TestSearch, unittest.TestCase):
         hits = pyinfernal.cmsearch([], seqs, parallel=self.parallel)
         self.assertIs(None, next(hits, None))
 
+    def test_max_time(self):
+        with self.cm_file("RF00029") as cm_file:
+            cm = cm_file.read()
+        with self.seqs_file("pANT_R100", digital=True, alphabet=cm.alphabet) as seqs_file:
+            seqs = seqs_file.read_block()
+        with self.assertRaises(TimeoutError):
+            self.get_hits(cm, seqs, max_time=1e-6)
+
+    def test_metrics(self):
+        cms = []
+        for rfam_id in ["RF03523", "RF00107"]:
+            with self.cm_file(rfam_id) as cm_file:
+                cms.append(cm_file.read())
+        with self.seqs_file("pANT_R100", digital=True, alphabet=cms[0].alphabet) as seqs_file:
+            seqs = seqs_file.read_block()
+
+        events = []
+        metrics = pyinfernal.infernal.SearchMetrics(lambda event, data: events.append(event))
+        self.assertIs(metrics.eta, None)
+        self.get_hits_multi(cms, seqs, metrics=metrics)
+
+        residues = len(cms) * seqs.total_length()
+        self.assertEqual(metrics.queries_total, len(cms))
+        self.assertEqual(metrics.queries_done, len(cms))
+        self.assertEqual(metrics.residues, residues)
+        self.assertEqual(metrics.eta, 0.0)
+        self.assertGreater(metrics.residues_per_second, 0.0)
+        self.assertEqual(events[0], "search_started")
+        self.assertEqual(events[-1], "search_finished")
+        self.assertEqual(events.count("hits_ready"), len(cms))
+
+        workers = metrics.workers
+        self.assertGreater(len(workers), 0)
+        self.assertEqual(sum(worker.residues for worker in workers), residues)
+        for worker in workers:
+            self.assertIs(worker.current_query, None)
+            self.assertGreaterEqual(worker.utilization, 0.0)
+            self.assertLessEqual(worker.utilization, 1.0)
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot["queries_done"], len(cms))
+        self.assertEqual(len(snapshot["workers"]), len(workers))
+
+    @unittest.skipUnless(resource_files, "importlib.resources not available")
+    def test_unordered(self):
+        with self.cm_file("5.c") as cm_file:
+            cms = list(cm_file)
+        with self.seqs_file("pANT_R100", digital=True, alphabet=cms[0].alphabet) as seqs_file:
+            seqs = seqs_file.read_block()
+
+        expected = self.get_hits_multi(cms, seqs, Z=1e5)
+        metrics = pyinfernal.infernal.SearchMetrics()
+        results = self.get_hits_multi(cms, seqs, Z=1e5, ordered=False, metrics=metrics)
+        self.assertEqual(sorted(index for index, _ in results), list(range(len(cms))))
+        self.assertEqual(metrics.queries_done, len(cms))
+        for index, hits in results:
+            self.assertEqual(hits.query.name, cms[index].name)
+            self.assertEqual(
+                [(hit.name, hit.score, hit.evalue) for hit in hits],
+                [(hit.name, hit.score, hit.evalue) for hit in expected[index]],
+            )
+
+    @unittest.skipUnless(resource_files, "importlib.resources not available")
+    def test_msa_query(self):
+        path = resource_files("pyinfernal.tests").joinpath("data", "msas", "tRNA.sto")
+        if not path.exists():
+            self.skipTest(f"data files not available: {str(path)!r}")
+        rna = Alphabet.rna()
+        with MSAFile(path, digital=True, alphabet=rna) as msa_file:
+            msa = msa_file.read()
+        # remove the base pairs so the built CM does not need calibration
+        msa.secondary_structure = "." * len(msa.secondary_structure)
+        with self.seqs_file("emitted-tRNA", digital=True, alphabet=rna) as seqs_file:
+            seqs = seqs_file.read_block()
+
+        builder = pyinfernal.cm.Builder(rna, symfrac=0.4)
+        expected = Pipeline(rna, Z=1000000).search_cm(builder.build_msa(msa), seqs)
+        self.assertGreater(len(expected), 0)
+
+        hits = self.get_hits(msa, seqs, Z=1000000, builder=builder)
+        self.assertEqual(hits.query.name, "tRNA")
+        self.assertEqual(hits.query.clen, expected.query.clen)
+        self.assertEqual(
+            [(hit.name, hit.score, hit.evalue) for hit in hits],
+            [(hit.name, hit.score, hit.evalue) for hit in expected],
+        )
+
+        expected = Pipeline(rna, Z=1000000).search_cm(pyinfernal.cm.Builder(rna).build_msa(msa), seqs)
+        all_hits = self.get_hits_multi([msa, msa], seqs, Z=1000000)
+        self.assertEqual(len(all_hits), 2)
+        for hits in all_hits:
+            self.assertEqual(hits.query.name, "tRNA")
+            self.assertEqual(
+                [(hit.name, hit.score) for hit in hits],
+                [(hit.name, hit.score) for hit in expected],
+            )
+
 
 class TestCmsearchSingle(TestCmsearch, unittest.TestCase):
 
@@ -270,6 +381,138 @@ class TestCmsearchReverseSingle(TestCmsearchSingle):
 #     parallel = "targets"
 
 
+class TestCmsearchDatabase(_TestSearch, unittest.TestCase):
+
+    def get_hits(self, cm, seqs, **options):
+        return self.get_hits_multi([cm], seqs, **options)[0]
+
+    def get_hits_multi(self, cms, seqs, **options):
+        with tempfile.TemporaryDirectory() as folder:
+            db = SequenceDatabase.create(os.path.join(folder, "targets.db"), seqs)
+            return list(pyinfernal.cmsearch(cms, db, **options))
+
+    def test_default_z(self):
+        with self.cm_file("RF00029") as cm_file:
+            cm = cm_file.read()
+        with self.seqs_file("pANT_R100", digital=True, alphabet=cm.alphabet) as seqs_file:
+            seqs = seqs_file.read_block()
+        expected = next(pyinfernal.cmsearch(cm, seqs))
+        hits = self.get_hits(cm, seqs)
+        self.assertEqual(hits.Z, expected.Z)
+        self.assertEqual([h.evalue for h in hits], [h.evalue for h in expected])
+
+
+class TestCmsearchDeterminism(_TestSearch, unittest.TestCase):
+
+    def get_hits(self, cm, seqs, **options):
+        return list(pyinfernal.cmsearch(cm, seqs, **options))[0]
+
+    def _chunked_block(self, alphabet, size=7000):
+        # split the plasmid into chunks, and add the chunks a second time in
+        # reverse order so that some hits have the same score and E-value
+        with self.seqs_file("pANT_R100") as seqs_file:
+            plasmid = seqs_file.read()
+        chunks = [
+            TextSequence(name=f"chunk{i}", sequence=plasmid.sequence[i:i+size]).digitize(alphabet)
+            for i in range(0, len(plasmid.sequence), size)
+        ]
+        for i, chunk in reversed(list(enumerate(chunks))):
+            copy = chunk.copy()
+            copy.name = f"copy{i}"
+            chunks.append(copy)
+        return pyhmmer.easel.DigitalSequenceBlock(alphabet, chunks)
+
+    def _hit_fields(self, hits):
+        return [
+            (hit.name, hit.strand, hit.alignment.target_from, hit.alignment.target_to, hit.score, hit.evalue)
+            for hit in hits
+        ]
+
+    def _search(self, cms, seqs, **options):
+        # record the coordinates and scores of the hits, as well as the
+        # written output which contains the complete hit information
+        outputs = []
+        for hits in pyinfernal.cmsearch(cms, seqs, E=1000.0, **options):
+            buffer = io.BytesIO()
+            hits.write(buffer, header=False)
+            outputs.append((self._hit_fields(hits), buffer.getvalue()))
+        return outputs
+
+    def test_output_identical(self):
+        cms = []
+        for rfam_id in ["RF03523", "RF00107"]:
+            with self.cm_file(rfam_id) as cm_file:
+                cms.append(cm_file.read())
+        seqs = self._chunked_block(cms[0].alphabet)
+
+        for reseed_targets in (False, True):
+            expected = self._search(cms, seqs, cpus=1, reseed_targets=reseed_targets)
+            self.assertGreater(sum(len(fields) for fields, _ in expected), 0)
+            matrix = itertools.product(
+                [1, 2, 3],
+                ["queries", "targets"],
+                ["threading", "multiprocessing"],
+                [{}, {"deduplicate": True}, {"sort_targets": True}],
+            )
+            for cpus, parallel, backend, options in matrix:
+                # a single CPU always runs in the main thread
+                if cpus == 1 and backend != "threading":
+                    continue
+                with self.subTest(cpus=cpus, parallel=parallel, backend=backend, reseed_targets=reseed_targets, **options):
+                    outputs = self._search(
+                        cms,
+                        seqs,
+                        cpus=cpus,
+                        parallel=parallel,
+                        backend=backend,
+                        reseed_targets=reseed_targets,
+                        **options,
+                    )
+                    self.assertEqual(outputs, expected)
+
+    def test_output_identical_windows(self):
+        # searching a long target split into overlapping windows must give
+        # the same hits as searching the complete target, whatever the size
+        # of the windows
+        with self.seqs_file("pANT_R100", digital=True, alphabet=Alphabet.rna()) as seqs_file:
+            seqs = seqs_file.read_block()
+        length = len(seqs[0])
+        for rfam_id in ["RF03523", "RF00107"]:
+            with self.cm_file(rfam_id) as cm_file:
+                cm = cm_file.read()
+            for reseed_targets in (False, True):
+                pli = Pipeline(cm.alphabet, Z=length, E=1000.0, reseed_targets=reseed_targets)
+                expected = self._hit_fields(pli.search_cm(cm, seqs))
+                self.assertGreater(len(expected), 0)
+                for size in (5000, 20000):
+                    with self.subTest(cm=rfam_id, reseed_targets=reseed_targets, size=size):
+                        # overlap the windows so that every hit is contained
+                        # in at least one window
+                        step = size - 2 * cm.W
+                        regions = [(0, start, min(length, start + size)) for start in range(0, length, step)]
+                        pli = Pipeline(cm.alphabet, Z=length, E=1000.0, reseed_targets=reseed_targets)
+                        hits = pli.search_regions(cm, seqs, regions)
+                        self.assertEqual(self._hit_fields(hits), expected)
+
+    def test_output_identical_database(self):
+        cms = []
+        for rfam_id in ["RF03523", "RF00107"]:
+            with self.cm_file(rfam_id) as cm_file:
+                cms.append(cm_file.read())
+        seqs = self._chunked_block(cms[0].alphabet)
+        expected = self._search(cms, seqs, cpus=1)
+
+        with tempfile.TemporaryDirectory() as folder:
+            db = SequenceDatabase.create(os.path.join(folder, "targets.db"), seqs)
+            matrix = itertools.product([1, 3], ["queries", "targets"], ["threading", "multiprocessing"])
+            for cpus, parallel, backend in matrix:
+                if cpus == 1 and backend != "threading":
+                    continue
+                with self.subTest(cpus=cpus, parallel=parallel, backend=backend):
+                    outputs = self._search(cms, db, cpus=cpus, parallel=parallel, backend=backend)
+                    self.assertEqual(outputs, expected)
+
+
 class TestPipelinesearch(_TestSearch, unittest.TestCase):
 
     def get_hits(self, cm, seqs, **options):
@@ -0,0 +1,134 @@
+import io
+import os
+import tempfile
+import unittest
+
+from pyhmmer.easel import SequenceFile
+from pyinfernal.cm import CMFile
+from pyinfernal.infernal import (
+    cmsearch,
+    Shard,
+    ShardManifest,
+    run_shard,
+    run_shards,
+    merge_shards,
+)
+
+from ..utils import resource_files
+
+
+@unittest.skipUnless(resource_files, "importlib.resources.files not available")
+class TestSharding(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        data = resource_files("pyinfernal.tests").joinpath("data")
+
+        # write several CMs to a single query file
+        cls.cms = []
+        for rfam_id in ["RF00029", "RF03523", "RF00107"]:
+            with CMFile(data.joinpath("cms", f"{rfam_id}.cm")) as cm_file:
+                cls.cms.append(cm_file.read())
+        cls.queries = os.path.join(cls.tmpdir.name, "queries.cm")
+        with open(cls.queries, "wb") as dst:
+            for cm in cls.cms:
+                cm.write(dst)
+
+        # split the plasmid into several targets
+        with SequenceFile(data.joinpath("seqs", "pANT_R100.fa")) as seqs_file:
+            plasmid = seqs_file.read()
+        cls.targets = os.path.join(cls.tmpdir.name, "targets.fa")
+        with open(cls.targets, "w") as dst:
+            for i in range(0, len(plasmid.sequence), 30000):
+                dst.write(f">chunk{i}\n{plasmid.sequence[i:i+30000]}\n")
+        with SequenceFile(cls.targets, digital=True, alphabet=cls.cms[0].alphabet) as seqs_file:
+            cls.sequences = seqs_file.read_block()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def setUp(self):
+        self.manifest = ShardManifest.create(
+            self.queries,
+            self.targets,
+            query_shards=2,
+            target_shards=3,
+            E=10.0,
+        )
+        self.outdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.outdir.cleanup()
+
+    def _summary(self, hits):
+        return sorted(
+            (hit.name, hit.score, hit.evalue, hit.alignment.target_from, hit.alignment.target_to)
+            for hit in hits
+        )
+
+    def assert_hits_match_search(self, all_hits):
+        expected = list(cmsearch(self.cms, self.sequences, cpus=1, Z=self.manifest.Z, E=10.0))
+        self.assertEqual(len(all_hits), len(expected))
+        for hits, exp in zip(all_hits, expected):
+            self.assertEqual(hits.query.name, exp.query.name)
+            self.assertEqual(hits.Z, exp.Z)
+            self.assertEqual(len(hits.included), len(exp.included))
+            self.assertEqual(self._summary(hits), self._summary(exp))
+
+    def test_create(self):
+        self.assertEqual(self.manifest.Z, self.sequences.total_length())
+        self.assertEqual(len(self.manifest.shards), 6)
+        queries = sorted({shard.queries for shard in self.manifest.shards})
+        targets = sorted({shard.targets for shard in self.manifest.shards})
+        self.assertEqual(queries[0][0], 0)
+        self.assertEqual(queries[-1][1], len(self.cms))
+        self.assertEqual(targets[0][0], 0)
+        self.assertEqual(targets[-1][1], len(self.sequences))
+        for shard in self.manifest.shards:
+            self.assertLess(shard.queries[0], shard.queries[1])
+            self.assertLess(shard.targets[0], shard.targets[1])
+
+    def test_create_error(self):
+        self.assertRaises(ValueError, ShardManifest.create, self.queries, self.targets, query_shards=0)
+        self.assertRaises(ValueError, ShardManifest.create, self.queries, self.targets, target_shards=-1)
+
+    def test_dump_load(self):
+        buffer = io.StringIO()
+        self.manifest.dump(buffer)
+        buffer.seek(0)
+        manifest = ShardManifest.load(buffer)
+        self.assertEqual(manifest, self.manifest)
+        self.assertEqual(manifest.checksum, self.manifest.checksum)
+        self.assertEqual(manifest.shards[0], Shard(0, manifest.shards[0].queries, manifest.shards[0].targets))
+
+    def test_run_shard(self):
+        results = []
+        for shard in reversed(self.manifest.shards):
+            path = os.path.join(self.outdir.name, f"{shard.index}.hits")
+            run_shard(self.manifest, shard.index, path, cpus=1)
+            results.append(path)
+        self.assert_hits_match_search(list(merge_shards(self.manifest, results)))
+
+    def test_run_shards(self):
+        results = run_shards(self.manifest, self.outdir.name, processes=2)
+        self.assertEqual(len(results), len(self.manifest.shards))
+        self.assert_hits_match_search(list(merge_shards(self.manifest, results)))
+
+    def test_merge_error(self):
+        results = []
+        for shard in self.manifest.shards:
+            path = os.path.join(self.outdir.name, f"{shard.index}.hits")
+            run_shard(self.manifest, shard.index, path, cpus=1)
+            results.append(path)
+        # missing shard
+        with self.assertRaises(ValueError):
+            list(merge_shards(self.manifest, results[1:]))
+        # duplicate shard
+        with self.assertRaises(ValueError):
+            list(merge_shards(self.manifest, results + results[:1]))
+        # different manifest
+        other = ShardManifest.create(self.queries, self.targets, query_shards=2, target_shards=3, E=1.0)
+        with self.assertRaises(ValueError):
+            list(merge_shards(other, results))